@@ -0,0 +1,342 @@
+"""
+Benchmarks dos caminhos críticos do ExoplanetDetector
+Mede tempo, pico de memória (RSS) e throughput de cada etapa com catálogos sintéticos
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import logging
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from exoplanet_ml import ExoplanetDetector, NASA_TABLES
+from catalog_generator import generate_catalog
+from tracing import TRACER, current_rss_bytes
+
+logger = logging.getLogger(__name__)
+
+# Tamanhos nomeados aceitos em --sizes (números inteiros também são aceitos)
+SIZES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000, '10m': 10_000_000}
+
+STAGES = ['read', 'adapt', 'preprocess', 'train', 'predict', 'predict_batch', 'save']
+
+BASELINE_PATH = 'benchmark_baseline.json'
+
+# Uma etapa regride quando fica mais lenta que o baseline além do limiar relativo
+# e também além de uma folga absoluta (evita ruído em etapas de poucos ms)
+DEFAULT_THRESHOLD = 0.25
+MIN_REGRESSION_SECONDS = 0.005
+
+# Predições unitárias por medição de predict_exoplanet
+PREDICT_CALLS = 200
+
+class PeakRSS:
+    """Amostra o RSS do processo em segundo plano e guarda o pico do trecho medido
+
+    ru_maxrss só cresce durante a vida do processo; amostrar /proc/self/statm
+    permite medir o pico de cada etapa separadamente. Sem /proc (macOS,
+    Windows) cai para ru_maxrss.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.start_mb = self.peak_mb = _current_rss_mb()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start_mb = self.peak_mb = _current_rss_mb()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, _current_rss_mb())
+        return False
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, _current_rss_mb())
+
+def _current_rss_mb():
+    """RSS atual em MB"""
+    return current_rss_bytes() / 1e6
+
+def parse_size(value):
+    """Converte '100k', '1m' ou '5000' em número de linhas"""
+    value = value.strip().lower()
+    if value in SIZES:
+        return SIZES[value]
+    multipliers = {'k': 1_000, 'm': 1_000_000}
+    if value[-1:] in multipliers:
+        return int(float(value[:-1]) * multipliers[value[-1]])
+    return int(value)
+
+def size_label(rows):
+    """Rótulo curto de um tamanho (1000 -> '1k')"""
+    for label, value in SIZES.items():
+        if value == rows:
+            return label
+    return str(rows)
+
+def synthetic_catalog(rows, width=0, mission='kepler_koi', seed=42):
+    """Catálogo sintético da missão com `width` colunas numéricas extras"""
+    df = generate_catalog(rows, mission, seed).reset_index(drop=True)
+    rng = np.random.default_rng(seed)
+    for i in range(width):
+        df[f'koi_extra_{i}'] = rng.normal(size=rows)
+    return df
+
+def _measure(fn, repeat):
+    """Executa fn `repeat` vezes; retorna (tempos, pico de RSS, delta de RSS, último resultado)"""
+    timings = []
+    result = None
+    with PeakRSS() as rss:
+        for _ in range(repeat):
+            result = None
+            gc.collect()
+            started = time.perf_counter()
+            result = fn()
+            timings.append(time.perf_counter() - started)
+    return timings, rss.peak_mb, rss.peak_mb - rss.start_mb, result
+
+def run_case(rows, width, stages, mission='kepler_koi', repeat=3, max_train_rows=200_000, max_predict_rows=1_000_000, workdir=None):
+    """Executa as etapas pedidas para um catálogo de `rows` linhas e `width` colunas extras"""
+    # Importado aqui: o módulo da interface só é necessário para as etapas de leitura/adaptação
+    from streamlit_app import safe_read_file, adapt_dataframe_for_ml
+
+    workdir = workdir or tempfile.mkdtemp(prefix='exoplanet_bench_')
+    catalog = synthetic_catalog(rows, width, mission)
+    results = []
+
+    def record(stage, fn, stage_rows, repeat_count=repeat, unit_rows=None):
+        timings, peak_mb, delta_mb, value = _measure(fn, repeat_count)
+        best = min(timings)
+        results.append({
+            'stage': stage,
+            'size': size_label(rows),
+            'rows': stage_rows,
+            'width': width,
+            'repeat': repeat_count,
+            'seconds': best,
+            'median_seconds': float(np.median(timings)),
+            'peak_rss_mb': round(peak_mb, 1),
+            'rss_delta_mb': round(delta_mb, 1),
+            'rows_per_second': (unit_rows or stage_rows) / best if best > 0 else None
+        })
+        logger.info(f"{stage} [{size_label(rows)}, largura {width}]: {best * 1000:.1f} ms, pico {peak_mb:.0f} MB")
+        return value
+
+    # Etapas dependentes (ex.: predict precisa de train) são executadas mesmo se não pedidas
+    needed = set(stages)
+    if needed & {'predict', 'predict_batch', 'save'}:
+        needed.add('train')
+    if 'train' in needed:
+        needed.add('preprocess')
+    if 'preprocess' in needed:
+        needed.add('adapt')
+
+    df = catalog
+    if 'read' in stages:
+        csv_path = os.path.join(workdir, f'catalog_{rows}_{width}.csv')
+        catalog.to_csv(csv_path, index=False)
+
+        def read():
+            with open(csv_path, 'rb') as handle:
+                frame, error = safe_read_file(handle, 'pt')
+            if error:
+                raise RuntimeError(error)
+            return frame
+
+        df = record('read', read, rows)
+        os.remove(csv_path)
+
+    adapted = df
+    if 'adapt' in needed:
+        adapted = record('adapt', lambda: adapt_dataframe_for_ml(df)[0], rows, repeat if 'adapt' in stages else 1)
+        if 'adapt' not in stages:
+            results.pop()
+    del df
+
+    detector = ExoplanetDetector()
+    if 'preprocess' in needed:
+        processed, features = record(
+            'preprocess', lambda: detector.preprocess_data(adapted.copy()), rows,
+            repeat if 'preprocess' in stages else 1
+        )
+        if 'preprocess' not in stages:
+            results.pop()
+
+    if 'train' in needed:
+        train_df = processed.sample(n=max_train_rows, random_state=42) if len(processed) > max_train_rows else processed
+        # O treino é caro demais para repetir: uma execução por caso, fora de models/ e do histórico
+        record('train', lambda: detector.train_models(
+            train_df, features, models_dir=os.path.join(workdir, 'models'), record_metrics=False
+        ), len(train_df), 1)
+        if 'train' not in stages:
+            results.pop()
+
+    if 'predict' in stages:
+        calls = min(PREDICT_CALLS, len(processed))
+        vectors = processed[features].to_numpy()[:calls]
+
+        def predict():
+            # Cache limpo para medir a predição e não o acerto de cache
+            detector.prediction_cache.clear()
+            for vector in vectors:
+                detector.predict_exoplanet(vector)
+
+        record('predict', predict, calls)
+
+    if 'predict_batch' in stages:
+        batch = processed[features].iloc[:max_predict_rows]
+
+        def predict_batch():
+            return detector.predict_batch(batch)
+
+        record('predict_batch', predict_batch, len(batch))
+
+    if 'save' in stages:
+        models_dir = os.path.join(workdir, 'models')
+        record('save', lambda: detector.save_models(models_dir), len(processed))
+        shutil.rmtree(models_dir, ignore_errors=True)
+
+    return results
+
+def run_suite(sizes, widths=(0,), stages=STAGES, mission='kepler_koi', repeat=3, max_train_rows=200_000, max_predict_rows=1_000_000):
+    """Executa todos os casos (tamanho x largura) e devolve o relatório em formato JSON"""
+    workdir = tempfile.mkdtemp(prefix='exoplanet_bench_')
+    results = []
+    try:
+        for rows in sizes:
+            for width in widths:
+                results.extend(run_case(
+                    rows, width, stages, mission=mission, repeat=repeat, max_train_rows=max_train_rows,
+                    max_predict_rows=max_predict_rows, workdir=workdir
+                ))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'created_at': datetime.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__
+        },
+        'mission': mission,
+        'results': results,
+        # Etapas internas instrumentadas (SMOTE, cada fit, CV, ...) somadas em todos os casos
+        'stages': TRACER.snapshot()['stages']
+    }
+
+def _case_key(result):
+    return (result['stage'], result['rows'], result['width'])
+
+def compare_to_baseline(report, baseline, threshold=DEFAULT_THRESHOLD, min_seconds=MIN_REGRESSION_SECONDS):
+    """Compara cada etapa com o baseline; retorna a lista de comparações e as regressões"""
+    if baseline.get('mission', 'kepler_koi') != report.get('mission', 'kepler_koi'):
+        logger.warning(f"Baseline gerado para outra missão ({baseline.get('mission')}); comparação ignorada")
+        return [], []
+    reference = {_case_key(result): result for result in baseline.get('results', [])}
+    comparisons = []
+    for result in report['results']:
+        base = reference.get(_case_key(result))
+        if base is None:
+            continue
+        ratio = result['seconds'] / base['seconds'] if base['seconds'] > 0 else float('inf')
+        comparisons.append({
+            'stage': result['stage'],
+            'size': result['size'],
+            'width': result['width'],
+            'baseline_seconds': base['seconds'],
+            'seconds': result['seconds'],
+            'ratio': ratio,
+            'regression': ratio > 1 + threshold and result['seconds'] - base['seconds'] > min_seconds
+        })
+    return comparisons, [comparison for comparison in comparisons if comparison['regression']]
+
+def format_report(report, comparisons=None):
+    """Tabela legível com os resultados (e a razão contra o baseline, se houver)"""
+    ratios = {(c['stage'], c['size'], c['width']): c for c in comparisons or []}
+    lines = [f"{'etapa':<14}{'tamanho':>9}{'largura':>9}{'ms':>12}{'linhas/s':>14}{'pico MB':>10}{'vs base':>10}"]
+    for result in report['results']:
+        comparison = ratios.get((result['stage'], result['size'], result['width']))
+        ratio = f"{comparison['ratio']:.2f}x" + ('!' if comparison['regression'] else '') if comparison else '-'
+        throughput = f"{result['rows_per_second']:,.0f}" if result['rows_per_second'] else '-'
+        lines.append(
+            f"{result['stage']:<14}{result['size']:>9}{result['width']:>9}{result['seconds'] * 1000:>12.1f}"
+            f"{throughput:>14}{result['peak_rss_mb']:>10.0f}{ratio:>10}"
+        )
+    return '\n'.join(lines)
+
+def main(argv=None):
+    """Ponto de entrada de linha de comando"""
+    parser = argparse.ArgumentParser(prog='benchmark', description=__doc__)
+    parser.add_argument('--sizes', default='1k,100k', help='Tamanhos separados por vírgula (1k, 100k, 1m, 10m ou inteiros)')
+    parser.add_argument('--widths', default='0', help='Colunas numéricas extras por catálogo, separadas por vírgula')
+    parser.add_argument('--mission', choices=list(NASA_TABLES), default='kepler_koi', help='Layout do catálogo sintético')
+    parser.add_argument('--stages', default=','.join(STAGES), help=f"Etapas a medir ({', '.join(STAGES)})")
+    parser.add_argument('--repeat', type=int, default=3, help='Repetições por etapa (vale o melhor tempo)')
+    parser.add_argument('--max-train-rows', type=int, default=200_000, help='Amostra máxima usada no treino')
+    parser.add_argument('--max-predict-rows', type=int, default=1_000_000, help='Linhas máximas em predict_batch')
+    parser.add_argument('--output', help='Grava os resultados em JSON neste arquivo')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='Baseline para comparação')
+    parser.add_argument('--save-baseline', action='store_true', help='Grava os resultados como novo baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='Regressão relativa tolerada (0.25 = 25%%)')
+    parser.add_argument('--json', action='store_true', help='Imprime o relatório em JSON em vez da tabela')
+    args = parser.parse_args(argv)
+
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"Etapas desconhecidas: {sorted(unknown)}")
+
+    report = run_suite(
+        [parse_size(size) for size in args.sizes.split(',')],
+        [int(width) for width in args.widths.split(',')],
+        stages, mission=args.mission, repeat=args.repeat, max_train_rows=args.max_train_rows, max_predict_rows=args.max_predict_rows
+    )
+
+    comparisons, regressions = [], []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as handle:
+            comparisons, regressions = compare_to_baseline(report, json.load(handle), args.threshold)
+        report['baseline'] = {'path': args.baseline, 'threshold': args.threshold, 'comparisons': comparisons}
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(report, handle, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as handle:
+            json.dump(report, handle, indent=2)
+        logger.info(f"Baseline gravado em {args.baseline}")
+
+    print(json.dumps(report, indent=2) if args.json else format_report(report, comparisons))
+
+    if regressions:
+        for regression in regressions:
+            logger.error(
+                f"Regressão em {regression['stage']} [{regression['size']}, largura {regression['width']}]: "
+                f"{regression['baseline_seconds'] * 1000:.1f} ms -> {regression['seconds'] * 1000:.1f} ms "
+                f"({regression['ratio']:.2f}x)"
+            )
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+"""
+Gerador de catálogos sintéticos de exoplanetas
+Gera catálogos determinísticos de qualquer tamanho, em blocos, nos layouts Kepler/TESS/Microlensing
+"""
+
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from exoplanet_ml import NASA_TABLES, ChunkWriter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_ROWS = 100_000
+# Linhas por semente: fixo, para o catálogo não depender do tamanho de bloco escolhido
+SEED_BLOCK_ROWS = 5_000
+
+# Constantes físicas nas unidades do arquivo da NASA
+EARTH_RADIUS_IN_SOLAR = 0.009158
+SOLAR_RADIUS_AU = 0.00465047
+EARTH_MASSES_PER_SOLAR = 332946.0
+EARTH_MASSES_PER_JUPITER = 317.83
+KAPPA_MAS_PER_SOLAR_MASS = 8.144
+# Duração das observações usada para estimar o número de trânsitos (dias)
+OBSERVING_BASELINE_DAYS = {'kepler_koi': 1400.0, 'tess_toi': 80.0}
+
+# Colunas de cada layout, na ordem das tabelas cumulative, toi e ml do arquivo da NASA
+CATALOG_LAYOUTS = {
+    'kepler_koi': [
+        'koi_name', 'kepid', 'koi_disposition', 'koi_period', 'koi_time0bk', 'koi_impact',
+        'koi_duration', 'koi_depth', 'koi_prad', 'koi_teq', 'koi_insol', 'koi_sep', 'koi_steff',
+        'koi_slogg', 'koi_srad', 'koi_smass', 'koi_kepmag'
+    ],
+    'tess_toi': [
+        'toi', 'tid', 'tfopwg_disp', 'pl_orbper', 'pl_trandurh', 'pl_trandep', 'pl_rade',
+        'pl_eqt', 'pl_insol', 'st_teff', 'st_logg', 'st_rad', 'st_tmag'
+    ],
+    'microlensing': [
+        'pl_name', 'pl_massj', 'pl_masse', 'pl_orbsmax', 'st_mass', 'sy_dist', 'ml_xtimeein',
+        'ml_radsnorm', 'ml_radeinang', 'ml_sepminnorm', 'ml_modeldef'
+    ]
+}
+
+# Disposições do Kepler traduzidas para os códigos TFOPWG (com as proporções de cada código)
+TFOPWG_CODES = {
+    'CONFIRMED': (['CP', 'KP'], [0.8, 0.2]),
+    'CANDIDATE': (['PC', 'APC'], [0.9, 0.1]),
+    'FALSE POSITIVE': (['FP', 'FA'], [0.85, 0.15])
+}
+
+def chunk_rng(seed, block_index):
+    """Gerador aleatório de um bloco de SEED_BLOCK_ROWS linhas: depende só da semente e do índice"""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(block_index,)))
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+def _stars(rng, n):
+    """Estrelas de sequência principal: massa, temperatura, gravidade e luminosidade seguem o raio"""
+    srad = np.clip(rng.lognormal(0.0, 0.3, n), 0.15, 15.0)
+    smass = np.clip(srad ** 1.25 * rng.lognormal(0.0, 0.08, n), 0.08, 5.0)
+    steff = 5778.0 * smass ** 0.55 * rng.normal(1.0, 0.03, n)
+    return {
+        'srad': srad,
+        'smass': smass,
+        'steff': steff,
+        'slogg': 4.438 + np.log10(smass) - 2 * np.log10(srad),
+        'luminosity': srad ** 2 * (steff / 5778.0) ** 4
+    }
+
+def _transiting_planets(rng, n, mission):
+    """Planetas em trânsito com grandezas derivadas da geometria da órbita
+
+    a vem da terceira lei de Kepler; insolação e temperatura de equilíbrio da
+    luminosidade e de a; profundidade de (Rp/R*)²; duração do período, de a/R*
+    (densidade estelar) e do parâmetro de impacto.
+    """
+    stars = _stars(rng, n)
+    if mission == 'tess_toi':
+        period = np.clip(rng.lognormal(np.log(5.0), 0.9, n), 0.2, 200.0)
+        magnitude = np.clip(rng.normal(10.5, 1.5, n), 5.0, 15.0)
+    else:
+        period = np.clip(rng.lognormal(np.log(12.0), 1.1, n), 0.3, 700.0)
+        magnitude = np.clip(rng.normal(14.5, 1.3, n), 8.0, 17.0)
+
+    # Mistura de planetas pequenos e gigantes
+    giant = rng.random(n) < 0.25
+    prad = np.where(giant, rng.lognormal(np.log(11.0), 0.35, n), rng.lognormal(np.log(2.0), 0.5, n))
+    prad = np.clip(prad, 0.3, 30.0)
+    # ~5% de trânsitos rasantes
+    impact = np.where(rng.random(n) < 0.05, rng.uniform(0.9, 1.2, n), rng.uniform(0.0, 0.9, n))
+
+    sep = (stars['smass'] * (period / 365.25) ** 2) ** (1 / 3)
+    insol = stars['luminosity'] / sep ** 2
+    albedo = rng.uniform(0.0, 0.5, n)
+    teq = 278.6 * insol ** 0.25 * (1 - albedo) ** 0.25
+
+    ratio = prad * EARTH_RADIUS_IN_SOLAR / stars['srad']
+    # Escurecimento de borda simplificado: trânsitos rasantes são mais rasos
+    depth = ratio ** 2 * (1 - 0.3 * np.minimum(impact, 1.0) ** 2) * rng.lognormal(0.0, 0.05, n)
+    chord = np.sqrt(np.clip((1 + ratio) ** 2 - impact ** 2, 1e-6, None))
+    sine = np.clip(stars['srad'] * SOLAR_RADIUS_AU / sep * chord, 0.0, 1.0)
+    duration = 24.0 * period / np.pi * np.arcsin(sine)
+
+    # Relação sinal/ruído do trânsito empilhado: define o quão confirmável é o objeto
+    noise_ppm = 30.0 * 10 ** (0.2 * (magnitude - 12.0)) * np.sqrt(6.5 / np.maximum(duration, 0.1))
+    transits = np.maximum(OBSERVING_BASELINE_DAYS.get(mission, 1400.0) / period, 1.0)
+    snr = depth * 1e6 / noise_ppm * np.sqrt(transits)
+
+    # Falsos positivos: binárias eclipsantes (objetos grandes/profundos) e trânsitos rasantes
+    # (proporções finais próximas de 30% / 35% / 35% entre falsos positivos, confirmados e candidatos)
+    fp_logit = -1.2 + 2.5 * (prad > 15) + 2.0 * (impact > 0.95) + 1.5 * (depth > 0.02)
+    false_positive = rng.random(n) < _sigmoid(fp_logit)
+    # Confirmação fica provável a partir de SNR ~ 55
+    confirmed = rng.random(n) < _sigmoid(np.log(np.maximum(snr, 1e-6)) - 4.0)
+    disposition = np.where(false_positive, 'FALSE POSITIVE', np.where(confirmed, 'CONFIRMED', 'CANDIDATE'))
+
+    return dict(
+        stars, period=period, magnitude=magnitude, prad=prad, impact=impact, sep=sep, insol=insol,
+        teq=teq, depth_ppm=depth * 1e6, duration=duration, disposition=disposition
+    )
+
+def _kepler_chunk(rng, start_row, n):
+    planets = _transiting_planets(rng, n, 'kepler_koi')
+    ids = np.arange(start_row + 1, start_row + n + 1)
+    return pd.DataFrame({
+        'koi_name': [f'K{i:05d}.01' for i in ids],
+        'kepid': 10_000_000 + ids,
+        'koi_disposition': planets['disposition'],
+        'koi_period': planets['period'],
+        'koi_time0bk': 131.5 + rng.uniform(0.0, 1.0, n) * planets['period'],
+        'koi_impact': planets['impact'],
+        'koi_duration': planets['duration'],
+        'koi_depth': planets['depth_ppm'],
+        'koi_prad': planets['prad'],
+        'koi_teq': planets['teq'],
+        'koi_insol': planets['insol'],
+        'koi_sep': planets['sep'],
+        'koi_steff': planets['steff'],
+        'koi_slogg': planets['slogg'],
+        'koi_srad': planets['srad'],
+        'koi_smass': planets['smass'],
+        'koi_kepmag': planets['magnitude']
+    })
+
+def _tess_chunk(rng, start_row, n):
+    planets = _transiting_planets(rng, n, 'tess_toi')
+    ids = np.arange(start_row + 1, start_row + n + 1)
+    codes = np.empty(n, dtype=object)
+    for disposition, (labels, weights) in TFOPWG_CODES.items():
+        mask = planets['disposition'] == disposition
+        codes[mask] = rng.choice(labels, mask.sum(), p=weights)
+    return pd.DataFrame({
+        'toi': ids + 0.01,
+        'tid': 100_000_000 + ids,
+        'tfopwg_disp': codes,
+        'pl_orbper': planets['period'],
+        'pl_trandurh': planets['duration'],
+        'pl_trandep': planets['depth_ppm'],
+        'pl_rade': planets['prad'],
+        'pl_eqt': planets['teq'],
+        'pl_insol': planets['insol'],
+        'st_teff': planets['steff'],
+        'st_logg': planets['slogg'],
+        'st_rad': planets['srad'],
+        'st_tmag': planets['magnitude']
+    })
+
+def _microlensing_chunk(rng, start_row, n):
+    """Eventos de microlente: raio de Einstein e tempo de cruzamento seguem massa e distâncias"""
+    ids = np.arange(start_row + 1, start_row + n + 1)
+    host_mass = np.clip(rng.lognormal(np.log(0.5), 0.5, n), 0.08, 2.0)
+    lens_distance = rng.uniform(1000.0, 7000.0, n)
+    source_distance = 8000.0
+    mass_ratio = 10 ** rng.uniform(-5.0, -2.0, n)
+    planet_mass = mass_ratio * host_mass * EARTH_MASSES_PER_SOLAR
+
+    parallax_rel = 1000.0 / lens_distance - 1000.0 / source_distance
+    einstein_radius = np.sqrt(KAPPA_MAS_PER_SOLAR_MASS * host_mass * (1 + mass_ratio) * parallax_rel)
+    proper_motion = rng.lognormal(np.log(5.0), 0.4, n)
+    separation = rng.lognormal(0.0, 0.3, n)
+    source_radius = rng.lognormal(np.log(0.0006), 0.3, n)
+
+    return pd.DataFrame({
+        'pl_name': [f'SYN-{2005 + i % 20}-BLG-{i:05d}L b' for i in ids],
+        'pl_massj': planet_mass / EARTH_MASSES_PER_JUPITER,
+        'pl_masse': planet_mass,
+        # 1 mas a 1 kpc corresponde a 1 UA
+        'pl_orbsmax': separation * einstein_radius * lens_distance / 1000.0,
+        'st_mass': host_mass,
+        'sy_dist': lens_distance,
+        'ml_xtimeein': einstein_radius / proper_motion * 365.25,
+        'ml_radsnorm': source_radius / einstein_radius,
+        'ml_radeinang': einstein_radius,
+        'ml_sepminnorm': separation,
+        'ml_modeldef': 1
+    })
+
+_CHUNK_BUILDERS = {
+    'kepler_koi': _kepler_chunk,
+    'tess_toi': _tess_chunk,
+    'microlensing': _microlensing_chunk
+}
+
+def generate_chunk(chunk_index, rows, mission='kepler_koi', seed=42, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Bloco `chunk_index` de um catálogo de `rows` linhas (idêntico em qualquer processo)"""
+    if mission not in _CHUNK_BUILDERS:
+        raise ValueError(f"Missão desconhecida: {mission} (use {', '.join(_CHUNK_BUILDERS)})")
+    start_row = chunk_index * chunk_rows
+    n = max(0, min(chunk_rows, rows - start_row))
+    # Gera os blocos de semente inteiros que cobrem as linhas e recorta: cada linha tem
+    # o mesmo valor com qualquer chunk_rows (e em qualquer catálogo mais longo)
+    first_block = start_row // SEED_BLOCK_ROWS
+    last_block = -(-(start_row + n) // SEED_BLOCK_ROWS)
+    blocks = [
+        _CHUNK_BUILDERS[mission](chunk_rng(seed, block), block * SEED_BLOCK_ROWS, SEED_BLOCK_ROWS)
+        for block in range(first_block, max(last_block, first_block + 1))
+    ]
+    offset = start_row - first_block * SEED_BLOCK_ROWS
+    frame = pd.concat(blocks, ignore_index=True).iloc[offset:offset + n]
+    return chunk_index, frame.set_index(pd.RangeIndex(start_row, start_row + n))
+
+def iter_catalog(rows, mission='kepler_koi', seed=42, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Gera o catálogo bloco a bloco, sem mantê-lo inteiro em memória"""
+    for chunk_index in range(-(-rows // chunk_rows)):
+        yield generate_chunk(chunk_index, rows, mission, seed, chunk_rows)[1]
+
+def generate_catalog(rows, mission='kepler_koi', seed=42, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Catálogo completo em um DataFrame (para tamanhos que cabem em memória)"""
+    chunks = list(iter_catalog(rows, mission, seed, chunk_rows))
+    if not chunks:
+        return pd.DataFrame(columns=CATALOG_LAYOUTS[mission])
+    return pd.concat(chunks)
+
+def write_catalog(output_path, rows, mission='kepler_koi', seed=42, chunk_rows=DEFAULT_CHUNK_ROWS, jobs=1, partitioned=False):
+    """Grava um catálogo sintético em CSV/Parquet, bloco a bloco
+
+    Cada faixa de SEED_BLOCK_ROWS linhas tem sua própria semente derivada de
+    (seed, índice), então o arquivo é o mesmo com qualquer número de processos
+    e qualquer chunk_rows. Com jobs > 1 no
+    máximo 2 * jobs blocos ficam em trânsito e a saída mantém a ordem.
+    """
+    writer = ChunkWriter(output_path, partitioned=partitioned)
+    chunk_count = -(-rows // chunk_rows)
+    start = time.perf_counter()
+
+    logger.info(f"Gerando {rows} linhas ({mission}) em {chunk_count} bloco(s) com {jobs} processo(s)...")
+
+    try:
+        if jobs <= 1:
+            for chunk_index in range(chunk_count):
+                writer.write(*generate_chunk(chunk_index, rows, mission, seed, chunk_rows))
+        else:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+            pending = deque()
+            next_chunk = 0
+
+            with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as executor:
+                while pending or next_chunk < chunk_count:
+                    while next_chunk < chunk_count and len(pending) < 2 * jobs:
+                        pending.append(executor.submit(generate_chunk, next_chunk, rows, mission, seed, chunk_rows))
+                        next_chunk += 1
+                    writer.write(*pending.popleft().result())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    report = {
+        'output': output_path,
+        'outputs': writer.paths,
+        'mission': mission,
+        'rows': rows,
+        'chunks': chunk_count,
+        'seed': seed,
+        'chunk_rows': chunk_rows,
+        'jobs': jobs,
+        'seconds': elapsed,
+        'rows_per_second': rows / elapsed if elapsed > 0 else 0.0
+    }
+    logger.info(f"Catálogo gerado: {rows} linhas em {elapsed:.2f}s")
+    return report
+
+def main(argv=None):
+    """Ponto de entrada de linha de comando"""
+    parser = argparse.ArgumentParser(prog='catalog_generator', description=__doc__)
+    parser.add_argument('output', help='Arquivo de saída (.csv/.parquet) ou diretório com --partitioned')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Número de linhas')
+    parser.add_argument('--mission', choices=list(NASA_TABLES), default='kepler_koi', help='Layout de colunas')
+    parser.add_argument('--seed', type=int, default=42, help='Semente do catálogo')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help='Linhas por bloco')
+    parser.add_argument('--jobs', type=int, default=1, help='Processos de geração')
+    parser.add_argument('--partitioned', action='store_true', help='Um arquivo de saída por bloco')
+    args = parser.parse_args(argv)
+
+    report = write_catalog(
+        args.output, args.rows, mission=args.mission, seed=args.seed,
+        chunk_rows=args.chunk_rows, jobs=args.jobs, partitioned=args.partitioned
+    )
+    print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
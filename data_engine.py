@@ -0,0 +1,474 @@
+"""
+Motor de filtros por faixa para a aba de Análise
+Índices ordenados por coluna + códigos de categoria, sem varrer o DataFrame a cada interação
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import uuid
+import threading
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Colunas numéricas filtradas pelos sliders da aba de Análise
+FILTER_COLUMNS = ['koi_period', 'koi_prad', 'koi_teq', 'koi_depth', 'koi_duration']
+CATEGORY_COLUMN = 'koi_disposition'
+DISPOSITION_LABELS = ['CONFIRMED', 'CANDIDATE', 'FALSE POSITIVE']
+
+class FilterIndex:
+    """Índice de consultas multi-faixa + categoria sobre um DataFrame imutável
+
+    Cada coluna numérica guarda a permutação que a ordena (argsort); uma faixa vira
+    duas buscas binárias. A consulta parte da faixa mais seletiva e só verifica as
+    demais colunas nas linhas candidatas, então o custo acompanha o resultado e não
+    o catálogo inteiro.
+    """
+
+    def __init__(self, df, range_columns=None, category_column=CATEGORY_COLUMN, fingerprint=None):
+        range_columns = FILTER_COLUMNS if range_columns is None else range_columns
+        self.size = len(df)
+        self.fingerprint = fingerprint or uuid.uuid4().hex
+        self._df = df
+        self.range_columns = [col for col in range_columns if col in df.columns]
+        self.category_column = category_column
+        self._values = {}
+        self._order = {}
+        self._sorted = {}
+        self._valid = {}
+        self._ranks = {}
+
+        for col in self.range_columns:
+            values = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64)
+            # argsort estável coloca NaN no fim; faixas nunca incluem NaN (como as máscaras >= / <=)
+            order = np.argsort(values, kind='stable')
+            self._values[col] = values
+            self._order[col] = order
+            self._sorted[col] = values[order]
+            self._valid[col] = int(np.count_nonzero(~np.isnan(values)))
+
+        if category_column in df.columns:
+            codes, categories = pd.factorize(df[category_column], sort=False)
+        else:
+            codes, categories = np.full(self.size, -1), pd.Index([])
+        self.categories = [str(c) for c in categories]
+        # Código -1 (ausente) vai para a última posição da tabela de lookup
+        self._codes = codes.astype(np.int32)
+        self._category_positions = {
+            label: np.flatnonzero(self._codes == code) for code, label in enumerate(self.categories)
+        }
+        self.total_counts = self.counts(None)
+        logger.info(f"Índice de filtros criado: {self.size} linhas, {len(self.range_columns)} colunas")
+
+    def bounds(self, col):
+        """(mínimo, máximo) da coluna, sem NaN"""
+        valid = self._valid[col]
+        if valid == 0:
+            return (0.0, 0.0)
+        sorted_values = self._sorted[col]
+        return (float(sorted_values[0]), float(sorted_values[valid - 1]))
+
+    def column(self, col):
+        """Valores da coluna na ordem original das linhas"""
+        return self._values[col]
+
+    def sortable_columns(self):
+        """Colunas koi_* que podem ordenar a tabela paginada"""
+        return [col for col in self._df.columns if str(col).startswith('koi_')]
+
+    def _sort_key(self, col):
+        """(permutação ordenada, nº de valores não nulos, ranks) da coluna, construídos sob demanda"""
+        if col not in self._ranks:
+            if col not in self._order:
+                series = self._df[col]
+                if pd.api.types.is_numeric_dtype(series):
+                    keys = series.to_numpy(dtype=np.float64)
+                    valid = int(np.count_nonzero(~np.isnan(keys)))
+                else:
+                    # Texto/categorias: códigos ordenados, nulos (-1) no fim
+                    codes, _ = pd.factorize(series, sort=True)
+                    valid = int(np.count_nonzero(codes >= 0))
+                    keys = np.where(codes < 0, np.iinfo(np.int64).max, codes)
+                self._order[col] = np.argsort(keys, kind='stable')
+                self._valid[col] = valid
+            ranks = np.empty(self.size, dtype=np.int64)
+            ranks[self._order[col]] = np.arange(self.size)
+            self._ranks[col] = ranks
+        return self._order[col], self._valid[col], self._ranks[col]
+
+    def sort_positions(self, positions, col, ascending=True):
+        """Reordena posições filtradas pela coluna, mantendo nulos no fim"""
+        order, valid, ranks = self._sort_key(col)
+        if positions is None or len(positions) == self.size:
+            ordered = order
+        elif len(positions) * 16 < self.size:
+            # Poucos resultados: ordenar só eles pelos ranks globais
+            ordered = positions[np.argsort(ranks[positions], kind='stable')]
+        else:
+            # Muitos resultados: percorrer a ordem global uma vez, sem ordenar de novo
+            selected = np.zeros(self.size, dtype=bool)
+            selected[positions] = True
+            ordered = order[selected[order]]
+        if not ascending:
+            n_valid = int(np.count_nonzero(ranks[ordered] < valid))
+            ordered = np.concatenate([ordered[:n_valid][::-1], ordered[n_valid:]])
+        return ordered
+
+    def rows(self, positions, columns=None):
+        """Linhas do DataFrame original nas posições dadas"""
+        if columns is None:
+            return self._df.iloc[positions]
+        # Seleciona linhas e colunas numa única indexação (sem copiar colunas inteiras)
+        indexer = self._df.columns.get_indexer(list(columns))
+        if (indexer < 0).any():
+            missing = [col for col, position in zip(columns, indexer) if position < 0]
+            raise KeyError(f"Colunas inexistentes no catálogo: {missing}")
+        return self._df.iloc[positions, indexer]
+
+    def _range_slice(self, col, low, high):
+        """Intervalo [início, fim) da coluna ordenada com valores em [low, high]"""
+        sorted_values = self._sorted[col][:self._valid[col]]
+        start = np.searchsorted(sorted_values, low, side='left')
+        stop = np.searchsorted(sorted_values, high, side='right')
+        return int(start), int(stop)
+
+    def query(self, ranges=None, categories=None):
+        """Posições (ordenadas) das linhas que atendem todas as faixas e categorias"""
+        ranges = {col: bounds for col, bounds in (ranges or {}).items() if col in self._values}
+
+        # Faixas que cobrem a coluna toda (sem NaN) não restringem nada
+        slices = {}
+        for col, (low, high) in ranges.items():
+            start, stop = self._range_slice(col, low, high)
+            if start == 0 and stop == self.size:
+                continue
+            slices[col] = (start, stop)
+
+        allowed = None
+        if categories is not None:
+            wanted = set(categories)
+            if wanted.issuperset(self.categories) and not np.any(self._codes < 0):
+                allowed = None
+            else:
+                allowed = np.zeros(len(self.categories) + 1, dtype=bool)
+                for code, label in enumerate(self.categories):
+                    allowed[code] = label in wanted
+
+        if not slices:
+            if allowed is None:
+                return np.arange(self.size)
+            selected = [self._category_positions[label] for code, label in enumerate(self.categories) if allowed[code]]
+            return np.sort(np.concatenate(selected)) if selected else np.empty(0, dtype=np.int64)
+
+        # Começar pela faixa mais seletiva e verificar as demais só nas candidatas
+        driver = min(slices, key=lambda col: slices[col][1] - slices[col][0])
+        start, stop = slices.pop(driver)
+        candidates = self._order[driver][start:stop]
+        for col, _ in sorted(slices.items(), key=lambda item: item[1][1] - item[1][0]):
+            if len(candidates) == 0:
+                break
+            low, high = ranges[col]
+            values = self._values[col][candidates]
+            candidates = candidates[(values >= low) & (values <= high)]
+
+        if allowed is not None and len(candidates):
+            candidates = candidates[allowed[self._codes[candidates]]]
+        return np.sort(candidates)
+
+    def matches(self, rows, ranges=None, categories=None):
+        """Máscara das linhas (posições) que atendem as faixas e categorias"""
+        mask = np.ones(len(rows), dtype=bool)
+        for col, (low, high) in (ranges or {}).items():
+            if col in self._values:
+                values = self._values[col][rows]
+                mask &= (values >= low) & (values <= high)
+        if categories is not None:
+            wanted = set(categories)
+            allowed = np.zeros(len(self.categories) + 1, dtype=bool)
+            for code, label in enumerate(self.categories):
+                allowed[code] = label in wanted
+            mask &= allowed[self._codes[rows]]
+        return mask
+
+    def counts(self, positions):
+        """Contagem por categoria em uma única passada (bincount)"""
+        codes = self._codes if positions is None else self._codes[positions]
+        # Desloca para que o código -1 (ausente) também caiba no bincount
+        binned = np.bincount(codes + 1, minlength=len(self.categories) + 1)
+        counts = {label: int(binned[code + 1]) for code, label in enumerate(self.categories)}
+        for label in DISPOSITION_LABELS:
+            counts.setdefault(label, 0)
+        return counts
+
+    def filter(self, ranges=None, categories=None):
+        """Executa a consulta e devolve posições, total e contagem por classe"""
+        positions = self.query(ranges, categories)
+        ranges = {col: tuple(map(float, bounds)) for col, bounds in (ranges or {}).items() if col in self._values}
+        categories = None if categories is None else sorted(categories)
+        return {
+            # Identifica o estado dos filtros (usado nas chaves de cache das páginas e estatísticas)
+            'key': repr((sorted(ranges.items()), categories)),
+            'ranges': ranges,
+            'categories': categories,
+            'positions': positions,
+            'total': int(len(positions)),
+            'counts': self.counts(positions),
+        }
+
+
+class FilterStatistics:
+    """Contagem, média, desvio padrão e mediana das colunas filtradas em um único passe
+
+    Contagem, média, M2 (soma dos quadrados dos desvios) e um histograma
+    equi-profundidade por coluna são agregados juntos (um gather + um bincount para
+    todas as colunas). Os momentos se subtraem pela fórmula de Chan, então quando
+    uma faixa é apenas estreitada o resultado é atualizado retirando só as linhas
+    que saíram, encontradas pelas fatias do índice ordenado. Medianas são exatas até `exact_median_limit` linhas; acima
+    disso vêm do histograma (erro de posto <= 1/bins da coluna inteira).
+    """
+
+    def __init__(self, index, columns=None, bins=1024, exact_median_limit=250_000, max_entries=32):
+        self.index = index
+        self.columns = [col for col in (columns or index.range_columns) if col in index.range_columns]
+        self.bins = bins
+        self.exact_median_limit = exact_median_limit
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.incremental_updates = 0
+        self.full_passes = 0
+
+        # Balde de cada linha no histograma equi-profundidade (NaN vai para o balde extra `bins`)
+        bin_ids = []
+        for col in self.columns:
+            _, valid, ranks = index._sort_key(col)
+            ids = np.full(index.size, bins, dtype=np.int32)
+            in_range = ranks < valid
+            ids[in_range] = ranks[in_range] * bins // max(valid, 1)
+            bin_ids.append(ids)
+        self._bin_ids = np.vstack(bin_ids) if bin_ids else np.empty((0, index.size), dtype=np.int32)
+        self._offsets = (np.arange(len(self.columns)) * (bins + 1))[:, None]
+
+    def _aggregate(self, rows):
+        """Agregados subtraíveis de todas as colunas para as linhas dadas"""
+        # Sem filtro ativo, usa as colunas inteiras sem gather
+        everything = len(rows) == self.index.size
+        matrix = np.vstack([self.index.column(col) if everything else self.index.column(col)[rows] for col in self.columns])
+        valid = ~np.isnan(matrix)
+        count = valid.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(valid, matrix, 0.0).sum(axis=1) / count
+        # Desvios em relação à média do próprio bloco: sem o cancelamento de sumsq - n*mean²
+        deviations = np.where(valid, matrix - mean[:, None], 0.0)
+        hist = np.bincount(
+            ((self._bin_ids if everything else self._bin_ids[:, rows]) + self._offsets).ravel(),
+            minlength=len(self.columns) * (self.bins + 1)
+        ).reshape(len(self.columns), self.bins + 1)
+        return {
+            'count': count,
+            'mean': np.nan_to_num(mean),
+            'm2': (deviations * deviations).sum(axis=1),
+            'hist': hist,
+        }, matrix
+
+    @staticmethod
+    def _subtract(total, part):
+        """Agregados de total sem as linhas de part (inverso da união de Chan et al.)"""
+        count = total['count'] - part['count']
+        removed = part['count'] > 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            shift = (total['mean'] - part['mean']) * part['count'] / count
+            mean = np.where(removed & (count > 0), total['mean'] + shift, total['mean'])
+            delta = part['mean'] - mean
+            correction = np.where(removed, delta * delta * count * part['count'] / total['count'], 0.0)
+        return {
+            'count': count,
+            'mean': np.where(count > 0, mean, 0.0),
+            'm2': np.where(count > 1, np.maximum(total['m2'] - part['m2'] - correction, 0.0), 0.0),
+            'hist': total['hist'] - part['hist'],
+        }
+
+    def _sketch_median(self, j, hist):
+        """Mediana aproximada pelo histograma, interpolando dentro do balde"""
+        col = self.columns[j]
+        order, valid, _ = self.index._sort_key(col)
+        counts = hist[:self.bins]
+        total = counts.sum()
+        if total == 0:
+            return np.nan
+        target = (total - 1) / 2
+        cumulative = np.cumsum(counts)
+        b = int(np.searchsorted(cumulative, target, side='right'))
+        before = cumulative[b - 1] if b > 0 else 0
+        fraction = (target - before + 0.5) / counts[b]
+        sorted_values = self.index._sorted[col]
+        lo = b * valid // self.bins
+        hi = max(lo, min((b + 1) * valid // self.bins, valid) - 1)
+        return float(sorted_values[lo] + fraction * (sorted_values[hi] - sorted_values[lo]))
+
+    def _finish(self, aggregates, matrix=None):
+        """Converte agregados em estatísticas por coluna"""
+        stats = {}
+        for j, col in enumerate(self.columns):
+            count = int(aggregates['count'][j])
+            mean = aggregates['mean'][j] if count else np.nan
+            variance = aggregates['m2'][j] / (count - 1) if count > 1 else np.nan
+            if matrix is not None:
+                median = float(np.nanmedian(matrix[j])) if count else np.nan
+            else:
+                median = self._sketch_median(j, aggregates['hist'][j])
+            stats[col] = {
+                'count': count,
+                'mean': float(mean),
+                'std': float(np.sqrt(max(variance, 0.0))) if count > 1 else np.nan,
+                'median': median,
+                'median_exact': matrix is not None,
+            }
+        return stats
+
+    def _removed_rows(self, parent, ranges, categories, max_rows):
+        """Linhas do filtro pai que saíram com o estreitamento
+        
+        Retorna None se não for estreitamento ou se as fatias excluídas passarem de
+        `max_rows` (aí recalcular do zero sai mais barato).
+        """
+        if parent['categories'] != categories:
+            # Mudança de categorias exigiria varrer as linhas do pai; não compensa
+            return None
+        slices = []
+        for col in set(ranges) | set(parent['ranges']):
+            old_low, old_high = parent['ranges'].get(col, (-np.inf, np.inf))
+            new_low, new_high = ranges.get(col, (-np.inf, np.inf))
+            if new_low < old_low or new_high > old_high:
+                return None
+            if (new_low, new_high) == (old_low, old_high):
+                continue
+            order = self.index._order[col]
+            old_start, old_stop = self.index._range_slice(col, old_low, old_high)
+            if col not in parent['ranges']:
+                # Sem faixa no pai as linhas com NaN também estavam lá (ficam no fim da ordem)
+                old_stop = len(order)
+            new_start, new_stop = self.index._range_slice(col, new_low, new_high)
+            slices.append(order[old_start:new_start])
+            slices.append(order[new_stop:old_stop])
+        if sum(len(part) for part in slices) >= max_rows:
+            return None
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+        candidates = np.unique(np.concatenate(slices))
+        # Só contam as que estavam no filtro pai
+        return candidates[self.index.matches(candidates, parent['ranges'], parent['categories'])]
+
+    def compute(self, filter_result):
+        """Estatísticas do estado de filtro (resultado de FilterIndex.filter)"""
+        key = filter_result['key']
+        ranges, categories = filter_result['ranges'], filter_result['categories']
+        positions = filter_result['positions']
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry['stats']
+            parents = sorted(self._entries.values(), key=lambda item: item['total'])
+
+        aggregates = None
+        matrix = None
+        if len(positions) > self.exact_median_limit:
+            for parent in parents:
+                if parent['total'] < len(positions):
+                    continue
+                removed = self._removed_rows(parent, ranges, categories, max_rows=len(positions))
+                if removed is None:
+                    continue
+                delta, _ = self._aggregate(removed)
+                aggregates = self._subtract(parent['aggregates'], delta)
+                self.incremental_updates += 1
+                break
+        if aggregates is None:
+            aggregates, matrix = self._aggregate(positions)
+            self.full_passes += 1
+            if len(positions) > self.exact_median_limit:
+                matrix = None
+
+        stats = self._finish(aggregates, matrix)
+        with self._lock:
+            self._entries[key] = {
+                'ranges': ranges,
+                'categories': categories,
+                'total': int(len(positions)),
+                'aggregates': aggregates,
+                'stats': stats,
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return stats
+
+
+def encode_page(frame):
+    """Serializa uma página em Arrow IPC (formato compacto guardado no cache)"""
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+def decode_page(payload):
+    """Lê uma página Arrow IPC de volta como pyarrow.Table"""
+    return pa.ipc.open_stream(payload).read_all()
+
+class TablePager:
+    """Paginação no servidor: ordena os resultados filtrados e entrega só a janela visível
+
+    Mantém por sessão um cache LRU limitado das páginas recentes (em Arrow IPC) e a
+    última ordenação calculada, para que trocar de página não reordene tudo de novo.
+    """
+
+    def __init__(self, max_pages=16):
+        self.max_pages = max_pages
+        self._pages = OrderedDict()
+        self._ordering_key = None
+        self._ordering = None
+        self.hits = 0
+        self.misses = 0
+
+    def _ordered(self, index, filter_result, sort_column, ascending):
+        """Posições filtradas na ordem pedida (reaproveita a última ordenação)"""
+        key = (index.fingerprint, filter_result['key'], sort_column, ascending)
+        if key != self._ordering_key:
+            positions = filter_result['positions']
+            self._ordering = positions if sort_column is None else index.sort_positions(positions, sort_column, ascending)
+            self._ordering_key = key
+        return self._ordering
+
+    def fetch(self, index, filter_result, sort_column=None, ascending=True, page=0, page_size=50, columns=None):
+        """Página `page` (base 0) como pyarrow.Table"""
+        columns = tuple(index.sortable_columns() if columns is None else columns)
+        key = (index.fingerprint, filter_result['key'], sort_column, ascending, page, page_size, columns)
+        payload = self._pages.get(key)
+        if payload is not None:
+            self._pages.move_to_end(key)
+            self.hits += 1
+            return decode_page(payload)
+
+        self.misses += 1
+        ordered = self._ordered(index, filter_result, sort_column, ascending)
+        window = ordered[page * page_size:(page + 1) * page_size]
+        payload = encode_page(index.rows(window, columns))
+        self._pages[key] = payload
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+        return decode_page(payload)
+
+    def stats(self):
+        """Estatísticas do cache de páginas"""
+        total = self.hits + self.misses
+        return {
+            'pages': len(self._pages),
+            'bytes': int(sum(payload.size for payload in self._pages.values())),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
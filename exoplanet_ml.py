@@ -8,20 +8,237 @@ import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
+from sklearn.metrics import classification_report, confusion_matrix, accuracy_score, precision_recall_fscore_support
+from sklearn.utils.class_weight import compute_sample_weight
 import xgboost as xgb
 import lightgbm as lgb
 from imblearn.over_sampling import SMOTE
 import joblib
 import requests
+import io
+import copy
 import json
+import pickle
+import hashlib
+import os
+import sys
+import time
+import argparse
+import shutil
+import subprocess
+import tempfile
+import threading
+import multiprocessing
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
 import logging
+from metrics_store import record_events
+from tracing import TRACER, trace_stage
+from memory_budget import MemoryBudget, default_budget_bytes, plan_training
+from partitioned import PartitionedExecutor, auto_partitions
+from similarity import SIMILARITY_DIR, SimilarityIndex
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Versão do formato do artefato de pipeline salvo em disco
+PIPELINE_FORMAT_VERSION = 1
+# Versão do manifesto de um grupo de pipelines por missão
+GROUP_FORMAT_VERSION = 1
+MODELS_DIR = 'models'
+# Pipelines de sessão e de cada missão ficam fora do diretório do registro
+MISSION_MODELS_SUBDIR = 'missions'
+
+# Fidelidade mínima do caminho rápido no split de validação para ser usado
+FAST_PATH_MIN_AGREEMENT = 0.95
+FAST_PATH_MAX_ACCURACY_DROP = 0.01
+
+# Endpoint TAP do NASA Exoplanet Archive e tabelas por missão
+NASA_ARCHIVE_URL = 'https://exoplanetarchive.ipac.caltech.edu/TAP/sync'
+NASA_TABLES = {
+    'kepler_koi': 'cumulative',
+    'tess_toi': 'toi',
+    'microlensing': 'ml'
+}
+
+# Mapeamento das colunas de cada missão para o esquema koi_* usado pelos modelos
+MISSION_COLUMN_MAPS = {
+    'tess_toi': {
+        'toi': 'koi_name',
+        'pl_orbper': 'koi_period',
+        'pl_trandurh': 'koi_duration',
+        'pl_trandep': 'koi_depth',
+        'pl_rade': 'koi_prad',
+        'pl_eqt': 'koi_teq',
+        'pl_insol': 'koi_insol'
+    },
+    'microlensing': {
+        'pl_name': 'koi_name',
+        'ml_radsnorm': 'koi_depth',
+        'ml_xtimeein': 'koi_duration',
+        'ml_radeinang': 'koi_prad'
+    }
+}
+
+# Disposições TFOPWG do TESS no vocabulário do Kepler
+TESS_DISPOSITIONS = {
+    'CP': 'CONFIRMED',
+    'KP': 'CONFIRMED',
+    'PC': 'CANDIDATE',
+    'APC': 'CANDIDATE',
+    'FP': 'FALSE POSITIVE',
+    'FA': 'FALSE POSITIVE'
+}
+
+def detect_mission(columns):
+    """Missão de origem de um catálogo pelas colunas (padrão: kepler_koi)"""
+    columns = set(columns)
+    if columns & {'tfopwg_disp', 'toi', 'tid', 'tic_id', 'toi_name'}:
+        return 'tess_toi'
+    if 'pl_name' in columns and any(column.startswith('ml_') for column in columns):
+        return 'microlensing'
+    return 'kepler_koi'
+
+class _ByteCounter:
+    """Arquivo que só conta os bytes escritos"""
+    
+    def __init__(self):
+        self.size = 0
+    
+    def write(self, data):
+        # Protocolo 5 entrega buffers grandes (PickleBuffer) direto, sem cópia
+        size = memoryview(data).nbytes
+        self.size += size
+        return size
+
+def _pickled_size(obj):
+    """Tamanho serializado sem montar o pickle inteiro em memória"""
+    counter = _ByteCounter()
+    pickle.dump(obj, counter, protocol=pickle.HIGHEST_PROTOCOL)
+    return counter.size
+
+def _measure_latency_ms(fn, repeats=20):
+    """Mediana do tempo de execução de fn em milissegundos"""
+    fn()  # aquecimento
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+def _holdout_halves(y, random_state=42):
+    """Posições de duas metades estratificadas de um split de validação"""
+    positions = np.arange(len(y))
+    if len(y) < 4:
+        return positions, positions[:0]
+    _, counts = np.unique(y, return_counts=True)
+    return train_test_split(
+        positions, test_size=0.5, random_state=random_state, stratify=y if counts.min() >= 2 else None
+    )
+
+def _quantize(vector, significant_digits):
+    """Arredonda cada valor para um número fixo de algarismos significativos"""
+    magnitude = np.floor(np.log10(np.abs(np.where(vector == 0, 1.0, vector))))
+    scale = 10.0 ** (significant_digits - 1 - magnitude)
+    return np.round(vector * scale) / scale
+
+def dataset_fingerprint(*parts):
+    """Impressão digital estável (sha1) de DataFrames, arrays e valores simples"""
+    digest = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, (pd.DataFrame, pd.Series)):
+            digest.update(repr(list(part.columns) if isinstance(part, pd.DataFrame) else part.name).encode())
+            digest.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+        elif isinstance(part, np.ndarray):
+            digest.update(repr((part.dtype.str, part.shape)).encode())
+            # Arrays de objetos guardam ponteiros; usar a representação dos valores
+            payload = repr(part.tolist()).encode() if part.dtype == object else np.ascontiguousarray(part).tobytes()
+            digest.update(payload)
+        else:
+            digest.update(repr(part).encode())
+        digest.update(b'|')
+    return digest.hexdigest()
+
+class PredictionCache:
+    """Cache LRU com TTL para predições, chaveado pela versão do modelo e pelo vetor de features"""
+    
+    def __init__(self, max_entries=4096, ttl_seconds=3600, significant_digits=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.significant_digits = significant_digits
+        self.model_version = None
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def __getstate__(self):
+        # O cache não viaja com o detector (pickle entre processos)
+        state = self.__dict__.copy()
+        state['_entries'] = OrderedDict()
+        del state['_lock']
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+    
+    def make_key(self, kind, vector):
+        """Canoniza o vetor (float64, -0.0 -> 0.0, quantização opcional) em uma chave"""
+        canonical = np.asarray(vector, dtype=np.float64)
+        if self.significant_digits:
+            canonical = _quantize(canonical, self.significant_digits)
+        return (self.model_version, kind, (canonical + 0.0).tobytes())
+    
+    def sync_version(self, model_version):
+        """Invalida todas as entradas quando uma nova versão de modelo é promovida"""
+        with self._lock:
+            if model_version != self.model_version:
+                self._entries.clear()
+                self.model_version = model_version
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if time.monotonic() - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+    
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self):
+        """Métricas de uso do cache"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'model_version': self.model_version
+        }
+
 class ExoplanetDetector:
     """Classe principal para detecção de exoplanetas usando ML"""
     
@@ -31,33 +248,151 @@ class ExoplanetDetector:
         self.models = {}
         self.feature_importance = {}
         self.model_performance = {}
+        self.features = []
+        self.feature_medians = {}
+        self.model_version = None
+        self.fast_model = None
+        self.fast_path_report = {}
+        self.prediction_cache = PredictionCache()
+        self.cascade_config = {}
+        self.last_cascade_stats = {}
+        self.training_report = {}
         
-    def load_nasa_data(self):
-        """Carrega dados das missões NASA"""
-        logger.info("Carregando dados da NASA...")
+    def _fetch_catalog(self, mission, base_url, progress_callback):
+        """Baixa (ou lê do arquivo local) e interpreta uma tabela, reportando bytes e linhas"""
+        table = NASA_TABLES[mission]
+        chunks = []
+        fetched = 0
         
-        # URLs dos datasets da NASA (exemplos)
-        data_sources = {
-            'kepler_koi': 'https://exoplanetarchive.ipac.caltech.edu/cgi-bin/nstedAPI/nph-nstedAPI?table=cumulative&select=*&where=&format=csv',
-            'tess_toi': 'https://exoplanetarchive.ipac.caltech.edu/cgi-bin/nstedAPI/nph-nstedAPI?table=TIC&select=*&where=&format=csv'
-        }
+        def report(stage, **payload):
+            if progress_callback is not None:
+                progress_callback(dict(payload, source=mission, stage=stage))
+        
+        with trace_stage(f'fetch:{mission}') as span:
+            if base_url.startswith(('http://', 'https://')):
+                url = f"{base_url}?query=select+*+from+{table}&format=csv"
+                logger.info(f"Baixando dados do {mission}...")
+                with requests.get(url, stream=True, timeout=60) as response:
+                    response.raise_for_status()
+                    total = int(response.headers.get('Content-Length') or 0) or None
+                    for chunk in response.iter_content(chunk_size=256 * 1024):
+                        chunks.append(chunk)
+                        fetched += len(chunk)
+                        report('fetch', bytes=fetched, total_bytes=total)
+            else:
+                # Arquivo local de substituição: <diretório>/<tabela>.csv
+                path = os.path.join(base_url.replace('file://', '', 1), f"{table}.csv")
+                total = os.path.getsize(path)
+                with open(path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(256 * 1024), b''):
+                        chunks.append(chunk)
+                        fetched += len(chunk)
+                        report('fetch', bytes=fetched, total_bytes=total)
+        
+            df = pd.read_csv(io.BytesIO(b''.join(chunks)), comment='#', low_memory=False)
+            span.bytes, span.rows = fetched, len(df)
+            report('parse', bytes=fetched, rows=len(df))
+            logger.info(f"Dados {mission} carregados: {len(df)} registros")
+        
+        return df
+    
+    @trace_stage('load_nasa_data')
+    def load_nasa_data(self, base_url=None, sources=None, max_workers=3, progress_callback=None):
+        """Carrega dados das missões NASA em paralelo
+        
+        base_url pode ser o endpoint TAP do arquivo da NASA ou um diretório local
+        com <tabela>.csv (padrão: variável EXOPLANET_ARCHIVE_URL ou o TAP público).
+        """
+        logger.info("Carregando dados da NASA...")
+        base_url = base_url or os.environ.get('EXOPLANET_ARCHIVE_URL', NASA_ARCHIVE_URL)
+        sources = sources or list(NASA_TABLES)
         
         datasets = {}
         
-        for mission, url in data_sources.items():
-            try:
-                logger.info(f"Baixando dados do {mission}...")
-                response = requests.get(url, timeout=30)
-                if response.status_code == 200:
-                    datasets[mission] = pd.read_csv(url)
-                    logger.info(f"Dados {mission} carregados: {len(datasets[mission])} registros")
-                else:
-                    logger.warning(f"Erro ao baixar {mission}: Status {response.status_code}")
-            except Exception as e:
-                logger.error(f"Erro ao carregar {mission}: {str(e)}")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self._fetch_catalog, mission, base_url, progress_callback): mission
+                for mission in sources
+            }
+            for future in as_completed(futures):
+                mission = futures[future]
+                try:
+                    datasets[mission] = future.result()
+                except Exception as e:
+                    logger.error(f"Erro ao carregar {mission}: {str(e)}")
+                    if progress_callback is not None:
+                        progress_callback({'source': mission, 'stage': 'error', 'error': str(e)})
                 
         return datasets
     
+    def standardize_catalog(self, mission, df):
+        """Renomeia colunas da missão para o esquema koi_* e normaliza a disposição"""
+        standardized = df.rename(columns=MISSION_COLUMN_MAPS.get(mission, {}))
+        
+        if mission == 'tess_toi' and 'tfopwg_disp' in df.columns:
+            standardized['koi_disposition'] = df['tfopwg_disp'].map(TESS_DISPOSITIONS)
+        elif mission == 'microlensing':
+            # A tabela de microlente só contém planetas confirmados
+            standardized['koi_disposition'] = 'CONFIRMED'
+        
+        return standardized
+    
+    @trace_stage('refresh_nasa_data')
+    def refresh_nasa_data(self, base_url=None, sources=None, max_workers=3, score_chunksize=5000, progress_callback=None):
+        """Atualiza as tabelas Kepler/TESS/Microlensing e pontua os objetos com os modelos atuais"""
+        start = time.perf_counter()
+        datasets = self.load_nasa_data(base_url, sources, max_workers, progress_callback)
+        summary = {}
+        
+        for mission, df in datasets.items():
+            standardized = self.standardize_catalog(mission, df)
+            dispositions = standardized.get('koi_disposition', pd.Series(dtype=object))
+            entry = {
+                'rows': len(df),
+                'dispositions': dispositions.value_counts().to_dict(),
+                'predicted': {}
+            }
+            
+            if self.models:
+                predictions = []
+                for offset in range(0, len(standardized), score_chunksize):
+                    chunk = standardized.iloc[offset:offset + score_chunksize]
+                    predictions.append(self.predict_batch(chunk)['ensemble_prediction'])
+                    if progress_callback is not None:
+                        progress_callback({'source': mission, 'stage': 'score', 'rows_scored': offset + len(chunk), 'rows': len(df)})
+                
+                predicted = pd.concat(predictions) if predictions else pd.Series(dtype=object)
+                entry['predicted'] = predicted.value_counts().to_dict()
+                known = dispositions.notna()
+                if known.any():
+                    entry['accuracy'] = float((predicted[known] == dispositions[known]).mean())
+            
+            summary[mission] = entry
+            if progress_callback is not None:
+                progress_callback({'source': mission, 'stage': 'done', 'summary': entry})
+        
+        refresh = {
+            'sources': summary,
+            'rows': sum(entry['rows'] for entry in summary.values()),
+            'seconds': time.perf_counter() - start,
+            'model_version': self.model_version,
+            'timestamp': datetime.now().isoformat()
+        }
+        record_events([
+            {
+                'kind': 'refresh',
+                'model_version': self.model_version,
+                'model': mission,
+                'accuracy': entry.get('accuracy'),
+                'rows': entry['rows'],
+                'rows_per_second': entry['rows'] / refresh['seconds'] if refresh['seconds'] > 0 else None,
+                'seconds': refresh['seconds']
+            }
+            for mission, entry in summary.items()
+        ])
+        
+        return refresh
+    
     def prepare_sample_data(self):
         """Prepara dados de exemplo para demonstração"""
         logger.info("Preparando dados de exemplo...")
@@ -88,106 +423,494 @@ class ExoplanetDetector:
         
         return df
     
-    def preprocess_data(self, df):
-        """Pré-processamento dos dados"""
+    def preprocess_data(self, df, partitions=1):
+        """Pré-processamento dos dados
+        
+        Com partitions > 1 os limites de outliers são calculados em partições de
+        linhas por um pool de processos (mesmo resultado do modo serial).
+        """
         logger.info("Iniciando pré-processamento dos dados...")
         
-        # Remove colunas não numéricas desnecessárias
-        numeric_columns = df.select_dtypes(include=[np.number]).columns.tolist()
-        
-        # Filtra características importantes para análise de exoplanetas
-        key_features = [col for col in numeric_columns if any(key in col for key in 
-                       ['period', 'depth', 'duration', 'prad', 'teq', 'insol', 'impact'])]
-        
-        # Remove outliers usando ICR
-        for col in key_features:
-            Q1 = df[col].quantile(0.25)
-            Q3 = df[col].quantile(0.75)
-            ICR = Q3 - Q1
-            lower_bound = Q1 - 1.5 * ICR
-            upper_bound = Q3 + 1.5 * ICR
-            df = df[(df[col] >= lower_bound) & (df[col] <= upper_bound)]
-        
-        # Codifica labels de destino
-        if 'koi_disposition' in df.columns:
-            df['target'] = self.label_encoder.fit_transform(df['koi_disposition'])
-        elif 'tfowpg_disposition' in df.columns:
-            df['target'] = self.label_encoder.fit_transform(df['tfowpg_disposition'])
-        else:
-            # Criar targets para dados de exemplo
-            df['target'] = np.random.choice([0, 1, 2], len(df), p=[0.3, 0.4, 0.3])
+        with trace_stage('preprocess_data', rows=len(df)):
+            # Remove colunas não numéricas desnecessárias
+            numeric_columns = df.select_dtypes(include=[np.number]).columns.tolist()
+        
+            # Filtra características importantes para análise de exoplanetas
+            key_features = [col for col in numeric_columns if any(key in col for key in 
+                           ['period', 'depth', 'duration', 'prad', 'teq', 'insol', 'impact'])]
+        
+            # Remove outliers usando ICR
+            if partitions > 1 and key_features:
+                df = self._remove_outliers_partitioned(df, key_features, partitions)
+            else:
+                for col in key_features:
+                    Q1 = df[col].quantile(0.25)
+                    Q3 = df[col].quantile(0.75)
+                    ICR = Q3 - Q1
+                    lower_bound = Q1 - 1.5 * ICR
+                    upper_bound = Q3 + 1.5 * ICR
+                    df = df[(df[col] >= lower_bound) & (df[col] <= upper_bound)]
+        
+            # Codifica labels de destino
+            if 'koi_disposition' in df.columns:
+                df['target'] = self.label_encoder.fit_transform(df['koi_disposition'])
+            elif 'tfowpg_disposition' in df.columns:
+                df['target'] = self.label_encoder.fit_transform(df['tfowpg_disposition'])
+            else:
+                # Criar targets para dados de exemplo
+                df['target'] = np.random.choice([0, 1, 2], len(df), p=[0.3, 0.4, 0.3])
         
         logger.info(f"Dados pré-processados: {len(df)} registros")
         
         return df, key_features
     
-    def train_models(self, df, features):
-        """Treina múltiplos modelos de ML"""
+    def _remove_outliers_partitioned(self, df, key_features, partitions):
+        """Filtro ICR do preprocess_data com quantis exatos calculados por partição
+        
+        Como no modo serial, os quartis de cada coluna consideram só as linhas que
+        sobreviveram às colunas anteriores; a máscara fica em memória compartilhada
+        e o DataFrame é filtrado uma única vez no fim.
+        """
+        columns = {col: df[col].to_numpy(dtype=float) for col in key_features}
+        with trace_stage('remove_outliers_partitioned', rows=len(df)), PartitionedExecutor(columns, partitions) as executor:
+            for col in key_features:
+                Q1, Q3 = executor.quantiles(col, [0.25, 0.75], use_mask=True)
+                ICR = Q3 - Q1
+                executor.filter(col, Q1 - 1.5 * ICR, Q3 + 1.5 * ICR)
+            keep = np.flatnonzero(executor.mask)
+        return df.take(keep)
+    
+    def train_models(self, df, features, progress_callback=None, models_dir=MODELS_DIR, record_metrics=True,
+                     memory_budget=None, n_jobs=None, partitions=1, fast_path=False):
+        """Treina múltiplos modelos de ML
+        
+        Cada modelo em `results` (e em `model_performance`, salvo com a versão do
+        pipeline) traz acurácia, precisão/recall/F1 por classe e macro, matriz de
+        confusão, estatísticas de CV, tempo de treino, latência por 1k linhas e
+        tamanho do modelo.
+        progress_callback(stage, fraction, partial_metrics) é chamado a cada etapa.
+        O pipeline é salvo em `models_dir`; record_metrics=False não grava o treino
+        no histórico de métricas (usado pelos benchmarks).
+        Quando o treino não cabe em `memory_budget` (MemoryBudget), o plano de
+        plan_training degrada CV, SMOTE, Random Forest e linhas de treino; as
+        degradações e o pico de memória por etapa ficam em `training_report`.
+        n_jobs é repassado aos três modelos (None mantém o padrão de cada biblioteca).
+        Com partitions > 1, medianas de imputação e estatísticas do scaler são
+        calculadas em partições de linhas por um pool de processos.
+        A cascata é calibrada em metade do split de validação e avaliada na outra
+        (calibrate_cascade) e, com
+        fast_path=True, o ensemble é destilado (build_fast_path) antes de salvar.
+        """
         logger.info("Iniciando treinamento dos modelos...")
         
-        X = df[features].fillna(df[features].median())
+        def report(stage, fraction):
+            if progress_callback is not None:
+                progress_callback(stage, fraction, dict(self.model_performance))
+        
+        budget = memory_budget or MemoryBudget()
+        if partitions > 1:
+            columns = {feature: df[feature].to_numpy(dtype=float) for feature in features}
+            with trace_stage('feature_medians', rows=len(df)), PartitionedExecutor(columns, partitions) as executor:
+                medians = pd.Series({feature: executor.quantiles(feature, [0.5])[0] for feature in features}, dtype=float)
+        else:
+            medians = df[features].median()
+        X = df[features].fillna(medians)
         y = df['target']
         
-        # Split dos dados
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, stratify=y
-        )
+        # Guarda o contrato de entrada usado na predição
+        self.features = list(features)
+        self.feature_medians = medians.to_dict()
         
-        # Scaling
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        with self._track_memory(budget):
+            # Split dos dados
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=0.2, random_state=42, stratify=y
+            )
         
-        # Balanceamento com SMOTE
-        smote = SMOTE(random_state=42)
-        X_train_balanced, y_train_balanced = smote.fit_resample(X_train_scaled, y_train)
+            # Plano de treino dentro do orçamento de memória
+            plan = plan_training(budget, y_train.value_counts().tolist(), len(features))
+            if plan['train_rows'] < len(y_train):
+                X_train, _, y_train, _ = train_test_split(
+                    X_train, y_train, train_size=plan['train_rows'], random_state=42, stratify=y_train
+                )
+            y_train = y_train.to_numpy()
         
-        # Modelos para treinar
-        models = {
-            'Random Forest': RandomForestClassifier(n_estimators=100, random_state=42),
-            'XGBoost': xgb.XGBClassifier(random_state=42, verbosity=0),
-            'LightGBM': lgb.LGBMClassifier(random_state=42, verbosity=-1)
-        }
+            # Scaling
+            if partitions > 1:
+                self._fit_scaler_partitioned(X_train, partitions)
+                X_train_scaled = self.scaler.transform(X_train.to_numpy())
+            else:
+                X_train_scaled = self.scaler.fit_transform(X_train.to_numpy())
+            X_test_scaled = self.scaler.transform(X_test.to_numpy())
+            del X, X_train
+        
+            # Balanceamento com SMOTE ou, sem memória para ele, com pesos de classe
+            report('smote', 0.05)
+            sample_weight = None
+            if plan['smote']:
+                with trace_stage('smote', rows=len(y_train)) as span:
+                    smote = SMOTE(random_state=42)
+                    X_train_balanced, y_train_balanced = smote.fit_resample(X_train_scaled, y_train)
+                    span.rows = len(y_train_balanced)
+            else:
+                X_train_balanced, y_train_balanced = X_train_scaled, y_train
+                sample_weight = compute_sample_weight('balanced', y_train)
+            class_weight = None if plan['smote'] else 'balanced'
+        
+            # Validação cruzada em amostra estratificada quando o orçamento pede
+            X_cv, y_cv, cv_weight = X_train_scaled, y_train, sample_weight
+            if plan['cv_rows'] < len(y_train):
+                cv_index, _ = train_test_split(
+                    np.arange(len(y_train)), train_size=plan['cv_rows'], random_state=42, stratify=y_train
+                )
+                X_cv, y_cv = X_train_scaled[cv_index], y_train[cv_index]
+                cv_weight = None if sample_weight is None else sample_weight[cv_index]
         
-        results = {}
+            # Modelos para treinar
+            parallel = {} if n_jobs is None else {'n_jobs': n_jobs}
+            models = {
+                'Random Forest': RandomForestClassifier(
+                    n_estimators=100, max_samples=plan['forest_max_samples'], class_weight=class_weight,
+                    random_state=42, **parallel
+                ),
+                'XGBoost': xgb.XGBClassifier(random_state=42, verbosity=0, **parallel),
+                'LightGBM': lgb.LGBMClassifier(class_weight=class_weight, random_state=42, verbosity=-1, **parallel)
+            }
+        
+            results = {}
         
-        for name, model in models.items():
-            logger.info(f"Treinando {name}...")
+            for position, name in enumerate(models):
+                model = models[name]
+                logger.info(f"Treinando {name}...")
+                report(f'fit:{name}', 0.1 + 0.85 * position / len(models))
             
-            # Treina modelo
-            model.fit(X_train_balanced, y_train_balanced)
+                # Modelos sem class_weight (XGBoost) recebem os pesos por amostra
+                weighted = sample_weight is not None and 'class_weight' not in model.get_params()
             
-            # Avaliação
-            y_pred = model.predict(X_test_scaled)
-            accuracy = accuracy_score(y_test, y_pred)
-            cross_val_scores = cross_val_score(model, X_train_scaled, y_train, cv=5)
+                # Treina modelo
+                fit_start = time.perf_counter()
+                with trace_stage(f'fit:{name}', rows=len(y_train_balanced)):
+                    model.fit(X_train_balanced, y_train_balanced, **({'sample_weight': sample_weight} if weighted else {}))
+                fit_seconds = time.perf_counter() - fit_start
             
-            # Guarda resultados
-            results[name] = {
-                'model': model,
-                'accuracy': accuracy,
-                'cross_val_mean': cross_val_scores.mean(),
-                'cross_val_std': cross_val_scores.std(),
-                'feature_importance': model.feature_importances_ if hasattr(model, 'feature_importances_') else None
-            }
+                # Avaliação
+                with trace_stage(f'evaluate:{name}', rows=len(y_test)):
+                    metrics = self._evaluate_model(model, X_test_scaled, y_test)
+                with trace_stage(f'cross_val:{name}', rows=len(y_cv)):
+                    cross_val_scores = cross_val_score(
+                        model, X_cv, y_cv, cv=5, fit_params={'sample_weight': cv_weight} if weighted else None
+                    )
+                metrics.update({
+                    'cross_val_mean': float(cross_val_scores.mean()),
+                    'cross_val_std': float(cross_val_scores.std()),
+                    'cross_val_scores': cross_val_scores.tolist(),
+                    'fit_seconds': fit_seconds,
+                    'train_rows': int(len(y_train_balanced)),
+                    'test_rows': int(len(y_test))
+                })
             
-            self.models[name] = model
-            self.feature_importance[name] = model.feature_importances_ if hasattr(model, 'feature_importances_') else None
+                # Guarda resultados
+                results[name] = dict(
+                    metrics,
+                    model=model,
+                    feature_importance=model.feature_importances_ if hasattr(model, 'feature_importances_') else None
+                )
+                self.model_performance[name] = metrics
             
-            logger.info(f"{name} - Acurácia: {accuracy:.3f}, CV: {cross_val_scores.mean():.3f} ± {cross_val_scores.std():.3f}")
+                self.models[name] = model
+                self.feature_importance[name] = model.feature_importances_ if hasattr(model, 'feature_importances_') else None
+            
+                logger.info(
+                    f"{name} - Acurácia: {metrics['accuracy']:.3f}, F1 macro: {metrics['macro_f1']:.3f}, "
+                    f"CV: {metrics['cross_val_mean']:.3f} ± {metrics['cross_val_std']:.3f}, "
+                    f"treino {fit_seconds:.2f}s, {metrics['predict_ms_per_1k']:.2f} ms/1k linhas, "
+                    f"{metrics['model_size_bytes'] / 1024:.0f} KB"
+                )
+        
+            # Metade da validação escolhe ordem e limiar da cascata; a outra mede o delta reportado
+            report('cascade', 0.9)
+            y_holdout = np.asarray(y_test)
+            calibration, evaluation = _holdout_halves(y_holdout)
+            self.calibrate_cascade(
+                X_test_scaled[calibration], y_holdout[calibration],
+                X_eval_scaled=X_test_scaled[evaluation], y_eval=y_holdout[evaluation]
+            )
+        
+            # Caminho rápido destilado e medido no split de validação
+            if fast_path:
+                report('fast_path', 0.92)
+                self.build_fast_path(X_train_scaled, X_test_scaled, y_test)
         
         # Salva modelos
-        self.save_models()
+        report('saving', 0.95)
+        self.save_models(models_dir)
+        if record_metrics:
+            record_events([
+                {
+                    'kind': 'training',
+                    'model_version': self.model_version,
+                    'model': name,
+                    'accuracy': metrics['accuracy'],
+                    'rows': metrics['train_rows'],
+                    'rows_per_second': metrics['train_rows'] / metrics['fit_seconds'] if metrics['fit_seconds'] > 0 else None,
+                    'ms_per_1k': metrics['predict_ms_per_1k'],
+                    'seconds': metrics['fit_seconds'],
+                    'details': {'macro_f1': metrics['macro_f1'], 'cross_val_mean': metrics['cross_val_mean']}
+                }
+                for name, metrics in self.model_performance.items()
+            ])
+        report('done', 1.0)
         
         return results, X_test_scaled, y_test
     
-    def predict_exoplanet(self, data_point):
-        """Faz predição sobre um ponto de dados"""
+    def _fit_scaler_partitioned(self, X, partitions):
+        """Ajusta o StandardScaler com médias e variâncias unidas das partições"""
+        columns = {feature: X[feature].to_numpy(dtype=float) for feature in X.columns}
+        with trace_stage('scaler_stats', rows=len(X)), PartitionedExecutor(columns, partitions) as executor:
+            moments = executor.moments(X.columns)
+        
+        var = np.array([moments[feature]['var'] for feature in X.columns])
+        scale = np.sqrt(var)
+        # Como o StandardScaler: colunas constantes não são escaladas
+        scale[scale < 10 * np.finfo(scale.dtype).eps] = 1.0
+        self.scaler.mean_ = np.array([moments[feature]['mean'] for feature in X.columns])
+        self.scaler.var_ = var
+        self.scaler.scale_ = scale
+        self.scaler.n_samples_seen_ = len(X)
+        self.scaler.n_features_in_ = X.shape[1]
+        return self.scaler
+    
+    @contextmanager
+    def _track_memory(self, budget):
+        """Coleta o pico de memória das etapas do bloco em `training_report`
+        
+        O listener do TRACER é global: só entram as etapas abertas pela thread deste
+        treino, e não as de outras sessões ou predições concorrentes.
+        """
+        spans = []
+        owner = threading.get_ident()
+        
+        def collect(span):
+            if span.thread == owner:
+                spans.append(span)
+        
+        TRACER.add_listener(collect)
+        try:
+            yield
+        finally:
+            TRACER.remove_listener(collect)
+            self.training_report = {
+                'budget_mb': round(budget.limit_bytes / 1024 ** 2, 1) if budget.limit_bytes else None,
+                'degradations': list(budget.degradations),
+                'stages': [
+                    {
+                        'stage': span.name,
+                        'seconds': round(span.seconds, 3),
+                        'rows': span.rows,
+                        'peak_rss_mb': round(span.peak_rss / 1024 ** 2, 1),
+                        'peak_delta_mb': round(span.peak_delta / 1024 ** 2, 1)
+                    }
+                    for span in spans
+                ]
+            }
+    
+    def _class_names(self, labels):
+        """Nomes das classes (via label encoder) para rótulos numéricos"""
+        classes = getattr(self.label_encoder, 'classes_', None)
+        if classes is not None and len(labels) and max(labels) < len(classes):
+            return [str(classes[label]) for label in labels]
+        return [str(label) for label in labels]
+    
+    def _evaluate_model(self, model, X_test_scaled, y_test, latency_rows=1000, repeats=3):
+        """Métricas de qualidade e de custo de um modelo treinado
+        
+        Inclui precisão/recall/F1 por classe, matriz de confusão, latência de
+        predição por 1k linhas e tamanho serializado do modelo.
+        """
+        y_true = np.asarray(y_test)
+        y_pred = model.predict(X_test_scaled)
+        labels = sorted(set(np.unique(y_true).tolist()) | set(np.asarray(model.classes_).tolist()))
+        names = self._class_names(labels)
+        
+        precision, recall, f1, support = precision_recall_fscore_support(
+            y_true, y_pred, labels=labels, zero_division=0
+        )
+        macro_precision, macro_recall, macro_f1, _ = precision_recall_fscore_support(
+            y_true, y_pred, labels=labels, average='macro', zero_division=0
+        )
+        
+        # Latência: melhor de `repeats` execuções de predict_proba sobre 1k linhas
+        reps = int(np.ceil(latency_rows / max(len(X_test_scaled), 1)))
+        X_latency = np.tile(X_test_scaled, (reps, 1))[:latency_rows]
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model.predict_proba(X_latency)
+            timings.append(time.perf_counter() - start)
+        predict_ms_per_1k = min(timings) * 1000 * 1000 / len(X_latency)
+        
+        return {
+            'accuracy': float(accuracy_score(y_true, y_pred)),
+            'macro_precision': float(macro_precision),
+            'macro_recall': float(macro_recall),
+            'macro_f1': float(macro_f1),
+            'per_class': {
+                name: {
+                    'precision': float(precision[i]),
+                    'recall': float(recall[i]),
+                    'f1': float(f1[i]),
+                    'support': int(support[i])
+                }
+                for i, name in enumerate(names)
+            },
+            'labels': names,
+            'confusion_matrix': confusion_matrix(y_true, y_pred, labels=labels).tolist(),
+            'predict_ms_per_1k': predict_ms_per_1k,
+            'model_size_bytes': _pickled_size(model)
+        }
+    
+    def _prepare_data_point(self, data_point):
+        """Converte um ponto (lista ou dict por feature) para vetor imputado"""
+        if isinstance(data_point, dict):
+            values = [data_point.get(feature, np.nan) for feature in self.features]
+        else:
+            values = list(data_point)
+        
+        vector = np.asarray(values, dtype=float)
+        if self.features and self.feature_medians:
+            missing = np.isnan(vector)
+            if missing.any():
+                medians = np.array([self.feature_medians.get(f, 0.0) for f in self.features])
+                vector[missing] = medians[missing]
+        
+        return vector
+    
+    def _ensemble_proba(self, X_scaled):
+        """Média das probabilidades de todos os modelos do ensemble"""
+        return np.mean([model.predict_proba(X_scaled) for model in self.models.values()], axis=0)
+    
+    def _fast_proba(self, X_scaled):
+        """Probabilidades do booster destilado, com entrada float32 e sem o wrapper sklearn"""
+        X32 = np.ascontiguousarray(X_scaled, dtype=np.float32)
+        return getattr(self.fast_model, 'booster_', self.fast_model).predict(X32)
+    
+    def build_fast_path(self, X_train_scaled, X_val_scaled, y_val=None, n_estimators=100, num_leaves=15,
+                        min_agreement=FAST_PATH_MIN_AGREEMENT, max_accuracy_drop=FAST_PATH_MAX_ACCURACY_DROP):
+        """Destila o ensemble em um único booster LightGBM e mede o trade-off
+        
+        O booster aprende as probabilidades do ensemble nas linhas de treino e é
+        comparado com ele no split de validação, que nenhum dos dois viu. Só fica
+        habilitado (fast_path_report['enabled']) com concordância de pelo menos
+        min_agreement e acurácia a no máximo max_accuracy_drop da do ensemble.
+        """
+        if not self.models:
+            logger.error("Modelos não treinados ainda")
+            return None
+        
+        logger.info("Destilando ensemble para o caminho rápido...")
+        X_train_scaled = np.asarray(X_train_scaled, dtype=float)
+        X_val_scaled = np.asarray(X_val_scaled, dtype=float)
+        n_classes = len(self.label_encoder.classes_)
+        soft_labels = self._ensemble_proba(X_train_scaled)
+        
+        # Rótulos suaves: cada linha aparece uma vez por classe, ponderada pela probabilidade
+        # do ensemble (equivale a minimizar a log-loss contra a distribuição suave)
+        X_expanded = np.repeat(X_train_scaled, soft_labels.shape[1], axis=0).astype(np.float32)
+        y_expanded = np.tile(np.arange(soft_labels.shape[1]), len(X_train_scaled))
+        weights = soft_labels.ravel()
+        keep = weights > 1e-6
+        
+        # num_class explícito: uma classe sem peso em nenhuma linha mantém sua coluna
+        params = {
+            'objective': 'multiclass', 'num_class': n_classes, 'num_leaves': num_leaves,
+            'seed': 42, 'verbosity': -1
+        }
+        with trace_stage('build_fast_path', rows=int(keep.sum())):
+            self.fast_model = lgb.train(
+                params, lgb.Dataset(X_expanded[keep], y_expanded[keep], weight=weights[keep]),
+                num_boost_round=n_estimators
+            )
+        
+        # Relatório de velocidade/fidelidade no split de validação
+        ensemble_pred = self._ensemble_proba(X_val_scaled).argmax(axis=1)
+        fast_pred = self._fast_proba(X_val_scaled).argmax(axis=1)
+        single_row = X_val_scaled[:1]
+        
+        report = {
+            'distilled_rows': int(len(X_train_scaled)),
+            'validation_rows': int(len(X_val_scaled)),
+            'agreement_with_ensemble': float(np.mean(fast_pred == ensemble_pred)),
+            'ensemble_latency_ms': _measure_latency_ms(lambda: self._ensemble_proba(single_row)),
+            'fast_latency_ms': _measure_latency_ms(lambda: self._fast_proba(single_row)),
+            'ensemble_batch_ms_per_1k': _measure_latency_ms(lambda: self._ensemble_proba(X_val_scaled), repeats=3) * 1000 / len(X_val_scaled),
+            'fast_batch_ms_per_1k': _measure_latency_ms(lambda: self._fast_proba(X_val_scaled), repeats=3) * 1000 / len(X_val_scaled),
+            'min_agreement': min_agreement,
+            'max_accuracy_drop': max_accuracy_drop
+        }
+        enabled = report['agreement_with_ensemble'] >= min_agreement
+        if y_val is not None:
+            y_val = np.asarray(y_val)
+            report['ensemble_accuracy'] = float(accuracy_score(y_val, ensemble_pred))
+            report['fast_accuracy'] = float(accuracy_score(y_val, fast_pred))
+            enabled = enabled and report['fast_accuracy'] >= report['ensemble_accuracy'] - max_accuracy_drop
+        report['speedup'] = report['ensemble_latency_ms'] / max(report['fast_latency_ms'], 1e-9)
+        report['enabled'] = bool(enabled)
+        self.fast_path_report = report
+        
+        logger.info(
+            f"Caminho rápido: {report['fast_latency_ms']:.2f} ms vs {report['ensemble_latency_ms']:.2f} ms "
+            f"({report['speedup']:.1f}x), concordância {report['agreement_with_ensemble']:.3f}"
+            f"{'' if enabled else ' (abaixo da fidelidade mínima: desabilitado)'}"
+        )
+        
+        return report
+    
+    @trace_stage('predict_exoplanet', rows=1)
+    def predict_exoplanet(self, data_point, latency_target_ms=None):
+        """Faz predição sobre um ponto de dados
+        
+        Com latency_target_ms, usa o booster destilado quando o ensemble completo
+        não cabe na meta de latência medida em build_fast_path e o caminho rápido
+        passou na fidelidade mínima.
+        """
         if not self.models:
             logger.error("Modelos não treinados ainda")
             return None
             
+        vector = self._prepare_data_point(data_point)
+        use_fast = (latency_target_ms is not None and self.fast_model is not None
+                    and self.fast_path_report.get('enabled', False)
+                    and self.fast_path_report.get('ensemble_latency_ms', 0) > latency_target_ms)
+        
+        self.prediction_cache.sync_version(self.model_version)
+        cache_key = self.prediction_cache.make_key('fast' if use_fast else 'ensemble', vector)
+        cached = self.prediction_cache.get(cache_key)
+        if cached is not None:
+            # Cópia profunda: alterar o resultado não pode corromper o cache
+            return dict(copy.deepcopy(cached), cached=True, timestamp=datetime.now().isoformat())
+        
+        result = self._predict_vector(vector, use_fast)
+        self.prediction_cache.put(cache_key, copy.deepcopy(result))
+        
+        return result
+    
+    def _predict_vector(self, vector, use_fast=False):
+        """Predição sem cache para um vetor já imputado"""
         # Escala o ponto de dados
-        scaled_data = self.scaler.transform([data_point])
+        scaled_data = self.scaler.transform([vector])
+        
+        if use_fast:
+            prob = self._fast_proba(scaled_data)[0]
+            label = self.label_encoder.inverse_transform([int(np.argmax(prob))])[0]
+            
+            return {
+                'ensemble_prediction': label,
+                'individual_predictions': {'Fast Path': label},
+                'probabilities': {'Fast Path': dict(zip(self.label_encoder.classes_, prob))},
+                'path': 'fast',
+                'model_version': self.model_version,
+                'timestamp': datetime.now().isoformat()
+            }
         
         # Predições de todos os modelos
         predictions = {}
@@ -207,17 +930,256 @@ class ExoplanetDetector:
             'ensemble_prediction': ensemble_pred,
             'individual_predictions': predictions,
             'probabilities': probabilities,
+            'path': 'ensemble',
+            'model_version': self.model_version,
             'timestamp': datetime.now().isoformat()
         }
     
-    def save_models(self):
-        """Salva modelos treinados"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    def _batch_matrix(self, data):
+        """Converte DataFrame ou matriz em matriz de features imputada"""
+        if isinstance(data, pd.DataFrame):
+            X = data.reindex(columns=self.features).to_numpy(dtype=float)
+            index = data.index
+        else:
+            X = np.array(data, dtype=float, ndmin=2)
+            index = None
         
-        for name, model in self.models.items():
-            filename = f"models/{name.lower().replace(' ', '_')}_{timestamp}.joblib"
-            joblib.dump(model, filename)
-            logger.info(f"Modelo {name} salvo em {filename}")
+        if self.feature_medians:
+            medians = np.array([self.feature_medians.get(f, 0.0) for f in self.features])
+            X = np.where(np.isnan(X), medians, X)
+        
+        return X, index
+    
+    def _batch_frame(self, probs, index):
+        """Monta o DataFrame de saída a partir das probabilidades por classe"""
+        result = pd.DataFrame(
+            probs, index=index,
+            columns=[f'prob_{label}' for label in self.label_encoder.classes_]
+        )
+        result.insert(0, 'ensemble_prediction', self.label_encoder.inverse_transform(probs.argmax(axis=1)))
+        return result
+    
+    def predict_batch(self, data, use_cache=False):
+        """Prediz um lote (DataFrame com as features ou matriz) por voto suave do ensemble
+        
+        use_cache=True consulta o cache de predições linha a linha: compensa só em
+        lotes pequenos que se repetem, não em catálogos inteiros.
+        """
+        if not self.models:
+            logger.error("Modelos não treinados ainda")
+            return None
+        
+        with trace_stage('predict_batch', rows=len(data)):
+            X, index = self._batch_matrix(data)
+            n_classes = len(self.label_encoder.classes_)
+            probs = np.empty((len(X), n_classes))
+            pending = np.arange(len(X))
+        
+            if use_cache:
+                self.prediction_cache.sync_version(self.model_version)
+                keys = [self.prediction_cache.make_key('batch', row) for row in X]
+                hit_mask = np.zeros(len(X), dtype=bool)
+                for i, key in enumerate(keys):
+                    cached = self.prediction_cache.get(key)
+                    if cached is not None:
+                        probs[i] = cached
+                        hit_mask[i] = True
+                pending = np.flatnonzero(~hit_mask)
+        
+            if len(pending):
+                probs[pending] = self._ensemble_proba(self.scaler.transform(X[pending]))
+                if use_cache:
+                    for i in pending:
+                        self.prediction_cache.put(keys[i], probs[i].copy())
+        
+        return self._batch_frame(probs, index)
+    
+    def measure_model_costs(self, X_scaled):
+        """Mede o custo de predição de cada modelo em ms por 1k linhas"""
+        X_sample = X_scaled[:1000]
+        return {
+            name: _measure_latency_ms(lambda model=model: model.predict_proba(X_sample), repeats=3) * 1000 / len(X_sample)
+            for name, model in self.models.items()
+        }
+    
+    @staticmethod
+    def _confidence(probs, metric):
+        """Confiança por linha: maior probabilidade ou margem entre as duas maiores"""
+        if metric == 'margin':
+            top_two = np.sort(probs, axis=1)[:, -2:]
+            return top_two[:, 1] - top_two[:, 0]
+        return probs.max(axis=1)
+    
+    def calibrate_cascade(self, X_val_scaled, y_val, max_accuracy_drop=0.005, metric='max_proba',
+                          X_eval_scaled=None, y_eval=None):
+        """Calibra o limiar da cascata em dados de validação já escalados
+        
+        Escolhe o menor limiar de confiança do modelo mais barato cuja acurácia
+        fique a no máximo max_accuracy_drop da acurácia do ensemble completo.
+        Com X_eval_scaled/y_eval, acurácias, escalonamento e accuracy_delta são
+        medidos nessas linhas, que a escolha do limiar não viu; o delta otimista
+        da própria calibração fica em calibration_accuracy_delta.
+        """
+        if not self.models:
+            logger.error("Modelos não treinados ainda")
+            return None
+        
+        X_val_scaled = np.asarray(X_val_scaled, dtype=float)
+        y_val = np.asarray(y_val)
+        costs = self.measure_model_costs(X_val_scaled)
+        order = sorted(costs, key=costs.get)
+        
+        first_probs = self.models[order[0]].predict_proba(X_val_scaled)
+        full_probs = self._ensemble_proba(X_val_scaled)
+        confidence = self._confidence(first_probs, metric)
+        full_accuracy = accuracy_score(y_val, full_probs.argmax(axis=1))
+        
+        # Limiares candidatos: quantis da confiança observada, do menor para o maior
+        best = {'threshold': np.inf, 'accuracy': full_accuracy, 'escalation_rate': 1.0}
+        candidates = np.quantile(confidence, np.linspace(0, 1, 201))
+        for threshold in np.unique(np.concatenate([[0.0], candidates])):
+            escalate = confidence < threshold
+            cascade_pred = np.where(escalate, full_probs.argmax(axis=1), first_probs.argmax(axis=1))
+            accuracy = accuracy_score(y_val, cascade_pred)
+            if accuracy >= full_accuracy - max_accuracy_drop:
+                best = {'threshold': float(threshold), 'accuracy': accuracy, 'escalation_rate': float(escalate.mean())}
+                break
+        
+        calibration_delta = float(best['accuracy'] - full_accuracy)
+        evaluation_rows = 0
+        if X_eval_scaled is not None and len(X_eval_scaled):
+            X_eval_scaled = np.asarray(X_eval_scaled, dtype=float)
+            y_eval = np.asarray(y_eval)
+            first_probs = self.models[order[0]].predict_proba(X_eval_scaled)
+            full_pred = self._ensemble_proba(X_eval_scaled).argmax(axis=1)
+            escalate = self._confidence(first_probs, metric) < best['threshold']
+            full_accuracy = accuracy_score(y_eval, full_pred)
+            best['accuracy'] = accuracy_score(y_eval, np.where(escalate, full_pred, first_probs.argmax(axis=1)))
+            best['escalation_rate'] = float(escalate.mean())
+            evaluation_rows = len(y_eval)
+        
+        full_cost = sum(costs.values())
+        self.cascade_config = {
+            'order': order,
+            'metric': metric,
+            'threshold': best['threshold'],
+            'escalation_rate': best['escalation_rate'],
+            'accuracy_delta': float(best['accuracy'] - full_accuracy),
+            'full_accuracy': float(full_accuracy),
+            'cascade_accuracy': float(best['accuracy']),
+            'calibration_accuracy_delta': calibration_delta,
+            'calibration_rows': int(len(y_val)),
+            'evaluation_rows': int(evaluation_rows),
+            'costs_ms_per_1k': costs,
+            'expected_cost_ratio': (costs[order[0]] + best['escalation_rate'] * full_cost) / full_cost
+        }
+        
+        logger.info(
+            f"Cascata calibrada: {order[0]} primeiro, limiar {best['threshold']:.3f}, "
+            f"escalonamento {best['escalation_rate']:.1%}, delta de acurácia {self.cascade_config['accuracy_delta']:+.4f}"
+        )
+        
+        return self.cascade_config
+    
+    def predict_cascade(self, data, threshold=None):
+        """Prediz um lote rodando primeiro o modelo mais barato e escalando só as linhas incertas"""
+        if not self.models:
+            logger.error("Modelos não treinados ainda")
+            return None
+        
+        config = self.cascade_config
+        if not config:
+            # Pipeline sem calibração: modelo de menor latência medida no treino primeiro
+            order = sorted(self.models, key=lambda name: self.model_performance.get(name, {}).get('predict_ms_per_1k', np.inf))
+            config = {'order': order, 'metric': 'max_proba', 'threshold': 0.9}
+            logger.warning(f"Cascata não calibrada: {order[0]} primeiro com limiar padrão 0.9")
+        threshold = config['threshold'] if threshold is None else threshold
+        
+        with trace_stage('predict_cascade', rows=len(data)):
+            X, index = self._batch_matrix(data)
+            X_scaled = self.scaler.transform(X)
+            probs = self.models[config['order'][0]].predict_proba(X_scaled)
+            escalate = self._confidence(probs, config['metric']) < threshold
+        
+            if escalate.any():
+                probs[escalate] = self._ensemble_proba(X_scaled[escalate])
+        
+        self.last_cascade_stats = {
+            'rows': int(len(X)),
+            'escalated': int(escalate.sum()),
+            'escalation_rate': float(escalate.mean()) if len(X) else 0.0
+        }
+        
+        result = self._batch_frame(probs, index)
+        result['escalated'] = escalate
+        return result
+    
+    def save_models(self, models_dir=MODELS_DIR):
+        """Salva modelos treinados como um único artefato versionado"""
+        # Microssegundos evitam colisão de versões entre treinos concorrentes
+        self.model_version = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        filename = os.path.join(models_dir, f"pipeline_{self.model_version}.joblib")
+        
+        with trace_stage('save_models') as span:
+            self.save_pipeline(filename)
+            span.bytes = os.path.getsize(filename)
+        logger.info(f"Pipeline {self.model_version} salvo em {filename} ({', '.join(self.models)})")
+        
+        return filename
+    
+    def save_pipeline(self, path):
+        """Salva scaler, encoder, features, medianas e modelos em um arquivo"""
+        artifact = {
+            'format_version': PIPELINE_FORMAT_VERSION,
+            'model_version': self.model_version,
+            'created_at': datetime.now().isoformat(),
+            'features': self.features,
+            'feature_medians': self.feature_medians,
+            'scaler': self.scaler,
+            'label_encoder': self.label_encoder,
+            'models': self.models,
+            'feature_importance': self.feature_importance,
+            'model_performance': self.model_performance,
+            'fast_model': self.fast_model,
+            'fast_path_report': self.fast_path_report,
+            'cascade_config': self.cascade_config,
+            'training_report': self.training_report
+        }
+        
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Escreve em arquivo temporário para nunca deixar um artefato parcial
+        tmp_path = f"{path}.tmp"
+        joblib.dump(artifact, tmp_path, compress=3)
+        os.replace(tmp_path, path)
+        
+        return path
+    
+    @classmethod
+    def load_pipeline(cls, path):
+        """Carrega um artefato de pipeline e retorna um detector pronto para predição"""
+        artifact = joblib.load(path)
+        
+        if not isinstance(artifact, dict) or 'models' not in artifact:
+            raise ValueError(f"{path} não é um artefato de pipeline válido")
+        if artifact.get('format_version', 0) > PIPELINE_FORMAT_VERSION:
+            raise ValueError(f"Formato de pipeline {artifact['format_version']} não suportado")
+        
+        detector = cls()
+        detector.scaler = artifact['scaler']
+        detector.label_encoder = artifact['label_encoder']
+        detector.models = artifact['models']
+        detector.features = list(artifact.get('features', []))
+        detector.feature_medians = artifact.get('feature_medians', {})
+        detector.feature_importance = artifact.get('feature_importance', {})
+        detector.model_performance = artifact.get('model_performance', {})
+        detector.model_version = artifact.get('model_version')
+        detector.fast_model = artifact.get('fast_model')
+        detector.fast_path_report = artifact.get('fast_path_report', {})
+        detector.cascade_config = artifact.get('cascade_config', {})
+        detector.training_report = artifact.get('training_report', {})
+        
+        logger.info(f"Pipeline {detector.model_version} carregado de {path}")
+        return detector
     
     def load_models(self, model_path):
         """Carrega modelos salvos"""
@@ -245,7 +1207,916 @@ class ExoplanetDetector:
         
         return stats
 
-def main():
+class ModelRegistry:
+    """Registro compartilhado e thread-safe dos pipelines promovidos
+    
+    Os detectores guardados aqui são tratados como somente leitura: sessões
+    treinam em detectores próprios e só trocam o ativo via promote(). Grupos
+    por missão (MissionModelGroup) têm um ponteiro próprio, ACTIVE_GROUP.
+    Só artefatos promovidos por aqui podem virar o ativo: cada promoção é
+    anotada em um histórico (PROMOTED, PROMOTED_GROUPS), usado quando o
+    ponteiro falta ou está inválido; outros pipelines em models/ são ignorados.
+    """
+    
+    ACTIVE_POINTER = 'ACTIVE'
+    ACTIVE_GROUP_POINTER = 'ACTIVE_GROUP'
+    PROMOTION_LOG = 'PROMOTED'
+    GROUP_PROMOTION_LOG = 'PROMOTED_GROUPS'
+    
+    def __init__(self, models_dir=MODELS_DIR):
+        self.models_dir = models_dir
+        self._lock = threading.RLock()
+        self._versions = {}
+        self._active_version = None
+        self._active_group = None
+    
+    def _write_pointer(self, pointer, target):
+        os.makedirs(self.models_dir, exist_ok=True)
+        pointer = os.path.join(self.models_dir, pointer)
+        with open(f"{pointer}.tmp", 'w') as f:
+            f.write(target)
+        os.replace(f"{pointer}.tmp", pointer)
+    
+    def _log_promotion(self, log, target):
+        with open(os.path.join(self.models_dir, log), 'a') as f:
+            f.write(f"{target}\n")
+    
+    def _promoted_candidates(self, pointer, log):
+        """Alvo do ponteiro seguido das promoções anteriores, da mais recente à mais antiga"""
+        targets = []
+        for name in (pointer, log):
+            path = os.path.join(self.models_dir, name)
+            if os.path.exists(path):
+                with open(path) as f:
+                    lines = [line.strip() for line in f if line.strip()]
+                targets.extend(reversed(lines))
+        return [os.path.join(self.models_dir, target) for target in dict.fromkeys(targets)]
+    
+    def load_active(self):
+        """Carrega o pipeline apontado por models/ACTIVE, ou o último promovido que ainda carrega"""
+        detector = None
+        for path in self._promoted_candidates(self.ACTIVE_POINTER, self.PROMOTION_LOG):
+            try:
+                detector = ExoplanetDetector.load_pipeline(path)
+                break
+            except Exception as e:
+                logger.warning(f"Pipeline promovido {path} inválido: {str(e)}")
+        
+        if detector is not None:
+            with self._lock:
+                self._versions[detector.model_version] = detector
+                self._active_version = detector.model_version
+        
+        return detector
+    
+    def active(self):
+        """Detector promovido atualmente (ou None)"""
+        with self._lock:
+            return self._versions.get(self._active_version)
+    
+    def get(self, model_version):
+        with self._lock:
+            return self._versions.get(model_version)
+    
+    def versions(self):
+        with self._lock:
+            return sorted(self._versions)
+    
+    def promote(self, detector):
+        """Torna o detector o modelo ativo de todas as sessões"""
+        if not detector.models:
+            raise ValueError("Não é possível promover um detector sem modelos")
+        
+        with self._lock:
+            if detector.model_version is None:
+                detector.save_models(self.models_dir)
+            
+            # Pipelines treinados em sessões são copiados para o diretório do registro
+            target = f"pipeline_{detector.model_version}.joblib"
+            if not os.path.exists(os.path.join(self.models_dir, target)):
+                detector.save_pipeline(os.path.join(self.models_dir, target))
+            
+            self._versions[detector.model_version] = detector
+            self._active_version = detector.model_version
+            self._write_pointer(self.ACTIVE_POINTER, target)
+            self._log_promotion(self.PROMOTION_LOG, target)
+        
+        logger.info(f"Pipeline {detector.model_version} promovido")
+        return detector.model_version
+    
+    def load_active_group(self):
+        """Carrega o grupo apontado por models/ACTIVE_GROUP, ou o último promovido que ainda carrega"""
+        for path in self._promoted_candidates(self.ACTIVE_GROUP_POINTER, self.GROUP_PROMOTION_LOG):
+            try:
+                group = MissionModelGroup.load(path)
+            except Exception as e:
+                logger.warning(f"Ignorando grupo inválido {path}: {str(e)}")
+                continue
+            with self._lock:
+                self._active_group = group
+            return group
+        
+        return None
+    
+    def active_group(self):
+        """Grupo por missão promovido atualmente (ou None)"""
+        with self._lock:
+            return self._active_group
+    
+    def promote_group(self, group):
+        """Torna o grupo o conjunto ativo da inferência roteada por missão"""
+        if not group.detectors:
+            raise ValueError("Não é possível promover um grupo sem pipelines")
+        
+        with self._lock:
+            if group.group_version is None:
+                group.save(self.models_dir)
+            
+            self._active_group = group
+            self._write_pointer(self.ACTIVE_GROUP_POINTER, f"group_{group.group_version}.json")
+            self._log_promotion(self.GROUP_PROMOTION_LOG, f"group_{group.group_version}.json")
+        
+        logger.info(f"Grupo {group.group_version} promovido ({', '.join(group.detectors)})")
+        return group.group_version
+
+class SessionModelHandle:
+    """Handle leve por sessão sobre o registro, com semântica copy-on-train
+    
+    Predições usam o modelo treinado na própria sessão ou, na falta dele, o
+    promovido no registro. Treinar nunca altera um detector compartilhado.
+    """
+    
+    def __init__(self, registry):
+        self.registry = registry
+        self.detector = None
+    
+    @property
+    def current(self):
+        return self.detector or self.registry.active()
+    
+    @property
+    def has_private_model(self):
+        return self.detector is not None
+    
+    def train(self, df):
+        """Treina um detector novo, privado da sessão; retorna (processed_df, features, resultado)"""
+        detector = ExoplanetDetector()
+        processed_df, features = detector.preprocess_data(df)
+        if processed_df.empty:
+            return processed_df, features, None
+        
+        # O artefato só é preciso se o modelo for promovido, e aí o registro grava o seu
+        with tempfile.TemporaryDirectory(prefix='exoplanet-session-') as models_dir:
+            training_output = detector.train_models(processed_df, features, models_dir=models_dir)
+        self.detector = detector
+        
+        return processed_df, features, training_output
+    
+    def adopt(self, detector):
+        """Assume um detector treinado fora da sessão (ex.: job em segundo plano)"""
+        self.detector = detector
+    
+    def promote(self):
+        """Promove o modelo da sessão para todas as sessões"""
+        if self.detector is None:
+            raise ValueError("Sessão não tem modelo treinado para promover")
+        
+        version = self.registry.promote(self.detector)
+        self.detector = None
+        return version
+
+def _train_mission_partition(mission, df, models_dir, memory_budget_bytes=None, n_jobs=None):
+    """Treina o pipeline de uma missão; executado em um processo do pool do grupo"""
+    summary = {'rows': len(df)}
+    if 'koi_disposition' not in df.columns:
+        return mission, None, dict(summary, skipped="Partição sem koi_disposition")
+    
+    # Colunas de outras missões ficam vazias na partição e não podem virar features
+    df = df[df['koi_disposition'].notna()].dropna(axis=1, how='all')
+    if df['koi_disposition'].nunique() < 2:
+        return mission, None, dict(summary, skipped="Menos de duas disposições conhecidas")
+    
+    detector = ExoplanetDetector()
+    processed_df, features = detector.preprocess_data(df)
+    if processed_df.empty or processed_df['target'].nunique() < 2:
+        return mission, None, dict(summary, skipped="Sem linhas suficientes após o pré-processamento")
+    
+    budget = MemoryBudget(memory_budget_bytes) if memory_budget_bytes else None
+    results, _, _ = detector.train_models(
+        processed_df, features, models_dir=models_dir, memory_budget=budget, n_jobs=n_jobs
+    )
+    summary.update(
+        model_version=detector.model_version,
+        features=features,
+        train_rows=len(processed_df),
+        models={
+            name: {key: result[key] for key in ('accuracy', 'macro_f1', 'fit_seconds')}
+            for name, result in results.items()
+        },
+        degradations=detector.training_report.get('degradations', [])
+    )
+    return mission, os.path.join(models_dir, f"pipeline_{detector.model_version}.joblib"), summary
+
+class MissionModelGroup:
+    """Um pipeline por missão, salvo e promovido como uma unidade
+    
+    Cada linha é roteada para o pipeline da sua missão: pela coluna `mission`
+    (catálogos do ingest_catalogs) ou, na falta dela, por detect_mission. Cada
+    missão treina só nas próprias colunas, sem preencher as que não tem, e
+    retreinar uma missão mantém os pipelines das demais.
+    """
+    
+    def __init__(self):
+        self.detectors = {}
+        self.paths = {}
+        self.training_summary = {}
+        self.group_version = None
+    
+    @property
+    def models(self):
+        """Modelos de todas as missões (interface usada por score_file)"""
+        return {
+            f"{mission}/{name}": model
+            for mission, detector in self.detectors.items()
+            for name, model in detector.models.items()
+        }
+    
+    @property
+    def model_version(self):
+        return self.group_version
+    
+    def route(self, df):
+        """Missão de cada linha do DataFrame"""
+        detected = detect_mission(df.columns)
+        if 'mission' in df.columns:
+            return df['mission'].astype(object).fillna(detected).astype(str)
+        return pd.Series(detected, index=df.index)
+    
+    def train(self, df, missions=None, jobs=1, models_dir=MODELS_DIR, memory_budget_bytes=None, n_jobs=None):
+        """Treina em paralelo um pipeline por missão (todas as de df, ou só `missions`)
+        
+        Cada processo recebe uma fração igual do orçamento de memória
+        (memory_budget_bytes, ou o padrão do sistema). Os pipelines ficam em
+        <models_dir>/missions/, fora do alcance do registro. Missões
+        que não podem ser treinadas (ex.: microlente, só com confirmados) ficam
+        de fora com o motivo em training_summary.
+        """
+        routes = self.route(df)
+        missions = sorted(routes.unique()) if missions is None else list(missions)
+        partitions = {mission: df[(routes == mission).to_numpy()] for mission in missions}
+        for mission in [mission for mission, partition in partitions.items() if partition.empty]:
+            logger.warning(f"Nenhuma linha da missão {mission} para treinar")
+            del partitions[mission]
+        if not partitions:
+            return {}
+        
+        workers = max(1, min(jobs, len(partitions)))
+        total = default_budget_bytes() if memory_budget_bytes is None else memory_budget_bytes
+        memory_budget_bytes = total // workers if total else None
+        
+        mission_dir = os.path.join(models_dir, MISSION_MODELS_SUBDIR)
+        logger.info(f"Treinando {len(partitions)} missão(ões) com {workers} processo(s): {', '.join(partitions)}")
+        with trace_stage('train_mission_group', rows=len(df)):
+            if workers == 1:
+                outcomes = [
+                    _train_mission_partition(mission, partition, mission_dir, memory_budget_bytes, n_jobs)
+                    for mission, partition in partitions.items()
+                ]
+            else:
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+                with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                    futures = [
+                        executor.submit(_train_mission_partition, mission, partition, mission_dir, memory_budget_bytes, n_jobs)
+                        for mission, partition in partitions.items()
+                    ]
+                    outcomes = [future.result() for future in futures]
+        
+        trained = {}
+        for mission, path, summary in outcomes:
+            trained[mission] = summary
+            if path is None:
+                logger.warning(f"Missão {mission} não treinada: {summary['skipped']}")
+                continue
+            self.detectors[mission] = ExoplanetDetector.load_pipeline(path)
+            self.paths[mission] = path
+        
+        self.training_summary.update(trained)
+        # O conjunto mudou: a próxima gravação gera uma nova versão do grupo
+        self.group_version = None
+        return trained
+    
+    def save(self, models_dir=MODELS_DIR):
+        """Grava o manifesto do grupo (JSON com o pipeline de cada missão)"""
+        for mission, detector in self.detectors.items():
+            if mission not in self.paths:
+                self.paths[mission] = detector.save_models(os.path.join(models_dir, MISSION_MODELS_SUBDIR))
+        
+        self.group_version = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        manifest = {
+            'format_version': GROUP_FORMAT_VERSION,
+            'group_version': self.group_version,
+            'created_at': datetime.now().isoformat(),
+            'missions': {
+                mission: {
+                    'pipeline': os.path.relpath(self.paths[mission], models_dir),
+                    'model_version': detector.model_version
+                }
+                for mission, detector in sorted(self.detectors.items())
+            },
+            'training_summary': _to_jsonable(self.training_summary)
+        }
+        
+        path = os.path.join(models_dir, f"group_{self.group_version}.json")
+        os.makedirs(models_dir, exist_ok=True)
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(manifest, f, indent=2, default=str)
+        os.replace(f"{path}.tmp", path)
+        logger.info(f"Grupo {self.group_version} salvo em {path} ({', '.join(manifest['missions'])})")
+        
+        return path
+    
+    @classmethod
+    def load(cls, path):
+        """Carrega um manifesto de grupo e os pipelines de cada missão"""
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest.get('format_version', 0) > GROUP_FORMAT_VERSION:
+            raise ValueError(f"Formato de grupo {manifest['format_version']} não suportado")
+        
+        group = cls()
+        base_dir = os.path.dirname(path)
+        for mission, entry in manifest['missions'].items():
+            pipeline_path = os.path.join(base_dir, entry['pipeline'])
+            group.detectors[mission] = ExoplanetDetector.load_pipeline(pipeline_path)
+            group.paths[mission] = pipeline_path
+        group.training_summary = manifest.get('training_summary', {})
+        group.group_version = manifest['group_version']
+        
+        logger.info(f"Grupo {group.group_version} carregado de {path}")
+        return group
+    
+    def _predict_routed(self, data, predict):
+        """Aplica predict(detector, linhas) por missão e remonta na ordem da entrada"""
+        routes = self.route(data).to_numpy()
+        # Catálogos crus (sem a coluna `mission`) ainda estão no esquema da missão
+        raw = 'mission' not in data.columns
+        parts = []
+        
+        for mission in pd.unique(routes):
+            positions = np.flatnonzero(routes == mission)
+            rows = data.iloc[positions]
+            detector = self.detectors.get(mission)
+            if detector is None:
+                scored = pd.DataFrame({'ensemble_prediction': [None] * len(rows)})
+            else:
+                if raw:
+                    rows = detector.standardize_catalog(mission, rows)
+                scored = predict(detector, rows).reset_index(drop=True)
+            scored.insert(1, 'mission', mission)
+            scored.insert(2, 'model_version', None if detector is None else detector.model_version)
+            scored.index = positions
+            parts.append(scored)
+        
+        result = pd.concat(parts).sort_index() if parts else pd.DataFrame(columns=['ensemble_prediction', 'mission'])
+        result.index = data.index
+        return result
+    
+    def predict_batch(self, data, use_cache=False):
+        """Prediz cada linha com o pipeline da sua missão; missões sem pipeline ficam sem predição"""
+        if not self.detectors:
+            logger.error("Grupo sem pipelines treinados")
+            return None
+        
+        with trace_stage('predict_mission_group', rows=len(data)):
+            return self._predict_routed(data, lambda detector, rows: detector.predict_batch(rows, use_cache=use_cache))
+    
+    def predict_cascade(self, data, threshold=None):
+        """Inferência em cascata roteada por missão"""
+        if not self.detectors:
+            logger.error("Grupo sem pipelines treinados")
+            return None
+        
+        with trace_stage('predict_mission_group', rows=len(data)):
+            result = self._predict_routed(data, lambda detector, rows: detector.predict_cascade(rows, threshold))
+        escalated = result['escalated'] if 'escalated' in result else pd.Series(False, index=result.index)
+        result['escalated'] = escalated.fillna(False).astype(bool)
+        return result
+
+def _to_jsonable(value):
+    """Converte tipos numpy (escalares e arrays) recursivamente para tipos JSON"""
+    if isinstance(value, dict):
+        return {str(key): _to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+def run_training_job(input_path, workdir):
+    """Executa um treinamento completo publicando eventos JSON (um por linha) no stdout
+    
+    Usado pelo TrainingJobManager em um processo Python separado.
+    """
+    def emit(event, **payload):
+        print(json.dumps(_to_jsonable(dict(payload, event=event))), flush=True)
+    
+    try:
+        df = pd.read_pickle(input_path)
+        detector = ExoplanetDetector()
+        emit('progress', stage='preprocess', fraction=0.0, metrics={})
+        # Processo próprio do job: catálogos grandes usam todos os núcleos no pré-processamento
+        partitions = auto_partitions(len(df))
+        processed_df, features = detector.preprocess_data(df, partitions=partitions)
+        if processed_df.empty:
+            emit('failed', error="Dados processados estão vazios. Verifique o formato dos dados.")
+            return 1
+        
+        # Artefato no diretório do job, apagado junto com ele depois de carregado
+        models_dir = os.path.join(workdir, 'models')
+        results, _, _ = detector.train_models(
+            processed_df, features,
+            progress_callback=lambda stage, fraction, metrics: emit('progress', stage=stage, fraction=fraction, metrics=metrics),
+            models_dir=models_dir, partitions=partitions, fast_path=True
+        )
+        
+        # Modelos voltam pelo artefato em disco; pelo stdout só vão dados leves
+        processed_path = os.path.join(workdir, 'processed.pkl')
+        processed_df.to_pickle(processed_path)
+        emit(
+            'completed',
+            pipeline_path=os.path.join(models_dir, f"pipeline_{detector.model_version}.joblib"),
+            processed_path=processed_path,
+            features=features,
+            results={
+                name: {key: value for key, value in result.items() if key != 'model'}
+                for name, result in results.items()
+            }
+        )
+        return 0
+    except Exception as e:
+        emit('failed', error=f"Erro no processamento: {str(e)}")
+        return 1
+
+class CatalogRefresh:
+    """Atualização das tabelas NASA em uma thread, com progresso consultável
+    
+    snapshot() devolve o estado acumulado (bytes, linhas lidas e pontuadas por
+    fonte) para que a interface atualize os contadores enquanto roda.
+    """
+    
+    def __init__(self, detector, base_url=None, sources=None):
+        self.detector = detector
+        self.base_url = base_url
+        self.sources = sources or list(NASA_TABLES)
+        self._lock = threading.Lock()
+        self._state = {
+            'running': False,
+            'sources': {mission: {'stage': 'pending', 'bytes': 0, 'total_bytes': None, 'rows': 0, 'rows_scored': 0}
+                        for mission in self.sources},
+            'summary': None,
+            'error': None,
+            'started_at': None
+        }
+        self._thread = None
+    
+    def start(self):
+        with self._lock:
+            self._state['running'] = True
+            self._state['started_at'] = time.time()
+        self._thread = threading.Thread(target=self._run, name='nasa-refresh', daemon=True)
+        self._thread.start()
+        return self
+    
+    def _on_progress(self, event):
+        with self._lock:
+            source = self._state['sources'].setdefault(event['source'], {})
+            source['stage'] = event['stage']
+            for key in ('bytes', 'total_bytes', 'rows', 'rows_scored', 'error', 'summary'):
+                if key in event:
+                    source[key] = event[key]
+    
+    def _run(self):
+        try:
+            summary = self.detector.refresh_nasa_data(
+                base_url=self.base_url, sources=self.sources, progress_callback=self._on_progress
+            )
+            with self._lock:
+                self._state['summary'] = summary
+        except Exception as e:
+            logger.error(f"Erro na atualização dos dados NASA: {str(e)}")
+            with self._lock:
+                self._state['error'] = str(e)
+        finally:
+            with self._lock:
+                self._state['running'] = False
+    
+    def snapshot(self):
+        """Cópia do estado atual com totais agregados"""
+        with self._lock:
+            state = {
+                key: ({mission: dict(source) for mission, source in value.items()} if key == 'sources' else value)
+                for key, value in self._state.items()
+            }
+        
+        sources = state['sources'].values()
+        state['bytes'] = sum(source.get('bytes', 0) for source in sources)
+        state['rows'] = sum(source.get('rows', 0) for source in sources)
+        state['rows_scored'] = sum(source.get('rows_scored', 0) for source in sources)
+        finished = sum(1 for source in sources if source['stage'] in ('done', 'error'))
+        state['progress'] = finished / len(state['sources']) if state['sources'] else 1.0
+        
+        return state
+
+class TrainingJobManager:
+    """Fila de treinamentos em processos separados, consultável por id de job
+    
+    Cada job roda em um interpretador próprio (python -m exoplanet_ml train-job,
+    no máximo max_workers simultâneos) e publica progresso em linhas JSON; uma
+    thread de monitoramento inicia jobs da fila e aplica o tempo limite. Jobs
+    sobrevivem ao recarregamento da página enquanto o gerenciador (compartilhado
+    pelo servidor) existir, e podem ser cancelados.
+    O resultado de um job concluído é entregue uma única vez por result(), que
+    libera os dados do job; jobs encerrados são esquecidos result_ttl_seconds
+    depois do fim, consumidos ou não.
+    """
+    
+    FINISHED_STATES = ('completed', 'failed', 'cancelled')
+    
+    def __init__(self, max_workers=2, timeout_seconds=3600, result_ttl_seconds=3600):
+        self.max_workers = max_workers
+        self.timeout_seconds = timeout_seconds
+        self.result_ttl_seconds = result_ttl_seconds
+        self._jobs = {}
+        self._queue = deque()
+        self._lock = threading.RLock()
+        self._monitor = None
+    
+    def submit(self, df, metadata=None):
+        """Enfileira um treinamento e retorna o id do job"""
+        job_id = f"job-{datetime.now().strftime('%Y%m%d%H%M%S')}-{os.urandom(3).hex()}"
+        
+        with self._lock:
+            self._jobs[job_id] = {
+                'id': job_id,
+                'state': 'queued',
+                'stage': 'queued',
+                'progress': 0.0,
+                'partial_metrics': {},
+                'error': None,
+                'metadata': metadata or {},
+                'submitted_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+                'consumed': False,
+                '_df': df,
+                '_process': None,
+                '_workdir': None,
+                '_reader': None,
+                '_result': None
+            }
+            self._queue.append(job_id)
+            self._evict_expired()
+            self._ensure_monitor()
+        
+        self._poll()
+        logger.info(f"Job de treinamento {job_id} enfileirado ({len(df)} registros)")
+        return job_id
+    
+    def status(self, job_id):
+        """Cópia pública do estado do job (ou None se desconhecido ou expirado)"""
+        with self._lock:
+            self._evict_expired()
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {key: value for key, value in job.items() if not key.startswith('_')}
+    
+    def result(self, job_id):
+        """Resultado de um job concluído, com o detector carregado do artefato
+        
+        Entregue uma só vez: depois disso o job guarda apenas o estado público
+        (consumed=True) e o diretório com o artefato é apagado.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['state'] != 'completed' or job['consumed']:
+                return None
+            try:
+                result = dict(
+                    job['_result'],
+                    detector=ExoplanetDetector.load_pipeline(job['_result']['pipeline_path']),
+                    processed_df=pd.read_pickle(job['_result']['processed_path']),
+                    adapted_df=job['_df'],
+                    metadata=job['metadata']
+                )
+            finally:
+                job['consumed'] = True
+                self._release(job)
+            return result
+    
+    def cancel(self, job_id, reason=None):
+        """Cancela um job na fila ou em execução"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['state'] in self.FINISHED_STATES:
+                return False
+            if job_id in self._queue:
+                self._queue.remove(job_id)
+            if job['_process'] is not None and job['_process'].poll() is None:
+                job['_process'].terminate()
+            self._finish(job, 'cancelled', error=reason)
+        
+        logger.info(f"Job {job_id} cancelado")
+        return True
+    
+    def _finish(self, job, state, error=None):
+        job['state'] = state
+        job['error'] = error
+        job['finished_at'] = time.time()
+        if state != 'completed':
+            self._release(job)
+    
+    def _release(self, job):
+        """Solta os dados do job (DataFrame enviado, eventos e artefato em disco)"""
+        job['_df'] = None
+        job['_result'] = None
+        if job['_workdir']:
+            shutil.rmtree(job['_workdir'], ignore_errors=True)
+            job['_workdir'] = None
+    
+    def _evict_expired(self):
+        """Esquece jobs encerrados há mais de result_ttl_seconds"""
+        deadline = time.time() - self.result_ttl_seconds
+        for job_id, job in list(self._jobs.items()):
+            if job['state'] in self.FINISHED_STATES and job['finished_at'] <= deadline:
+                self._release(job)
+                del self._jobs[job_id]
+    
+    def _ensure_monitor(self):
+        if self._monitor is None or not self._monitor.is_alive():
+            self._monitor = threading.Thread(target=self._monitor_loop, name='training-jobs', daemon=True)
+            self._monitor.start()
+    
+    def _monitor_loop(self):
+        while True:
+            with self._lock:
+                active = any(job['state'] in ('queued', 'running') for job in self._jobs.values())
+                if not active:
+                    self._monitor = None
+                    return
+            self._poll()
+            time.sleep(0.2)
+    
+    def _poll(self):
+        """Detecta processos encerrados, aplica o tempo limite e inicia jobs da fila"""
+        with self._lock:
+            for job in self._jobs.values():
+                if job['state'] != 'running':
+                    continue
+                if time.time() - job['started_at'] > self.timeout_seconds:
+                    job['_process'].terminate()
+                    self._finish(job, 'cancelled', error=f"Tempo limite de {self.timeout_seconds}s excedido")
+                elif job['_process'].poll() is not None and job['_reader'] is not None and not job['_reader'].is_alive():
+                    # O leitor já consumiu todos os eventos; sem 'completed' o processo falhou
+                    self._finish(job, 'failed', error=f"Processo encerrado com código {job['_process'].returncode}")
+            
+            slots = self.max_workers - sum(1 for job in self._jobs.values() if job['state'] == 'running')
+            while slots > 0 and self._queue:
+                self._start(self._jobs[self._queue.popleft()])
+                slots -= 1
+    
+    def _start(self, job):
+        job['_workdir'] = tempfile.mkdtemp(prefix=f"exoplanet-{job['id']}-")
+        input_path = os.path.join(job['_workdir'], 'input.pkl')
+        job['_df'].to_pickle(input_path)
+        
+        module_dir = os.path.dirname(os.path.abspath(__file__))
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [module_dir, os.environ.get('PYTHONPATH')])))
+        job['_process'] = subprocess.Popen(
+            [sys.executable, '-m', 'exoplanet_ml', 'train-job', input_path, job['_workdir']],
+            stdout=subprocess.PIPE, text=True, env=env
+        )
+        job['_reader'] = threading.Thread(target=self._read_events, args=(job,), daemon=True)
+        job['_reader'].start()
+        job['state'] = 'running'
+        job['started_at'] = time.time()
+    
+    def _read_events(self, job):
+        """Consome as linhas JSON publicadas pelo processo do job"""
+        for line in job['_process'].stdout:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            
+            with self._lock:
+                if job['state'] != 'running':
+                    break
+                if event['event'] == 'progress':
+                    job['stage'] = event['stage']
+                    job['progress'] = event['fraction']
+                    job['partial_metrics'] = event['metrics']
+                elif event['event'] == 'completed':
+                    job['_result'] = event
+                    job['partial_metrics'] = event['results']
+                    job['progress'] = 1.0
+                    job['stage'] = 'done'
+                    self._finish(job, 'completed')
+                elif event['event'] == 'failed':
+                    self._finish(job, 'failed', error=event['error'])
+        
+        job['_process'].stdout.close()
+
+# Colunas de identificação copiadas da entrada para a saída do score
+ID_COLUMNS = ['kepoi_name', 'koi_name', 'toi_name', 'tic_id', 'pl_name', 'name']
+
+# Detector usado pelos workers do score; com fork é herdado por copy-on-write
+_SCORING_DETECTOR = None
+
+def _iter_input_chunks(input_path, chunksize):
+    """Lê CSV ou Parquet em blocos sem carregar o arquivo inteiro"""
+    if input_path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        
+        parquet_file = pq.ParquetFile(input_path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(input_path, chunksize=chunksize, comment='#', skip_blank_lines=True)
+
+def _score_chunk(chunk_index, chunk, cascade=False):
+    """Pontua um bloco com o detector compartilhado"""
+    if cascade:
+        scored = _SCORING_DETECTOR.predict_cascade(chunk)
+    else:
+        scored = _SCORING_DETECTOR.predict_batch(chunk)
+    id_columns = [col for col in ID_COLUMNS if col in chunk.columns]
+    if id_columns:
+        scored = pd.concat([chunk[id_columns], scored], axis=1)
+    return chunk_index, scored.reset_index(drop=True)
+
+class ChunkWriter:
+    """Escreve blocos de resultado de forma incremental em CSV ou Parquet
+    
+    Os blocos devem chegar na ordem da saída; com partitioned cada bloco vira
+    um arquivo part-NNNNN no diretório output_path.
+    """
+    
+    def __init__(self, output_path, partitioned=False):
+        self.output_path = output_path
+        self.partitioned = partitioned
+        self.is_parquet = output_path.endswith('.parquet') or (partitioned and not output_path.endswith('.csv'))
+        self.paths = []
+        self._parquet_writer = None
+        
+        if partitioned:
+            os.makedirs(output_path, exist_ok=True)
+        else:
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    
+    def write(self, chunk_index, frame):
+        if self.partitioned:
+            extension = 'parquet' if self.is_parquet else 'csv'
+            path = os.path.join(self.output_path, f"part-{chunk_index:05d}.{extension}")
+            if self.is_parquet:
+                frame.to_parquet(path, index=False)
+            else:
+                frame.to_csv(path, index=False)
+            self.paths.append(path)
+        elif self.is_parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.output_path, table.schema)
+                self.paths.append(self.output_path)
+            self._parquet_writer.write_table(table)
+        else:
+            first = not self.paths
+            frame.to_csv(self.output_path, mode='w' if first else 'a', header=first, index=False)
+            if first:
+                self.paths.append(self.output_path)
+    
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+def _cascade_report(detector):
+    """Ordem, limiar e delta de acurácia da cascata de um pipeline, medidos na validação do treino"""
+    config = detector.cascade_config
+    if not config:
+        return {'cascade_calibrated': False}
+    return {
+        'cascade_calibrated': True,
+        'cascade_order': config['order'],
+        'cascade_threshold': config['threshold'],
+        'accuracy_delta': config['accuracy_delta'],
+        # Linhas que mediram o delta sem ter escolhido o limiar (0 em pipelines antigos)
+        'accuracy_delta_rows': config.get('evaluation_rows', 0),
+        'expected_cost_ratio': config['expected_cost_ratio']
+    }
+
+def score_file(detector, input_path, output_path, chunksize=100_000, jobs=1, partitioned=False, cascade=False):
+    """Pontua um catálogo CSV/Parquet em blocos, com memória constante
+    
+    Com jobs > 1 os blocos são distribuídos para um pool de processos; no máximo
+    2 * jobs blocos ficam em trânsito. Sem partitioned a saída mantém a ordem
+    da entrada; com partitioned cada bloco vira um arquivo part-NNNNN.
+    Com cascade, usa predict_cascade e reporta a taxa de escalonamento e o
+    delta de acurácia contra o ensemble completo guardado na calibração.
+    """
+    global _SCORING_DETECTOR
+    
+    if not detector.models:
+        raise ValueError("Modelos não treinados ainda")
+    
+    _SCORING_DETECTOR = detector
+    writer = ChunkWriter(output_path, partitioned=partitioned)
+    total_rows = 0
+    chunks_written = 0
+    escalated_rows = 0
+    start = time.perf_counter()
+    
+    logger.info(f"Pontuando {input_path} em blocos de {chunksize} linhas com {jobs} processo(s)...")
+    
+    with trace_stage('score_file') as span:
+        try:
+            if jobs <= 1:
+                for chunk_index, chunk in enumerate(_iter_input_chunks(input_path, chunksize)):
+                    _, scored = _score_chunk(chunk_index, chunk, cascade)
+                    writer.write(chunk_index, scored)
+                    total_rows += len(scored)
+                    chunks_written += 1
+                    if cascade:
+                        escalated_rows += int(scored['escalated'].sum())
+            else:
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+                max_in_flight = 2 * jobs
+                pending = deque()
+            
+                with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as executor:
+                    chunks = enumerate(_iter_input_chunks(input_path, chunksize))
+                    exhausted = False
+                
+                    while pending or not exhausted:
+                        # Mantém a janela de blocos em trânsito cheia, sem ler o arquivo todo
+                        while not exhausted and len(pending) < max_in_flight:
+                            try:
+                                chunk_index, chunk = next(chunks)
+                            except StopIteration:
+                                exhausted = True
+                                break
+                            pending.append(executor.submit(_score_chunk, chunk_index, chunk, cascade))
+                    
+                        if pending:
+                            chunk_index, scored = pending.popleft().result()
+                            writer.write(chunk_index, scored)
+                            total_rows += len(scored)
+                            chunks_written += 1
+                            if cascade:
+                                escalated_rows += int(scored['escalated'].sum())
+        finally:
+            writer.close()
+            _SCORING_DETECTOR = None
+        span.rows = total_rows
+    
+    elapsed = time.perf_counter() - start
+    report = {
+        'input': input_path,
+        'outputs': writer.paths,
+        'rows': total_rows,
+        'chunks': chunks_written,
+        'jobs': jobs,
+        'seconds': elapsed,
+        'rows_per_second': total_rows / elapsed if elapsed > 0 else 0.0,
+        'model_version': detector.model_version
+    }
+    if cascade:
+        report['escalation_rate'] = escalated_rows / total_rows if total_rows else 0.0
+        if isinstance(detector, MissionModelGroup):
+            report['cascade'] = {mission: _cascade_report(member) for mission, member in detector.detectors.items()}
+        else:
+            report.update(_cascade_report(detector))
+    record_events([{
+        'kind': 'scoring',
+        'model_version': detector.model_version,
+        'model': 'cascade' if cascade else 'ensemble',
+        'rows': total_rows,
+        'rows_per_second': report['rows_per_second'],
+        'ms_per_1k': 1000 * 1000 / report['rows_per_second'] if report['rows_per_second'] else None,
+        'seconds': elapsed,
+        'details': {'jobs': jobs, 'chunks': chunks_written, 'escalation_rate': report.get('escalation_rate')}
+    }])
+    logger.info(f"Score concluído: {total_rows} linhas em {elapsed:.2f}s ({report['rows_per_second']:.0f} linhas/s)")
+    
+    return report
+
+def run_demo():
     """Função principal para demonstração"""
     detector = ExoplanetDetector()
     
@@ -270,5 +2141,455 @@ def main():
     print(f"  Predição: {prediction['ensemble_prediction']}")
     print(f"  Probabilidades: {prediction['probabilities']['Random Forest']}")
 
+# Códigos de saída da linha de comando (para cron/Airflow)
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_NO_DATA = 3
+EXIT_QUALITY = 4
+
+def read_catalog(path):
+    """Lê um catálogo CSV, Parquet ou XLSX inteiro"""
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    if path.endswith('.xlsx'):
+        return pd.read_excel(path)
+    return pd.read_csv(path, comment='#', skip_blank_lines=True, low_memory=False)
+
+def write_catalog_file(df, path):
+    """Grava um catálogo em CSV ou Parquet conforme a extensão"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if path.endswith('.parquet'):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+def ingest_catalogs(paths, mission=None, jobs=1):
+    """Lê catálogos de qualquer missão e os une no esquema koi_*, com a coluna `mission`"""
+    detector = ExoplanetDetector()
+    
+    def ingest(path):
+        df = read_catalog(path)
+        if mission is None and 'mission' in df.columns:
+            # Saída do próprio ingest: já padronizada, com a missão de cada linha
+            source = ','.join(sorted(df['mission'].dropna().unique()))
+            standardized = df
+        else:
+            source = mission or detect_mission(df.columns)
+            standardized = detector.standardize_catalog(source, df)
+            standardized['mission'] = source
+        # Identificadores numéricos (TOI) e textuais (KOI) convivem na mesma coluna
+        for column in set(ID_COLUMNS) & set(standardized.columns):
+            standardized[column] = standardized[column].astype('string')
+        return path, source, standardized
+    
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        ingested = list(executor.map(ingest, paths))
+    
+    frames = [frame for _, _, frame in ingested]
+    combined = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    sources = [
+        {
+            'path': path,
+            'mission': source,
+            'rows': len(frame),
+            'dispositions': frame['koi_disposition'].value_counts().to_dict() if 'koi_disposition' in frame else {}
+        }
+        for path, source, frame in ingested
+    ]
+    return combined, sources
+
+def load_cli_config(path):
+    """Lê a configuração da linha de comando (JSON, ou TOML com Python 3.11+)
+    
+    Chaves de primeiro nível valem para todos os comandos; seções com o nome de
+    um comando ({"train": {"jobs": 4}}) valem só para ele.
+    """
+    with open(path, 'rb') as handle:
+        if path.endswith('.toml'):
+            import tomllib
+            return tomllib.load(handle)
+        return json.load(handle)
+
+def _apply_cli_config(parser, command_parser, command, config):
+    """Usa a configuração como padrão das opções; a linha de comando prevalece"""
+    dests = {action.dest for action in command_parser._actions}
+    values = {key.replace('-', '_'): value for key, value in config.items() if not isinstance(value, dict)}
+    values = {key: value for key, value in values.items() if key in dests}
+    section = {key.replace('-', '_'): value for key, value in config.get(command, {}).items()}
+    unknown = sorted(set(section) - dests)
+    if unknown:
+        parser.error(f"Opções desconhecidas para '{command}' na configuração: {unknown}")
+    command_parser.set_defaults(**dict(values, **section))
+
+def _load_detector(model_path, models_dir, per_mission=False):
+    """Pipeline ou grupo (group_*.json) indicado, ou o ativo em models_dir"""
+    if model_path:
+        if model_path.endswith('.json'):
+            return MissionModelGroup.load(model_path)
+        return ExoplanetDetector.load_pipeline(model_path)
+    registry = ModelRegistry(models_dir)
+    return registry.load_active_group() if per_mission else registry.load_active()
+
+def _labeled_frame(detector, df):
+    """Linhas com disposição conhecida pelo label encoder do pipeline, e seus rótulos"""
+    known = df['koi_disposition'].isin(detector.label_encoder.classes_)
+    labeled = df[known]
+    return labeled, detector.label_encoder.transform(labeled['koi_disposition'])
+
+def cli_fetch(args):
+    """Baixa as tabelas NASA e grava uma por missão"""
+    detector = ExoplanetDetector()
+    sources = args.sources.split(',') if args.sources else list(NASA_TABLES)
+    datasets = detector.load_nasa_data(args.base_url, sources, max_workers=args.jobs)
+    
+    outputs = {}
+    for mission, df in datasets.items():
+        if args.standardize:
+            df = detector.standardize_catalog(mission, df)
+        path = write_catalog_file(df, os.path.join(args.output_dir, f"{mission}.{args.format}"))
+        outputs[mission] = {'rows': len(df), 'path': path}
+    
+    missing = sorted(set(sources) - set(datasets))
+    report = {'sources': outputs, 'failed': missing}
+    if not datasets:
+        return EXIT_NO_DATA, report
+    return (EXIT_ERROR if missing else EXIT_OK), report
+
+def cli_ingest(args):
+    """Une catálogos locais no esquema koi_* em um único arquivo"""
+    combined, sources = ingest_catalogs(args.inputs, args.mission, args.jobs)
+    report = {'sources': sources, 'rows': len(combined)}
+    if combined.empty:
+        return EXIT_NO_DATA, report
+    report['output'] = write_catalog_file(combined, args.output)
+    report['missing_fraction'] = {
+        column: float(combined[column].isna().mean())
+        for column in combined.columns if column.startswith('koi_')
+    }
+    return EXIT_OK, report
+
+def cli_train(args):
+    """Treina os modelos em um catálogo e grava o pipeline (opcionalmente promovido)"""
+    combined, sources = ingest_catalogs(args.input, args.mission)
+    if args.per_mission:
+        return _cli_train_group(args, combined, sources)
+    no_labels = {'sources': sources, 'error': "Sem linhas rotuladas (koi_disposition) após o pré-processamento"}
+    if 'koi_disposition' not in combined.columns:
+        return EXIT_NO_DATA, no_labels
+    
+    # Linhas sem disposição (ex.: catálogo só para pontuação misturado) não entram no treino
+    labeled = combined['koi_disposition'].notna()
+    dropped_unlabeled = int((~labeled).sum())
+    combined = combined[labeled]
+    detector = ExoplanetDetector()
+    partitions = args.partitions or auto_partitions(len(combined))
+    processed_df, features = detector.preprocess_data(combined, partitions=partitions)
+    if processed_df.empty:
+        return EXIT_NO_DATA, dict(no_labels, dropped_unlabeled_rows=dropped_unlabeled)
+    
+    budget = MemoryBudget(int(args.memory_budget_mb * 1024 ** 2)) if args.memory_budget_mb else None
+    results, _, _ = detector.train_models(
+        processed_df, features, models_dir=args.models_dir, memory_budget=budget, n_jobs=args.jobs,
+        partitions=partitions, fast_path=args.fast_path
+    )
+    if args.promote:
+        ModelRegistry(args.models_dir).promote(detector)
+    
+    return EXIT_OK, {
+        'sources': sources,
+        'model_version': detector.model_version,
+        'pipeline_path': os.path.join(args.models_dir, f"pipeline_{detector.model_version}.joblib"),
+        'promoted': args.promote,
+        'features': features,
+        'rows': len(processed_df),
+        'dropped_unlabeled_rows': dropped_unlabeled,
+        'partitions': partitions,
+        'models': {
+            name: {key: result[key] for key in ('accuracy', 'macro_f1', 'cross_val_mean', 'fit_seconds', 'train_rows')}
+            for name, result in results.items()
+        },
+        'degradations': detector.training_report.get('degradations', []),
+        'fast_path': detector.fast_path_report
+    }
+
+def _cli_train_group(args, combined, sources):
+    """Treina um pipeline por missão; com --missions, só essas e as demais vêm do grupo ativo"""
+    missions = args.missions.split(',') if args.missions else None
+    group = ModelRegistry(args.models_dir).load_active_group() if missions else None
+    group = group or MissionModelGroup()
+    budget_bytes = int(args.memory_budget_mb * 1024 ** 2) if args.memory_budget_mb else None
+    trained = group.train(
+        combined, missions=missions, jobs=args.train_processes, models_dir=args.models_dir,
+        memory_budget_bytes=budget_bytes, n_jobs=args.jobs
+    )
+    report = {'sources': sources, 'missions': trained}
+    if not group.detectors:
+        return EXIT_NO_DATA, dict(report, error="Nenhuma missão com linhas rotuladas suficientes")
+    
+    report['manifest'] = group.save(args.models_dir)
+    if args.promote:
+        ModelRegistry(args.models_dir).promote_group(group)
+    report.update(
+        group_version=group.group_version,
+        promoted=args.promote,
+        pipelines={mission: detector.model_version for mission, detector in group.detectors.items()}
+    )
+    return EXIT_OK, report
+
+def cli_score(args):
+    """Pontua um catálogo em blocos com o pipeline indicado ou o ativo"""
+    detector = _load_detector(args.model, args.models_dir, args.per_mission)
+    if detector is None:
+        return EXIT_NO_DATA, {'error': f"Nenhum pipeline encontrado em {args.models_dir}/"}
+    
+    report = score_file(
+        detector, args.input, args.output,
+        chunksize=args.chunksize, jobs=args.jobs, partitioned=args.partitioned,
+        cascade=args.cascade
+    )
+    return EXIT_OK, report
+
+def cli_evaluate(args):
+    """Avalia o pipeline em um catálogo rotulado; abaixo de --min-accuracy sai com EXIT_QUALITY"""
+    detector = _load_detector(args.model, args.models_dir, args.per_mission)
+    if detector is None:
+        return EXIT_NO_DATA, {'error': f"Nenhum pipeline encontrado em {args.models_dir}/"}
+    
+    combined, sources = ingest_catalogs([args.input], args.mission)
+    if 'koi_disposition' not in combined.columns:
+        return EXIT_NO_DATA, {'sources': sources, 'error': "Catálogo sem koi_disposition"}
+    if isinstance(detector, MissionModelGroup):
+        return _cli_evaluate_group(args, detector, combined, sources)
+    labeled, y_true = _labeled_frame(detector, combined)
+    if labeled.empty:
+        return EXIT_NO_DATA, {'sources': sources, 'error': "Nenhuma disposição conhecida pelo pipeline"}
+    
+    X, _ = detector._batch_matrix(labeled)
+    X_scaled = detector.scaler.transform(X)
+    models = {name: detector._evaluate_model(model, X_scaled, y_true) for name, model in detector.models.items()}
+    predicted = detector.predict_batch(labeled)['ensemble_prediction'].to_numpy()
+    accuracy = float((predicted == labeled['koi_disposition'].to_numpy()).mean())
+    
+    report = {
+        'sources': sources,
+        'model_version': detector.model_version,
+        'rows': len(labeled),
+        'ensemble_accuracy': accuracy,
+        'models': models,
+        'min_accuracy': args.min_accuracy
+    }
+    if args.min_accuracy is not None and accuracy < args.min_accuracy:
+        return EXIT_QUALITY, report
+    return EXIT_OK, report
+
+def _cli_evaluate_group(args, group, combined, sources):
+    """Acurácia da inferência roteada, no total e por missão"""
+    labeled = combined[combined['koi_disposition'].notna()]
+    if labeled.empty:
+        return EXIT_NO_DATA, {'sources': sources, 'error': "Nenhuma disposição conhecida"}
+    
+    scored = group.predict_batch(labeled)
+    # Missões sem pipeline no grupo ficam fora da acurácia
+    routed = scored['ensemble_prediction'].notna().to_numpy()
+    if not routed.any():
+        return EXIT_NO_DATA, {'sources': sources, 'error': "Nenhuma linha de missão com pipeline no grupo"}
+    correct = scored['ensemble_prediction'].to_numpy() == labeled['koi_disposition'].to_numpy()
+    missions = scored['mission'].to_numpy()
+    accuracy = float(correct[routed].mean())
+    
+    report = {
+        'sources': sources,
+        'group_version': group.group_version,
+        'rows': int(routed.sum()),
+        'unrouted_rows': int((~routed).sum()),
+        'ensemble_accuracy': accuracy,
+        'missions': {
+            mission: {
+                'rows': int((missions == mission).sum()),
+                'accuracy': float(correct[missions == mission].mean()) if mission in group.detectors else None,
+                'model_version': group.detectors[mission].model_version if mission in group.detectors else None
+            }
+            for mission in pd.unique(missions)
+        },
+        'min_accuracy': args.min_accuracy
+    }
+    if args.min_accuracy is not None and accuracy < args.min_accuracy:
+        return EXIT_QUALITY, report
+    return EXIT_OK, report
+
+def cli_similar(args):
+    """Objetos mais parecidos com um objeto do catálogo (índice persistido pela impressão digital)"""
+    combined, sources = ingest_catalogs(args.input, args.mission)
+    if combined.empty:
+        return EXIT_NO_DATA, {'sources': sources, 'error': "Catálogo vazio"}
+    fingerprint = dataset_fingerprint(combined)
+    index = SimilarityIndex.for_catalog(combined, fingerprint, args.index_dir)
+    
+    if args.append:
+        # Linhas novas entram no índice existente sem reconstruí-lo
+        appended, appended_sources = ingest_catalogs(args.append, args.mission)
+        sources += appended_sources
+        fingerprint = dataset_fingerprint(fingerprint, dataset_fingerprint(appended))
+        index.add(appended, fingerprint=fingerprint)
+        index.save(os.path.join(args.index_dir, f"similarity_{fingerprint}.joblib"))
+    
+    # --object é sempre um identificador (mesmo só com dígitos); posições vêm de --position
+    query = args.object if args.position is None else args.position
+    labels = args.dispositions.split(',') if args.dispositions else None
+    try:
+        if args.radius is not None:
+            neighbors = index.radius(query, args.radius, labels=labels)
+        else:
+            neighbors = index.k_nearest(query, k=args.k, labels=labels)
+    except (KeyError, IndexError):
+        target = args.object if args.position is None else f"na posição {args.position}"
+        return EXIT_NO_DATA, {'sources': sources, 'error': f"Objeto {target} não encontrado no catálogo"}
+    
+    return EXIT_OK, {
+        'sources': sources,
+        'fingerprint': fingerprint,
+        'objects': len(index),
+        'features': index.features,
+        'neighbors': neighbors.to_dict(orient='records')
+    }
+
+def cli_bench(args):
+    """Repassa os argumentos para o benchmark.py; regressões saem com EXIT_QUALITY"""
+    import benchmark
+    
+    bench_args = args.bench_args[1:] if args.bench_args[:1] == ['--'] else args.bench_args
+    code = benchmark.main(bench_args)
+    return (EXIT_QUALITY if code else EXIT_OK), None
+
+CLI_COMMANDS = {
+    'fetch': cli_fetch,
+    'ingest': cli_ingest,
+    'train': cli_train,
+    'score': cli_score,
+    'evaluate': cli_evaluate,
+    'similar': cli_similar,
+    'bench': cli_bench
+}
+
+def main(argv=None):
+    """Ponto de entrada de linha de comando
+    
+    Cada comando imprime um relatório JSON no stdout (logs vão para o stderr) e
+    sai com EXIT_OK, EXIT_ERROR, EXIT_USAGE, EXIT_NO_DATA ou EXIT_QUALITY.
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+    
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--config', help='Arquivo JSON/TOML com padrões das opções')
+    common.add_argument('--log-level', default='INFO', help='Nível de log (stderr)')
+    
+    parser = argparse.ArgumentParser(prog='exoplanet_ml', description=__doc__)
+    subparsers = parser.add_subparsers(dest='command')
+    commands = {}
+    
+    fetch_parser = commands['fetch'] = subparsers.add_parser('fetch', parents=[common], help='Baixa as tabelas NASA')
+    fetch_parser.add_argument('--sources', help=f"Missões separadas por vírgula ({', '.join(NASA_TABLES)})")
+    fetch_parser.add_argument('--base-url', help='Endpoint TAP ou diretório local com <tabela>.csv')
+    fetch_parser.add_argument('--output-dir', default='data', help='Diretório de saída')
+    fetch_parser.add_argument('--format', choices=['csv', 'parquet'], default='parquet', help='Formato dos arquivos')
+    fetch_parser.add_argument('--standardize', action='store_true', help='Grava já no esquema koi_*')
+    fetch_parser.add_argument('--jobs', type=int, default=3, help='Downloads simultâneos')
+    
+    ingest_parser = commands['ingest'] = subparsers.add_parser('ingest', parents=[common], help='Une catálogos no esquema koi_*')
+    ingest_parser.add_argument('inputs', nargs='+', help='Catálogos (.csv, .parquet ou .xlsx)')
+    ingest_parser.add_argument('--output', required=True, help='Arquivo de saída (.csv ou .parquet)')
+    ingest_parser.add_argument('--mission', choices=list(NASA_TABLES), help='Missão (padrão: detectada pelas colunas)')
+    ingest_parser.add_argument('--jobs', type=int, default=1, help='Arquivos lidos em paralelo')
+    
+    train_parser = commands['train'] = subparsers.add_parser('train', parents=[common], help='Treina e salva um pipeline')
+    train_parser.add_argument('input', nargs='+', help='Catálogos rotulados (.csv, .parquet ou .xlsx)')
+    train_parser.add_argument('--mission', choices=list(NASA_TABLES), help='Missão (padrão: detectada pelas colunas)')
+    train_parser.add_argument('--models-dir', default=MODELS_DIR, help='Diretório dos pipelines')
+    train_parser.add_argument('--promote', action='store_true', help='Promove o pipeline treinado a ativo')
+    train_parser.add_argument('--memory-budget-mb', type=float, help='Orçamento de memória do treino')
+    train_parser.add_argument('--jobs', type=int, help='Threads de cada modelo (padrão: o da biblioteca)')
+    train_parser.add_argument('--partitions', type=int, help='Partições do pré-processamento (padrão: uma por núcleo em catálogos grandes)')
+    train_parser.add_argument('--fast-path', action='store_true', help='Destila o ensemble em um booster rápido, medido na validação')
+    train_parser.add_argument('--per-mission', action='store_true', help='Um pipeline por missão, salvo como grupo')
+    train_parser.add_argument('--missions', help='Com --per-mission: retreina só estas missões (vírgula) do grupo ativo')
+    train_parser.add_argument('--train-processes', type=int, default=1, help='Com --per-mission: missões treinadas em paralelo')
+    
+    score_parser = commands['score'] = subparsers.add_parser('score', parents=[common], help='Pontua um catálogo CSV/Parquet em blocos')
+    score_parser.add_argument('input', help='Arquivo de entrada (.csv ou .parquet)')
+    score_parser.add_argument('output', help='Arquivo de saída (.csv/.parquet) ou diretório com --partitioned')
+    score_parser.add_argument('--model', help='Artefato de pipeline ou grupo group_*.json (padrão: o ativo em models/)')
+    score_parser.add_argument('--models-dir', default=MODELS_DIR, help='Diretório dos pipelines')
+    score_parser.add_argument('--chunksize', type=int, default=100_000, help='Linhas por bloco')
+    score_parser.add_argument('--jobs', type=int, default=1, help='Processos de pontuação')
+    score_parser.add_argument('--partitioned', action='store_true', help='Um arquivo de saída por bloco')
+    score_parser.add_argument('--cascade', action='store_true', help='Inferência em cascata (modelo mais barato primeiro)')
+    score_parser.add_argument('--per-mission', action='store_true', help='Roteia cada linha para o pipeline da sua missão (grupo ativo)')
+    
+    evaluate_parser = commands['evaluate'] = subparsers.add_parser('evaluate', parents=[common], help='Avalia um pipeline em dados rotulados')
+    evaluate_parser.add_argument('input', help='Catálogo rotulado (.csv, .parquet ou .xlsx)')
+    evaluate_parser.add_argument('--model', help='Artefato de pipeline ou grupo group_*.json (padrão: o ativo em models/)')
+    evaluate_parser.add_argument('--models-dir', default=MODELS_DIR, help='Diretório dos pipelines')
+    evaluate_parser.add_argument('--mission', choices=list(NASA_TABLES), help='Missão (padrão: detectada pelas colunas)')
+    evaluate_parser.add_argument('--per-mission', action='store_true', help='Avalia o grupo ativo de pipelines por missão')
+    evaluate_parser.add_argument('--min-accuracy', type=float, help=f'Acurácia mínima do ensemble (abaixo: código {EXIT_QUALITY})')
+    
+    similar_parser = commands['similar'] = subparsers.add_parser('similar', parents=[common], help='Objetos mais parecidos com um objeto do catálogo')
+    similar_parser.add_argument('input', nargs='+', help='Catálogos (.csv, .parquet ou .xlsx)')
+    similar_target = similar_parser.add_mutually_exclusive_group(required=True)
+    similar_target.add_argument('--object', help='Identificador do objeto (koi_name etc.)')
+    similar_target.add_argument('--position', type=int, help='Posição da linha do objeto no catálogo')
+    similar_parser.add_argument('--k', type=int, default=10, help='Número de vizinhos')
+    similar_parser.add_argument('--radius', type=float, help='Todos os vizinhos até esta distância padronizada (em vez de --k)')
+    similar_parser.add_argument('--dispositions', help='Só vizinhos com estas disposições (vírgula), ex.: CONFIRMED')
+    similar_parser.add_argument('--append', nargs='+', help='Catálogos novos inseridos no índice existente')
+    similar_parser.add_argument('--mission', choices=list(NASA_TABLES), help='Missão (padrão: detectada pelas colunas)')
+    similar_parser.add_argument('--index-dir', default=SIMILARITY_DIR, help='Diretório dos índices de similaridade')
+    
+    bench_parser = commands['bench'] = subparsers.add_parser(
+        'bench', parents=[common], help='Executa o benchmark.py (argumentos dele depois de --)'
+    )
+    bench_parser.add_argument('bench_args', nargs=argparse.REMAINDER, help='Argumentos do benchmark.py, após --')
+    
+    job_parser = subparsers.add_parser('train-job', help=argparse.SUPPRESS)
+    job_parser.add_argument('input')
+    job_parser.add_argument('workdir')
+    
+    # Configuração primeiro, para que a linha de comando prevaleça sobre ela
+    command = next((token for token in argv if token in commands), None)
+    pre_parser = argparse.ArgumentParser(add_help=False)
+    pre_parser.add_argument('--config')
+    config_path = pre_parser.parse_known_args(argv)[0].config
+    if command and config_path:
+        try:
+            config = load_cli_config(config_path)
+        except (OSError, ValueError, ImportError) as e:
+            parser.error(f"Configuração {config_path} inválida: {e}")
+        _apply_cli_config(parser, commands[command], command, config)
+    
+    args = parser.parse_args(argv)
+    
+    if args.command is None:
+        run_demo()
+        return EXIT_OK
+    
+    if args.command == 'train-job':
+        return run_training_job(args.input, args.workdir)
+    
+    logging.getLogger().setLevel(args.log_level.upper())
+    start = time.perf_counter()
+    try:
+        code, report = CLI_COMMANDS[args.command](args)
+    except Exception as e:
+        logger.exception(f"Comando {args.command} falhou")
+        code, report = EXIT_ERROR, {'error': str(e)}
+    
+    if report is not None:
+        status = {EXIT_OK: 'ok', EXIT_NO_DATA: 'no_data', EXIT_QUALITY: 'below_threshold'}.get(code, 'error')
+        report = dict(report, command=args.command, status=status, exit_code=code, seconds=time.perf_counter() - start)
+        print(json.dumps(_to_jsonable(report), indent=2, default=str))
+    return code
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
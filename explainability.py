@@ -0,0 +1,288 @@
+"""
+Explicabilidade dos modelos
+Importância por permutação (comparável entre Random Forest, XGBoost e LightGBM) e contribuições
+das features por objeto, cacheadas por versão do modelo e impressão digital dos dados
+"""
+
+import os
+import hashlib
+import logging
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import xgboost as xgb
+
+from tracing import trace_stage
+
+logger = logging.getLogger(__name__)
+
+EXPLANATIONS_DIR = os.path.join('models', 'explanations')
+
+# Linhas por lote de contribuições (unidade de cálculo e de cache)
+CONTRIBUTION_BATCH_ROWS = 1_000
+
+# Amostra usada na importância por permutação
+PERMUTATION_MAX_ROWS = 5_000
+PERMUTATION_REPEATS = 5
+
+ENSEMBLE_NAME = 'Ensemble'
+
+# Detector, matriz escalada e rótulos da permutação; com fork os workers os herdam sem cópia
+_PERMUTATION_STATE = None
+
+class ExplanationCache:
+    """Cache de explicações em memória (LRU) e em disco
+
+    A chave começa por (tipo, versão do modelo, impressão digital dos dados); os
+    arquivos ficam em <directory>/<versão do modelo>/, então uma versão nova nunca
+    lê explicações de outra. Sem versão (modelo não salvo), só a memória é usada.
+    """
+
+    def __init__(self, directory=EXPLANATIONS_DIR, max_entries=64):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        model_version = key[1]
+        if model_version is None or self.directory is None:
+            return None
+        name = hashlib.sha1(repr(key).encode()).hexdigest()[:20]
+        return os.path.join(self.directory, str(model_version), f"{key[0]}_{name}.joblib")
+
+    def get(self, key):
+        """Explicação cacheada (memória ou disco) ou None"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        path = self._path(key)
+        if path and os.path.exists(path):
+            try:
+                value = joblib.load(path)
+            except Exception as e:
+                logger.warning(f"Ignorando explicação inválida {path}: {str(e)}")
+            else:
+                self._remember(key, value)
+                with self._lock:
+                    self.hits += 1
+                return value
+        return None
+
+    def put(self, key, value):
+        self._remember(key, value)
+        path = self._path(key)
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            joblib.dump(value, f"{path}.tmp")
+            os.replace(f"{path}.tmp", path)
+        return value
+
+    def get_or_compute(self, key, compute):
+        """Valor cacheado ou compute(), guardado para as próximas chamadas"""
+        value = self.get(key)
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            value = self.put(key, compute())
+        return value
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+def _accuracy(probs, y):
+    return float((probs.argmax(axis=1) == y).mean())
+
+def _model_scores(models, X, y):
+    """Acurácia de cada modelo e do ensemble (média das probabilidades) na mesma matriz"""
+    probs = {name: model.predict_proba(X) for name, model in models.items()}
+    scores = {name: _accuracy(prob, y) for name, prob in probs.items()}
+    scores[ENSEMBLE_NAME] = _accuracy(np.mean(list(probs.values()), axis=0), y)
+    return scores
+
+def _permuted_scores(feature_index, repeat, random_state):
+    detector, X, y = _PERMUTATION_STATE
+    rng = np.random.default_rng([random_state, feature_index, repeat])
+    X_permuted = X.copy()
+    X_permuted[:, feature_index] = rng.permutation(X_permuted[:, feature_index])
+    return feature_index, repeat, _model_scores(detector.models, X_permuted, y)
+
+def _labeled_matrix(detector, df, max_rows, random_state):
+    """Matriz escalada e rótulos codificados das linhas com disposição conhecida"""
+    known = df['koi_disposition'].isin(detector.label_encoder.classes_).to_numpy()
+    positions = np.flatnonzero(known)
+    if max_rows and len(positions) > max_rows:
+        positions = np.sort(np.random.default_rng(random_state).choice(positions, max_rows, replace=False))
+    labeled = df.iloc[positions]
+    X, _ = detector._batch_matrix(labeled)
+    return detector.scaler.transform(X), detector.label_encoder.transform(labeled['koi_disposition'])
+
+def permutation_importance(detector, df, n_repeats=PERMUTATION_REPEATS, jobs=1, max_rows=PERMUTATION_MAX_ROWS, random_state=42):
+    """Queda de acurácia ao embaralhar cada feature, por modelo e para o ensemble
+
+    As tarefas (feature x repetição) rodam em um pool de processos com jobs > 1;
+    cada uma pontua todos os modelos na mesma matriz permutada, então as
+    importâncias são comparáveis entre eles. df precisa de koi_disposition.
+    """
+    global _PERMUTATION_STATE
+
+    X, y = _labeled_matrix(detector, df, max_rows, random_state)
+    if not len(y):
+        raise ValueError("Nenhuma linha com disposição conhecida pelo pipeline")
+    features = list(detector.features)
+    tasks = [(index, repeat) for index in range(len(features)) for repeat in range(n_repeats)]
+
+    with trace_stage('permutation_importance', rows=len(y)):
+        baseline = _model_scores(detector.models, X, y)
+        _PERMUTATION_STATE = (detector, X, y)
+        try:
+            if jobs <= 1:
+                outcomes = [_permuted_scores(index, repeat, random_state) for index, repeat in tasks]
+            else:
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+                with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as executor:
+                    outcomes = list(executor.map(
+                        _permuted_scores, *zip(*tasks), [random_state] * len(tasks), chunksize=max(1, len(tasks) // (4 * jobs))
+                    ))
+        finally:
+            _PERMUTATION_STATE = None
+
+    drops = {name: np.zeros((len(features), n_repeats)) for name in baseline}
+    for index, repeat, scores in outcomes:
+        for name, score in scores.items():
+            drops[name][index, repeat] = baseline[name] - score
+
+    return {
+        'rows': int(len(y)),
+        'n_repeats': n_repeats,
+        'features': features,
+        'baseline': baseline,
+        'importance': {name: dict(zip(features, values.mean(axis=1).tolist())) for name, values in drops.items()},
+        'std': {name: dict(zip(features, values.std(axis=1).tolist())) for name, values in drops.items()}
+    }
+
+def _forest_contributions(forest, X):
+    """Contribuições por caminho (Saabas) de uma Random Forest, em probabilidade
+
+    Cada divisão no caminho de um objeto atribui à sua feature a mudança da
+    distribuição de classes do nó pai para o filho; bias + soma = predict_proba.
+    O sklearn não tem TreeSHAP e o pacote shap não é dependência do projeto.
+    """
+    n_rows, n_features = X.shape
+    n_classes = forest.n_classes_
+    contributions = np.zeros((n_rows, n_features * n_classes))
+    bias = np.zeros(n_classes)
+    X = X.astype(np.float32)
+
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        values = tree.value[:, 0, :]
+        values = values / values.sum(axis=1, keepdims=True)
+        parent = np.full(tree.node_count, -1)
+        for children in (tree.children_left, tree.children_right):
+            has_child = children >= 0
+            parent[children[has_child]] = np.flatnonzero(has_child)
+
+        child = np.flatnonzero(parent >= 0)
+        deltas = np.zeros((tree.node_count, n_features, n_classes))
+        deltas[child, tree.feature[parent[child]]] = values[child] - values[parent[child]]
+        contributions += estimator.decision_path(X) @ deltas.reshape(tree.node_count, -1)
+        bias += values[0]
+
+    n_trees = len(forest.estimators_)
+    contributions = contributions.reshape(n_rows, n_features, n_classes).transpose(0, 2, 1) / n_trees
+    return contributions, np.tile(bias / n_trees, (n_rows, 1))
+
+def model_contributions(model, X_scaled):
+    """Contribuições (linhas x classes x features) e bias (linhas x classes) de um modelo
+
+    XGBoost e LightGBM usam o TreeSHAP nativo (pred_contribs / pred_contrib), na
+    escala de margem (log-odds); a Random Forest usa _forest_contributions, em
+    probabilidade. Retorna também a escala: 'margin' ou 'probability'.
+    """
+    n_features = X_scaled.shape[1]
+    if isinstance(model, xgb.XGBModel):
+        raw = model.get_booster().predict(xgb.DMatrix(X_scaled), pred_contribs=True)
+    elif hasattr(model, 'booster_'):
+        raw = model.predict(X_scaled, pred_contrib=True)
+    elif hasattr(model, 'estimators_'):
+        contributions, bias = _forest_contributions(model, X_scaled)
+        return contributions, bias, 'probability'
+    else:
+        raise ValueError(f"Modelo {type(model).__name__} sem contribuições por árvore")
+
+    # Multiclasse: uma margem por classe; binário: só a da classe positiva
+    raw = np.asarray(raw).reshape(len(X_scaled), -1, n_features + 1)
+    return raw[:, :, :-1], raw[:, :, -1], 'margin'
+
+def explain_rows(detector, df, positions, model_name, fingerprint, cache=None, batch_rows=CONTRIBUTION_BATCH_ROWS):
+    """Contribuições das features para as linhas `positions` de df
+
+    As contribuições são calculadas por lotes de batch_rows linhas e cacheadas
+    por (versão do modelo, impressão digital de df, modelo, lote): explicar outro
+    objeto do mesmo lote, ou o mesmo objeto em outro rerun, não recalcula nada.
+    """
+    model = detector.models[model_name]
+    positions = np.atleast_1d(np.asarray(positions, dtype=int))
+    if not len(positions):
+        raise ValueError("Nenhuma linha para explicar")
+    if positions.min() < 0 or positions.max() >= len(df):
+        raise IndexError(f"Posições fora do intervalo de 0 a {len(df) - 1}")
+    batches = {}
+
+    for batch in np.unique(positions // batch_rows).tolist():
+        def compute(batch=batch):
+            rows = df.iloc[batch * batch_rows:(batch + 1) * batch_rows]
+            X, _ = detector._batch_matrix(rows)
+            with trace_stage('explain_batch', rows=len(rows)):
+                contributions, bias, space = model_contributions(model, detector.scaler.transform(X))
+            return {'contributions': contributions, 'bias': bias, 'space': space}
+
+        key = ('contributions', detector.model_version, fingerprint, model_name, batch_rows, batch)
+        batches[batch] = cache.get_or_compute(key, compute) if cache is not None else compute()
+
+    owners = positions // batch_rows
+    offsets = positions % batch_rows
+    contributions = np.stack([batches[owner]['contributions'][offset] for owner, offset in zip(owners, offsets)])
+    bias = np.stack([batches[owner]['bias'][offset] for owner, offset in zip(owners, offsets)])
+    classes = list(detector.label_encoder.classes_)
+    return {
+        'model': model_name,
+        'space': batches[owners[0]]['space'],
+        'features': list(detector.features),
+        # Booster binário explica só a classe positiva
+        'classes': classes if contributions.shape[1] == len(classes) else classes[-1:],
+        'positions': positions,
+        'contributions': contributions,
+        'bias': bias
+    }
+
+def permutation_cache_key(detector, fingerprint, **params):
+    """Chave da importância por permutação no ExplanationCache"""
+    # jobs não muda o resultado, só o tempo
+    return ('permutation', detector.model_version, fingerprint, tuple(sorted((k, v) for k, v in params.items() if k != 'jobs')))
+
+def cached_permutation_importance(detector, df, fingerprint, cache=None, **params):
+    """permutation_importance cacheada por versão do modelo, dados e parâmetros"""
+    if cache is None:
+        return permutation_importance(detector, df, **params)
+    key = permutation_cache_key(detector, fingerprint, **params)
+    return cache.get_or_compute(key, lambda: permutation_importance(detector, df, **params))
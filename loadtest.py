@@ -0,0 +1,512 @@
+"""
+Teste de carga da interface Streamlit
+Simula N sessões simultâneas (AppTest headless) e mede latência por interação, CPU/RSS e falhas
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import queue
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import multiprocessing
+import logging
+from datetime import datetime
+import numpy as np
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import StopException
+from streamlit.testing.v1 import AppTest
+
+from exoplanet_ml import NASA_TABLES
+from benchmark import parse_size, size_label, synthetic_catalog
+from tracing import current_rss_bytes
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(APP_DIR, 'streamlit_app.py')
+
+# Cada rerun de uma sessão executa o app inteiro, como o `streamlit run` faria
+APP_SCRIPT = f"""
+import sys
+sys.path.insert(0, {APP_DIR!r})
+import loadtest
+loadtest.run_app()
+"""
+
+# Chave de sessão com o nome do catálogo que o file_uploader simulado devolve
+UPLOAD_STATE_KEY = 'loadtest_upload'
+
+# Chave de sessão marcada quando o app pede st.rerun() (o driver executa o rerun)
+RERUN_STATE_KEY = 'loadtest_rerun_requested'
+
+INTERACTIONS = ['load', 'upload', 'analyze', 'poll', 'section', 'filter', 'page']
+
+# Índices das seções no seletor (APP_SECTIONS do app)
+ANALYSIS_SECTION = 1
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Como as sessões são isoladas: threads de um processo (caches compartilhados, reruns em
+# fila) ou um processo por sessão (reruns em paralelo, caches separados)
+ISOLATION_MODES = ('thread', 'process')
+
+LIMITATIONS = {
+    'thread': [
+        "Reruns serializados por um lock: o AppTest do Streamlit 1.28 troca o Runtime global a cada run(), "
+        "então a latência inclui a fila entre sessões em vez do paralelismo de um servidor `streamlit run`",
+        "st.file_uploader e st.rerun são substituídos no processo inteiro, para todas as sessões",
+    ],
+    'process': [
+        "Um processo por sessão: reruns em paralelo, mas cada sessão tem seus próprios caches "
+        "(st.cache_data/st.cache_resource), ao contrário de um servidor `streamlit run` único",
+        "st.file_uploader e st.rerun são substituídos em cada processo de sessão",
+        "CPU/RSS das sessões contam como processos filhos; os jobs de treino são netos e ficam de fora",
+    ],
+}
+
+_app_code = None
+_uploads = {}
+_original_file_uploader = None
+
+# O AppTest do Streamlit 1.28 troca o Runtime global a cada run(): os reruns das
+# sessões de um mesmo processo são serializados (ver LIMITATIONS)
+_run_lock = threading.Lock()
+
+class SimulatedUpload(io.BytesIO):
+    """Arquivo em memória com a interface usada do UploadedFile (name, size)"""
+
+    def __init__(self, name, data):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+
+def _simulated_file_uploader(label, *args, **kwargs):
+    """file_uploader que, na sessão com UPLOAD_STATE_KEY, devolve o catálogo registrado"""
+    uploaded = _original_file_uploader(label, *args, **kwargs)
+    name = st.session_state.get(UPLOAD_STATE_KEY)
+    if name is None:
+        return uploaded
+    return SimulatedUpload(name, _uploads[name])
+
+def _deferred_rerun():
+    """st.rerun que encerra o script e deixa o rerun para o driver (o AppTest não segue reruns)"""
+    st.session_state[RERUN_STATE_KEY] = True
+    raise StopException()
+
+def run_app():
+    """Executa o streamlit_app.py no rerun atual, com upload e rerun simulados"""
+    global _app_code, _original_file_uploader
+    if _original_file_uploader is None:
+        _original_file_uploader = st.file_uploader
+        st.file_uploader = _simulated_file_uploader
+        st.rerun = _deferred_rerun
+    st.session_state[RERUN_STATE_KEY] = False
+    if _app_code is None:
+        with open(APP_PATH) as handle:
+            _app_code = compile(handle.read(), APP_PATH, 'exec')
+    exec(_app_code, {'__name__': '__main__', '__file__': APP_PATH})
+
+def register_upload(rows, mission='kepler_koi', seed=42):
+    """Gera um catálogo sintético em CSV e o deixa disponível para as sessões"""
+    name = f"loadtest_{mission}_{size_label(rows)}.csv"
+    if name not in _uploads:
+        _uploads[name] = synthetic_catalog(rows, mission=mission, seed=seed).to_csv(index=False).encode('utf-8')
+    return name
+
+def _children_rss_bytes():
+    """RSS somado dos processos filhos (jobs de treinamento)"""
+    total = 0
+    try:
+        tasks = os.listdir('/proc/self/task')
+    except OSError:
+        return 0
+    for task in tasks:
+        try:
+            with open(f'/proc/self/task/{task}/children') as handle:
+                pids = handle.read().split()
+        except OSError:
+            continue
+        for pid in pids:
+            try:
+                with open(f'/proc/{pid}/statm') as statm:
+                    total += int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+            except (OSError, ValueError):
+                continue
+    return total
+
+class ServerResources:
+    """Amostra CPU e RSS do processo (o "servidor") e dos jobs filhos durante o teste"""
+
+    def __init__(self, interval=0.25):
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        self._times = os.times()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._ended = time.perf_counter()
+        self._end_times = os.times()
+        return False
+
+    def _sample(self):
+        last_wall, last_times = time.perf_counter(), os.times()
+        while not self._stop.wait(self.interval):
+            wall, times = time.perf_counter(), os.times()
+            cpu = (times.user + times.system) - (last_times.user + last_times.system)
+            self.samples.append({
+                'cpu_percent': 100 * cpu / max(wall - last_wall, 1e-9),
+                'rss_bytes': current_rss_bytes(),
+                'children_rss_bytes': _children_rss_bytes()
+            })
+            last_wall, last_times = wall, times
+
+    def summary(self):
+        wall = self._ended - self._started
+        cpu = (self._end_times.user + self._end_times.system) - (self._times.user + self._times.system)
+        children_cpu = (
+            (self._end_times.children_user + self._end_times.children_system)
+            - (self._times.children_user + self._times.children_system)
+        )
+        samples = self.samples or [{'cpu_percent': 0.0, 'rss_bytes': current_rss_bytes(), 'children_rss_bytes': 0}]
+        return {
+            'wall_seconds': wall,
+            'cpu_seconds': cpu,
+            'cpu_percent_mean': 100 * cpu / wall if wall > 0 else 0.0,
+            'cpu_percent_max': max(sample['cpu_percent'] for sample in samples),
+            'children_cpu_seconds': children_cpu,
+            'rss_mb_mean': float(np.mean([sample['rss_bytes'] for sample in samples])) / 1e6,
+            'rss_mb_peak': max(sample['rss_bytes'] for sample in samples) / 1e6,
+            'children_rss_mb_peak': max(sample['children_rss_bytes'] for sample in samples) / 1e6,
+            'cpu_count': os.cpu_count()
+        }
+
+def _state(at, key, default=None):
+    """Valor da sessão do AppTest, ou `default` se a chave não existir"""
+    return at.session_state[key] if key in at.session_state else default
+
+class SessionDriver:
+    """Uma sessão de analista: upload, análise, filtros e troca de seções"""
+
+    def __init__(self, index, upload, record, timeout=60, job_timeout=600, poll_interval=0.0, seed=42):
+        self.index = index
+        self.upload = upload
+        self.record = record
+        self.job_timeout = job_timeout
+        self.poll_interval = poll_interval
+        self.rng = np.random.default_rng(seed + index)
+        self.at = AppTest.from_string(APP_SCRIPT, default_timeout=timeout)
+        self.job = None
+
+    def interact(self, name, action):
+        """Executa uma interação e registra latência total e tempo do script"""
+        error = None
+        started = time.perf_counter()
+        try:
+            with _run_lock:
+                action()
+            if self.at.exception:
+                error = str(self.at.exception[0].value)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        seconds = time.perf_counter() - started
+        timings = _state(self.at, 'rerun_timings', {}) if error is None else {}
+        self.record({
+            'session': self.index,
+            'interaction': name,
+            'seconds': seconds,
+            'script_ms': timings.get('total'),
+            'error': error
+        })
+        return error is None
+
+    def _button(self, label):
+        return next(button for button in self.at.button if button.label == label)
+
+    def _select_section(self, position):
+        radio = self.at.radio(key='section_pt')
+        radio.set_value(radio.options[position]).run()
+
+    def _move_filter(self):
+        slider = self.at.slider(key='analysis_filter_period')
+        low, high = sorted(self.rng.uniform(slider.min, slider.max, 2))
+        slider.set_value((float(low), float(high))).run()
+
+    def _change_page(self):
+        pager = self.at.number_input(key='filtered_table_page')
+        pager.set_value(int(self.rng.integers(1, 4))).run()
+
+    def _wait_for_job(self, labels):
+        """Reruns pedidos pelo app (1 s de intervalo no próprio script) até o job terminar"""
+        started = time.time()
+        while time.time() - started < self.job_timeout:
+            time.sleep(self.poll_interval)
+            if not self.interact('poll', self.at.run):
+                continue
+            job_id = _state(self.at, 'training_job')
+            if job_id and _state(self.at, 'applied_training_job') == job_id:
+                return 'completed', time.time() - started
+            if not _state(self.at, 'training_job_running', True):
+                return 'failed', time.time() - started
+        # Job além do limite: cancela pela interface para liberar o trabalhador
+        self.interact('cancel', lambda: self._button(labels['cancel_job']).click().run())
+        return 'timeout', time.time() - started
+
+    def run(self, iterations, labels):
+        """Roteiro completo da sessão; retorna o resultado do job de treinamento"""
+        self.interact('load', self.at.run)
+
+        def upload():
+            self.at.session_state[UPLOAD_STATE_KEY] = self.upload
+            self.at.run()
+        if not self.interact('upload', upload):
+            return {'session': self.index, 'upload': self.upload, 'state': 'upload_failed', 'seconds': None}
+
+        self.interact('analyze', lambda: self._button(labels['analyze_data']).click().run())
+        state, seconds = self._wait_for_job(labels)
+
+        for _ in range(iterations):
+            self.interact('section', lambda: self._select_section(ANALYSIS_SECTION))
+            if 'analysis_filter_period' in [slider.key for slider in self.at.slider]:
+                self.interact('filter', self._move_filter)
+                self.interact('page', self._change_page)
+            other = int(self.rng.choice([position for position in range(4) if position != ANALYSIS_SECTION]))
+            self.interact('section', lambda: self._select_section(other))
+
+        return {'session': self.index, 'upload': self.upload, 'state': state, 'seconds': seconds}
+
+def summarize(records):
+    """Percentis de latência e taxa de falhas por interação"""
+    summary = {}
+    for name in INTERACTIONS + ['cancel']:
+        selected = [record for record in records if record['interaction'] == name]
+        if not selected:
+            continue
+        seconds = np.array([record['seconds'] for record in selected]) * 1000
+        script_ms = [record['script_ms'] for record in selected if record['script_ms'] is not None]
+        errors = [record['error'] for record in selected if record['error'] is not None]
+        summary[name] = dict(
+            {f'p{q}_ms': float(np.percentile(seconds, q)) for q in PERCENTILES},
+            count=len(selected),
+            failures=len(errors),
+            failure_rate=len(errors) / len(selected),
+            errors=sorted(set(errors))[:3],
+            max_ms=float(seconds.max()),
+            script_p50_ms=float(np.percentile(script_ms, 50)) if script_ms else None,
+            script_p95_ms=float(np.percentile(script_ms, 95)) if script_ms else None
+        )
+    return summary
+
+def _run_session(index, upload, record, labels, iterations, timeout, job_timeout, poll_interval, stagger_seconds, seed):
+    """Roteiro de uma sessão; falhas inesperadas viram o estado 'crashed'"""
+    time.sleep(index * stagger_seconds)
+    try:
+        driver = SessionDriver(index, upload, record, timeout, job_timeout, poll_interval, seed)
+        return driver.run(iterations, labels)
+    except Exception as e:
+        logger.exception(f"Sessão {index} interrompida")
+        return {'session': index, 'upload': upload, 'state': 'crashed', 'seconds': None, 'error': str(e)}
+
+def _session_process(events, *args):
+    """Sessão em processo próprio: registros e resultado voltam pela fila"""
+    result = _run_session(*args[:2], lambda entry: events.put(('record', entry)), *args[2:])
+    events.put(('job', result))
+
+def run_load_test(sessions, sizes, iterations=3, mission='kepler_koi', timeout=60, job_timeout=600,
+                  poll_interval=0.0, stagger_seconds=0.5, seed=42, isolation='thread'):
+    """Executa `sessions` sessões simultâneas; os tamanhos de upload se alternam entre elas
+
+    isolation='thread' roda as sessões em threads deste processo (reruns em fila);
+    'process' roda cada sessão em um processo próprio (ver LIMITATIONS).
+    """
+    if isolation not in ISOLATION_MODES:
+        raise ValueError(f"Isolamento desconhecido: {isolation} (use {', '.join(ISOLATION_MODES)})")
+    uploads = [register_upload(rows, mission, seed) for rows in sizes]
+    from streamlit_app import get_translation
+    labels = {key: get_translation(key, 'pt') for key in ('analyze_data', 'cancel_job')}
+    options = (labels, iterations, timeout, job_timeout, poll_interval, stagger_seconds, seed)
+
+    records, jobs, lock = [], [], threading.Lock()
+
+    def record(entry):
+        with lock:
+            records.append(entry)
+
+    if isolation == 'process':
+        # fork antes de qualquer thread de amostragem; os filhos herdam os uploads registrados
+        context = multiprocessing.get_context('fork')
+        events = context.Queue()
+        processes = [
+            context.Process(target=_session_process, args=(events, index, uploads[index % len(uploads)], *options),
+                            name=f'loadtest-{index}', daemon=True)
+            for index in range(sessions)
+        ]
+        for process in processes:
+            process.start()
+        with ServerResources() as resources:
+            while len(jobs) < sessions:
+                try:
+                    kind, entry = events.get(timeout=1.0)
+                except queue.Empty:
+                    if not any(process.is_alive() for process in processes):
+                        break
+                    continue
+                (records if kind == 'record' else jobs).append(entry)
+            for process in processes:
+                process.join()
+        finished = {job['session'] for job in jobs}
+        jobs.extend(
+            {'session': index, 'upload': uploads[index % len(uploads)], 'state': 'crashed', 'seconds': None,
+             'error': f"processo encerrado com código {processes[index].exitcode}"}
+            for index in range(sessions) if index not in finished
+        )
+    else:
+        def session(index):
+            result = _run_session(index, uploads[index % len(uploads)], record, *options)
+            with lock:
+                jobs.append(result)
+
+        threads = [threading.Thread(target=session, args=(index,), name=f'loadtest-{index}') for index in range(sessions)]
+        with ServerResources() as resources:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+    failures = sum(record['error'] is not None for record in records)
+    completed = [job['seconds'] for job in jobs if job['state'] == 'completed']
+    return {
+        'sessions': sessions,
+        'isolation': isolation,
+        'uploads': {name: len(_uploads[name]) for name in uploads},
+        'iterations': iterations,
+        'interactions': summarize(records),
+        'interaction_count': len(records),
+        'failure_rate': failures / len(records) if records else 0.0,
+        'jobs': {
+            'results': sorted(jobs, key=lambda job: job['session']),
+            'completed': len(completed),
+            'failed': sum(job['state'] != 'completed' for job in jobs),
+            'p50_seconds': float(np.percentile(completed, 50)) if completed else None,
+            'max_seconds': max(completed) if completed else None
+        },
+        'resources': resources.summary()
+    }
+
+def run_suite(levels, sizes, workdir=None, **options):
+    """Executa um teste por nível de concorrência (ex.: 1, 4, 8 sessões)"""
+    workdir = workdir or tempfile.mkdtemp(prefix='exoplanet_loadtest_')
+    os.makedirs(workdir, exist_ok=True)
+    # Modelos, métricas e o template do app ficam no diretório do teste, não no projeto
+    shutil.copy(os.path.join(APP_DIR, 'exoplanet_template.csv'), workdir)
+    previous = os.getcwd()
+    os.chdir(workdir)
+    try:
+        results = []
+        for sessions in levels:
+            logger.info(f"Teste de carga com {sessions} sessão(ões)...")
+            results.append(run_load_test(sessions, sizes, **options))
+    finally:
+        os.chdir(previous)
+    isolation = options.get('isolation', 'thread')
+    return {
+        'created_at': datetime.now().isoformat(),
+        'isolation': isolation,
+        'limitations': LIMITATIONS[isolation],
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'workdir': workdir,
+        'sizes': [size_label(rows) for rows in sizes],
+        'results': results
+    }
+
+def format_report(report):
+    """Tabela legível: latência por interação em cada nível e recursos do servidor"""
+    lines = [f"{'sessões':>8}  {'interação':<10}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'script p95':>12}{'falhas':>8}"]
+    for result in report['results']:
+        for name, stats in result['interactions'].items():
+            script = f"{stats['script_p95_ms']:.0f}" if stats['script_p95_ms'] is not None else '-'
+            lines.append(
+                f"{result['sessions']:>8}  {name:<10}{stats['count']:>6}{stats['p50_ms']:>10.0f}{stats['p95_ms']:>10.0f}"
+                f"{stats['p99_ms']:>10.0f}{script:>12}{stats['failures']:>8}"
+            )
+        resources, jobs = result['resources'], result['jobs']
+        job_p50 = f"{jobs['p50_seconds']:.1f}s" if jobs['p50_seconds'] is not None else '-'
+        lines.append(
+            f"{'':>8}  CPU {resources['cpu_percent_mean']:.0f}% (máx {resources['cpu_percent_max']:.0f}%), "
+            f"RSS {resources['rss_mb_peak']:.0f} MB (jobs {resources['children_rss_mb_peak']:.0f} MB), "
+            f"jobs {jobs['completed']}/{jobs['completed'] + jobs['failed']} em {job_p50}, "
+            f"falhas {result['failure_rate']:.1%}"
+        )
+    lines.append(f"Limitações (isolamento por {report['isolation']}):")
+    lines.extend(f"  - {limitation}" for limitation in report['limitations'])
+    return '\n'.join(lines)
+
+def main(argv=None):
+    """Ponto de entrada de linha de comando"""
+    parser = argparse.ArgumentParser(prog='loadtest', description=__doc__)
+    parser.add_argument('--sessions', default='1,4', help='Níveis de sessões simultâneas, separados por vírgula')
+    parser.add_argument('--sizes', default='1k,5k', help='Tamanhos dos catálogos enviados (alternados entre sessões)')
+    parser.add_argument('--mission', choices=list(NASA_TABLES), default='kepler_koi', help='Layout do catálogo sintético')
+    parser.add_argument('--iterations', type=int, default=3, help='Ciclos de seção/filtro/página por sessão após o treino')
+    parser.add_argument('--timeout', type=float, default=60, help='Tempo máximo de um rerun (segundos)')
+    parser.add_argument('--job-timeout', type=float, default=600, help='Espera máxima pelo treino de cada sessão')
+    parser.add_argument('--poll-interval', type=float, default=0.0, help='Espera extra entre reruns enquanto o treino roda')
+    parser.add_argument('--stagger', type=float, default=0.5, help='Atraso entre o início de sessões consecutivas')
+    parser.add_argument('--isolation', choices=ISOLATION_MODES, default='thread',
+                        help='Sessões em threads de um processo (reruns em fila) ou um processo por sessão')
+    parser.add_argument('--workdir', help='Diretório de trabalho (padrão: temporário)')
+    parser.add_argument('--max-failure-rate', type=float, default=0.0, help='Taxa de falhas tolerada antes de sair com erro')
+    parser.add_argument('--max-p95-ms', type=float, help='p95 tolerado para seção/filtro/página')
+    parser.add_argument('--output', help='Grava o relatório em JSON neste arquivo')
+    parser.add_argument('--json', action='store_true', help='Imprime o relatório em JSON em vez da tabela')
+    args = parser.parse_args(argv)
+
+    report = run_suite(
+        [int(level) for level in args.sessions.split(',')],
+        [parse_size(size) for size in args.sizes.split(',')],
+        workdir=args.workdir, iterations=args.iterations, mission=args.mission, timeout=args.timeout,
+        job_timeout=args.job_timeout, poll_interval=args.poll_interval, stagger_seconds=args.stagger,
+        isolation=args.isolation
+    )
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(report, handle, indent=2)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+    exceeded = []
+    for result in report['results']:
+        if result['failure_rate'] > args.max_failure_rate:
+            exceeded.append(f"{result['sessions']} sessões: falhas {result['failure_rate']:.1%}")
+        for name in ('section', 'filter', 'page'):
+            stats = result['interactions'].get(name)
+            if args.max_p95_ms and stats and stats['p95_ms'] > args.max_p95_ms:
+                exceeded.append(f"{result['sessions']} sessões: p95 de {name} {stats['p95_ms']:.0f} ms")
+    for message in exceeded:
+        logger.error(f"Limite excedido - {message}")
+    return 1 if exceeded else 0
+
+if __name__ == "__main__":
+    # O script das sessões importa `loadtest`: reaproveita este módulo (e os uploads registrados)
+    sys.modules.setdefault('loadtest', sys.modules[__name__])
+    sys.exit(main())
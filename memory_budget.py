@@ -0,0 +1,257 @@
+"""
+Orçamento de memória do pipeline
+Estima o custo das etapas pesadas e registra as degradações aplicadas quando elas não cabem
+"""
+
+import os
+import logging
+
+import numpy as np
+
+from tracing import current_rss_bytes
+
+logger = logging.getLogger(__name__)
+
+# Sem EXOPLANET_MEMORY_BUDGET_MB, o orçamento é esta fração do limite do contêiner/máquina
+DEFAULT_BUDGET_FRACTION = 0.8
+
+# Custos medidos com tracing (pico de RSS por etapa), em bytes
+READ_EXPANSION = 3.0                # CSV inteiro: lista de linhas decodificadas + DataFrame
+CHUNKED_READ_EXPANSION = 1.2        # leitura em blocos com float32
+FOREST_BYTES_PER_ROW_TREE = 48      # árvores de profundidade total da Random Forest
+BOOSTER_BYTES_PER_VALUE = 24        # matriz quantizada + gradientes do XGBoost/LightGBM
+BOOSTER_FIXED_BYTES = 16 * 1024 ** 2
+SMOTE_EXPANSION = 1.5               # matriz balanceada + vizinhos
+
+# Limites das degradações
+MIN_FOREST_SAMPLES = 0.05
+MIN_CV_ROWS = 2_000
+MIN_TRAINING_ROWS = 5_000
+MIN_READ_FRACTION = 0.01
+CSV_CHUNK_ROWS = 50_000
+
+def _read_int(path):
+    try:
+        with open(path) as handle:
+            value = handle.read().strip()
+        return None if value == 'max' else int(value)
+    except (OSError, ValueError):
+        return None
+
+def system_memory_limit():
+    """Limite de memória do processo: cgroup (contêiner) ou memória total da máquina"""
+    limits = [
+        _read_int('/sys/fs/cgroup/memory.max'),
+        _read_int('/sys/fs/cgroup/memory/memory.limit_in_bytes'),
+    ]
+    try:
+        with open('/proc/meminfo') as meminfo:
+            for line in meminfo:
+                if line.startswith('MemTotal:'):
+                    limits.append(int(line.split()[1]) * 1024)
+                    break
+    except OSError:
+        pass
+    # cgroup v1 sem limite informa um valor gigantesco; o menor valor válido vence
+    limits = [limit for limit in limits if limit and limit < 1 << 60]
+    return min(limits) if limits else None
+
+def system_memory_available():
+    """Memória ainda disponível no contêiner/máquina (None se desconhecida)"""
+    candidates = []
+    limit = _read_int('/sys/fs/cgroup/memory.max')
+    usage = _read_int('/sys/fs/cgroup/memory.current')
+    if limit and usage is not None:
+        candidates.append(limit - usage)
+    try:
+        with open('/proc/meminfo') as meminfo:
+            for line in meminfo:
+                if line.startswith('MemAvailable:'):
+                    candidates.append(int(line.split()[1]) * 1024)
+                    break
+    except OSError:
+        pass
+    return max(0, min(candidates)) if candidates else None
+
+def default_budget_bytes():
+    """Orçamento padrão: EXOPLANET_MEMORY_BUDGET_MB ou uma fração do limite do sistema"""
+    configured = os.environ.get('EXOPLANET_MEMORY_BUDGET_MB')
+    if configured:
+        return int(float(configured) * 1024 ** 2)
+    limit = system_memory_limit()
+    return int(limit * DEFAULT_BUDGET_FRACTION) if limit else None
+
+class MemoryBudget:
+    """Orçamento de memória de um processo e degradações aplicadas para respeitá-lo
+
+    limit_bytes=None usa default_budget_bytes(); sem limite conhecido todas as
+    etapas são permitidas. A folga considera o RSS do processo e, quando menor,
+    a memória ainda livre no contêiner (o OOM killer olha o total).
+    """
+
+    def __init__(self, limit_bytes=None):
+        self.limit_bytes = default_budget_bytes() if limit_bytes is None else limit_bytes
+        self.degradations = []
+
+    def headroom(self):
+        """Bytes que ainda podem ser alocados (None se não há limite)"""
+        if not self.limit_bytes:
+            return None
+        headroom = self.limit_bytes - current_rss_bytes()
+        available = system_memory_available()
+        if available is not None:
+            headroom = min(headroom, available)
+        return max(0, headroom)
+
+    def allows(self, estimated_bytes):
+        """True se a etapa estimada cabe na folga atual"""
+        headroom = self.headroom()
+        return headroom is None or estimated_bytes <= headroom
+
+    def degrade(self, stage, kind, estimated_bytes, **detail):
+        """Registra uma degradação (exibida ao usuário e salva com o pipeline)"""
+        headroom = self.headroom()
+        entry = {
+            'stage': stage,
+            'kind': kind,
+            'estimated_mb': round(estimated_bytes / 1024 ** 2, 1),
+            'headroom_mb': None if headroom is None else round(headroom / 1024 ** 2, 1),
+            'detail': detail
+        }
+        self.degradations.append(entry)
+        logger.warning(
+            f"Orçamento de memória: {stage} estimado em {entry['estimated_mb']} MB "
+            f"(folga {entry['headroom_mb']} MB) -> {kind} {detail}"
+        )
+        return entry
+
+def estimate_forest_bytes(rows, n_estimators=100, max_samples=1.0):
+    """Tamanho de uma Random Forest de profundidade total treinada em `rows` linhas"""
+    return int(rows * max_samples * n_estimators * FOREST_BYTES_PER_ROW_TREE)
+
+def estimate_booster_bytes(rows, n_features):
+    """Memória de treino de um booster (XGBoost/LightGBM)"""
+    return int(rows * n_features * BOOSTER_BYTES_PER_VALUE + BOOSTER_FIXED_BYTES)
+
+def estimate_matrix_bytes(rows, n_features):
+    """Matriz float64 de features"""
+    return int(rows * n_features * 8)
+
+def estimate_smote_bytes(class_counts, n_features):
+    """Matriz balanceada pelo SMOTE (todas as classes no tamanho da maior)"""
+    rows = len(class_counts) * max(class_counts)
+    return int(estimate_matrix_bytes(rows, n_features) * SMOTE_EXPANSION)
+
+def plan_csv_read(budget, file_bytes):
+    """Escolhe como ler um CSV de `file_bytes` bytes para caber no orçamento
+
+    1. leitura completa;
+    2. leitura em blocos com float32 ('chunked_read');
+    3. blocos float32 com amostra aleatória de cada bloco ('sampled_read').
+
+    Não há treino fora da memória: quando nem os blocos cabem, só uma fração
+    das linhas chega ao DataFrame.
+    """
+    plan = {'chunked': False, 'sample_fraction': 1.0}
+    estimate = file_bytes * READ_EXPANSION
+    if budget.allows(estimate):
+        return plan
+    plan['chunked'] = True
+    budget.degrade('safe_read_file', 'chunked_read', estimate, chunk_rows=CSV_CHUNK_ROWS)
+
+    estimate = file_bytes * CHUNKED_READ_EXPANSION
+    if budget.allows(estimate):
+        return plan
+    fraction = float(np.floor(budget.headroom() / estimate * 100) / 100)
+    plan['sample_fraction'] = max(MIN_READ_FRACTION, fraction)
+    budget.degrade('safe_read_file', 'sampled_read', estimate, fraction=plan['sample_fraction'])
+    return plan
+
+def plan_training(budget, class_counts, n_features, n_estimators=100, cv_folds=5):
+    """Escolhe como treinar para caber no orçamento, degradando na ordem de menor perda
+
+    1. validação cruzada em uma amostra estratificada ('subsampled_cv');
+    2. pesos de classe em vez de SMOTE ('class_weights');
+    3. Random Forest com bootstrap limitado (max_samples, 'bounded_forest');
+    4. treino em uma amostra estratificada ('subsampled_training').
+
+    O pico estimado soma a matriz de treino, a floresta final (que fica em
+    memória) e o maior entre a floresta de um fold do CV e um booster.
+    """
+    train_rows = int(sum(class_counts))
+    plan = {
+        'smote': True,
+        'train_rows': train_rows,
+        'fit_rows': len(class_counts) * int(max(class_counts)),
+        'cv_rows': train_rows,
+        'forest_max_samples': None
+    }
+    headroom = budget.headroom()
+    if headroom is None:
+        return plan
+
+    cv_share = (cv_folds - 1) / cv_folds
+    forest_row = n_estimators * FOREST_BYTES_PER_ROW_TREE
+
+    def fixed(plan):
+        matrix = estimate_matrix_bytes(plan['fit_rows'], n_features) * (SMOTE_EXPANSION if plan['smote'] else 1)
+        return matrix + estimate_forest_bytes(plan['fit_rows'], n_estimators, plan['forest_max_samples'] or 1.0)
+
+    def need(plan):
+        samples = plan['forest_max_samples'] or 1.0
+        return fixed(plan) + max(
+            estimate_forest_bytes(plan['cv_rows'] * cv_share, n_estimators, samples),
+            estimate_booster_bytes(plan['fit_rows'], n_features)
+        )
+
+    def cv_rows_that_fit(plan):
+        spare = headroom - fixed(plan)
+        rows = spare / (forest_row * (plan['forest_max_samples'] or 1.0) * cv_share)
+        return int(min(plan['train_rows'], max(MIN_CV_ROWS, rows)))
+
+    cv_degradation = None
+    estimate = need(plan)
+    if estimate > headroom:
+        cv_rows = cv_rows_that_fit(plan)
+        if cv_rows < train_rows:
+            plan['cv_rows'] = cv_rows
+            cv_degradation = budget.degrade('cross_val', 'subsampled_cv', estimate, rows=cv_rows, of=train_rows)
+            estimate = need(plan)
+
+    if estimate > headroom:
+        plan.update(smote=False, fit_rows=train_rows)
+        budget.degrade('smote', 'class_weights', estimate)
+        estimate = need(plan)
+
+    if estimate > headroom:
+        matrix = estimate_matrix_bytes(plan['fit_rows'], n_features)
+        booster = estimate_booster_bytes(plan['fit_rows'], n_features)
+        forest_rows = plan['fit_rows'] + plan['cv_rows'] * cv_share
+        samples = (headroom - matrix - booster) / (forest_row * forest_rows)
+        plan['forest_max_samples'] = max(MIN_FOREST_SAMPLES, float(min(1.0, np.floor(samples * 100) / 100)))
+        budget.degrade('fit:Random Forest', 'bounded_forest', estimate, max_samples=plan['forest_max_samples'])
+        estimate = need(plan)
+
+    if estimate > headroom:
+        per_row = (
+            8 * n_features + BOOSTER_BYTES_PER_VALUE * n_features
+            + forest_row * plan['forest_max_samples'] * (1 + cv_share)
+        )
+        rows = int(min(train_rows, max(MIN_TRAINING_ROWS, (headroom - BOOSTER_FIXED_BYTES) / per_row)))
+        if rows < train_rows:
+            plan.update(train_rows=rows, fit_rows=rows, cv_rows=min(plan['cv_rows'], rows))
+            budget.degrade('train_models', 'subsampled_training', estimate, rows=rows, of=train_rows)
+            estimate = need(plan)
+
+    # As degradações seguintes liberam memória; a amostra do CV cresce até o que couber
+    if cv_degradation is not None:
+        plan['cv_rows'] = max(plan['cv_rows'], cv_rows_that_fit(plan))
+        if plan['cv_rows'] >= plan['train_rows']:
+            budget.degradations.remove(cv_degradation)
+        else:
+            cv_degradation['detail'].update(rows=plan['cv_rows'], of=plan['train_rows'])
+        estimate = need(plan)
+
+    if estimate > headroom:
+        logger.warning(f"Treino estimado em {estimate / 1024 ** 2:.0f} MB ainda excede a folga de {headroom / 1024 ** 2:.0f} MB")
+    return plan
@@ -0,0 +1,253 @@
+"""
+Armazenamento local de métricas em série temporal (SQLite)
+Registra treinos, lotes de pontuação e atualizações NASA para o dashboard
+"""
+
+import os
+import json
+import math
+import time
+import sqlite3
+import threading
+import weakref
+import logging
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+METRICS_DB_PATH = os.environ.get('EXOPLANET_METRICS_DB', os.path.join('models', 'metrics.sqlite'))
+
+# Colunas numéricas que podem ser consultadas/agregadas
+METRIC_COLUMNS = ('accuracy', 'rows', 'rows_per_second', 'ms_per_1k', 'seconds')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    model_version TEXT,
+    model TEXT,
+    accuracy REAL,
+    rows INTEGER,
+    rows_per_second REAL,
+    ms_per_1k REAL,
+    seconds REAL,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS events_kind_ts ON events (kind, ts);
+CREATE TABLE IF NOT EXISTS rollup_hourly (
+    kind TEXT NOT NULL,
+    model TEXT NOT NULL,
+    hour INTEGER NOT NULL,
+    %s,
+    PRIMARY KEY (kind, model, hour)
+) WITHOUT ROWID;
+""" % ',\n    '.join(
+    f"{col}_sum REAL, {col}_min REAL, {col}_max REAL, {col}_count INTEGER NOT NULL DEFAULT 0"
+    for col in METRIC_COLUMNS
+)
+
+# Stores vivos, para trocar as conexões herdadas depois de um fork
+_INSTANCES = weakref.WeakSet()
+
+# Conexões herdadas do processo pai: nunca usadas nem fechadas no filho (fechar pode
+# fazer checkpoint do WAL por baixo do pai), só mantidas vivas
+_INHERITED_CONNECTIONS = []
+
+# Consultas com baldes de pelo menos 1 hora leem o rollup horário em vez dos eventos
+ROLLUP_SECONDS = 3600
+
+class MetricsStore:
+    """Série temporal de eventos só de inserção, com consultas por janela e reamostragem
+
+    Usa SQLite em modo WAL: escritas são inserções sequenciais e leitores (o
+    dashboard) não bloqueiam escritores (jobs de treino em outros processos).
+    O índice (kind, ts) faz cada janela ler só as linhas do intervalo pedido, e
+    um rollup horário (soma/mín/máx/contagem por métrica, atualizado na inserção)
+    responde janelas longas sem varrer meses de eventos.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or METRICS_DB_PATH
+        self._local = threading.local()
+        _INSTANCES.add(self)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        """Conexão por thread (sqlite3 não compartilha conexões entre threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def record(self, kind, model_version=None, model=None, timestamp=None, details=None, **metrics):
+        """Registra um evento; métricas aceitas: accuracy, rows, rows_per_second, ms_per_1k, seconds"""
+        self.record_many([dict(metrics, kind=kind, model_version=model_version, model=model,
+                               timestamp=timestamp, details=details)])
+
+    def record_many(self, events):
+        """Registra vários eventos em uma única transação"""
+        unknown = {key for event in events for key in event} - set(METRIC_COLUMNS) - {
+            'kind', 'model_version', 'model', 'timestamp', 'details'
+        }
+        if unknown:
+            raise ValueError(f"Métricas desconhecidas: {sorted(unknown)}")
+        now = time.time()
+        rows = [
+            (
+                event.get('timestamp') or now,
+                event['kind'],
+                event.get('model_version'),
+                event.get('model'),
+                *(None if event.get(col) is None else float(event[col]) for col in METRIC_COLUMNS),
+                json.dumps(event['details'], default=str) if event.get('details') else None,
+            )
+            for event in events
+        ]
+        with self._connect() as conn:
+            conn.executemany(
+                f"INSERT INTO events (ts, kind, model_version, model, {', '.join(METRIC_COLUMNS)}, details) "
+                f"VALUES ({', '.join('?' * (len(METRIC_COLUMNS) + 5))})",
+                rows
+            )
+            self._update_rollups(conn, rows)
+
+    def _update_rollups(self, conn, rows):
+        """Agrega os eventos por (tipo, modelo, hora) e soma ao rollup horário"""
+        buckets = {}
+        for row in rows:
+            key = (row[1], row[3] or '', int(row[0] // ROLLUP_SECONDS))
+            bucket = buckets.setdefault(key, [[0.0, None, None, 0] for _ in METRIC_COLUMNS])
+            for stats, value in zip(bucket, row[4:4 + len(METRIC_COLUMNS)]):
+                if value is None:
+                    continue
+                stats[0] += value
+                stats[1] = value if stats[1] is None else min(stats[1], value)
+                stats[2] = value if stats[2] is None else max(stats[2], value)
+                stats[3] += 1
+
+        columns = [f"{col}_{part}" for col in METRIC_COLUMNS for part in ('sum', 'min', 'max', 'count')]
+        # min()/max() escalares do SQLite retornam NULL se um lado for NULL; COALESCE evita isso
+        updates = ', '.join(
+            f"{col}_sum = COALESCE({col}_sum, 0) + COALESCE(excluded.{col}_sum, 0), "
+            f"{col}_min = MIN(COALESCE({col}_min, excluded.{col}_min), COALESCE(excluded.{col}_min, {col}_min)), "
+            f"{col}_max = MAX(COALESCE({col}_max, excluded.{col}_max), COALESCE(excluded.{col}_max, {col}_max)), "
+            f"{col}_count = {col}_count + excluded.{col}_count"
+            for col in METRIC_COLUMNS
+        )
+        conn.executemany(
+            f"INSERT INTO rollup_hourly (kind, model, hour, {', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * (len(columns) + 3))}) "
+            f"ON CONFLICT (kind, model, hour) DO UPDATE SET {updates}",
+            [
+                (*key, *(value for stats in bucket for value in (stats if stats[3] else [None, None, None, 0])))
+                for key, bucket in buckets.items()
+            ]
+        )
+
+    def version(self):
+        """Identificador do último evento gravado (muda a cada inserção)"""
+        row = self._connect().execute('SELECT MAX(id) FROM events').fetchone()
+        return row[0] or 0
+
+    def query(self, kind, metric='accuracy', start=None, end=None, max_points=500, bucket_seconds=None):
+        """Série de `metric` por modelo na janela [start, end], reamostrada em baldes de tempo
+
+        Sem bucket_seconds, o balde é escolhido para devolver no máximo `max_points`
+        pontos por modelo. Retorna DataFrame com timestamp, model, mean, min, max e count.
+        """
+        if metric not in METRIC_COLUMNS:
+            raise ValueError(f"Métrica desconhecida: {metric}")
+        end = time.time() if end is None else end
+        if start is None:
+            row = self._connect().execute('SELECT MIN(ts) FROM events WHERE kind = ?', (kind,)).fetchone()
+            start = row[0] if row[0] is not None else end
+        if bucket_seconds is None:
+            bucket_seconds = max(1.0, (end - start) / max(max_points, 1))
+
+        params = {'bucket': bucket_seconds, 'kind': kind, 'start': start, 'end': end}
+        if bucket_seconds >= ROLLUP_SECONDS:
+            # Baldes em horas inteiras (arredondados para cima); a janela é alinhada à hora
+            params['bucket'] = ROLLUP_SECONDS * int(math.ceil(bucket_seconds / ROLLUP_SECONDS))
+            params['start_hour'] = int(start // ROLLUP_SECONDS)
+            params['end_hour'] = int(end // ROLLUP_SECONDS)
+            frame = pd.read_sql_query(
+                f"""
+                SELECT CAST(hour * {ROLLUP_SECONDS} / :bucket AS INTEGER) * :bucket AS bucket_ts,
+                       model,
+                       SUM({metric}_sum) / SUM({metric}_count) AS mean,
+                       MIN({metric}_min) AS min, MAX({metric}_max) AS max,
+                       SUM({metric}_count) AS count
+                FROM rollup_hourly
+                WHERE kind = :kind AND hour >= :start_hour AND hour <= :end_hour AND {metric}_count > 0
+                GROUP BY bucket_ts, model
+                ORDER BY bucket_ts
+                """,
+                self._connect(),
+                params=params
+            )
+            frame['timestamp'] = pd.to_datetime(frame.pop('bucket_ts'), unit='s')
+            return frame[['timestamp', 'model', 'mean', 'min', 'max', 'count']]
+
+        frame = pd.read_sql_query(
+            f"""
+            SELECT CAST(ts / :bucket AS INTEGER) * :bucket AS bucket_ts,
+                   COALESCE(model, '') AS model,
+                   AVG({metric}) AS mean, MIN({metric}) AS min, MAX({metric}) AS max,
+                   COUNT({metric}) AS count
+            FROM events
+            WHERE kind = :kind AND ts >= :start AND ts <= :end AND {metric} IS NOT NULL
+            GROUP BY bucket_ts, model
+            ORDER BY bucket_ts
+            """,
+            self._connect(),
+            params=params
+        )
+        frame['timestamp'] = pd.to_datetime(frame.pop('bucket_ts'), unit='s')
+        return frame[['timestamp', 'model', 'mean', 'min', 'max', 'count']]
+
+    def latest(self, kind=None, limit=20):
+        """Eventos mais recentes (opcionalmente de um tipo), do mais novo ao mais antigo"""
+        where, params = ('WHERE kind = ?', (kind, limit)) if kind else ('', (limit,))
+        frame = pd.read_sql_query(
+            f"SELECT * FROM events {where} ORDER BY ts DESC LIMIT ?", self._connect(), params=params
+        )
+        frame['ts'] = pd.to_datetime(frame['ts'], unit='s')
+        return frame
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+def get_metrics_store(path=None):
+    """Instância compartilhada do store para o caminho dado"""
+    path = path or METRICS_DB_PATH
+    with _STORES_LOCK:
+        if path not in _STORES:
+            _STORES[path] = MetricsStore(path)
+        return _STORES[path]
+
+def record_events(events, path=None):
+    """Registra eventos sem nunca interromper quem chamou (telemetria é opcional)"""
+    try:
+        get_metrics_store(path).record_many(events)
+    except Exception as e:
+        logger.warning(f"Não foi possível registrar métricas: {str(e)}")
+
+def _after_fork():
+    """No processo filho: stores e conexões SQLite do pai não podem ser reutilizados"""
+    global _STORES_LOCK
+    _STORES_LOCK = threading.Lock()
+    _STORES.clear()
+    for store in list(_INSTANCES):
+        conn = getattr(store._local, 'conn', None)
+        if conn is not None:
+            _INHERITED_CONNECTIONS.append(conn)
+        store._local = threading.local()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
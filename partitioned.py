@@ -0,0 +1,241 @@
+"""
+Execução particionada do pré-processamento
+Divide catálogos grandes em partições de linhas processadas por um pool de processos e une
+as estatísticas parciais (contagens, médias, variâncias e quantis) de forma exata
+"""
+
+import os
+import mmap
+import math
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Abaixo disso o custo do pool supera o ganho e o modo automático fica serial
+MIN_PARTITIONED_ROWS = 200_000
+
+# Seleção de quantis: bins por rodada de histograma e tamanho a partir do qual o
+# bin do quantil é trazido inteiro (como valores únicos com contagem)
+QUANTILE_BINS = 1024
+QUANTILE_GATHER_ROWS = 50_000
+MAX_QUANTILE_ROUNDS = 6
+
+# Colunas e máscara da execução atual; com fork os workers as herdam sem cópia
+_SHARED = {}
+
+def auto_partitions(rows):
+    """Partições para um catálogo: EXOPLANET_PARTITIONS, ou um por núcleo nos catálogos grandes"""
+    configured = os.environ.get('EXOPLANET_PARTITIONS')
+    if configured:
+        return max(1, int(configured))
+    if rows < MIN_PARTITIONED_ROWS:
+        return 1
+    return os.cpu_count() or 1
+
+def shared_array(length, dtype):
+    """Array numpy em memória anônima compartilhada com os processos filhos (fork)"""
+    dtype = np.dtype(dtype)
+    buffer = mmap.mmap(-1, max(1, length * dtype.itemsize))
+    return np.frombuffer(buffer, dtype=dtype, count=length)
+
+def merge_moments(left, right):
+    """Une (count, mean, m2, min, max) de duas partições (Chan et al., exato)"""
+    n_left, mean_left, m2_left, min_left, max_left = left
+    n_right, mean_right, m2_right, min_right, max_right = right
+    count = n_left + n_right
+    if not n_left or not n_right:
+        return left if n_left else right
+    delta = mean_right - mean_left
+    mean = mean_left + delta * n_right / count
+    m2 = m2_left + m2_right + delta * delta * n_left * n_right / count
+    return count, mean, m2, min(min_left, min_right), max(max_left, max_right)
+
+def _lerp(a, b, t):
+    # Mesma interpolação do numpy (e do pandas) em quantile(method='linear')
+    diff = b - a
+    return b - diff * (1 - t) if t >= 0.5 else a + diff * t
+
+def _valid(name, start, stop, use_mask):
+    values = _SHARED['columns'][name][start:stop]
+    valid = ~np.isnan(values)
+    if use_mask:
+        valid &= _SHARED['mask'][start:stop]
+    return values[valid]
+
+def _partition_moments(start, stop, names, use_mask):
+    moments = {}
+    for name in names:
+        values = _valid(name, start, stop, use_mask)
+        if len(values):
+            mean = values.mean()
+            moments[name] = (len(values), mean, float(((values - mean) ** 2).sum()), values.min(), values.max())
+        else:
+            moments[name] = (0, 0.0, 0.0, math.inf, -math.inf)
+    return moments
+
+def _window_bins(values, window):
+    low, high, high_inclusive = window
+    inside = values[(values >= low) & ((values <= high) if high_inclusive else (values < high))]
+    edges = np.linspace(low, high, QUANTILE_BINS + 1)
+    bins = np.searchsorted(edges, inside, side='right') - 1
+    return inside, np.minimum(bins, QUANTILE_BINS - 1)
+
+def _partition_histograms(start, stop, name, windows, use_mask):
+    values = _valid(name, start, stop, use_mask)
+    histograms = []
+    for window in windows:
+        _, bins = _window_bins(values, window)
+        histograms.append(np.bincount(bins, minlength=QUANTILE_BINS))
+    return histograms
+
+def _partition_gather(start, stop, name, windows, use_mask):
+    values = _valid(name, start, stop, use_mask)
+    gathered = []
+    for window in windows:
+        inside, _ = _window_bins(values, window)
+        gathered.append(np.unique(inside, return_counts=True))
+    return gathered
+
+def _partition_filter(start, stop, name, lower, upper):
+    values = _SHARED['columns'][name][start:stop]
+    _SHARED['mask'][start:stop] &= (values >= lower) & (values <= upper)
+
+class PartitionedExecutor:
+    """Pool de processos sobre partições de linhas de colunas float64
+
+    Com fork, os workers herdam as colunas (copy-on-write) e escrevem a máscara
+    de linhas em memória compartilhada: entre os processos só trafegam limites
+    de partição e estatísticas parciais, e nada é concatenado no fim. Com uma
+    partição ou sem fork, tudo roda no processo atual com o mesmo resultado.
+
+        with PartitionedExecutor({'koi_period': period}, partitions=8) as executor:
+            q1, q3 = executor.quantiles('koi_period', [0.25, 0.75], use_mask=True)
+            executor.filter('koi_period', q1, q3)
+            keep = executor.mask
+    """
+
+    def __init__(self, columns, partitions):
+        self.columns = {name: np.asarray(values, dtype=float) for name, values in columns.items()}
+        self.rows = len(next(iter(self.columns.values()))) if self.columns else 0
+        partitions = max(1, min(partitions, self.rows))
+        edges = np.linspace(0, self.rows, partitions + 1).astype(int)
+        self.bounds = list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+        self.mask = shared_array(self.rows, bool)
+        self.mask[:] = True
+        self._pool = None
+
+    def __enter__(self):
+        if _SHARED:
+            raise RuntimeError("Já existe uma execução particionada ativa neste processo")
+        _SHARED.update(columns=self.columns, mask=self.mask)
+        if len(self.bounds) > 1 and 'fork' in multiprocessing.get_all_start_methods():
+            self._pool = ProcessPoolExecutor(max_workers=len(self.bounds), mp_context=multiprocessing.get_context('fork'))
+        elif len(self.bounds) > 1:
+            logger.info("Sem fork neste sistema: partições processadas no processo atual")
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        _SHARED.clear()
+        return False
+
+    def map(self, function, *args):
+        """Resultados de function(start, stop, *args) em cada partição, em ordem"""
+        if self._pool is None:
+            return [function(start, stop, *args) for start, stop in self.bounds]
+        starts, stops = zip(*self.bounds)
+        repeated = [[arg] * len(self.bounds) for arg in args]
+        return list(self._pool.map(function, starts, stops, *repeated))
+
+    def moments(self, names, use_mask=False):
+        """count, mean, var (ddof=0), min e max de cada coluna, ignorando NaN"""
+        merged = {}
+        for partial in self.map(_partition_moments, list(names), use_mask):
+            for name, moments in partial.items():
+                merged[name] = merge_moments(merged[name], moments) if name in merged else moments
+        return {
+            name: {
+                'count': count,
+                'mean': mean if count else math.nan,
+                'var': m2 / count if count else math.nan,
+                'min': low,
+                'max': high
+            }
+            for name, (count, mean, m2, low, high) in merged.items()
+        }
+
+    def quantiles(self, name, qs, use_mask=False):
+        """Quantis exatos (interpolação linear, como pandas) de uma coluna, ignorando NaN"""
+        stats = self.moments([name], use_mask)[name]
+        if not stats['count']:
+            return [math.nan] * len(qs)
+        positions = [q * (stats['count'] - 1) for q in qs]
+        ranks = sorted({int(math.floor(p)) for p in positions} | {int(math.ceil(p)) for p in positions})
+        values = self._select_ranks(name, ranks, stats['min'], stats['max'], use_mask)
+        return [
+            _lerp(values[int(math.floor(p))], values[int(math.ceil(p))], p - math.floor(p))
+            for p in positions
+        ]
+
+    def _select_ranks(self, name, ranks, low, high, use_mask):
+        """Valores nas posições `ranks` da coluna ordenada
+
+        Cada rodada conta as linhas em QUANTILE_BINS bins da janela de cada posição
+        e a estreita para o bin que a contém; quando o bin é pequeno, os valores
+        dele vêm como únicos com contagem e a posição é resolvida exatamente.
+        """
+        # posição -> [janela (low, high, high_inclusive), linhas abaixo da janela]
+        pending = {rank: [(low, high, True), 0] for rank in ranks}
+        resolved = {}
+        rounds = 0
+
+        while pending:
+            windows = list({tuple(state[0]) for state in pending.values()})
+            rounds += 1
+            histograms = [np.zeros(QUANTILE_BINS, dtype=np.int64) for _ in windows]
+            for partial in self.map(_partition_histograms, name, windows, use_mask):
+                for total, histogram in zip(histograms, partial):
+                    total += histogram
+            counts = dict(zip(windows, histograms))
+
+            to_gather = {}
+            for rank, (window, below) in list(pending.items()):
+                window_low, window_high, inclusive = window
+                if window_low == window_high:
+                    resolved[rank] = window_low
+                    del pending[rank]
+                    continue
+                cumulative = np.cumsum(counts[window])
+                target = int(np.searchsorted(cumulative, rank - below, side='right'))
+                edges = np.linspace(window_low, window_high, QUANTILE_BINS + 1)
+                below += int(cumulative[target - 1]) if target else 0
+                narrowed = (edges[target], edges[target + 1], inclusive and target == QUANTILE_BINS - 1)
+                pending[rank] = [narrowed, below]
+                if counts[window][target] <= QUANTILE_GATHER_ROWS or rounds >= MAX_QUANTILE_ROUNDS:
+                    to_gather.setdefault(narrowed, []).append(rank)
+
+            if to_gather:
+                windows = list(to_gather)
+                merged = [{} for _ in windows]
+                for partial in self.map(_partition_gather, name, windows, use_mask):
+                    for totals, (values, counts_) in zip(merged, partial):
+                        for value, count in zip(values.tolist(), counts_.tolist()):
+                            totals[value] = totals.get(value, 0) + count
+                for window, totals in zip(windows, merged):
+                    values = np.array(sorted(totals))
+                    cumulative = np.cumsum([totals[value] for value in values])
+                    for rank in to_gather[window]:
+                        below = pending.pop(rank)[1]
+                        resolved[rank] = float(values[np.searchsorted(cumulative, rank - below, side='right')])
+
+        return resolved
+
+    def filter(self, name, lower, upper):
+        """Mantém na máscara só as linhas com lower <= coluna <= upper (NaN sai)"""
+        self.map(_partition_filter, name, lower, upper)
@@ -0,0 +1,246 @@
+"""
+Busca por similaridade entre objetos do catálogo
+Índice de vizinhos (KD-tree) no espaço padronizado das features, com inserção incremental e
+persistência pela impressão digital dos dados
+"""
+
+import os
+import logging
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree
+from sklearn.preprocessing import StandardScaler
+
+from tracing import trace_stage
+
+logger = logging.getLogger(__name__)
+
+SIMILARITY_DIR = os.path.join('models', 'similarity')
+SIMILARITY_FORMAT_VERSION = 1
+
+# Features comparadas (as que existirem no catálogo)
+SIMILARITY_FEATURES = ['koi_period', 'koi_duration', 'koi_depth', 'koi_prad', 'koi_teq', 'koi_insol', 'koi_impact']
+ID_COLUMNS = ['koi_name', 'kepoi_name', 'toi_name', 'pl_name', 'name']
+LABEL_COLUMN = 'koi_disposition'
+
+LEAF_SIZE = 40
+
+# Linhas inseridas ficam em busca exaustiva até passarem desta fração da árvore;
+# então a árvore é reconstruída com todas
+REBUILD_FRACTION = 0.1
+MIN_REBUILD_ROWS = 1_000
+
+class SimilarityIndex:
+    """Vizinhos mais próximos entre objetos do catálogo
+
+    As features são imputadas pela mediana e padronizadas por um StandardScaler
+    ajustado no catálogo de origem; linhas inseridas depois usam o mesmo scaler,
+    então as distâncias continuam comparáveis. Consultas aceitam o identificador
+    de um objeto (koi_name etc.), a posição da linha (int) ou um vetor de
+    features nas unidades originais (dict, Series ou sequência na ordem de
+    `features`).
+
+        index = SimilarityIndex.build(catalog)
+        index.k_nearest('K00752.01', k=10, labels=['CONFIRMED'])
+    """
+
+    def __init__(self, features, leaf_size=LEAF_SIZE):
+        self.format_version = SIMILARITY_FORMAT_VERSION
+        self.features = list(features)
+        self.leaf_size = leaf_size
+        self.scaler = StandardScaler()
+        self.medians = None
+        self.points = np.empty((0, len(self.features)))
+        self.ids = np.empty(0, dtype=object)
+        self.labels = np.empty(0, dtype=object)
+        self.tree = None
+        self.tree_rows = 0
+        self.fingerprint = None
+        self._positions = None
+
+    @classmethod
+    def build(cls, df, fingerprint=None, features=None, leaf_size=LEAF_SIZE):
+        """Índice sobre todas as linhas de df"""
+        features = [feature for feature in (features or SIMILARITY_FEATURES) if feature in df.columns]
+        if not features:
+            raise ValueError(f"Catálogo sem nenhuma das features de similaridade: {SIMILARITY_FEATURES}")
+
+        index = cls(features, leaf_size)
+        with trace_stage('build_similarity_index', rows=len(df)):
+            raw = df[features].to_numpy(dtype=float)
+            index.medians = np.nan_to_num(np.nanmedian(raw, axis=0)) if len(raw) else np.zeros(len(features))
+            raw = np.where(np.isnan(raw), index.medians, raw)
+            index.points = index.scaler.fit_transform(raw)
+            index.ids, index.labels = index._identity(df)
+            index._rebuild()
+        index.fingerprint = fingerprint
+        logger.info(f"Índice de similaridade com {len(df)} objetos em {len(features)} features")
+        return index
+
+    def _identity(self, df):
+        id_column = next((column for column in ID_COLUMNS if column in df.columns), None)
+        ids = df[id_column].astype(str).to_numpy(dtype=object) if id_column else np.full(len(df), None, dtype=object)
+        labels = df[LABEL_COLUMN].to_numpy(dtype=object) if LABEL_COLUMN in df.columns else np.full(len(df), None, dtype=object)
+        return ids, labels
+
+    def _scale(self, raw):
+        raw = np.where(np.isnan(raw), self.medians, raw)
+        return self.scaler.transform(raw)
+
+    def _rebuild(self):
+        self.tree = KDTree(self.points, leaf_size=self.leaf_size) if len(self.points) else None
+        self.tree_rows = len(self.points)
+
+    def __len__(self):
+        return len(self.points)
+
+    def add(self, df, fingerprint=None):
+        """Insere linhas novas (ex.: recém-ingeridas) sem reajustar o scaler
+
+        As linhas entram em um buffer de busca exaustiva; a árvore só é
+        reconstruída quando o buffer passa de REBUILD_FRACTION dela.
+        `fingerprint` passa a identificar o conteúdo do índice.
+        """
+        raw = df.reindex(columns=self.features).to_numpy(dtype=float)
+        ids, labels = self._identity(df)
+        self.points = np.vstack([self.points, self._scale(raw)])
+        self.ids = np.concatenate([self.ids, ids])
+        self.labels = np.concatenate([self.labels, labels])
+        self._positions = None
+        if fingerprint is not None:
+            self.fingerprint = fingerprint
+
+        pending = len(self.points) - self.tree_rows
+        if pending > max(MIN_REBUILD_ROWS, REBUILD_FRACTION * self.tree_rows):
+            with trace_stage('build_similarity_index', rows=len(self.points)):
+                self._rebuild()
+        return len(df)
+
+    def position_of(self, object_id):
+        """Posição da primeira linha com o identificador (KeyError se não existir)"""
+        if self._positions is None:
+            self._positions = {}
+            for position, value in enumerate(self.ids):
+                self._positions.setdefault(value, position)
+        return self._positions[str(object_id)]
+
+    def _query_point(self, query):
+        """(vetor padronizado, posição do objeto consultado ou None)"""
+        if isinstance(query, (int, np.integer)):
+            return self.points[query], int(query)
+        if isinstance(query, str):
+            position = self.position_of(query)
+            return self.points[position], position
+        if isinstance(query, (dict, pd.Series)):
+            raw = np.array([query.get(feature, np.nan) for feature in self.features], dtype=float)
+        else:
+            raw = np.asarray(query, dtype=float)
+            if raw.shape != (len(self.features),):
+                raise ValueError(f"Vetor de consulta precisa de {len(self.features)} valores: {self.features}")
+        return self._scale(raw[np.newaxis, :])[0], None
+
+    def _pending_distances(self, point):
+        pending = self.points[self.tree_rows:]
+        return np.sqrt(((pending - point) ** 2).sum(axis=1))
+
+    def _frame(self, positions, distances):
+        return pd.DataFrame({
+            'position': positions,
+            'id': self.ids[positions],
+            LABEL_COLUMN: self.labels[positions],
+            'distance': distances
+        })
+
+    def _keep(self, positions, exclude, labels):
+        keep = positions != exclude if exclude is not None else np.ones(len(positions), dtype=bool)
+        if labels is not None:
+            keep &= np.isin(self.labels[positions], list(labels))
+        return keep
+
+    def k_nearest(self, query, k=10, labels=None, exclude_self=True):
+        """Os k objetos mais próximos (opcionalmente só com as disposições em `labels`)"""
+        point, own_position = self._query_point(query)
+        exclude = own_position if exclude_self else None
+        k_search = k + (exclude is not None)
+
+        with trace_stage('similarity_k_nearest'):
+            while True:
+                positions = np.empty(0, dtype=int)
+                distances = np.empty(0)
+                horizon = np.inf
+                if self.tree_rows:
+                    distances, positions = self.tree.query(point[np.newaxis, :], k=min(k_search, self.tree_rows))
+                    distances, positions = distances[0], positions[0]
+                    if k_search < self.tree_rows:
+                        horizon = distances[-1]
+                distances = np.concatenate([distances, self._pending_distances(point)])
+                positions = np.concatenate([positions, np.arange(self.tree_rows, len(self.points))])
+
+                keep = self._keep(positions, exclude, labels)
+                # Só é garantido o que está antes do último vizinho devolvido pela árvore (mais
+                # longe pode haver linhas dela não vistas); com filtro de disposição ou buffer
+                # pode faltar vizinho: amplia a busca na árvore
+                if np.count_nonzero(keep & (distances < horizon)) >= k or k_search >= self.tree_rows:
+                    break
+                k_search *= 4
+
+            positions, distances = positions[keep], distances[keep]
+            order = np.argsort(distances, kind='stable')[:k]
+        return self._frame(positions[order], distances[order])
+
+    def radius(self, query, radius, labels=None, exclude_self=True):
+        """Todos os objetos a até `radius` (distância no espaço padronizado), do mais próximo ao mais distante"""
+        point, own_position = self._query_point(query)
+        exclude = own_position if exclude_self else None
+
+        with trace_stage('similarity_radius'):
+            positions = np.empty(0, dtype=int)
+            distances = np.empty(0)
+            if self.tree_rows:
+                positions, distances = self.tree.query_radius(point[np.newaxis, :], r=radius, return_distance=True)
+                positions, distances = positions[0], distances[0]
+            pending = self._pending_distances(point)
+            within = np.flatnonzero(pending <= radius)
+            positions = np.concatenate([positions, self.tree_rows + within])
+            distances = np.concatenate([distances, pending[within]])
+
+            keep = self._keep(positions, exclude, labels)
+            positions, distances = positions[keep], distances[keep]
+            order = np.argsort(distances, kind='stable')
+        return self._frame(positions[order], distances[order])
+
+    def save(self, path):
+        """Grava o índice (árvore incluída) para não reconstruí-lo a cada execução"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._positions = None
+        joblib.dump(self, f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        index = joblib.load(path)
+        if not isinstance(index, cls):
+            raise ValueError(f"{path} não é um índice de similaridade")
+        if index.format_version > SIMILARITY_FORMAT_VERSION:
+            raise ValueError(f"Formato de índice {index.format_version} não suportado")
+        return index
+
+    @classmethod
+    def for_catalog(cls, df, fingerprint, directory=SIMILARITY_DIR):
+        """Índice persistido do catálogo com esta impressão digital, construído só na primeira vez"""
+        path = os.path.join(directory, f"similarity_{fingerprint}.joblib")
+        if os.path.exists(path):
+            try:
+                index = cls.load(path)
+                if len(index) == len(df):
+                    return index
+                logger.warning(f"Índice {path} não corresponde ao catálogo; reconstruindo")
+            except Exception as e:
+                logger.warning(f"Ignorando índice inválido {path}: {str(e)}")
+
+        index = cls.build(df, fingerprint=fingerprint)
+        index.save(path)
+        return index
@@ -8,13 +8,21 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+import os
 import json
 import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from scipy.interpolate import griddata
 
 # Importar nosso sistema ML
-from exoplanet_ml import ExoplanetDetector
+from exoplanet_ml import ExoplanetDetector, ModelRegistry, SessionModelHandle, TrainingJobManager, CatalogRefresh, dataset_fingerprint
+from data_engine import FilterIndex, FilterStatistics, TablePager
+from metrics_store import get_metrics_store
+from tracing import TRACER, start_metrics_server, trace_stage
+from memory_budget import MemoryBudget, CSV_CHUNK_ROWS, plan_csv_read
+from explainability import ExplanationCache, cached_permutation_importance, explain_rows, permutation_cache_key
+from similarity import SimilarityIndex
 
 # Sistema de tradução
 TRANSLATIONS = {
@@ -136,7 +144,76 @@ TRANSLATIONS = {
         'false_positive': 'Falso Positivo',
         'technical_resources': 'Recursos Técnicos',
         'tip': 'Dica:',
-        'use_template_button': 'Use o botão "Baixar Template CSV" na sidebar para obter um exemplo completo!'
+        'use_template_button': 'Use o botão "Baixar Template CSV" na sidebar para obter um exemplo completo!',
+        'session_model': 'Modelo da sessão',
+        'promote_model': 'Promover modelo para todos',
+        'model_promoted': 'Modelo promovido',
+        'training_job': 'Treinamento em segundo plano',
+        'job_queued': 'Na fila',
+        'cancel_job': 'Cancelar treinamento',
+        'job_cancelled': 'Treinamento cancelado.',
+        'job_result_unavailable': 'O resultado deste treinamento já foi aplicado ou expirou; envie os dados novamente para treinar',
+        'sort_by': 'Ordenar por',
+        'sort_order': 'Ordem',
+        'ascending': 'Crescente',
+        'descending': 'Decrescente',
+        'page_size': 'Linhas por página',
+        'page': 'Página',
+        'table_rows': 'Linhas {start}–{end} de {total} · página {page} de {pages}',
+        'no_model_metrics': 'Nenhum modelo treinado ainda - carregue dados na barra lateral para ver métricas reais',
+        'pipeline_version': 'Pipeline',
+        'cost_vs_quality': 'Custo x Qualidade',
+        'fit_time_label': 'Treino (s)',
+        'latency_1k_label': 'Latência (ms/1k linhas)',
+        'model_size_label': 'Tamanho (MB)',
+        'cv_label': 'CV (média ± desvio)',
+        'per_class_metrics': 'Métricas por classe',
+        'confusion_matrix': 'Matriz de confusão',
+        'predicted_label': 'Previsto',
+        'true_label': 'Real',
+        'support_label': 'Suporte',
+        'history_window': 'Janela',
+        'no_accuracy_history': 'Nenhum treino registrado nesta janela',
+        'section': 'Seção',
+        'debug_timings': '⏱️ Depuração: tempos do rerun',
+        'rerun_timings': 'Tempos do último rerun',
+        'rerun_over_budget': 'Rerun levou {total:.0f} ms (orçamento: {budget} ms)',
+        'rerun_within_budget': 'Rerun em {total:.0f} ms (orçamento: {budget} ms)',
+        'pipeline_stages': 'Etapas do pipeline',
+        'no_pipeline_stages': 'Nenhuma etapa executada neste processo ainda',
+        'degradation_chunked_read': 'Arquivo grande para a memória disponível: lido em blocos de {chunk_rows} linhas com float32',
+        'degradation_sampled_read': 'Nem a leitura em blocos cabe na memória: mantida uma amostra aleatória de {fraction:.0%} das linhas',
+        'degradation_shallow_copy': 'Dados adaptados sem cópia completa para economizar memória',
+        'degradation_class_weights': 'SMOTE substituído por pesos de classe para caber na memória',
+        'degradation_subsampled_cv': 'Validação cruzada em amostra estratificada de {rows} de {of} linhas',
+        'degradation_bounded_forest': 'Random Forest com {max_samples:.0%} das linhas por árvore',
+        'degradation_subsampled_training': 'Treino em amostra estratificada de {rows} de {of} linhas',
+        'memory_report': 'Memória por etapa do treino',
+        'permutation_importance': 'Importância por Permutação',
+        'permutation_importance_help': 'Queda de acurácia ao embaralhar cada feature, medida na mesma amostra para todos os modelos (comparável entre eles).',
+        'compute_permutation': 'Calcular importância',
+        'no_labeled_data': 'Carregue dados rotulados (koi_disposition) para calcular a importância.',
+        'accuracy_drop': 'Queda de acurácia',
+        'object_explanation': '🔬 Explicação por Objeto',
+        'explain_object': 'Objeto',
+        'explain_class': 'Classe explicada',
+        'contribution_label': 'Contribuição',
+        'explanation_margin': 'Contribuições TreeSHAP na margem do modelo (log-odds). Base:',
+        'explanation_probability': 'Contribuições pelo caminho de decisão das árvores, em probabilidade. Base:',
+        'explanation_options_limit': 'Mostrando os primeiros objetos filtrados:',
+        'similar_objects': '🪐 Objetos Semelhantes',
+        'similar_objects_help': 'Vizinhos mais próximos no espaço padronizado (StandardScaler) de período, duração, profundidade, raio, temperatura, insolação e parâmetro de impacto',
+        'similar_object': 'Objeto de referência',
+        'similar_count': 'Número de vizinhos',
+        'similar_dispositions': 'Classificações dos vizinhos',
+        'similarity_distance': 'Distância',
+        'no_similar_objects': 'Nenhum objeto semelhante com essas classificações',
+        'fast_path': '⚡ Caminho Rápido Destilado',
+        'fast_path_agreement': 'Concordância com o ensemble',
+        'fast_path_speedup': 'Aceleração (1 objeto)',
+        'fast_path_accuracy': 'Acurácia rápida / ensemble',
+        'fast_path_enabled': 'Habilitado para predições com meta de latência',
+        'fast_path_disabled': 'Desabilitado: abaixo da fidelidade mínima na validação',
     },
     'en': {
         'page_title': 'Exoplanet Detection with AI',
@@ -248,6 +325,75 @@ TRANSLATIONS = {
         'required_columns': 'Required Columns',
         'tip': 'Tip',
         'classifications': 'Classifications',
+        'session_model': 'Session model',
+        'promote_model': 'Promote model for everyone',
+        'model_promoted': 'Model promoted',
+        'training_job': 'Background training',
+        'job_queued': 'Queued',
+        'cancel_job': 'Cancel training',
+        'job_cancelled': 'Training cancelled.',
+        'job_result_unavailable': 'This training result was already applied or has expired; upload the data again to retrain',
+        'sort_by': 'Sort by',
+        'sort_order': 'Order',
+        'ascending': 'Ascending',
+        'descending': 'Descending',
+        'page_size': 'Rows per page',
+        'page': 'Page',
+        'table_rows': 'Rows {start}–{end} of {total} · page {page} of {pages}',
+        'no_model_metrics': 'No trained model yet - upload data in the sidebar to see real metrics',
+        'pipeline_version': 'Pipeline',
+        'cost_vs_quality': 'Cost vs Quality',
+        'fit_time_label': 'Fit (s)',
+        'latency_1k_label': 'Latency (ms/1k rows)',
+        'model_size_label': 'Size (MB)',
+        'cv_label': 'CV (mean ± std)',
+        'per_class_metrics': 'Per-class metrics',
+        'confusion_matrix': 'Confusion matrix',
+        'predicted_label': 'Predicted',
+        'true_label': 'True',
+        'support_label': 'Support',
+        'history_window': 'Window',
+        'no_accuracy_history': 'No training runs recorded in this window',
+        'section': 'Section',
+        'debug_timings': '⏱️ Debug: rerun timings',
+        'rerun_timings': 'Last rerun timings',
+        'rerun_over_budget': 'Rerun took {total:.0f} ms (budget: {budget} ms)',
+        'rerun_within_budget': 'Rerun in {total:.0f} ms (budget: {budget} ms)',
+        'pipeline_stages': 'Pipeline stages',
+        'no_pipeline_stages': 'No stage has run in this process yet',
+        'degradation_chunked_read': 'File too large for the available memory: read in chunks of {chunk_rows} rows as float32',
+        'degradation_sampled_read': 'Even the chunked read does not fit in memory: kept a random sample of {fraction:.0%} of the rows',
+        'degradation_shallow_copy': 'Data adapted without a full copy to save memory',
+        'degradation_class_weights': 'SMOTE replaced by class weights to fit in memory',
+        'degradation_subsampled_cv': 'Cross-validation on a stratified sample of {rows} of {of} rows',
+        'degradation_bounded_forest': 'Random Forest using {max_samples:.0%} of the rows per tree',
+        'degradation_subsampled_training': 'Training on a stratified sample of {rows} of {of} rows',
+        'memory_report': 'Memory per training stage',
+        'permutation_importance': 'Permutation Importance',
+        'permutation_importance_help': 'Accuracy drop when each feature is shuffled, measured on the same sample for every model (comparable across them).',
+        'compute_permutation': 'Compute importance',
+        'no_labeled_data': 'Load labeled data (koi_disposition) to compute the importance.',
+        'accuracy_drop': 'Accuracy drop',
+        'object_explanation': '🔬 Per-Object Explanation',
+        'explain_object': 'Object',
+        'explain_class': 'Explained class',
+        'contribution_label': 'Contribution',
+        'explanation_margin': 'TreeSHAP contributions on the model margin (log-odds). Base:',
+        'explanation_probability': 'Decision-path contributions of the trees, in probability. Base:',
+        'explanation_options_limit': 'Showing the first filtered objects:',
+        'similar_objects': '🪐 Similar Objects',
+        'similar_objects_help': 'Nearest neighbors in the standardized (StandardScaler) space of period, duration, depth, radius, temperature, insolation and impact parameter',
+        'similar_object': 'Reference object',
+        'similar_count': 'Number of neighbors',
+        'similar_dispositions': 'Neighbor dispositions',
+        'similarity_distance': 'Distance',
+        'no_similar_objects': 'No similar objects with these dispositions',
+        'fast_path': '⚡ Distilled Fast Path',
+        'fast_path_agreement': 'Agreement with ensemble',
+        'fast_path_speedup': 'Speedup (1 object)',
+        'fast_path_accuracy': 'Fast / ensemble accuracy',
+        'fast_path_enabled': 'Enabled for predictions with a latency target',
+        'fast_path_disabled': 'Disabled: below the minimum validation fidelity',
     },
     'es': {
         'page_title': 'Detección de Exoplanetas con IA',
@@ -359,6 +505,75 @@ TRANSLATIONS = {
         'required_columns': 'Columnas Requeridas',
         'tip': 'Consejo',
         'classifications': 'Clasificaciones',
+        'session_model': 'Modelo de la sesión',
+        'promote_model': 'Promover modelo para todos',
+        'model_promoted': 'Modelo promovido',
+        'training_job': 'Entrenamiento en segundo plano',
+        'job_queued': 'En cola',
+        'cancel_job': 'Cancelar entrenamiento',
+        'job_cancelled': 'Entrenamiento cancelado.',
+        'job_result_unavailable': 'El resultado de este entrenamiento ya fue aplicado o expiró; envíe los datos de nuevo para entrenar',
+        'sort_by': 'Ordenar por',
+        'sort_order': 'Orden',
+        'ascending': 'Ascendente',
+        'descending': 'Descendente',
+        'page_size': 'Filas por página',
+        'page': 'Página',
+        'table_rows': 'Filas {start}–{end} de {total} · página {page} de {pages}',
+        'no_model_metrics': 'Ningún modelo entrenado aún - cargue datos en la barra lateral para ver métricas reales',
+        'pipeline_version': 'Pipeline',
+        'cost_vs_quality': 'Costo vs Calidad',
+        'fit_time_label': 'Entrenamiento (s)',
+        'latency_1k_label': 'Latencia (ms/1k filas)',
+        'model_size_label': 'Tamaño (MB)',
+        'cv_label': 'CV (media ± desv.)',
+        'per_class_metrics': 'Métricas por clase',
+        'confusion_matrix': 'Matriz de confusión',
+        'predicted_label': 'Predicho',
+        'true_label': 'Real',
+        'support_label': 'Soporte',
+        'history_window': 'Ventana',
+        'no_accuracy_history': 'Ningún entrenamiento registrado en esta ventana',
+        'section': 'Sección',
+        'debug_timings': '⏱️ Depuración: tiempos del rerun',
+        'rerun_timings': 'Tiempos del último rerun',
+        'rerun_over_budget': 'El rerun tardó {total:.0f} ms (presupuesto: {budget} ms)',
+        'rerun_within_budget': 'Rerun en {total:.0f} ms (presupuesto: {budget} ms)',
+        'pipeline_stages': 'Etapas del pipeline',
+        'no_pipeline_stages': 'Ninguna etapa se ejecutó en este proceso todavía',
+        'degradation_chunked_read': 'Archivo demasiado grande para la memoria disponible: leído en bloques de {chunk_rows} filas con float32',
+        'degradation_sampled_read': 'Ni la lectura en bloques cabe en la memoria: se mantuvo una muestra aleatoria del {fraction:.0%} de las filas',
+        'degradation_shallow_copy': 'Datos adaptados sin copia completa para ahorrar memoria',
+        'degradation_class_weights': 'SMOTE reemplazado por pesos de clase para caber en memoria',
+        'degradation_subsampled_cv': 'Validación cruzada en una muestra estratificada de {rows} de {of} filas',
+        'degradation_bounded_forest': 'Random Forest con {max_samples:.0%} de las filas por árbol',
+        'degradation_subsampled_training': 'Entrenamiento en una muestra estratificada de {rows} de {of} filas',
+        'memory_report': 'Memoria por etapa del entrenamiento',
+        'permutation_importance': 'Importancia por Permutación',
+        'permutation_importance_help': 'Caída de precisión al mezclar cada característica, medida en la misma muestra para todos los modelos (comparable entre ellos).',
+        'compute_permutation': 'Calcular importancia',
+        'no_labeled_data': 'Cargue datos etiquetados (koi_disposition) para calcular la importancia.',
+        'accuracy_drop': 'Caída de precisión',
+        'object_explanation': '🔬 Explicación por Objeto',
+        'explain_object': 'Objeto',
+        'explain_class': 'Clase explicada',
+        'contribution_label': 'Contribución',
+        'explanation_margin': 'Contribuciones TreeSHAP en el margen del modelo (log-odds). Base:',
+        'explanation_probability': 'Contribuciones por el camino de decisión de los árboles, en probabilidad. Base:',
+        'explanation_options_limit': 'Mostrando los primeros objetos filtrados:',
+        'similar_objects': '🪐 Objetos Similares',
+        'similar_objects_help': 'Vecinos más cercanos en el espacio estandarizado (StandardScaler) de período, duración, profundidad, radio, temperatura, insolación y parámetro de impacto',
+        'similar_object': 'Objeto de referencia',
+        'similar_count': 'Número de vecinos',
+        'similar_dispositions': 'Clasificaciones de los vecinos',
+        'similarity_distance': 'Distancia',
+        'no_similar_objects': 'Ningún objeto similar con esas clasificaciones',
+        'fast_path': '⚡ Camino Rápido Destilado',
+        'fast_path_agreement': 'Concordancia con el ensemble',
+        'fast_path_speedup': 'Aceleración (1 objeto)',
+        'fast_path_accuracy': 'Precisión rápida / ensemble',
+        'fast_path_enabled': 'Habilitado para predicciones con meta de latencia',
+        'fast_path_disabled': 'Deshabilitado: por debajo de la fidelidad mínima en validación',
     }
 }
 
@@ -366,8 +581,37 @@ def get_translation(key, lang='pt'):
     """Retorna a tradução para a chave especificada"""
     return TRANSLATIONS.get(lang, TRANSLATIONS['pt']).get(key, key)
 
-def safe_read_file(uploaded_file, selected_language):
-    """Lê arquivo de forma segura com tratamento de erros"""
+def uploaded_file_size(uploaded_file):
+    """Tamanho em bytes de um arquivo enviado (UploadedFile ou arquivo aberto)"""
+    size = getattr(uploaded_file, 'size', None)
+    if size is None:
+        position = uploaded_file.tell()
+        size = uploaded_file.seek(0, os.SEEK_END)
+        uploaded_file.seek(position)
+    return size
+
+def read_csv_in_chunks(uploaded_file, encoding, chunksize=CSV_CHUNK_ROWS, sample_fraction=1.0, seed=42):
+    """Lê um CSV em blocos, convertendo colunas float64 para float32 a cada bloco
+    
+    Com `sample_fraction` < 1 cada bloco é amostrado antes de ser guardado, então
+    só a amostra (e não o arquivo inteiro) fica em memória até o concat final.
+    """
+    rng = np.random.default_rng(seed)
+    chunks = []
+    for chunk in pd.read_csv(uploaded_file, encoding=encoding, comment='#', skip_blank_lines=True, chunksize=chunksize):
+        if sample_fraction < 1.0:
+            chunk = chunk[rng.random(len(chunk)) < sample_fraction]
+        floats = chunk.select_dtypes('float64').columns
+        chunks.append(chunk.astype({column: 'float32' for column in floats}))
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+@trace_stage('safe_read_file')
+def safe_read_file(uploaded_file, selected_language, memory_budget=None):
+    """Lê arquivo de forma segura com tratamento de erros
+    
+    Com `memory_budget`, um CSV que não cabe na folga é lido em blocos (float32)
+    e, se nem assim couber, em uma amostra de cada bloco (ver plan_csv_read).
+    """
     try:
         # Verificar tipo de arquivo
         if uploaded_file.name.endswith('.csv'):
@@ -375,10 +619,22 @@ def safe_read_file(uploaded_file, selected_language):
             encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
             df = None
             
+            # Arquivo grande demais para a leitura completa: leitura em blocos (amostrados se preciso)
+            read_plan = {'chunked': False, 'sample_fraction': 1.0}
+            if memory_budget is not None:
+                read_plan = plan_csv_read(memory_budget, uploaded_file_size(uploaded_file))
+            
             for encoding in encodings:
                 try:
                     uploaded_file.seek(0)  # Reset file pointer
                     
+                    if read_plan['chunked']:
+                        df = read_csv_in_chunks(uploaded_file, encoding, sample_fraction=read_plan['sample_fraction'])
+                        if df.empty:
+                            df = None
+                            continue
+                        break
+                    
                     # Ler arquivo linha por linha para detectar problemas
                     lines = []
                     for line in uploaded_file:
@@ -473,11 +729,29 @@ def validate_dataframe(df, selected_language):
     except Exception as e:
         return False, f"Erro na validação: {str(e)}"
 
-def adapt_dataframe_for_ml(df):
+def disposition_thirds(n_samples, shuffle=True):
+    """Rótulos CONFIRMED/CANDIDATE/FALSE POSITIVE em terços (vetorizado; embaralhados por padrão)"""
+    if shuffle:
+        counts = [n_samples // 3, n_samples // 3, n_samples - 2 * (n_samples // 3)]
+    else:
+        counts = [n_samples // 3, 2 * n_samples // 3 - n_samples // 3, n_samples - 2 * n_samples // 3]
+    dispositions = np.repeat(np.array(['CONFIRMED', 'CANDIDATE', 'FALSE POSITIVE'], dtype=object), counts)
+    if shuffle:
+        np.random.shuffle(dispositions)
+    return dispositions
+
+@trace_stage('adapt_dataframe_for_ml')
+def adapt_dataframe_for_ml(df, memory_budget=None):
     """Adapta DataFrame para formato compatível com ML"""
     try:
-        # Criar uma cópia para não modificar o original
-        adapted_df = df.copy()
+        # Criar uma cópia para não modificar o original; sem folga para duplicar os
+        # dados, a cópia rasa basta (aqui só se atribuem colunas inteiras)
+        estimate = df.memory_usage(index=True).sum()
+        if memory_budget is not None and not memory_budget.allows(estimate):
+            memory_budget.degrade('adapt_dataframe_for_ml', 'shallow_copy', estimate)
+            adapted_df = df.copy(deep=False)
+        else:
+            adapted_df = df.copy()
         
         # Detectar tipo de arquivo e adaptar colunas
         if 'pl_name' in df.columns and 'ml_' in ' '.join(df.columns):
@@ -519,20 +793,10 @@ def adapt_dataframe_for_ml(df):
             # Usar dados reais para criar classificação mais realista
             if 'ml_modeldef' in df.columns:
                 # Baseado em ml_modeldef, mas garantir múltiplas classes
-                dispositions = []
-                for i, modeldef in enumerate(adapted_df['ml_modeldef']):
-                    if i < n_samples//3:
-                        dispositions.append('CONFIRMED')
-                    elif i < 2*n_samples//3:
-                        dispositions.append('CANDIDATE')
-                    else:
-                        dispositions.append('FALSE POSITIVE')
-                adapted_df['koi_disposition'] = dispositions
+                adapted_df['koi_disposition'] = disposition_thirds(n_samples, shuffle=False)
             else:
                 # Classificação balanceada
-                dispositions = ['CONFIRMED'] * (n_samples//3) + ['CANDIDATE'] * (n_samples//3) + ['FALSE POSITIVE'] * (n_samples - 2*(n_samples//3))
-                np.random.shuffle(dispositions)
-                adapted_df['koi_disposition'] = dispositions
+                adapted_df['koi_disposition'] = disposition_thirds(n_samples)
         
         elif 'koi_name' in df.columns:
             # Arquivo Kepler - já está no formato correto
@@ -559,9 +823,7 @@ def adapt_dataframe_for_ml(df):
             # Adicionar colunas faltantes com valores simulados
             if 'koi_disposition' not in df.columns:
                 n_samples = len(df)
-                dispositions = ['CONFIRMED'] * (n_samples//3) + ['CANDIDATE'] * (n_samples//3) + ['FALSE POSITIVE'] * (n_samples - 2*(n_samples//3))
-                np.random.shuffle(dispositions)
-                adapted_df['koi_disposition'] = dispositions
+                adapted_df['koi_disposition'] = disposition_thirds(n_samples)
         
         # Garantir que todas as colunas necessárias existem
         required_columns = ['koi_name', 'koi_period', 'koi_depth', 'koi_duration', 'koi_prad', 'koi_teq', 'koi_insol', 'koi_impact', 'koi_disposition']
@@ -569,7 +831,7 @@ def adapt_dataframe_for_ml(df):
         for col in required_columns:
             if col not in adapted_df.columns:
                 if col == 'koi_name':
-                    adapted_df[col] = [f'PLANET-{i+1:03d}' for i in range(len(df))]
+                    adapted_df[col] = 'PLANET-' + pd.Series(np.arange(1, len(df) + 1), index=adapted_df.index).astype(str).str.zfill(3)
                 elif col == 'koi_period':
                     adapted_df[col] = np.random.uniform(1.0, 10.0, len(df))
                 elif col == 'koi_depth':
@@ -586,26 +848,22 @@ def adapt_dataframe_for_ml(df):
                     adapted_df[col] = np.random.uniform(0.0, 1.0, len(df))
                 elif col == 'koi_disposition':
                     n_samples = len(df)
-                    dispositions = ['CONFIRMED'] * (n_samples//3) + ['CANDIDATE'] * (n_samples//3) + ['FALSE POSITIVE'] * (n_samples - 2*(n_samples//3))
-                    np.random.shuffle(dispositions)
-                    adapted_df[col] = dispositions
+                    adapted_df[col] = disposition_thirds(n_samples)
         
         return adapted_df, None
         
     except Exception as e:
         return None, f"Erro na adaptação dos dados: {str(e)}"
 
-def process_uploaded_data(df, selected_language):
-    """Processa dados carregados de forma segura"""
+def process_uploaded_data(df, selected_language, memory_budget=None):
+    """Valida os dados carregados e envia o treinamento para segundo plano"""
     try:
-        detector = initialize_detector()
-        
         # Verificar se há dados suficientes para treinamento
         if len(df) < 6:
             return None, f"Dados insuficientes para treinamento. Necessário pelo menos 6 amostras, encontradas {len(df)}."
         
         # Adaptar dados para formato compatível com ML
-        adapted_df, adapt_error = adapt_dataframe_for_ml(df)
+        adapted_df, adapt_error = adapt_dataframe_for_ml(df, memory_budget)
         
         if adapt_error:
             return None, f"Erro na adaptação dos dados: {adapt_error}"
@@ -617,38 +875,107 @@ def process_uploaded_data(df, selected_language):
             if min_samples < 2:
                 return None, f"Classes desbalanceadas. Classe menos frequente tem apenas {min_samples} amostra(s). Necessário pelo menos 2 por classe."
         
-        # Preparar dados para processamento
-        processed_df, features = detector.preprocess_data(adapted_df)
-        
-        if processed_df.empty:
-            return None, "Dados processados estão vazios. Verifique o formato dos dados."
-        
-        # Treinar modelos
-        results = detector.train_models(processed_df, features)
-        
-        if not results:
-            return None, "Falha ao treinar modelos. Verifique se os dados são adequados."
-        
-        # Garantir que results é um dicionário
-        if isinstance(results, tuple):
-            # Se for tupla, converter para dicionário simples
-            results_dict = {
-                'Random Forest': {'accuracy': 0.85},
-                'XGBoost': {'accuracy': 0.87},
-                'LightGBM': {'accuracy': 0.86}
-            }
-            results = results_dict
+        # Treinar em processo separado; o id do job vai para a URL para sobreviver a um refresh
+        job_id = get_job_manager().submit(adapted_df, metadata={'filename': st.session_state.get('uploaded_filename')})
+        st.session_state['training_job'] = job_id
+        st.experimental_set_query_params(job=job_id)
         
-        # Salvar dados processados na sessão
-        st.session_state['processed_data'] = processed_df
-        st.session_state['features'] = features
-        st.session_state['adapted_data'] = adapted_df  # Salvar dados adaptados também
-        
-        return results, None
+        return job_id, None
         
     except Exception as e:
         return None, f"Erro no processamento: {str(e)}"
 
+def apply_training_result(job_id):
+    """Leva o resultado de um job concluído para a sessão"""
+    result = get_job_manager().result(job_id)
+    if result is None:
+        return False
+    
+    get_session_models().adopt(result['detector'])
+    
+    # Salvar dados processados na sessão
+    st.session_state['processed_data'] = result['processed_df']
+    st.session_state['features'] = result['features']
+    st.session_state['adapted_data'] = result['adapted_df']  # Salvar dados adaptados também
+    st.session_state['adapted_fingerprint'] = dataset_fingerprint(result['adapted_df'])
+    st.session_state.pop('filter_result', None)
+    st.session_state['analysis_results'] = result['results']
+    st.session_state['training_report'] = result['detector'].training_report
+    st.session_state['applied_training_job'] = job_id
+    
+    return True
+
+def render_memory_degradations(degradations, selected_language):
+    """Avisa quais degradações o orçamento de memória aplicou"""
+    for degradation in degradations:
+        message = get_translation(f"degradation_{degradation['kind']}", selected_language)
+        st.warning(
+            f"🧠 {message.format(**degradation['detail'])} "
+            f"({degradation['estimated_mb']:.0f} MB > {degradation['headroom_mb']:.0f} MB)"
+        )
+
+def render_training_job(selected_language):
+    """Mostra o job de treinamento da sessão; retorna True enquanto ele estiver ativo"""
+    job_id = st.session_state.get('training_job')
+    if not job_id:
+        return False
+    
+    manager = get_job_manager()
+    status = manager.status(job_id)
+    if status is None:
+        # Job desconhecido (ex.: servidor reiniciado)
+        del st.session_state['training_job']
+        st.experimental_set_query_params()
+        return False
+    
+    st.subheader(get_translation("training_job", selected_language))
+    st.caption(job_id)
+    
+    if status['state'] in ('queued', 'running'):
+        stage = get_translation("job_queued", selected_language) if status['state'] == 'queued' else status['stage']
+        st.progress(status['progress'], text=stage)
+        for model_name, metrics in status['partial_metrics'].items():
+            st.write(f"- {model_name}: {metrics['accuracy']:.3f}")
+        if st.button(get_translation("cancel_job", selected_language)):
+            manager.cancel(job_id)
+            st.rerun()
+        return True
+    
+    if status['state'] == 'completed':
+        if st.session_state.get('applied_training_job') != job_id and not apply_training_result(job_id):
+            # Resultado já entregue a outra sessão (ex.: página recarregada) ou expirado
+            st.warning(get_translation("job_result_unavailable", selected_language))
+            del st.session_state['training_job']
+            st.experimental_set_query_params()
+            return False
+        st.success(get_translation("analysis_complete", selected_language))
+        
+        # Mostrar dados adaptados
+        if 'adapted_data' in st.session_state:
+            st.write("**📊 Dados Adaptados para ML:**")
+            st.dataframe(st.session_state['adapted_data'].head())
+        
+        # Mostrar resultados
+        st.write(f"**{get_translation('analysis_results', selected_language)}:**")
+        for model_name, result in st.session_state.get('analysis_results', {}).items():
+            st.write(f"- {model_name}: {result['accuracy']:.3f}")
+        st.write(f"- Dados processados: {len(st.session_state.get('processed_data', []))} amostras")
+        st.write(f"- Features utilizadas: {len(st.session_state.get('features', []))}")
+        
+        # Degradações aplicadas pelo orçamento de memória e pico por etapa
+        training_report = st.session_state.get('training_report', {})
+        render_memory_degradations(training_report.get('degradations', []), selected_language)
+        if training_report.get('stages'):
+            with st.expander(get_translation("memory_report", selected_language)):
+                st.dataframe(pd.DataFrame(training_report['stages']), hide_index=True)
+    elif status['state'] == 'failed':
+        st.error(f"❌ **Erro na análise:** {status['error']}")
+        st.info("💡 **Sugestão:** Verifique se os dados estão no formato correto e tente novamente")
+    else:
+        st.warning(f"{get_translation('job_cancelled', selected_language)} {status['error'] or ''}")
+    
+    return False
+
 def clear_all_data():
     """Limpa todos os dados simulados e cache"""
     # Lista completa de chaves para limpar
@@ -656,7 +983,9 @@ def clear_all_data():
         'real_time_data', 'uploaded_data', 'confirm_reset',
         'upload_file', 'analysis_results', 'prediction_data',
         'model_results', 'data_processed', 'uploaded_filename',
-        'processed_data', 'features', 'detector_model'
+        'processed_data', 'features', 'detector_model',
+        'training_job', 'applied_training_job', 'training_job_running',
+        'nasa_refresh', 'refresh_running', 'training_report'
     ]
     
     # Limpar chaves específicas
@@ -671,6 +1000,8 @@ def clear_all_data():
             if key not in ['selected_language', 'status']:  # Manter configurações importantes
                 del st.session_state[key]
     
+    st.experimental_set_query_params()
+    
     # Forçar limpeza do cache de dados simulados
     if hasattr(st, 'cache_data'):
         st.cache_data.clear()
@@ -704,10 +1035,6 @@ st.set_page_config(
 
 # Obter idioma selecionado (será movido para sidebar)
 
-@st.cache_resource
-def initialize_detector():
-    return ExoplanetDetector()
-
 # CSS customizado com fundo estrelado
 st.markdown("""
 <style>
@@ -789,10 +1116,588 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 @st.cache_resource
+def get_job_manager():
+    """Fila de treinamentos em segundo plano compartilhada pelo servidor"""
+    return TrainingJobManager()
+
+@st.cache_resource
+def get_model_registry():
+    """Registro de modelos compartilhado por todas as sessões (somente leitura)"""
+    registry = ModelRegistry()
+    # Reutiliza o pipeline promovido para não precisar retreinar após reinício
+    registry.load_active()
+    return registry
+
+def get_session_models():
+    """Handle de modelos da sessão atual; treinos ficam isolados nele"""
+    if 'model_handle' not in st.session_state:
+        st.session_state['model_handle'] = SessionModelHandle(get_model_registry())
+    return st.session_state['model_handle']
+
 def initialize_detector():
-    return ExoplanetDetector()
+    """Detector visto pela sessão: o treinado nela ou o promovido no registro"""
+    return get_session_models().current or ExoplanetDetector()
+
+# Cache de figuras: cada gráfico é construído uma vez por (impressão digital dos dados, idioma)
+# e reutilizado entre reruns e sessões. As figuras cacheadas são compartilhadas, então são
+# tratadas como somente leitura. Argumentos com "_" não entram na chave do cache.
+FIGURE_CACHE_ENTRIES = 64
+
+# Nomes de planetas reais usados nas amostras do gráfico de hyperparâmetros
+HYPERPARAMETER_PLANET_NAMES = [
+    "Kepler-452b", "Kepler-186f", "Kepler-442b", "Kepler-62f", "Kepler-296f",
+    "Kepler-438b", "Kepler-440b", "Kepler-1229b", "Kepler-1544b", "Kepler-1638b",
+    "Kepler-1649c", "Kepler-1652b", "Kepler-1653b", "Kepler-1701b", "Kepler-1726b",
+    "Kepler-1749b", "Kepler-1755b", "Kepler-1776b", "Kepler-1781b", "Kepler-1783b",
+    "Kepler-1785b", "Kepler-1787b", "Kepler-1789b", "Kepler-1791b", "Kepler-1793b",
+    "Kepler-1795b", "Kepler-1797b", "Kepler-1799b", "Kepler-1801b", "Kepler-1803b",
+    "Kepler-1805b", "Kepler-1807b", "Kepler-1809b", "Kepler-1811b", "Kepler-1813b",
+    "Kepler-1815b", "Kepler-1817b", "Kepler-1819b", "Kepler-1821b", "Kepler-1823b",
+    "Kepler-1825b", "Kepler-1827b", "Kepler-1829b", "Kepler-1831b", "Kepler-1833b",
+    "Kepler-1835b", "Kepler-1837b", "Kepler-1839b", "Kepler-1841b", "Kepler-1843b"
+]
+
+# Janelas do histórico de acurácia (segundos)
+ACCURACY_WINDOWS = {'24h': 24 * 3600, '7d': 7 * 24 * 3600, '30d': 30 * 24 * 3600, '180d': 180 * 24 * 3600}
+MODEL_COLORS = {'Random Forest': '#2a9d8f', 'XGBoost': '#e76f51', 'LightGBM': '#e9c46a'}
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_accuracy_history(window_seconds, store_version, minute):
+    """Acurácia dos treinos na janela, reamostrada no SQLite
+    
+    Cacheada pela versão do store (muda a cada evento gravado) e pelo minuto atual.
+    """
+    end = time.time()
+    return get_metrics_store().query('training', 'accuracy', start=end - window_seconds, end=end, max_points=200)
+
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def build_accuracy_figure(fingerprint, lang, _history):
+    """Gráfico de acurácia ao longo do tempo, uma linha por modelo"""
+    fig_accuracy = go.Figure()
+    for model_name, series in _history.groupby('model', sort=False):
+        fig_accuracy.add_trace(go.Scatter(
+            x=series['timestamp'],
+            y=series['mean'],
+            mode='lines+markers',
+            name=model_name,
+            line=dict(color=MODEL_COLORS.get(model_name), width=3),
+            customdata=np.column_stack((series['min'], series['max'], series['count'])),
+            hovertemplate='%{y:.3f} (%{customdata[0]:.3f}-%{customdata[1]:.3f}, n=%{customdata[2]})<extra></extra>'
+        ))
+    
+    fig_accuracy.update_layout(
+        title=get_translation("accuracy_evolution", lang),
+        xaxis_title=get_translation("time", lang),
+        yaxis_title=get_translation("accuracy", lang),
+        height=350
+    )
+    return fig_accuracy
+
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def build_pie_figure(values, lang):
+    """Gráfico de pizza da distribuição das classificações"""
+    labels = [get_translation("confirmed", lang), get_translation("candidate", lang), get_translation("false_positive", lang)]
+    
+    # Cores planetárias: Terra (azul), Marte (vermelho), Netuno (azul escuro)
+    planet_colors = ['#4169E1', '#FF4500', '#1E90FF']  # Terra, Marte, Netuno
+    
+    fig_pie = go.Figure(data=[go.Pie(
+        labels=labels, 
+        values=list(values),
+        marker=dict(colors=planet_colors),
+        textinfo='label+percent',
+        textfont_size=12,
+        hovertemplate='<b>%{label}</b><br>' +
+                     'Quantidade: %{value}<br>' +
+                     'Percentual: %{percent}<br>' +
+                     '<extra></extra>'
+    )])
+    
+    fig_pie.update_layout(
+        height=350,
+        showlegend=True,
+        legend=dict(
+            orientation="v",
+            yanchor="middle",
+            y=0.5,
+            xanchor="left",
+            x=1.01
+        ),
+        title=dict(
+            text=get_translation("exoplanet_classification", lang),
+            font=dict(size=16, color='#2E8B57')
+        )
+    )
+    return fig_pie
+
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def build_hyperparameter_figure(lang):
+    """Paisagem de hyperparâmetros do Random Forest (interpolação cúbica em grid 30x30)"""
+    # Semente fixa local: a figura só depende do idioma
+    rng = np.random.RandomState(42)
+    n_samples = 50  # Reduzido de 100 para 50
+    
+    # Hyperparâmetros reais do Random Forest
+    n_estimators = rng.uniform(50, 200, n_samples)  # Número de árvores
+    max_depth = rng.uniform(3, 20, n_samples)       # Profundidade máxima
+    
+    # Função objetivo realista baseada em performance de Random Forest
+    def rf_objective_function(n_est, max_dep):
+        # Simula curva de performance real do Random Forest
+        # Mais árvores geralmente melhoram até certo ponto
+        # Profundidade muito alta pode causar overfitting
+        trees_score = 1 - np.exp(-n_est/100)  # Melhora com mais árvores
+        depth_penalty = np.exp(-(max_dep-10)**2/50)  # Penalty para profundidade extrema
+        noise = rng.normal(0, 0.05, len(n_est))  # Ruído realista
+        
+        return trees_score * depth_penalty + noise
+    
+    # Normalizar para escala 0-1
+    n_est_norm = (n_estimators - n_estimators.min()) / (n_estimators.max() - n_estimators.min())
+    max_dep_norm = (max_depth - max_depth.min()) / (max_depth.max() - max_depth.min())
+    
+    z = rf_objective_function(n_estimators, max_depth)
+    
+    # Criar gráfico de contorno com pontos
+    fig_hyperparams = go.Figure()
+    
+    # Adicionar contornos
+    x_grid = np.linspace(0, 1, 30)  # Reduzido de 50 para 30
+    y_grid = np.linspace(0, 1, 30)  # Reduzido de 50 para 30
+    X, Y = np.meshgrid(x_grid, y_grid)
+    
+    # Interpolar valores para o grid
+    Z = griddata((n_est_norm, max_dep_norm), z, (X, Y), method='cubic')
+    
+    fig_hyperparams.add_trace(go.Contour(
+        x=x_grid,
+        y=y_grid,
+        z=Z,
+        colorscale='RdYlBu',
+        showscale=True,
+        opacity=0.7,
+        name=get_translation("objective_function", lang)
+    ))
+    
+    # Adicionar pontos de amostragem
+    fig_hyperparams.add_trace(go.Scatter(
+        x=n_est_norm,
+        y=max_dep_norm,
+        mode='markers',
+        marker=dict(
+            size=6,  # Reduzido de 8 para 6
+            color='black',
+            symbol='x',
+            line=dict(width=1, color='white')
+        ),
+        name=get_translation("samples", lang),
+        hovertemplate='<b>%{customdata[0]}</b><br>' +
+                     'N_Estimators: %{customdata[1]:.0f}<br>' +
+                     'Max_Depth: %{customdata[2]:.1f}<br>' +
+                     'Score: %{customdata[3]:.3f}<br>' +
+                     '<extra></extra>',
+        customdata=np.column_stack((HYPERPARAMETER_PLANET_NAMES[:n_samples], n_estimators, max_depth, z))
+    ))
+    
+    fig_hyperparams.update_layout(
+        title=get_translation("hyperparameter_landscape", lang),
+        xaxis_title=get_translation("n_estimators", lang),
+        yaxis_title=get_translation("max_depth", lang),
+        width=600,  # Reduzido de 800 para 600
+        height=450,  # Reduzido de 600 para 450
+        xaxis=dict(range=[-0.05, 1.05]),
+        yaxis=dict(range=[-0.05, 1.05]),
+        showlegend=True
+    )
+    return fig_hyperparams
+
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def build_comparison_figure(fingerprint, lang, _models, _scores):
+    """Barras comparativas das métricas por modelo"""
+    colors = {
+        "accuracy_label": '#667eea',
+        "precision_label": '#764ba2',
+        "recall_label": '#f093fb',
+        "f1_score_label": '#f5576c',
+    }
+    fig_comparison = go.Figure()
+    for label_key, values in _scores.items():
+        fig_comparison.add_trace(go.Bar(name=get_translation(label_key, lang), x=list(_models), y=list(values), marker_color=colors.get(label_key)))
+    
+    fig_comparison.update_layout(
+        title=get_translation("model_comparison", lang),
+        xaxis_title=get_translation("models_label", lang),
+        yaxis_title=get_translation("score_label", lang),
+        barmode='group',
+        height=400
+    )
+    return fig_comparison
+
+# Colunas resumidas no bloco "Estatísticas dos Dados Filtrados"
+STATISTICS_COLUMNS = ['koi_period', 'koi_prad', 'koi_teq', 'koi_depth']
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def build_filter_index(fingerprint, _df):
+    """Índice de filtros compartilhado por dados com a mesma impressão digital"""
+    return FilterIndex(_df, fingerprint=fingerprint)
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def build_filter_statistics(fingerprint, _index):
+    """Estágio de estatísticas compartilhado pelo mesmo índice de filtros"""
+    return FilterStatistics(_index, STATISTICS_COLUMNS)
+
+def get_filter_statistics():
+    """Estatísticas incrementais dos dados adaptados da sessão"""
+    filter_index = get_filter_index()
+    return build_filter_statistics(filter_index.fingerprint, filter_index)
+
+def get_filter_index():
+    """Índice de filtros dos dados adaptados da sessão"""
+    if 'adapted_fingerprint' not in st.session_state:
+        st.session_state['adapted_fingerprint'] = dataset_fingerprint(st.session_state['adapted_data'])
+    return build_filter_index(st.session_state['adapted_fingerprint'], st.session_state['adapted_data'])
+
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def build_confusion_figure(fingerprint, lang, _labels, _matrix):
+    """Mapa de calor da matriz de confusão de um modelo"""
+    fig_confusion = px.imshow(
+        np.asarray(_matrix),
+        x=list(_labels),
+        y=list(_labels),
+        text_auto=True,
+        color_continuous_scale='Blues',
+        labels=dict(x=get_translation("predicted_label", lang), y=get_translation("true_label", lang))
+    )
+    fig_confusion.update_layout(title=get_translation("confusion_matrix", lang), height=350)
+    return fig_confusion
+
+def render_model_performance(detector, selected_language):
+    """Aba de performance com as métricas reais salvas no pipeline"""
+    performance = {name: metrics for name, metrics in detector.model_performance.items() if 'macro_f1' in metrics}
+    if not performance:
+        st.info(get_translation("no_model_metrics", selected_language))
+        return
+    
+    models = list(performance)
+    st.caption(f"{get_translation('pipeline_version', selected_language)} {detector.model_version}")
+    
+    # Métricas por modelo (médias macro entre as classes)
+    for column, name in zip(st.columns(len(models)), models):
+        metrics = performance[name]
+        with column:
+            st.subheader(name)
+            st.metric(get_translation("accuracy_label", selected_language), f"{metrics['accuracy']:.1%}")
+            st.metric(get_translation("precision_label", selected_language), f"{metrics['macro_precision']:.1%}")
+            st.metric(get_translation("recall_label", selected_language), f"{metrics['macro_recall']:.1%}")
+            st.metric(get_translation("f1_score_label", selected_language), f"{metrics['macro_f1']:.1%}")
+    
+    # Gráfico comparativo
+    scores = {
+        "accuracy_label": tuple(performance[name]['accuracy'] for name in models),
+        "precision_label": tuple(performance[name]['macro_precision'] for name in models),
+        "recall_label": tuple(performance[name]['macro_recall'] for name in models),
+        "f1_score_label": tuple(performance[name]['macro_f1'] for name in models),
+    }
+    fig_comparison = build_comparison_figure(dataset_fingerprint(detector.model_version, models, scores), selected_language, models, scores)
+    st.plotly_chart(fig_comparison, use_container_width=True)
+    
+    # Custo de cada modelo frente à qualidade
+    st.subheader(get_translation("cost_vs_quality", selected_language))
+    st.dataframe(pd.DataFrame([
+        {
+            get_translation("models_label", selected_language): name,
+            get_translation("accuracy_label", selected_language): round(performance[name]['accuracy'], 4),
+            get_translation("f1_score_label", selected_language): round(performance[name]['macro_f1'], 4),
+            get_translation("cv_label", selected_language): f"{performance[name]['cross_val_mean']:.3f} ± {performance[name]['cross_val_std']:.3f}",
+            get_translation("fit_time_label", selected_language): round(performance[name]['fit_seconds'], 2),
+            get_translation("latency_1k_label", selected_language): round(performance[name]['predict_ms_per_1k'], 2),
+            get_translation("model_size_label", selected_language): round(performance[name]['model_size_bytes'] / 1024 ** 2, 2),
+        }
+        for name in models
+    ]), use_container_width=True, hide_index=True)
+    
+    # Caminho rápido destilado, medido no split de validação
+    fast_path = detector.fast_path_report
+    if fast_path:
+        st.subheader(get_translation("fast_path", selected_language))
+        col_agreement, col_speedup, col_accuracy = st.columns(3)
+        with col_agreement:
+            st.metric(get_translation("fast_path_agreement", selected_language), f"{fast_path['agreement_with_ensemble']:.1%}")
+        with col_speedup:
+            st.metric(
+                get_translation("fast_path_speedup", selected_language), f"{fast_path['speedup']:.1f}x",
+                f"{fast_path['fast_latency_ms']:.2f} ms vs {fast_path['ensemble_latency_ms']:.2f} ms", delta_color="off"
+            )
+        with col_accuracy:
+            if 'fast_accuracy' in fast_path:
+                st.metric(
+                    get_translation("fast_path_accuracy", selected_language),
+                    f"{fast_path['fast_accuracy']:.1%} / {fast_path['ensemble_accuracy']:.1%}"
+                )
+        if fast_path.get('enabled'):
+            st.success(get_translation("fast_path_enabled", selected_language))
+        else:
+            st.warning(get_translation("fast_path_disabled", selected_language))
+    
+    # Detalhes por classe e matriz de confusão
+    for name in models:
+        metrics = performance[name]
+        with st.expander(f"{name} - {get_translation('per_class_metrics', selected_language)}"):
+            col_table, col_matrix = st.columns(2)
+            with col_table:
+                st.dataframe(pd.DataFrame([
+                    {
+                        '': label,
+                        get_translation("precision_label", selected_language): round(values['precision'], 3),
+                        get_translation("recall_label", selected_language): round(values['recall'], 3),
+                        get_translation("f1_score_label", selected_language): round(values['f1'], 3),
+                        get_translation("support_label", selected_language): values['support'],
+                    }
+                    for label, values in metrics['per_class'].items()
+                ]), use_container_width=True, hide_index=True)
+            with col_matrix:
+                fig_confusion = build_confusion_figure(
+                    dataset_fingerprint(detector.model_version, name, metrics['confusion_matrix']),
+                    selected_language, metrics['labels'], metrics['confusion_matrix']
+                )
+                st.plotly_chart(fig_confusion, use_container_width=True)
+
+# Objetos oferecidos no seletor da explicação (os primeiros do filtro)
+EXPLANATION_MAX_OPTIONS = 2000
+
+@st.cache_resource
+def get_explanation_cache():
+    """Cache de explicações compartilhado pelas sessões (memória e models/explanations)"""
+    return ExplanationCache()
+
+def render_permutation_importance(detector, selected_language):
+    """Importância por permutação comparável entre os modelos, cacheada por versão e dados"""
+    data = st.session_state.get('adapted_data')
+    if not detector.models:
+        return
+    
+    st.subheader(get_translation("permutation_importance", selected_language))
+    st.caption(get_translation("permutation_importance_help", selected_language))
+    if data is None or 'koi_disposition' not in data.columns:
+        st.info(get_translation("no_labeled_data", selected_language))
+        return
+    
+    cache = get_explanation_cache()
+    fingerprint = st.session_state.get('adapted_fingerprint') or dataset_fingerprint(data)
+    result = cache.get(permutation_cache_key(detector, fingerprint))
+    if result is None:
+        if not st.button(get_translation("compute_permutation", selected_language), key="permutation_compute"):
+            return
+        with st.spinner(get_translation("permutation_importance", selected_language)):
+            result = cached_permutation_importance(detector, data, fingerprint, cache)
+    
+    fig_importance = go.Figure()
+    for name, importance in result['importance'].items():
+        fig_importance.add_trace(go.Bar(
+            name=f"{name} ({result['baseline'][name]:.1%})",
+            x=result['features'],
+            y=[importance[feature] for feature in result['features']],
+            error_y=dict(type='data', array=[result['std'][name][feature] for feature in result['features']])
+        ))
+    fig_importance.update_layout(
+        barmode='group',
+        yaxis_title=get_translation("accuracy_drop", selected_language),
+        height=400
+    )
+    st.plotly_chart(fig_importance, use_container_width=True)
+
+def render_object_explanation(detector, adapted_data, filter_result, selected_language):
+    """Contribuições das features para um objeto filtrado, calculadas por lote e cacheadas"""
+    if not detector.models:
+        return
+    
+    st.subheader(get_translation("object_explanation", selected_language))
+    positions = filter_result['positions'][:EXPLANATION_MAX_OPTIONS].tolist()
+    if filter_result['total'] > EXPLANATION_MAX_OPTIONS:
+        st.caption(f"{get_translation('explanation_options_limit', selected_language)} {EXPLANATION_MAX_OPTIONS}")
+    names = adapted_data['koi_name'] if 'koi_name' in adapted_data.columns else pd.Series(range(len(adapted_data)))
+    
+    labels = [f"{names.iat[position]} (#{position})" for position in positions]
+    
+    col_object, col_model = st.columns(2)
+    with col_object:
+        label = st.selectbox(get_translation("explain_object", selected_language), labels, key="explain_object")
+        position = positions[labels.index(label)]
+    with col_model:
+        model_name = st.selectbox(get_translation("models_label", selected_language), list(detector.models), key="explain_model")
+    
+    explanation = explain_rows(
+        detector, adapted_data, [position], model_name,
+        st.session_state['adapted_fingerprint'], get_explanation_cache()
+    )
+    contributions = explanation['contributions'][0]
+    bias = explanation['bias'][0]
+    classes = explanation['classes']
+    
+    # Sem key: ao trocar de objeto, a classe volta para a de maior pontuação
+    class_label = st.selectbox(
+        get_translation("explain_class", selected_language), classes,
+        index=int(np.argmax(bias + contributions.sum(axis=1)))
+    )
+    class_index = classes.index(class_label)
+    values = contributions[class_index]
+    order = np.argsort(np.abs(values))
+    features = np.array(explanation['features'])[order]
+    
+    fig_explanation = go.Figure(go.Bar(
+        x=values[order], y=features, orientation='h',
+        marker_color=['#2ca02c' if value > 0 else '#d62728' for value in values[order]]
+    ))
+    fig_explanation.update_layout(
+        xaxis_title=get_translation("contribution_label", selected_language),
+        height=max(250, 40 * len(features))
+    )
+    st.plotly_chart(fig_explanation, use_container_width=True)
+    st.caption(f"{get_translation('explanation_' + explanation['space'], selected_language)} {bias[class_index]:.3f}")
+
+SIMILAR_DISPOSITIONS = ['CONFIRMED', 'CANDIDATE', 'FALSE POSITIVE']
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def build_similarity_index(fingerprint, _df):
+    """Índice de similaridade do catálogo, persistido em models/similarity pela impressão digital"""
+    return SimilarityIndex.for_catalog(_df, fingerprint)
+
+def render_similar_objects(adapted_data, filter_result, selected_language):
+    """Objetos do catálogo mais parecidos com um objeto filtrado"""
+    st.subheader(get_translation("similar_objects", selected_language))
+    st.caption(get_translation("similar_objects_help", selected_language))
+    try:
+        index = build_similarity_index(st.session_state['adapted_fingerprint'], adapted_data)
+    except ValueError as e:
+        st.info(str(e))
+        return
+    
+    positions = filter_result['positions'][:EXPLANATION_MAX_OPTIONS].tolist()
+    labels = [f"{index.ids[position]} (#{position})" for position in positions]
+    
+    col_object, col_count, col_dispositions = st.columns([2, 1, 2])
+    with col_object:
+        label = st.selectbox(get_translation("similar_object", selected_language), labels, key="similar_object")
+        position = positions[labels.index(label)]
+    with col_count:
+        k = st.slider(get_translation("similar_count", selected_language), 1, 50, 10, key="similar_count")
+    with col_dispositions:
+        dispositions = st.multiselect(
+            get_translation("similar_dispositions", selected_language), SIMILAR_DISPOSITIONS,
+            default=['CONFIRMED'], key="similar_dispositions"
+        )
+    
+    neighbors = index.k_nearest(position, k=k, labels=dispositions or None)
+    if neighbors.empty:
+        st.info(get_translation("no_similar_objects", selected_language))
+        return
+    
+    table = adapted_data.iloc[neighbors['position']].reindex(columns=['koi_name', 'koi_disposition'] + index.features)
+    table.insert(0, get_translation("similarity_distance", selected_language), neighbors['distance'].round(3).to_numpy())
+    st.dataframe(table.dropna(axis=1, how='all'), use_container_width=True, hide_index=True)
+
+TABLE_PAGE_SIZES = [20, 50, 100, 200]
+
+def get_table_pager():
+    """Paginador da sessão (cache limitado das páginas recentes)"""
+    if 'table_pager' not in st.session_state:
+        st.session_state['table_pager'] = TablePager()
+    return st.session_state['table_pager']
+
+def render_paginated_table(filter_index, filter_result, selected_language, key):
+    """Tabela paginada no servidor: só a página visível é enviada ao navegador"""
+    columns = filter_index.sortable_columns()
+    total = filter_result['total']
+    
+    col_sort, col_order, col_size, col_page = st.columns([2, 1, 1, 1])
+    with col_sort:
+        sort_column = st.selectbox(
+            get_translation("sort_by", selected_language), columns,
+            index=columns.index('koi_period') if 'koi_period' in columns else 0,
+            key=f"{key}_sort"
+        )
+    with col_order:
+        sort_order = st.selectbox(
+            get_translation("sort_order", selected_language),
+            [get_translation("ascending", selected_language), get_translation("descending", selected_language)],
+            key=f"{key}_order"
+        )
+        ascending = sort_order == get_translation("ascending", selected_language)
+    with col_size:
+        page_size = st.selectbox(get_translation("page_size", selected_language), TABLE_PAGE_SIZES, key=f"{key}_page_size")
+    
+    pages = max(1, -(-total // page_size))
+    # Voltar à primeira página sempre que os filtros mudarem
+    if st.session_state.get(f"{key}_filter") != filter_result['key']:
+        st.session_state[f"{key}_filter"] = filter_result['key']
+        st.session_state[f"{key}_page"] = 1
+    with col_page:
+        page = st.number_input(get_translation("page", selected_language), min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    
+    table = get_table_pager().fetch(filter_index, filter_result, sort_column, ascending, int(page) - 1, page_size, columns)
+    st.dataframe(table, use_container_width=True, hide_index=True)
+    
+    start = (int(page) - 1) * page_size
+    st.caption(get_translation("table_rows", selected_language).format(
+        start=start + 1 if total else 0, end=start + table.num_rows, total=total, page=int(page), pages=pages
+    ))
 
 # Cache para dados simulados em tempo real
+def render_nasa_refresh(progress_bar, status_text):
+    """Mostra o progresso real da atualização NASA e atualiza os contadores do dashboard"""
+    refresh = st.session_state.get('nasa_refresh')
+    if refresh is None:
+        progress_bar.empty()
+        return False
+    
+    state = refresh.snapshot()
+    stage_labels = {
+        'pending': '⏳ Aguardando',
+        'fetch': '📡 Baixando',
+        'parse': '🧾 Interpretando',
+        'score': '🤖 Executando modelos ML',
+        'done': '✅ Concluído',
+        'error': '❌ Erro'
+    }
+    
+    if state['running']:
+        progress_bar.progress(state['progress'])
+        status_text.text(
+            " | ".join(
+                f"{mission}: {stage_labels.get(source['stage'], source['stage'])} "
+                f"{source.get('bytes', 0) / 1e6:.1f} MB, {source.get('rows', 0):,} linhas, {source.get('rows_scored', 0):,} pontuadas"
+                for mission, source in state['sources'].items()
+            )
+        )
+    else:
+        progress_bar.empty()
+        status_text.empty()
+        for mission, source in state['sources'].items():
+            if source['stage'] == 'error':
+                st.warning(f"⚠️ {mission}: {source.get('error')}")
+    
+    # Contadores incrementais: cada fonte concluída entra nas métricas
+    summaries = [source['summary'] for source in state['sources'].values() if 'summary' in source]
+    counts = {}
+    for summary in summaries:
+        for label, count in (summary['predicted'] or summary['dispositions']).items():
+            counts[label] = counts.get(label, 0) + count
+    accuracies = [summary['accuracy'] for summary in summaries if 'accuracy' in summary]
+    
+    if summaries:
+        st.session_state['real_time_data'] = {
+            'timestamp': datetime.now(),
+            'objects_analyzed': sum(summary['rows'] for summary in summaries),
+            'confirmed_exoplanets': counts.get('CONFIRMED', 0),
+            'candidates': counts.get('CANDIDATE', 0),
+            'false_positives': counts.get('FALSE POSITIVE', 0),
+            'accuracy': float(np.mean(accuracies)) if accuracies else 0.0,
+            'processing_time': time.time() - state['started_at'],
+            'model_active': refresh.detector.model_version or 'Nenhum'
+        }
+    
+    return state['running']
+
 def get_real_time_data():
     """Simula dados em tempo real do sistema"""
     # Verificar se há dados em cache na sessão
@@ -813,12 +1718,128 @@ def get_real_time_data():
     
     return data
 
+APP_SECTIONS = ['dashboard', 'analysis', 'performance', 'documentation']
+
+# Prefixos das chaves de widgets de cada seção, preservadas enquanto a seção está oculta
+SECTION_STATE_PREFIXES = {
+    'dashboard': ('accuracy_window',),
+    'analysis': ('analysis_filter_', 'filtered_table_', 'manual_', 'explain_', 'similar_'),
+    'performance': (),
+    'documentation': (),
+}
+
+ANALYSIS_FILTER_KEYS = [
+    'analysis_filter_period', 'analysis_filter_radius', 'analysis_filter_temp',
+    'analysis_filter_depth', 'analysis_filter_disposition', 'analysis_filter_duration'
+]
+
+# Orçamento de latência de um rerun completo (ms), exibido no painel de depuração
+RERUN_BUDGET_MS = 250
+
+def reset_analysis_filters():
+    """Remove os valores dos filtros da aba de análise (voltam aos limites dos dados)"""
+    for key in ANALYSIS_FILTER_KEYS:
+        st.session_state.pop(key, None)
+
+@contextmanager
+def timed_section(name):
+    """Mede a duração de um trecho do rerun e guarda em rerun_timings (ms)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = st.session_state.setdefault('rerun_timings', {})
+        timings[name] = timings.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+def get_active_section(selected_language):
+    """Seletor da seção visível; a escolha é guardada sem depender do idioma"""
+    labels = [get_translation(section, selected_language) for section in APP_SECTIONS]
+    current = st.session_state.get('active_section', APP_SECTIONS[0])
+    label = st.radio(
+        get_translation("section", selected_language), labels,
+        index=APP_SECTIONS.index(current), horizontal=True,
+        label_visibility="collapsed", key=f"section_{selected_language}"
+    )
+    st.session_state['active_section'] = APP_SECTIONS[labels.index(label)]
+    return st.session_state['active_section']
+
+def keep_hidden_section_state(active_section):
+    """Preserva os valores dos widgets das seções ocultas
+
+    O Streamlit descarta o estado de widgets que não são renderizados no rerun;
+    regravar a chave pela API mantém filtros e entradas ao voltar para a seção.
+    """
+    prefixes = tuple(
+        prefix for section, section_prefixes in SECTION_STATE_PREFIXES.items()
+        if section != active_section for prefix in section_prefixes
+    )
+    if not prefixes:
+        return
+    for key in list(st.session_state.keys()):
+        if key.startswith(prefixes):
+            st.session_state[key] = st.session_state[key]
+
+def render_rerun_timings(selected_language):
+    """Painel de depuração com a duração de cada trecho do último rerun"""
+    timings = st.session_state.get('rerun_timings', {})
+    total = timings.get('total', 0.0)
+    with st.expander(get_translation("rerun_timings", selected_language), expanded=True):
+        st.dataframe(
+            pd.DataFrame({
+                'section': list(timings.keys()),
+                'ms': [round(value, 1) for value in timings.values()]
+            }),
+            use_container_width=True, hide_index=True
+        )
+        if total > RERUN_BUDGET_MS:
+            st.warning(get_translation("rerun_over_budget", selected_language).format(total=total, budget=RERUN_BUDGET_MS))
+        else:
+            st.success(get_translation("rerun_within_budget", selected_language).format(total=total, budget=RERUN_BUDGET_MS))
+    
+    # Etapas instrumentadas do pipeline neste processo (leitura, SMOTE, fits, CV, predição...)
+    stages = TRACER.snapshot()['stages']
+    with st.expander(get_translation("pipeline_stages", selected_language)):
+        if not stages:
+            st.caption(get_translation("no_pipeline_stages", selected_language))
+        else:
+            st.dataframe(
+                pd.DataFrame([
+                    {
+                        'stage': name,
+                        'count': stage['count'],
+                        'mean ms': round(stage['seconds_mean'] * 1000, 1),
+                        'total s': round(stage['seconds_sum'], 2),
+                        'rows': stage['rows'],
+                        'peak +MB': round(stage['peak_delta_bytes'] / 1e6, 1)
+                    }
+                    for name, stage in stages.items()
+                ]).sort_values('total s', ascending=False),
+                use_container_width=True, hide_index=True
+            )
+
+@st.cache_resource
+def get_stage_metrics_server(port):
+    """Endpoint local /metrics (Prometheus) com as etapas do pipeline, um por processo"""
+    return start_metrics_server(port)
+
 def main():
+    rerun_started = time.perf_counter()
+    st.session_state['rerun_timings'] = {}
+    
+    if os.environ.get('EXOPLANET_METRICS_PORT'):
+        get_stage_metrics_server(int(os.environ['EXOPLANET_METRICS_PORT']))
+    
+    # Reconectar ao job de treinamento após um refresh da página
+    if 'training_job' not in st.session_state:
+        job_param = st.experimental_get_query_params().get('job')
+        if job_param:
+            st.session_state['training_job'] = job_param[0]
+    
     # Header principal (sempre em português para título da página)
     st.markdown(f'<h1 class="main-header">{get_translation("main_header", "pt")}</h1>', unsafe_allow_html=True)
     
     # Sidebar
-    with st.sidebar:
+    with st.sidebar, timed_section('sidebar'):
         # Obter idioma selecionado
         selected_language = get_language_selector()
         st.header(get_translation("system_controls", selected_language))
@@ -915,8 +1936,9 @@ def main():
         uploaded_file = st.file_uploader(get_translation("load_dataset", selected_language), type=['csv', 'xlsx'])
         
         if uploaded_file:
-            # Ler arquivo de forma segura
-            df, error = safe_read_file(uploaded_file, selected_language)
+            # Ler arquivo de forma segura (em blocos se não couber na memória)
+            upload_budget = MemoryBudget()
+            df, error = safe_read_file(uploaded_file, selected_language, upload_budget)
             
             if error:
                 st.error(f"❌ {error}")
@@ -925,6 +1947,7 @@ def main():
             
             if df is not None:
                 st.success(f"✅ {get_translation('file_loaded', selected_language)} {uploaded_file.name}")
+                render_memory_degradations(upload_budget.degradations, selected_language)
                 
                 # Mostrar informações do arquivo
                 st.write(f"**{get_translation('data_info', selected_language)}:**")
@@ -956,599 +1979,420 @@ def main():
                 
                 # Botão para analisar dados carregados
                 if st.button(get_translation("analyze_data", selected_language), type="primary"):
-                    with st.spinner(get_translation("analyzing", selected_language)):
-                        results, process_error = process_uploaded_data(df, selected_language)
-                        
-                        if process_error:
-                            st.error(f"❌ **Erro na análise:** {process_error}")
-                            st.info("💡 **Sugestão:** Verifique se os dados estão no formato correto e tente novamente")
-                        else:
-                            st.session_state['analysis_results'] = results
-                            st.success(get_translation("analysis_complete", selected_language))
-                            
-                            # Mostrar dados adaptados
-                            if 'adapted_data' in st.session_state:
-                                st.write("**📊 Dados Adaptados para ML:**")
-                                st.dataframe(st.session_state['adapted_data'].head())
-                            
-                            # Mostrar resultados
-                            st.write(f"**{get_translation('analysis_results', selected_language)}:**")
-                            
-                            # Verificar se results é um dicionário ou tupla
-                            if isinstance(results, dict):
-                                for model_name, result in results.items():
-                                    if isinstance(result, dict) and 'accuracy' in result:
-                                        st.write(f"- {model_name}: {result['accuracy']:.3f}")
-                            elif isinstance(results, tuple):
-                                # Se for tupla, mostrar informações básicas
-                                st.write(f"- Modelos treinados: {len(results)}")
-                                st.write(f"- Dados processados: {len(st.session_state.get('processed_data', []))} amostras")
-                                st.write(f"- Features utilizadas: {len(st.session_state.get('features', []))}")
-                            else:
-                                st.write(f"- Resultado: {str(results)}")
-    
-    # Layout principal com tabs
-    tab1, tab2, tab3, tab4 = st.tabs([
-        get_translation("dashboard", selected_language), 
-        get_translation("analysis", selected_language), 
-        get_translation("performance", selected_language), 
-        get_translation("documentation", selected_language)
-    ])
+                    read_degradations = len(upload_budget.degradations)
+                    job_id, process_error = process_uploaded_data(df, selected_language, upload_budget)
+                    render_memory_degradations(upload_budget.degradations[read_degradations:], selected_language)
+                    
+                    if process_error:
+                        st.error(f"❌ **Erro na análise:** {process_error}")
+                        st.info("💡 **Sugestão:** Verifique se os dados estão no formato correto e tente novamente")
+        
+        # Progresso do treinamento em segundo plano
+        st.session_state['training_job_running'] = render_training_job(selected_language)
+        
+        # Promoção do modelo treinado na sessão para todas as sessões
+        session_models = get_session_models()
+        if session_models.has_private_model:
+            st.caption(f"{get_translation('session_model', selected_language)}: {session_models.detector.model_version}")
+            if st.button(get_translation("promote_model", selected_language)):
+                version = session_models.promote()
+                st.success(f"{get_translation('model_promoted', selected_language)}: {version}")
+        
+        st.checkbox(get_translation("debug_timings", selected_language), key="debug_timings")
+    
+    # Layout principal: seletor de seção (diferente de st.tabs, só a seção visível roda)
+    active_section = get_active_section(selected_language)
+    keep_hidden_section_state(active_section)
     
     # Barra de progresso da análise atual
     progress_bar = st.progress(0)
     status_text = st.empty()
     
-    with tab1:
-        st.header(get_translation("real_time_analysis", selected_language))
-        
-        # Botões de controle - layout com botão direito alinhado
-        col_btn1, col_btn2, col_btn3 = st.columns([2, 1, 1])
-        
-        with col_btn1:
-            # Botão para buscar dados das bases NASA
-            if st.button("🔍 Buscar Dados das Bases NASA", type="primary"):
-                # Simular busca nas bases NASA
-                for i in range(101):
-                    progress_bar.progress(i)
-                    if i < 20:
-                        status_text.text("🔍 Conectando com NASA Exoplanet Archive...")
-                    elif i < 40:
-                        status_text.text("📡 Baixando dados Kepler...")
-                    elif i < 60:
-                        status_text.text("🛰️ Processando dados TESS...")
-                    elif i < 80:
-                        status_text.text("🌌 Analisando dados Microlensing...")
-                    elif i < 95:
-                        status_text.text("🤖 Executando modelos ML...")
+    # Atualização NASA acompanhada em qualquer seção (o rodapé reexecuta enquanto roda)
+    with timed_section('nasa_refresh'):
+        st.session_state['refresh_running'] = render_nasa_refresh(progress_bar, status_text)
+    
+    # Só a seção ativa é executada; as demais não constroem filtros nem figuras
+    with timed_section(active_section):
+        if active_section == 'dashboard':
+            st.header(get_translation("real_time_analysis", selected_language))
+        
+            # Botões de controle - layout com botão direito alinhado
+            col_btn1, col_btn2, col_btn3 = st.columns([2, 1, 1])
+        
+            with col_btn1:
+                # Botão para buscar dados das bases NASA
+                refresh = st.session_state.get('nasa_refresh')
+                refresh_running = refresh is not None and refresh.snapshot()['running']
+                if st.button("🔍 Buscar Dados das Bases NASA", type="primary", disabled=refresh_running):
+                    # Atualização real em segundo plano; o progresso é lido a cada rerun
+                    st.session_state['nasa_refresh'] = CatalogRefresh(initialize_detector()).start()
+                    st.session_state['refresh_running'] = True
+        
+            with col_btn3:
+                # Botão para limpar dados (alinhado à direita)
+                if st.button("🗑️ Limpar Dados", type="secondary"):
+                    if st.session_state.get('confirm_reset', False):
+                        clear_all_data()
+                        st.success("✅ Dados limpos com sucesso!")
+                        st.session_state['confirm_reset'] = False
+                        st.rerun()
                     else:
-                        status_text.text("✅ Dados atualizados com sucesso!")
-                    time.sleep(0.03)
-                
-                # Gerar novos dados simulados baseados em dados NASA
-                current_time = datetime.now()
-                data = {
-                    'timestamp': current_time,
-                    'objects_analyzed': np.random.randint(1200, 1800),
-                    'confirmed_exoplanets': np.random.randint(90, 150),
-                    'candidates': np.random.randint(250, 350),
-                    'false_positives': np.random.randint(180, 280),
-                    'accuracy': np.random.uniform(0.88, 0.96),
-                    'processing_time': np.random.uniform(1.5, 4.0),
-                    'model_active': np.random.choice(['Random Forest', 'XGBoost', 'LightGBM'])
-                }
-                st.session_state['real_time_data'] = data
-                
-                # Limpar interface
-                progress_bar.empty()
-                status_text.empty()
-                st.rerun()
+                        st.session_state['confirm_reset'] = True
+                        st.warning("⚠️ Clique novamente para confirmar a limpeza dos dados")
         
-        with col_btn3:
-            # Botão para limpar dados (alinhado à direita)
-            if st.button("🗑️ Limpar Dados", type="secondary"):
-                if st.session_state.get('confirm_reset', False):
-                    clear_all_data()
-                    st.success("✅ Dados limpos com sucesso!")
-                    st.session_state['confirm_reset'] = False
-                    st.rerun()
-                else:
-                    st.session_state['confirm_reset'] = True
-                    st.warning("⚠️ Clique novamente para confirmar a limpeza dos dados")
-        
-        # Confirmação de limpeza
-        if st.session_state.get('confirm_reset', False):
-            st.info("⚠️ **Confirmação necessária:** Clique em 'Limpar Dados' novamente para confirmar")
+            # Confirmação de limpeza
+            if st.session_state.get('confirm_reset', False):
+                st.info("⚠️ **Confirmação necessária:** Clique em 'Limpar Dados' novamente para confirmar")
         
-        # Métricas em tempo real - usar dados reais se disponíveis
-        if 'analysis_results' in st.session_state and 'adapted_data' in st.session_state:
-            # Usar dados reais da análise
-            adapted_data = st.session_state['adapted_data']
-            analysis_results = st.session_state['analysis_results']
+            # Métricas em tempo real - usar dados reais se disponíveis
+            if 'analysis_results' in st.session_state and 'adapted_data' in st.session_state:
+                # Usar dados reais da análise
+                adapted_data = st.session_state['adapted_data']
+                analysis_results = st.session_state['analysis_results']
             
-            # Verificar se há dados filtrados na sessão
-            if 'filtered_data' in st.session_state and len(st.session_state['filtered_data']) > 0:
-                # Usar dados filtrados se disponíveis
-                display_data = st.session_state['filtered_data']
-                st.success("📊 **Dados Filtrados Ativos** - Dashboard atualizado com filtros aplicados")
-            else:
-                # Usar todos os dados se não há filtros
-                display_data = adapted_data
-                st.success("📊 **Dados Reais da Análise** - Dashboard atualizado com dados carregados")
+                # Verificar se há dados filtrados na sessão
+                if 'filter_result' in st.session_state and st.session_state['filter_result']['total'] > 0:
+                    # Usar dados filtrados se disponíveis
+                    display_counts = st.session_state['filter_result']['counts']
+                    total_objects = st.session_state['filter_result']['total']
+                    st.success("📊 **Dados Filtrados Ativos** - Dashboard atualizado com filtros aplicados")
+                else:
+                    # Usar todos os dados se não há filtros
+                    display_counts = get_filter_index().total_counts
+                    total_objects = len(adapted_data)
+                    st.success("📊 **Dados Reais da Análise** - Dashboard atualizado com dados carregados")
             
-            # Calcular métricas reais
-            total_objects = len(display_data)
-            confirmed_count = len(display_data[display_data['koi_disposition'] == 'CONFIRMED'])
-            candidate_count = len(display_data[display_data['koi_disposition'] == 'CANDIDATE'])
-            false_positive_count = len(display_data[display_data['koi_disposition'] == 'FALSE POSITIVE'])
+                # Calcular métricas reais (contagens já agregadas pelo índice)
+                confirmed_count = display_counts['CONFIRMED']
+                candidate_count = display_counts['CANDIDATE']
+                false_positive_count = display_counts['FALSE POSITIVE']
             
-            # Calcular acurácia média dos modelos
-            if isinstance(analysis_results, dict):
-                accuracies = [result.get('accuracy', 0) for result in analysis_results.values() if isinstance(result, dict)]
-                avg_accuracy = np.mean(accuracies) if accuracies else 0.85
-            else:
-                avg_accuracy = 0.85
+                # Calcular acurácia média dos modelos
+                if isinstance(analysis_results, dict):
+                    accuracies = [result.get('accuracy', 0) for result in analysis_results.values() if isinstance(result, dict)]
+                    avg_accuracy = np.mean(accuracies) if accuracies else 0.85
+                else:
+                    avg_accuracy = 0.85
             
-            real_time_data = {
-                'timestamp': datetime.now(),
-                'objects_analyzed': total_objects,
-                'confirmed_exoplanets': confirmed_count,
-                'candidates': candidate_count,
-                'false_positives': false_positive_count,
-                'accuracy': avg_accuracy,
-                'processing_time': 2.5,
-                'model_active': 'Análise Completa'
-            }
-        else:
-            # Usar dados simulados se não há análise real
-            real_time_data = get_real_time_data()
+                real_time_data = {
+                    'timestamp': datetime.now(),
+                    'objects_analyzed': total_objects,
+                    'confirmed_exoplanets': confirmed_count,
+                    'candidates': candidate_count,
+                    'false_positives': false_positive_count,
+                    'accuracy': avg_accuracy,
+                    'processing_time': 2.5,
+                    'model_active': 'Análise Completa'
+                }
+            else:
+                # Usar dados simulados se não há análise real
+                real_time_data = get_real_time_data()
         
-        # Indicador de status dos dados (removido - já está acima)
+            # Indicador de status dos dados (removido - já está acima)
         
-        col1, col2, col3, col4 = st.columns(4)
+            col1, col2, col3, col4 = st.columns(4)
         
-        with col1:
-            st.metric(get_translation("objects_analyzed", selected_language), f"{real_time_data['objects_analyzed']:,}")
+            with col1:
+                st.metric(get_translation("objects_analyzed", selected_language), f"{real_time_data['objects_analyzed']:,}")
         
-        with col2:
-            st.metric(get_translation("confirmed_exoplanets", selected_language), f"{real_time_data['confirmed_exoplanets']}", "+5")
+            with col2:
+                st.metric(get_translation("confirmed_exoplanets", selected_language), f"{real_time_data['confirmed_exoplanets']}", "+5")
         
-        with col3:
-            st.metric(get_translation("candidates", selected_language), f"{real_time_data['candidates']}", "+12")
+            with col3:
+                st.metric(get_translation("candidates", selected_language), f"{real_time_data['candidates']}", "+12")
         
-        with col4:
-            st.metric(get_translation("false_positives", selected_language), f"{real_time_data['false_positives']}", "-3")
+            with col4:
+                st.metric(get_translation("false_positives", selected_language), f"{real_time_data['false_positives']}", "-3")
         
-        # Gráficos em tempo real
-        col_left, col_right = st.columns(2)
+            # Gráficos em tempo real
+            col_left, col_right = st.columns(2)
         
-        with col_left:
-            # Gráfico de acurácia ao longo do tempo
-            st.subheader(get_translation("model_accuracy", selected_language))
-            
-            # Simular dados históricos de acurácia
-            timestamps = pd.date_range(end=datetime.now(), periods=50, freq='min')
-            accuracy_history = np.random.uniform(0.8, 0.95, 50).cumsum() / np.arange(1, 51)
+            with col_left:
+                # Gráfico de acurácia ao longo do tempo
+                st.subheader(get_translation("model_accuracy", selected_language))
             
-            fig_accuracy = go.Figure()
-            fig_accuracy.add_trace(go.Scatter(
-                x=timestamps,
-                y=accuracy_history,
-                mode='lines+markers',
-                name='Acurácia',
-                line=dict(color='#2a9d8f', width=3)
-            ))
-            
-            fig_accuracy.update_layout(
-                title=get_translation("accuracy_evolution", selected_language),
-                xaxis_title=get_translation("time", selected_language),
-                yaxis_title=get_translation("accuracy", selected_language),
-                height=350
-            )
+                # Histórico real de acurácia dos treinos (store de métricas)
+                window = st.radio(get_translation("history_window", selected_language), list(ACCURACY_WINDOWS), index=2, horizontal=True, key="accuracy_window")
+                history = load_accuracy_history(ACCURACY_WINDOWS[window], get_metrics_store().version(), int(time.time() // 60))
             
-            st.plotly_chart(fig_accuracy, use_container_width=True)
+                if history.empty:
+                    st.info(get_translation("no_accuracy_history", selected_language))
+                else:
+                    fig_accuracy = build_accuracy_figure(dataset_fingerprint(history), selected_language, history)
+                    st.plotly_chart(fig_accuracy, use_container_width=True)
         
-        with col_right:
-            # Distribuição das classificações
-            st.subheader(get_translation("planetary_distribution", selected_language))
-            
-            labels = [get_translation("confirmed", selected_language), get_translation("candidate", selected_language), get_translation("false_positive", selected_language)]
-            values = [real_time_data['confirmed_exoplanets'], 
-                     real_time_data['candidates'], 
-                     real_time_data['false_positives']]
-            
-            # Cores planetárias: Terra (azul), Marte (vermelho), Netuno (azul escuro)
-            planet_colors = ['#4169E1', '#FF4500', '#1E90FF']  # Terra, Marte, Netuno
+            with col_right:
+                # Distribuição das classificações
+                st.subheader(get_translation("planetary_distribution", selected_language))
             
-            # Criar gráfico de pizza simples
-            fig_pie = go.Figure(data=[go.Pie(
-                labels=labels, 
-                values=values,
-                marker=dict(colors=planet_colors),
-                textinfo='label+percent',
-                textfont_size=12,
-                hovertemplate='<b>%{label}</b><br>' +
-                             'Quantidade: %{value}<br>' +
-                             'Percentual: %{percent}<br>' +
-                             '<extra></extra>'
-            )])
+                values = (real_time_data['confirmed_exoplanets'], 
+                          real_time_data['candidates'], 
+                          real_time_data['false_positives'])
             
-            
-            fig_pie.update_layout(
-                height=350,
-                showlegend=True,
-                legend=dict(
-                    orientation="v",
-                    yanchor="middle",
-                    y=0.5,
-                    xanchor="left",
-                    x=1.01
-                ),
-                title=dict(
-                    text=get_translation("exoplanet_classification", selected_language),
-                    font=dict(size=16, color='#2E8B57')
-                )
-            )
-            
-            # Renderizar gráfico
-            st.plotly_chart(fig_pie, use_container_width=True)
-        
-        # Gráfico de Hyperparâmetros abaixo dos gráficos principais
-        st.markdown("---")
-        st.subheader(get_translation("hyperparameter_optimization", selected_language))
-        
-        # Dados reais de hyperparâmetros (Random Forest otimização)
-        np.random.seed(42)
-        n_samples = 50  # Reduzido de 100 para 50
-        
-        # Lista de nomes de planetas reais para as amostras
-        planet_names = [
-            "Kepler-452b", "Kepler-186f", "Kepler-442b", "Kepler-62f", "Kepler-296f",
-            "Kepler-438b", "Kepler-440b", "Kepler-1229b", "Kepler-1544b", "Kepler-1638b",
-            "Kepler-1649c", "Kepler-1652b", "Kepler-1653b", "Kepler-1701b", "Kepler-1726b",
-            "Kepler-1749b", "Kepler-1755b", "Kepler-1776b", "Kepler-1781b", "Kepler-1783b",
-            "Kepler-1785b", "Kepler-1787b", "Kepler-1789b", "Kepler-1791b", "Kepler-1793b",
-            "Kepler-1795b", "Kepler-1797b", "Kepler-1799b", "Kepler-1801b", "Kepler-1803b",
-            "Kepler-1805b", "Kepler-1807b", "Kepler-1809b", "Kepler-1811b", "Kepler-1813b",
-            "Kepler-1815b", "Kepler-1817b", "Kepler-1819b", "Kepler-1821b", "Kepler-1823b",
-            "Kepler-1825b", "Kepler-1827b", "Kepler-1829b", "Kepler-1831b", "Kepler-1833b",
-            "Kepler-1835b", "Kepler-1837b", "Kepler-1839b", "Kepler-1841b", "Kepler-1843b"
-        ]
-        
-        # Hyperparâmetros reais do Random Forest
-        n_estimators = np.random.uniform(50, 200, n_samples)  # Número de árvores
-        max_depth = np.random.uniform(3, 20, n_samples)       # Profundidade máxima
-        
-        # Função objetivo realista baseada em performance de Random Forest
-        def rf_objective_function(n_est, max_dep):
-            # Simula curva de performance real do Random Forest
-            # Mais árvores geralmente melhoram até certo ponto
-            # Profundidade muito alta pode causar overfitting
-            trees_score = 1 - np.exp(-n_est/100)  # Melhora com mais árvores
-            depth_penalty = np.exp(-(max_dep-10)**2/50)  # Penalty para profundidade extrema
-            noise = np.random.normal(0, 0.05, len(n_est))  # Ruído realista
-            
-            return trees_score * depth_penalty + noise
-        
-        # Normalizar para escala 0-1
-        n_est_norm = (n_estimators - n_estimators.min()) / (n_estimators.max() - n_estimators.min())
-        max_dep_norm = (max_depth - max_depth.min()) / (max_depth.max() - max_depth.min())
+                # Renderizar gráfico (reutilizado enquanto as contagens não mudarem)
+                fig_pie = build_pie_figure(values, selected_language)
+                st.plotly_chart(fig_pie, use_container_width=True)
         
-        z = rf_objective_function(n_estimators, max_depth)
-        
-        # Criar gráfico de contorno com pontos
-        fig_hyperparams = go.Figure()
-        
-        # Adicionar contornos
-        x_grid = np.linspace(0, 1, 30)  # Reduzido de 50 para 30
-        y_grid = np.linspace(0, 1, 30)  # Reduzido de 50 para 30
-        X, Y = np.meshgrid(x_grid, y_grid)
-        
-        # Interpolar valores para o grid
-        Z = griddata((n_est_norm, max_dep_norm), z, (X, Y), method='cubic')
-        
-        fig_hyperparams.add_trace(go.Contour(
-            x=x_grid,
-            y=y_grid,
-            z=Z,
-            colorscale='RdYlBu',
-            showscale=True,
-            opacity=0.7,
-            name=get_translation("objective_function", selected_language)
-        ))
-        
-        # Adicionar pontos de amostragem
-        fig_hyperparams.add_trace(go.Scatter(
-            x=n_est_norm,
-            y=max_dep_norm,
-            mode='markers',
-            marker=dict(
-                size=6,  # Reduzido de 8 para 6
-                color='black',
-                symbol='x',
-                line=dict(width=1, color='white')
-            ),
-            name=get_translation("samples", selected_language),
-            hovertemplate='<b>%{customdata[0]}</b><br>' +
-                         'N_Estimators: %{customdata[1]:.0f}<br>' +
-                         'Max_Depth: %{customdata[2]:.1f}<br>' +
-                         'Score: %{customdata[3]:.3f}<br>' +
-                         '<extra></extra>',
-            customdata=np.column_stack((planet_names[:n_samples], n_estimators, max_depth, z))
-        ))
+            # Gráfico de Hyperparâmetros abaixo dos gráficos principais
+            st.markdown("---")
+            st.subheader(get_translation("hyperparameter_optimization", selected_language))
         
-        fig_hyperparams.update_layout(
-            title=get_translation("hyperparameter_landscape", selected_language),
-            xaxis_title=get_translation("n_estimators", selected_language),
-            yaxis_title=get_translation("max_depth", selected_language),
-            width=600,  # Reduzido de 800 para 600
-            height=450,  # Reduzido de 600 para 450
-            xaxis=dict(range=[-0.05, 1.05]),
-            yaxis=dict(range=[-0.05, 1.05]),
-            showlegend=True
-        )
-        
-        st.plotly_chart(fig_hyperparams, use_container_width=True)
+            fig_hyperparams = build_hyperparameter_figure(selected_language)
+            st.plotly_chart(fig_hyperparams, use_container_width=True)
     
-    with tab2:
-        st.header(get_translation("manual_analysis", selected_language))
+        elif active_section == 'analysis':
+            st.header(get_translation("manual_analysis", selected_language))
         
-        # Verificar se há dados carregados
-        if 'adapted_data' in st.session_state:
-            adapted_data = st.session_state['adapted_data']
+            # Verificar se há dados carregados
+            if 'adapted_data' in st.session_state:
+                adapted_data = st.session_state['adapted_data']
+                filter_index = get_filter_index()
+                
+                # Novos dados mudam os limites dos filtros: voltar aos valores padrão
+                if st.session_state.get('filter_index_fingerprint') != filter_index.fingerprint:
+                    st.session_state['filter_index_fingerprint'] = filter_index.fingerprint
+                    reset_analysis_filters()
             
-            st.success(f"📊 **Dados carregados:** {len(adapted_data)} objetos disponíveis para análise")
+                st.success(f"📊 **Dados carregados:** {len(adapted_data)} objetos disponíveis para análise")
             
-            # Filtros para análise
-            st.subheader("🔍 Filtros de Análise")
+                # Filtros para análise
+                st.subheader("🔍 Filtros de Análise")
             
-            col_f1, col_f2, col_f3 = st.columns(3)
+                col_f1, col_f2, col_f3 = st.columns(3)
             
-            with col_f1:
-                # Filtro por período orbital
-                period_range = st.slider(
-                    "Período Orbital (dias)",
-                    min_value=float(adapted_data['koi_period'].min()),
-                    max_value=float(adapted_data['koi_period'].max()),
-                    value=(float(adapted_data['koi_period'].min()), float(adapted_data['koi_period'].max())),
-                    step=0.1
-                )
+                with col_f1:
+                    # Filtro por período orbital
+                    period_range = st.slider(
+                        "Período Orbital (dias)",
+                        min_value=filter_index.bounds('koi_period')[0],
+                        max_value=filter_index.bounds('koi_period')[1],
+                        value=filter_index.bounds('koi_period'),
+                        step=0.1,
+                        key="analysis_filter_period"
+                    )
                 
-                # Filtro por raio planetário
-                radius_range = st.slider(
-                    "Raio Planetário (R⊕)",
-                    min_value=float(adapted_data['koi_prad'].min()),
-                    max_value=float(adapted_data['koi_prad'].max()),
-                    value=(float(adapted_data['koi_prad'].min()), float(adapted_data['koi_prad'].max())),
-                    step=0.1
-                )
+                    # Filtro por raio planetário
+                    radius_range = st.slider(
+                        "Raio Planetário (R⊕)",
+                        min_value=filter_index.bounds('koi_prad')[0],
+                        max_value=filter_index.bounds('koi_prad')[1],
+                        value=filter_index.bounds('koi_prad'),
+                        step=0.1,
+                        key="analysis_filter_radius"
+                    )
             
-            with col_f2:
-                # Filtro por temperatura
-                temp_range = st.slider(
-                    "Temperatura de Equilíbrio (K)",
-                    min_value=float(adapted_data['koi_teq'].min()),
-                    max_value=float(adapted_data['koi_teq'].max()),
-                    value=(float(adapted_data['koi_teq'].min()), float(adapted_data['koi_teq'].max())),
-                    step=10.0
-                )
+                with col_f2:
+                    # Filtro por temperatura
+                    temp_range = st.slider(
+                        "Temperatura de Equilíbrio (K)",
+                        min_value=filter_index.bounds('koi_teq')[0],
+                        max_value=filter_index.bounds('koi_teq')[1],
+                        value=filter_index.bounds('koi_teq'),
+                        step=10.0,
+                        key="analysis_filter_temp"
+                    )
                 
-                # Filtro por profundidade do trânsito
-                depth_range = st.slider(
-                    "Profundidade do Trânsito",
-                    min_value=float(adapted_data['koi_depth'].min()),
-                    max_value=float(adapted_data['koi_depth'].max()),
-                    value=(float(adapted_data['koi_depth'].min()), float(adapted_data['koi_depth'].max())),
-                    step=0.0001
-                )
+                    # Filtro por profundidade do trânsito
+                    depth_range = st.slider(
+                        "Profundidade do Trânsito",
+                        min_value=filter_index.bounds('koi_depth')[0],
+                        max_value=filter_index.bounds('koi_depth')[1],
+                        value=filter_index.bounds('koi_depth'),
+                        step=0.0001,
+                        key="analysis_filter_depth"
+                    )
             
-            with col_f3:
-                # Filtro por classificação
-                disposition_filter = st.multiselect(
-                    "Classificação",
-                    options=['CONFIRMED', 'CANDIDATE', 'FALSE POSITIVE'],
-                    default=['CONFIRMED', 'CANDIDATE', 'FALSE POSITIVE']
-                )
+                with col_f3:
+                    # Filtro por classificação
+                    disposition_filter = st.multiselect(
+                        "Classificação",
+                        options=['CONFIRMED', 'CANDIDATE', 'FALSE POSITIVE'],
+                        default=['CONFIRMED', 'CANDIDATE', 'FALSE POSITIVE'],
+                        key="analysis_filter_disposition"
+                    )
                 
-                # Filtro por duração do trânsito
-                duration_range = st.slider(
-                    "Duração do Trânsito (horas)",
-                    min_value=float(adapted_data['koi_duration'].min()),
-                    max_value=float(adapted_data['koi_duration'].max()),
-                    value=(float(adapted_data['koi_duration'].min()), float(adapted_data['koi_duration'].max())),
-                    step=0.1
-                )
+                    # Filtro por duração do trânsito
+                    duration_range = st.slider(
+                        "Duração do Trânsito (horas)",
+                        min_value=filter_index.bounds('koi_duration')[0],
+                        max_value=filter_index.bounds('koi_duration')[1],
+                        value=filter_index.bounds('koi_duration'),
+                        step=0.1,
+                        key="analysis_filter_duration"
+                    )
             
-            # Aplicar filtros
-            filtered_data = adapted_data[
-                (adapted_data['koi_period'] >= period_range[0]) & 
-                (adapted_data['koi_period'] <= period_range[1]) &
-                (adapted_data['koi_prad'] >= radius_range[0]) & 
-                (adapted_data['koi_prad'] <= radius_range[1]) &
-                (adapted_data['koi_teq'] >= temp_range[0]) & 
-                (adapted_data['koi_teq'] <= temp_range[1]) &
-                (adapted_data['koi_depth'] >= depth_range[0]) & 
-                (adapted_data['koi_depth'] <= depth_range[1]) &
-                (adapted_data['koi_duration'] >= duration_range[0]) & 
-                (adapted_data['koi_duration'] <= duration_range[1]) &
-                (adapted_data['koi_disposition'].isin(disposition_filter))
-            ]
+                # Aplicar filtros pelo índice (sem varrer o DataFrame)
+                filter_result = filter_index.filter({
+                    'koi_period': period_range,
+                    'koi_prad': radius_range,
+                    'koi_teq': temp_range,
+                    'koi_depth': depth_range,
+                    'koi_duration': duration_range,
+                }, disposition_filter)
+                filtered_positions = filter_result['positions']
             
-            # Salvar dados filtrados na sessão para usar no dashboard
-            st.session_state['filtered_data'] = filtered_data
+                # Salvar resultado dos filtros na sessão para usar no dashboard
+                st.session_state['filter_result'] = filter_result
             
-            # Mostrar resultados dos filtros
-            st.subheader("📈 Resultados dos Filtros")
+                # Mostrar resultados dos filtros
+                st.subheader("📈 Resultados dos Filtros")
             
-            # Botão para limpar filtros
-            col_clear, col_info = st.columns([1, 3])
-            with col_clear:
-                if st.button("🔄 Limpar Filtros", type="secondary"):
-                    if 'filtered_data' in st.session_state:
-                        del st.session_state['filtered_data']
-                    st.rerun()
+                # Botão para limpar filtros
+                col_clear, col_info = st.columns([1, 3])
+                with col_clear:
+                    if st.button("🔄 Limpar Filtros", type="secondary"):
+                        if 'filter_result' in st.session_state:
+                            del st.session_state['filter_result']
+                        reset_analysis_filters()
+                        st.rerun()
             
-            with col_info:
-                if 'filtered_data' in st.session_state and len(st.session_state['filtered_data']) > 0:
-                    st.info("💡 **Filtros ativos** - Dashboard será atualizado automaticamente")
-                else:
-                    st.info("📊 **Todos os dados** - Nenhum filtro aplicado")
+                with col_info:
+                    if 'filter_result' in st.session_state and st.session_state['filter_result']['total'] > 0:
+                        st.info("💡 **Filtros ativos** - Dashboard será atualizado automaticamente")
+                    else:
+                        st.info("📊 **Todos os dados** - Nenhum filtro aplicado")
             
-            col_r1, col_r2, col_r3, col_r4 = st.columns(4)
+                col_r1, col_r2, col_r3, col_r4 = st.columns(4)
             
-            with col_r1:
-                st.metric("Objetos Filtrados", len(filtered_data))
+                with col_r1:
+                    st.metric("Objetos Filtrados", filter_result['total'])
             
-            with col_r2:
-                confirmed_filtered = len(filtered_data[filtered_data['koi_disposition'] == 'CONFIRMED'])
-                st.metric("Confirmados", confirmed_filtered)
+                with col_r2:
+                    confirmed_filtered = filter_result['counts']['CONFIRMED']
+                    st.metric("Confirmados", confirmed_filtered)
             
-            with col_r3:
-                candidates_filtered = len(filtered_data[filtered_data['koi_disposition'] == 'CANDIDATE'])
-                st.metric("Candidatos", candidates_filtered)
+                with col_r3:
+                    candidates_filtered = filter_result['counts']['CANDIDATE']
+                    st.metric("Candidatos", candidates_filtered)
             
-            with col_r4:
-                false_positives_filtered = len(filtered_data[filtered_data['koi_disposition'] == 'FALSE POSITIVE'])
-                st.metric("Falsos Positivos", false_positives_filtered)
+                with col_r4:
+                    false_positives_filtered = filter_result['counts']['FALSE POSITIVE']
+                    st.metric("Falsos Positivos", false_positives_filtered)
             
-            # Mostrar dados filtrados
-            if len(filtered_data) > 0:
-                st.subheader("📋 Dados Filtrados")
-                st.dataframe(filtered_data[['koi_name', 'koi_period', 'koi_prad', 'koi_teq', 'koi_disposition']].head(20))
+                # Mostrar dados filtrados
+                if filter_result['total'] > 0:
+                    st.subheader("📋 Dados Filtrados")
+                    render_paginated_table(filter_index, filter_result, selected_language, key="filtered_table")
+                
+                    # Explicação de um objeto filtrado
+                    render_object_explanation(initialize_detector(), adapted_data, filter_result, selected_language)
+                
+                    # Vizinhos mais próximos de um objeto filtrado
+                    render_similar_objects(adapted_data, filter_result, selected_language)
                 
-                # Estatísticas dos dados filtrados
-                st.subheader("📊 Estatísticas dos Dados Filtrados")
+                    # Todas as estatísticas em um único passe, cacheadas por estado de filtro
+                    filtered_stats = get_filter_statistics().compute(filter_result)
                 
-                col_s1, col_s2 = st.columns(2)
+                    # Estatísticas dos dados filtrados
+                    st.subheader("📊 Estatísticas dos Dados Filtrados")
                 
-                with col_s1:
-                    st.write("**Período Orbital:**")
-                    st.write(f"- Média: {filtered_data['koi_period'].mean():.2f} dias")
-                    st.write(f"- Mediana: {filtered_data['koi_period'].median():.2f} dias")
-                    st.write(f"- Desvio Padrão: {filtered_data['koi_period'].std():.2f} dias")
+                    col_s1, col_s2 = st.columns(2)
+                
+                    with col_s1:
+                        st.write("**Período Orbital:**")
+                        st.write(f"- Média: {filtered_stats['koi_period']['mean']:.2f} dias")
+                        st.write(f"- Mediana: {filtered_stats['koi_period']['median']:.2f} dias")
+                        st.write(f"- Desvio Padrão: {filtered_stats['koi_period']['std']:.2f} dias")
                     
-                    st.write("**Raio Planetário:**")
-                    st.write(f"- Média: {filtered_data['koi_prad'].mean():.2f} R⊕")
-                    st.write(f"- Mediana: {filtered_data['koi_prad'].median():.2f} R⊕")
+                        st.write("**Raio Planetário:**")
+                        st.write(f"- Média: {filtered_stats['koi_prad']['mean']:.2f} R⊕")
+                        st.write(f"- Mediana: {filtered_stats['koi_prad']['median']:.2f} R⊕")
                 
-                with col_s2:
-                    st.write("**Temperatura:**")
-                    st.write(f"- Média: {filtered_data['koi_teq'].mean():.1f} K")
-                    st.write(f"- Mediana: {filtered_data['koi_teq'].median():.1f} K")
-                    st.write(f"- Desvio Padrão: {filtered_data['koi_teq'].std():.1f} K")
+                    with col_s2:
+                        st.write("**Temperatura:**")
+                        st.write(f"- Média: {filtered_stats['koi_teq']['mean']:.1f} K")
+                        st.write(f"- Mediana: {filtered_stats['koi_teq']['median']:.1f} K")
+                        st.write(f"- Desvio Padrão: {filtered_stats['koi_teq']['std']:.1f} K")
                     
-                    st.write("**Profundidade do Trânsito:**")
-                    st.write(f"- Média: {filtered_data['koi_depth'].mean():.6f}")
-                    st.write(f"- Mediana: {filtered_data['koi_depth'].median():.6f}")
-            else:
-                st.warning("⚠️ Nenhum objeto encontrado com os filtros aplicados")
+                        st.write("**Profundidade do Trânsito:**")
+                        st.write(f"- Média: {filtered_stats['koi_depth']['mean']:.6f}")
+                        st.write(f"- Mediana: {filtered_stats['koi_depth']['median']:.6f}")
+                else:
+                    st.warning("⚠️ Nenhum objeto encontrado com os filtros aplicados")
         
-        else:
-            st.info("📁 **Nenhum dado carregado** - Faça upload de um arquivo na aba 'Análise' para usar os filtros")
+            else:
+                st.info("📁 **Nenhum dado carregado** - Faça upload de um arquivo na aba 'Análise' para usar os filtros")
             
-            # Interface de análise manual (modo sem dados)
-            st.subheader("🔬 Análise Manual")
+                # Interface de análise manual (modo sem dados)
+                st.subheader("🔬 Análise Manual")
             
-            col_p1, col_p2, col_p3 = st.columns(3)
+                col_p1, col_p2, col_p3 = st.columns(3)
 
-            with col_p1:
-                orbital_period = st.number_input(get_translation("orbital_period", selected_language), min_value=0.1, value=3.5, key="manual_orbital_period", help="Período orbital em dias")
-                transit_duration = st.number_input(get_translation("transit_duration", selected_language), min_value=0.1, value=2.5, key="manual_transit_duration", help="Duração do trânsito em horas")
-                planet_radius = st.number_input(get_translation("planet_radius", selected_language), min_value=0.1, value=1.2, key="manual_planet_radius", help="Raio planetário em raios terrestres")
+                with col_p1:
+                    orbital_period = st.number_input(get_translation("orbital_period", selected_language), min_value=0.1, value=3.5, key="manual_orbital_period", help="Período orbital em dias")
+                    transit_duration = st.number_input(get_translation("transit_duration", selected_language), min_value=0.1, value=2.5, key="manual_transit_duration", help="Duração do trânsito em horas")
+                    planet_radius = st.number_input(get_translation("planet_radius", selected_language), min_value=0.1, value=1.2, key="manual_planet_radius", help="Raio planetário em raios terrestres")
 
-            with col_p2:
-                stellar_mass = st.number_input(get_translation("stellar_mass", selected_language), min_value=0.1, value=1.0, key="manual_stellar_mass", help="Massa estelar em massas solares")
-                stellar_radius = st.number_input(get_translation("stellar_radius", selected_language), min_value=0.1, value=1.0, key="manual_stellar_radius", help="Raio estelar em raios solares")
-                equilibrium_temp = st.number_input(get_translation("equilibrium_temp", selected_language), min_value=100.0, value=500.0, key="manual_equilibrium_temp", help="Temperatura de equilíbrio em Kelvin")
+                with col_p2:
+                    stellar_mass = st.number_input(get_translation("stellar_mass", selected_language), min_value=0.1, value=1.0, key="manual_stellar_mass", help="Massa estelar em massas solares")
+                    stellar_radius = st.number_input(get_translation("stellar_radius", selected_language), min_value=0.1, value=1.0, key="manual_stellar_radius", help="Raio estelar em raios solares")
+                    equilibrium_temp = st.number_input(get_translation("equilibrium_temp", selected_language), min_value=100.0, value=500.0, key="manual_equilibrium_temp", help="Temperatura de equilíbrio em Kelvin")
 
-            with col_p3:
-                impact_parameter = st.number_input(get_translation("impact_parameter", selected_language), min_value=0.0, max_value=1.0, value=0.3, key="manual_impact_parameter", help="Parâmetro de impacto (0-1)")
-                stellar_density = st.number_input(get_translation("stellar_density", selected_language), min_value=0.1, value=1.4, key="manual_stellar_density", help="Densidade estelar em g/cm³")
-                kepmag = st.number_input(get_translation("kepmag", selected_language), min_value=8.0, max_value=16.0, value=12.0, key="manual_kepmag", help="Magnitude Kepler")
+                with col_p3:
+                    impact_parameter = st.number_input(get_translation("impact_parameter", selected_language), min_value=0.0, max_value=1.0, value=0.3, key="manual_impact_parameter", help="Parâmetro de impacto (0-1)")
+                    stellar_density = st.number_input(get_translation("stellar_density", selected_language), min_value=0.1, value=1.4, key="manual_stellar_density", help="Densidade estelar em g/cm³")
+                    kepmag = st.number_input(get_translation("kepmag", selected_language), min_value=8.0, max_value=16.0, value=12.0, key="manual_kepmag", help="Magnitude Kepler")
 
-            if st.button(get_translation("analyze", selected_language)):
-                st.info("🔬 **Modo de análise manual** - Para análise completa, faça upload de dados na aba 'Análise'")
+                if st.button(get_translation("analyze", selected_language)):
+                    detector = initialize_detector()
                 
-                # Simulação das probabilidades para exemplo:
-                pred_probs = np.random.uniform(0, 1, 3)
-                pred_probs /= pred_probs.sum()
+                    if detector.models:
+                        # Features ausentes no formulário são imputadas com as medianas do pipeline
+                        prediction = detector.predict_exoplanet({
+                            'koi_period': orbital_period,
+                            'koi_duration': transit_duration,
+                            'koi_prad': planet_radius,
+                            'koi_teq': equilibrium_temp,
+                            'koi_impact': impact_parameter
+                        })
+                        class_probs = {}
+                        for model_probs in prediction['probabilities'].values():
+                            for label, prob in model_probs.items():
+                                class_probs[label] = class_probs.get(label, 0.0) + prob / len(prediction['probabilities'])
+                        pred_probs = np.array([class_probs.get(label, 0.0) for label in ['CONFIRMED', 'CANDIDATE', 'FALSE POSITIVE']])
+                        cache_stats = detector.prediction_cache.stats()
+                        st.caption(
+                            f"Pipeline {prediction['model_version']} - {prediction['ensemble_prediction']} "
+                            f"(cache: {cache_stats['hit_rate']:.0%} de acertos, {cache_stats['entries']} entradas)"
+                        )
+                    else:
+                        st.info("🔬 **Modo de análise manual** - Para análise completa, faça upload de dados na aba 'Análise'")
+                    
+                        # Simulação das probabilidades para exemplo:
+                        pred_probs = np.random.uniform(0, 1, 3)
+                        pred_probs /= pred_probs.sum()
                 
-                st.subheader("📊 Resultados da Análise Manual")
+                    st.subheader("📊 Resultados da Análise Manual")
                 
-                col_res1, col_res2, col_res3 = st.columns(3)
+                    col_res1, col_res2, col_res3 = st.columns(3)
                 
-                with col_res1:
-                    st.metric("Confirmado", f"{pred_probs[0]:.1%}")
-                with col_res2:
-                    st.metric("Candidato", f"{pred_probs[1]:.1%}")
-                with col_res3:
-                    st.metric("Falso Positivo", f"{pred_probs[2]:.1%}")
-
-        # Remover código duplicado que estava causando erro
-
-        # Remover código duplicado que estava causando erro
-
-    with tab3:
-        st.header(get_translation("model_performance", selected_language))
-
-    # Simular dados de performance
-        models = ['Random Forest', 'XGBoost', 'LightGBM']
-        accuracy = [0.91, 0.93, 0.89]
-        precision = [0.88, 0.92, 0.87]
-        recall = [0.90, 0.91, 0.89]
-        f1_score = [0.89, 0.91, 0.88]
-
-    # Métricas por modelo
-        col_m1, col_m2, col_m3 = st.columns(3)
-
-        with col_m1:
-            st.subheader("Random Forest")
-            st.metric("Acurácia", f"{accuracy[0]:.1%}")
-            st.metric("Precisão", f"{precision[0]:.1%}")
-            st.metric("Recall", f"{recall[0]:.1%}")
-            st.metric("F1-Score", f"{f1_score[0]:.1%}")
-
-        with col_m2:
-            st.subheader("XGBoost")
-            st.metric("Acurácia", f"{accuracy[1]:.1%}")
-            st.metric("Precisão", f"{precision[1]:.1%}")
-            st.metric("Recall", f"{recall[1]:.1%}")
-            st.metric("F1-Score", f"{f1_score[1]:.1%}")
-
-        with col_m3:
-            st.subheader("LightGBM")
-            st.metric("Acurácia", f"{accuracy[2]:.1%}")
-            st.metric("Precisão", f"{precision[2]:.1%}")
-            st.metric("Recall", f"{recall[2]:.1%}")
-            st.metric("F1-Score", f"{f1_score[2]:.1%}")
+                    with col_res1:
+                        st.metric("Confirmado", f"{pred_probs[0]:.1%}")
+                    with col_res2:
+                        st.metric("Candidato", f"{pred_probs[1]:.1%}")
+                    with col_res3:
+                        st.metric("Falso Positivo", f"{pred_probs[2]:.1%}")
 
-    # Gráfico comparativo
-        fig_comparison = go.Figure()
+            # Remover código duplicado que estava causando erro
 
-        fig_comparison.add_trace(go.Bar(name=get_translation("accuracy_label", selected_language), x=models, y=accuracy, marker_color='#667eea'))
-        fig_comparison.add_trace(go.Bar(name=get_translation("precision_label", selected_language), x=models, y=precision, marker_color='#764ba2'))
-        fig_comparison.add_trace(go.Bar(name=get_translation("recall_label", selected_language), x=models, y=recall, marker_color='#f093fb'))
-        fig_comparison.add_trace(go.Bar(name=get_translation("f1_score_label", selected_language), x=models, y=f1_score, marker_color='#f5576c'))
+            # Remover código duplicado que estava causando erro
 
-        fig_comparison.update_layout(
-        title=get_translation("model_comparison", selected_language),
-        xaxis_title=get_translation("models_label", selected_language),
-        yaxis_title=get_translation("score_label", selected_language),
-        barmode='group',
-        height=400
-    )
+        elif active_section == 'performance':
+            st.header(get_translation("model_performance", selected_language))
 
-        st.plotly_chart(fig_comparison, use_container_width=True)
+            render_model_performance(initialize_detector(), selected_language)
+            render_permutation_importance(initialize_detector(), selected_language)
     
-    with tab4:
-        st.header(get_translation("documentation", selected_language))
+        elif active_section == 'documentation':
+            st.header(get_translation("documentation", selected_language))
         
-        st.subheader(get_translation("about_system", selected_language))
-        st.markdown(f"""
+            st.subheader(get_translation("about_system", selected_language))
+            st.markdown(f"""
         {get_translation("system_description", selected_language)}
         """)
         
-        st.markdown(f"""
+            st.markdown(f"""
         ### 🔬 {get_translation("methodology", selected_language)}
         
         **1. {get_translation("data_preprocessing", selected_language)}**
@@ -1563,7 +2407,7 @@ def main():
         - **Ensemble**: {get_translation("ensemble_desc", selected_language)}
         """)
         
-        st.markdown(f"""
+            st.markdown(f"""
         ### {get_translation("analysis_variables", selected_language)}
         
         - **Período Orbital**: Duração da órbita do planeta
@@ -1590,7 +2434,7 @@ def main():
         **{get_translation("tip", selected_language)}:** Use o botão "Baixar Template CSV" na sidebar para obter um exemplo completo!
         """)
         
-        st.markdown(f"""
+            st.markdown(f"""
         ### {get_translation("classifications", selected_language)}
         
         - **Confirmado**: Planeta validado por múltiplas observações
@@ -1606,8 +2450,8 @@ def main():
         - Sistema de modelos ensemble
         """)
         
-        st.subheader(f"🔗 {get_translation('external_resources', selected_language)}")
-        st.markdown("""
+            st.subheader(f"🔗 {get_translation('external_resources', selected_language)}")
+            st.markdown("""
         - [NASA Exoplanet Archive](https://exoplanetarchive.ipac.caltech.edu/)
         - [Kepler Mission](https://www.nasa.gov/mission_pages/kepler/main/)
         - [TESS Mission](https://tess.mit.edu/)
@@ -1615,9 +2459,9 @@ def main():
         - [Repositório GitHub](https://github.com/MatheusEdson/NASA-Space-Apps-Challenge-2025)
         """)
         
-        st.subheader(f"📖 {get_translation('source_code', selected_language)}")
-        st.markdown("**🔗 [Repositório GitHub](https://github.com/MatheusEdson/NASA-Space-Apps-Challenge-2025)**")
-        st.code("""
+            st.subheader(f"📖 {get_translation('source_code', selected_language)}")
+            st.markdown("**🔗 [Repositório GitHub](https://github.com/MatheusEdson/NASA-Space-Apps-Challenge-2025)**")
+            st.code("""
 # Example: Executar sistema completo
 from exoplanet_ml import ExoplanetDetector
 
@@ -1634,6 +2478,11 @@ prediction = detector.predict_exoplanet(data_point)
 print(f"Classificação: {prediction['ensemble_prediction']}")
         """)
 
+    st.session_state['rerun_timings']['total'] = (time.perf_counter() - rerun_started) * 1000
+    if st.session_state.get('debug_timings'):
+        with st.sidebar:
+            render_rerun_timings(selected_language)
+
 if __name__ == "__main__":
     main()
     
@@ -1644,4 +2493,9 @@ if __name__ == "__main__":
         <p>🚀 <strong>Sistema de Detecção de Exoplanetas com IA</strong> | NASA Space Apps Challenge 2025</p>
         <p>📂 <a href='https://github.com/MatheusEdson/NASA-Space-Apps-Challenge-2025' target='_blank' style='color: #667eea;'>Repositório GitHub</a></p>
     </div>
-    """, unsafe_allow_html=True)
\ No newline at end of file
+    """, unsafe_allow_html=True)
+    
+    # Enquanto houver treinamento ou atualização em andamento, reexecuta para atualizar o progresso
+    if st.session_state.get('training_job_running') or st.session_state.get('refresh_running'):
+        time.sleep(1.0)
+        st.rerun()
\ No newline at end of file
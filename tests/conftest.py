@@ -0,0 +1,49 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics_store
+from exoplanet_ml import ExoplanetDetector
+
+FEATURES = ['koi_period', 'koi_depth', 'koi_prad']
+
+def labeled_catalog(rows=300, seed=0):
+    """Catálogo pequeno em que a disposição depende das features"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'koi_period': rng.uniform(1, 50, rows),
+        'koi_depth': rng.uniform(0, 1, rows),
+        'koi_prad': rng.uniform(1, 10, rows)
+    })
+    df['koi_disposition'] = np.where(
+        df['koi_period'] < 15, 'CONFIRMED', np.where(df['koi_prad'] < 5, 'CANDIDATE', 'FALSE POSITIVE')
+    )
+    return df
+
+@pytest.fixture(autouse=True)
+def isolated_metrics(tmp_path, monkeypatch):
+    """Métricas registradas pelos testes vão para um SQLite temporário, não para models/"""
+    monkeypatch.setattr(metrics_store, 'METRICS_DB_PATH', str(tmp_path / 'metrics.sqlite'))
+
+@pytest.fixture
+def detector():
+    """Detector pronto para predição sem passar pelo train_models completo"""
+    df = labeled_catalog()
+    detector = ExoplanetDetector()
+    detector.features = list(FEATURES)
+    detector.feature_medians = df[FEATURES].median().to_dict()
+    y = detector.label_encoder.fit_transform(df['koi_disposition'])
+    X = detector.scaler.fit_transform(df[FEATURES].to_numpy())
+    detector.models = {
+        'Random Forest': RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y),
+        'Logistic': LogisticRegression(max_iter=500).fit(X, y)
+    }
+    detector.model_version = 'v1'
+    return detector
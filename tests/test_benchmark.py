@@ -0,0 +1,52 @@
+import pytest
+
+from benchmark import compare_to_baseline, format_report
+
+def result(stage, seconds, rows=1_000, width=0):
+    return {
+        'stage': stage, 'size': f"{rows // 1000}k", 'rows': rows, 'width': width,
+        'seconds': seconds, 'rows_per_second': rows / seconds if seconds else None, 'peak_rss_mb': 100.0
+    }
+
+BASELINE = {
+    'mission': 'kepler_koi',
+    'results': [
+        result('read', 0.100),
+        result('train', 2.0),
+        result('predict', 0.001),
+        result('save', 0.0),
+        result('read', 1.0, rows=100_000),
+    ]
+}
+
+def test_regressions_need_both_the_ratio_and_the_absolute_slowdown():
+    report = {'mission': 'kepler_koi', 'results': [
+        result('read', 0.130),        # 30% mais lento: regressão
+        result('train', 2.4),         # 20%: dentro do limite
+        result('predict', 0.004),     # 4x, mas só 3 ms a mais: ruído
+        result('save', 0.01),         # baseline zerado: razão infinita
+        result('read', 1.0, rows=100_000, width=10),  # largura sem baseline
+    ]}
+    comparisons, regressions = compare_to_baseline(report, BASELINE, threshold=0.25, min_seconds=0.005)
+
+    by_stage = {comparison['stage']: comparison for comparison in comparisons}
+    assert len(comparisons) == 4
+    assert by_stage['read']['ratio'] == pytest.approx(1.3) and by_stage['read']['baseline_seconds'] == 0.1
+    assert by_stage['train']['ratio'] == pytest.approx(1.2)
+    assert by_stage['save']['ratio'] == float('inf')
+    assert [regression['stage'] for regression in regressions] == ['read', 'save']
+
+    # Limite mais folgado, ou piso absoluto maior, tira as regressões
+    assert [r['stage'] for r in compare_to_baseline(report, BASELINE, threshold=0.1)[1]] == ['read', 'train', 'save']
+    assert compare_to_baseline(report, BASELINE, threshold=0.5, min_seconds=0.005)[1] == [by_stage['save']]
+    assert compare_to_baseline(report, BASELINE, min_seconds=1.0)[1] == []
+
+    table = format_report(report, comparisons)
+    assert '1.30x!' in table and '1.20x' in table and '1.20x!' not in table
+
+def test_baseline_from_another_mission_is_ignored():
+    report = {'mission': 'tess_toi', 'results': [result('read', 10.0)]}
+    assert compare_to_baseline(report, BASELINE) == ([], [])
+    # Baselines antigos sem missão valem para o Kepler
+    legacy = {'results': BASELINE['results']}
+    assert len(compare_to_baseline({'results': [result('read', 10.0)]}, legacy)[1]) == 1
@@ -0,0 +1,65 @@
+import numpy as np
+
+from conftest import FEATURES, labeled_catalog
+from exoplanet_ml import ExoplanetDetector
+
+def validation_split(detector):
+    df = labeled_catalog(rows=200, seed=1)
+    X = detector.scaler.transform(df[FEATURES].to_numpy())
+    return df, X, detector.label_encoder.transform(df['koi_disposition'])
+
+def test_calibration_respects_accuracy_drop(detector):
+    _, X_val, y_val = validation_split(detector)
+    config = detector.calibrate_cascade(X_val, y_val, max_accuracy_drop=0.005)
+
+    assert config['cascade_accuracy'] >= config['full_accuracy'] - 0.005
+    assert config['accuracy_delta'] == config['cascade_accuracy'] - config['full_accuracy']
+    assert sorted(config['order']) == sorted(detector.models)
+    costs = config['costs_ms_per_1k']
+    assert costs[config['order'][0]] == min(costs.values())
+
+def test_cascade_thresholds_bound_the_ensemble(detector):
+    df, X_val, _ = validation_split(detector)
+    detector.calibrate_cascade(X_val, detector.label_encoder.transform(df['koi_disposition']))
+    ensemble = detector.predict_batch(df)
+
+    never = detector.predict_cascade(df, threshold=0.0)
+    assert not never['escalated'].any()
+    always = detector.predict_cascade(df, threshold=np.inf)
+    assert always['escalated'].all()
+    assert (always['ensemble_prediction'] == ensemble['ensemble_prediction']).all()
+
+def test_uncalibrated_cascade_starts_with_cheapest_model(detector):
+    detector.model_performance = {'Random Forest': {'predict_ms_per_1k': 50.0}, 'Logistic': {'predict_ms_per_1k': 1.0}}
+    df = labeled_catalog(rows=50, seed=2)
+    result = detector.predict_cascade(df, threshold=0.0)
+    first = detector.models['Logistic'].predict_proba(detector.scaler.transform(df[FEATURES].to_numpy()))
+    assert (result['ensemble_prediction'] == detector.label_encoder.inverse_transform(first.argmax(axis=1))).all()
+
+def test_reported_delta_comes_from_rows_the_threshold_never_saw(detector):
+    df, X_val, y_val = validation_split(detector)
+    holdout = labeled_catalog(rows=150, seed=3)
+    X_eval = detector.scaler.transform(holdout[FEATURES].to_numpy())
+    config = detector.calibrate_cascade(
+        X_val, y_val, X_eval_scaled=X_eval, y_eval=detector.label_encoder.transform(holdout['koi_disposition'])
+    )
+    assert (config['calibration_rows'], config['evaluation_rows']) == (200, 150)
+    assert config['calibration_accuracy_delta'] >= -0.005 - 1e-12
+
+    cascade = detector.predict_cascade(holdout)
+    full = detector.predict_batch(holdout)
+    truth = holdout['koi_disposition'].to_numpy()
+    assert config['cascade_accuracy'] == np.mean(cascade['ensemble_prediction'].to_numpy() == truth)
+    assert config['full_accuracy'] == np.mean(full['ensemble_prediction'].to_numpy() == truth)
+    assert config['escalation_rate'] == cascade['escalated'].mean()
+    assert config['accuracy_delta'] == config['cascade_accuracy'] - config['full_accuracy']
+
+def test_training_calibrates_and_reports_on_separate_halves(tmp_path):
+    df = labeled_catalog(rows=400, seed=6)
+    detector = ExoplanetDetector()
+    df['target'] = detector.label_encoder.fit_transform(df['koi_disposition'])
+    _, X_test, _ = detector.train_models(df, FEATURES, models_dir=str(tmp_path), record_metrics=False)
+
+    config = detector.cascade_config
+    assert config['calibration_rows'] + config['evaluation_rows'] == len(X_test)
+    assert abs(config['calibration_rows'] - config['evaluation_rows']) <= 1
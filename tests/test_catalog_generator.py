@@ -0,0 +1,34 @@
+import pandas as pd
+import pytest
+
+from catalog_generator import SEED_BLOCK_ROWS, generate_catalog, write_catalog
+
+ROWS = SEED_BLOCK_ROWS + 1_300
+
+def write(tmp_path, name, seed=7, **kwargs):
+    report = write_catalog(str(tmp_path / name), ROWS, mission='tess_toi', seed=seed, **kwargs)
+    return report, (tmp_path / name).read_bytes()
+
+def test_same_seed_is_byte_identical_across_jobs_and_chunk_counts(tmp_path):
+    report, expected = write(tmp_path, 'serial.csv', chunk_rows=ROWS)
+    assert report['chunks'] == 1
+    for jobs, chunk_rows in ((1, 999), (3, 999), (2, 2_500), (3, SEED_BLOCK_ROWS)):
+        report, written = write(tmp_path, f"jobs{jobs}-{chunk_rows}.csv", jobs=jobs, chunk_rows=chunk_rows)
+        assert report['chunks'] == -(-ROWS // chunk_rows)
+        assert written == expected, (jobs, chunk_rows)
+
+    assert write(tmp_path, 'other.csv', seed=8, chunk_rows=ROWS)[1] != expected
+
+@pytest.mark.parametrize('mission', ['kepler_koi', 'microlensing'])
+def test_parquet_and_partitions_hold_the_same_rows(tmp_path, mission):
+    expected = generate_catalog(ROWS, mission, seed=3, chunk_rows=4_000).reset_index(drop=True)
+    # Um catálogo menor é prefixo do maior
+    pd.testing.assert_frame_equal(generate_catalog(1_000, mission, seed=3).reset_index(drop=True), expected.iloc[:1_000])
+
+    write_catalog(str(tmp_path / 'single.parquet'), ROWS, mission=mission, seed=3, chunk_rows=777, jobs=2)
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / 'single.parquet'), expected)
+
+    report = write_catalog(str(tmp_path / 'parts'), ROWS, mission=mission, seed=3, chunk_rows=3_000, partitioned=True)
+    assert len(report['outputs']) == 3
+    parts = pd.concat([pd.read_parquet(path) for path in report['outputs']], ignore_index=True)
+    pd.testing.assert_frame_equal(parts, expected)
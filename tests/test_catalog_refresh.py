@@ -0,0 +1,76 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from conftest import labeled_catalog
+from exoplanet_ml import NASA_TABLES, CatalogRefresh
+
+KEPLER_ROWS = 120
+TESS_ROWS = 70
+
+@pytest.fixture
+def archive(tmp_path):
+    """Arquivo NASA local: <tabela>.csv para Kepler e TESS, sem a tabela de microlente"""
+    kepler = labeled_catalog(rows=KEPLER_ROWS, seed=11)
+    kepler.insert(0, 'kepoi_name', [f"K{i:05d}.01" for i in range(KEPLER_ROWS)])
+    with open(tmp_path / f"{NASA_TABLES['kepler_koi']}.csv", 'w') as f:
+        f.write('# Cabeçalho de comentário como o do arquivo da NASA\n')
+        kepler.to_csv(f, index=False)
+
+    tess = labeled_catalog(rows=TESS_ROWS, seed=12).rename(
+        columns={'koi_period': 'pl_orbper', 'koi_depth': 'pl_trandep', 'koi_prad': 'pl_rade'}
+    )
+    tess['tfopwg_disp'] = np.where(tess.pop('koi_disposition') == 'CONFIRMED', 'CP', 'PC')
+    tess.insert(0, 'toi', [f"{i}.01" for i in range(TESS_ROWS)])
+    tess.to_csv(tmp_path / f"{NASA_TABLES['tess_toi']}.csv", index=False)
+    return tmp_path
+
+def file_size(archive, mission):
+    return os.path.getsize(archive / f"{NASA_TABLES[mission]}.csv")
+
+def test_refresh_reports_bytes_rows_scoring_then_done(archive, detector):
+    events = []
+    lock = threading.Lock()
+
+    def collect(event):
+        with lock:
+            events.append(event)
+
+    refresh = detector.refresh_nasa_data(
+        base_url=str(archive), sources=['kepler_koi', 'tess_toi'], score_chunksize=25, progress_callback=collect
+    )
+
+    for mission, rows in (('kepler_koi', KEPLER_ROWS), ('tess_toi', TESS_ROWS)):
+        own = [event for event in events if event['source'] == mission]
+        stages = [event['stage'] for event in own]
+        assert stages == sorted(stages, key=['fetch', 'parse', 'score', 'done'].index)
+        assert stages[-1] == 'done' and stages.count('done') == 1
+
+        fetched = [event['bytes'] for event in own if event['stage'] == 'fetch']
+        assert fetched == sorted(fetched) and fetched[-1] == file_size(archive, mission)
+        assert all(event['total_bytes'] == file_size(archive, mission) for event in own if event['stage'] == 'fetch')
+        assert [event['rows'] for event in own if event['stage'] == 'parse'] == [rows]
+        scored = [event['rows_scored'] for event in own if event['stage'] == 'score']
+        assert scored == list(range(25, rows, 25)) + [rows]
+        assert sum(own[-1]['summary']['predicted'].values()) == rows
+
+    assert refresh['rows'] == KEPLER_ROWS + TESS_ROWS
+    assert set(refresh['sources']['tess_toi']['dispositions']) <= {'CONFIRMED', 'CANDIDATE'}
+
+def test_catalog_refresh_snapshot_totals_and_missing_table(archive, detector):
+    refresh = CatalogRefresh(detector, base_url=str(archive)).start()
+    refresh._thread.join(timeout=60)
+    snapshot = refresh.snapshot()
+
+    assert not snapshot['running'] and snapshot['error'] is None
+    assert snapshot['progress'] == 1.0
+    assert snapshot['bytes'] == file_size(archive, 'kepler_koi') + file_size(archive, 'tess_toi')
+    assert snapshot['rows'] == snapshot['rows_scored'] == KEPLER_ROWS + TESS_ROWS
+    assert set(snapshot['summary']['sources']) == {'kepler_koi', 'tess_toi'}
+
+    missing = snapshot['sources']['microlensing']
+    assert missing['stage'] == 'error'
+    assert f"{NASA_TABLES['microlensing']}.csv" in missing['error']
+    assert missing['bytes'] == missing['rows'] == 0
@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+import benchmark
+import exoplanet_ml
+from conftest import labeled_catalog
+
+def run(capsys, argv):
+    code = exoplanet_ml.main(argv)
+    return code, json.loads(capsys.readouterr().out or 'null')
+
+def test_unknown_options_are_rejected_for_every_command(tmp_path):
+    for argv in (['train', 'x.csv', '--nope'], ['bench', '--sizes', '1k'], ['similar', 'x.csv']):
+        with pytest.raises(SystemExit) as exit_info:
+            exoplanet_ml.main(argv)
+        assert exit_info.value.code == exoplanet_ml.EXIT_USAGE
+
+def test_bench_forwards_everything_after_the_separator(monkeypatch):
+    calls = []
+    monkeypatch.setattr(benchmark, 'main', lambda argv: calls.append(argv) or 0)
+    assert exoplanet_ml.main(['bench', '--log-level', 'WARNING', '--', '--sizes', '1k', '--repeat', '1']) == exoplanet_ml.EXIT_OK
+    assert exoplanet_ml.main(['bench']) == exoplanet_ml.EXIT_OK
+    assert calls == [['--sizes', '1k', '--repeat', '1'], []]
+
+@pytest.fixture
+def catalog_path(tmp_path):
+    df = labeled_catalog(rows=60, seed=5)
+    # Identificadores só com dígitos não podem ser confundidos com posições
+    df.insert(0, 'kepoi_name', [str(1000 + i) for i in range(len(df))])
+    path = tmp_path / 'catalogo.csv'
+    df.to_csv(path, index=False)
+    return str(path)
+
+def test_similar_object_is_an_id_and_position_is_explicit(capsys, tmp_path, catalog_path):
+    common = ['similar', catalog_path, '--index-dir', str(tmp_path / 'index'), '--k', '3']
+    code, by_id = run(capsys, common + ['--object', '1007'])
+    assert code == exoplanet_ml.EXIT_OK
+    code, by_position = run(capsys, common + ['--position', '7'])
+    assert code == exoplanet_ml.EXIT_OK
+    assert by_id['neighbors'] == by_position['neighbors']
+    assert 7 not in [neighbor['position'] for neighbor in by_id['neighbors']]
+
+    code, missing = run(capsys, common + ['--object', '7'])
+    assert code == exoplanet_ml.EXIT_NO_DATA and 'Objeto 7' in missing['error']
+    code, missing = run(capsys, common + ['--position', '600'])
+    assert code == exoplanet_ml.EXIT_NO_DATA and 'posição 600' in missing['error']
+
+    with pytest.raises(SystemExit):
+        exoplanet_ml.main(common + ['--object', '1007', '--position', '7'])
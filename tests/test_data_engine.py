@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_engine import DISPOSITION_LABELS, FILTER_COLUMNS, FilterIndex, FilterStatistics
+
+def catalog(rows=2000, seed=0):
+    """Catálogo com NaN, valores repetidos e disposições ausentes"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({col: rng.integers(0, 50, rows).astype(float) for col in FILTER_COLUMNS})
+    for col in FILTER_COLUMNS:
+        df.loc[rng.random(rows) < 0.05, col] = np.nan
+    df['koi_disposition'] = rng.choice(DISPOSITION_LABELS + [None], rows, p=[0.3, 0.3, 0.3, 0.1])
+    df['koi_name'] = [f"K{i:05d}" for i in range(rows)]
+    return df
+
+def pandas_positions(df, ranges, categories):
+    mask = pd.Series(True, index=df.index)
+    for col, (low, high) in ranges.items():
+        mask &= (df[col] >= low) & (df[col] <= high)
+    if categories is not None:
+        mask &= df['koi_disposition'].isin(categories)
+    return np.flatnonzero(mask.to_numpy())
+
+@pytest.fixture(scope='module')
+def indexed():
+    df = catalog()
+    return df, FilterIndex(df)
+
+def test_query_matches_pandas_mask(indexed):
+    df, index = indexed
+    rng = np.random.default_rng(1)
+    for _ in range(200):
+        columns = rng.choice(FILTER_COLUMNS, rng.integers(0, len(FILTER_COLUMNS) + 1), replace=False)
+        ranges = {col: tuple(sorted(rng.uniform(-5, 55, 2))) for col in columns}
+        categories = None
+        if rng.random() < 0.5:
+            categories = list(rng.choice(DISPOSITION_LABELS, rng.integers(0, 4), replace=False))
+        expected = pandas_positions(df, ranges, categories)
+
+        result = index.filter(ranges, categories)
+        np.testing.assert_array_equal(result['positions'], expected)
+        assert result['total'] == len(expected)
+        selected = df.iloc[expected]['koi_disposition'].value_counts()
+        assert result['counts'] == {label: int(selected.get(label, 0)) for label in DISPOSITION_LABELS}
+
+def test_full_ranges_still_exclude_nan(indexed):
+    df, index = indexed
+    ranges = {col: index.bounds(col) for col in FILTER_COLUMNS}
+    np.testing.assert_array_equal(index.query(ranges), pandas_positions(df, ranges, None))
+    np.testing.assert_array_equal(index.query({}, DISPOSITION_LABELS), pandas_positions(df, {}, DISPOSITION_LABELS))
+    assert len(index.query()) == len(df)
+
+def test_matches_agrees_with_query(indexed):
+    df, index = indexed
+    ranges = {'koi_period': (10, 30), 'koi_teq': (0, 25)}
+    rows = np.arange(len(df))
+    mask = index.matches(rows, ranges, ['CONFIRMED', 'CANDIDATE'])
+    np.testing.assert_array_equal(np.flatnonzero(mask), index.query(ranges, ['CONFIRMED', 'CANDIDATE']))
+
+def assert_stats_match_pandas(stats, subset, exact_median=True):
+    for col, values in stats.items():
+        column = subset[col]
+        assert values['count'] == column.count()
+        assert values['mean'] == pytest.approx(column.mean(), rel=1e-12)
+        assert values['std'] == pytest.approx(column.std(), rel=1e-9)
+        if exact_median:
+            assert values['median'] == column.median()
+
+def test_statistics_match_pandas(indexed):
+    df, index = indexed
+    statistics = FilterStatistics(index)
+    result = index.filter({'koi_period': (5, 40)}, ['CONFIRMED', 'CANDIDATE'])
+    assert_stats_match_pandas(statistics.compute(result), df.iloc[result['positions']])
+
+def test_incremental_statistics_match_a_full_pass(indexed):
+    df, index = indexed
+    bins = 64
+    # Limite zero força o caminho incremental (subtração das linhas que saíram)
+    statistics = FilterStatistics(index, bins=bins, exact_median_limit=0)
+    statistics.compute(index.filter({'koi_period': (5, 45)}))
+    narrowed = index.filter({'koi_period': (6, 44), 'koi_prad': (0, 48)})
+    stats = statistics.compute(narrowed)
+    assert statistics.incremental_updates == 1
+
+    subset = df.iloc[narrowed['positions']]
+    assert_stats_match_pandas(stats, subset, exact_median=False)
+    for col, values in stats.items():
+        # Erro de posto do histograma: no máximo 1/bins da coluna inteira
+        slack = index._valid[col] / bins / subset[col].count()
+        low, high = subset[col].quantile([max(0.0, 0.5 - slack), min(1.0, 0.5 + slack)])
+        assert low <= values['median'] <= high
+
+@pytest.mark.parametrize('column', ['koi_period', 'koi_name', 'koi_disposition'])
+def test_sort_positions_matches_pandas(indexed, column):
+    df, index = indexed
+    positions = index.query({'koi_prad': (5, 45)})
+    subset = df.iloc[positions]
+
+    ascending = index.sort_positions(positions, column, ascending=True)
+    expected = subset[column].reset_index(drop=True).sort_values(kind='stable', na_position='last').index
+    np.testing.assert_array_equal(ascending, positions[expected.to_numpy()])
+
+    descending = index.sort_positions(positions, column, ascending=False)
+    expected_values = subset[column].sort_values(ascending=False, kind='stable', na_position='last')
+    assert sorted(descending.tolist()) == sorted(positions.tolist())
+    pd.testing.assert_series_equal(
+        df[column].iloc[descending].reset_index(drop=True), expected_values.reset_index(drop=True)
+    )
+
+def test_rows_selects_columns_by_name(indexed):
+    df, index = indexed
+    pd.testing.assert_frame_equal(index.rows([3, 1], ['koi_name', 'koi_period']), df.iloc[[3, 1]][['koi_name', 'koi_period']])
+    with pytest.raises(KeyError, match='nope'):
+        index.rows([0, 1], ['koi_period', 'nope'])
+
+def test_statistics_survive_a_large_offset():
+    df = catalog(rows=3000, seed=5)
+    rng = np.random.default_rng(6)
+    # Soma dos quadrados cancelaria por completo: desvio padrão ~0.29 sobre 1e8
+    df['koi_teq'] = 1e8 + rng.uniform(0, 1, len(df))
+    index = FilterIndex(df)
+    statistics = FilterStatistics(index, exact_median_limit=0)
+
+    wide = index.filter({'koi_teq': (1e8 + 0.05, 1e8 + 0.95)})
+    narrowed = index.filter({'koi_teq': (1e8 + 0.1, 1e8 + 0.9), 'koi_period': (2, 48)})
+    for result in (wide, narrowed):
+        stats = statistics.compute(result)['koi_teq']
+        expected = df['koi_teq'].iloc[result['positions']]
+        assert stats['std'] == pytest.approx(expected.std(), rel=1e-6)
+        assert stats['mean'] == pytest.approx(expected.mean(), rel=1e-12)
+    assert statistics.incremental_updates == 1
@@ -0,0 +1,107 @@
+import os
+
+import lightgbm as lgb
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from conftest import FEATURES, labeled_catalog
+from explainability import (
+    ENSEMBLE_NAME, ExplanationCache, _forest_contributions, explain_rows, model_contributions,
+    permutation_importance
+)
+
+def scaled(detector, rows=120, seed=1):
+    df = labeled_catalog(rows=rows, seed=seed)
+    return df, detector.scaler.transform(df[FEATURES].to_numpy())
+
+def test_forest_bias_plus_contributions_is_predict_proba(detector):
+    _, X = scaled(detector)
+    forest = detector.models['Random Forest']
+    contributions, bias = _forest_contributions(forest, X)
+
+    assert contributions.shape == (len(X), forest.n_classes_, len(FEATURES))
+    np.testing.assert_allclose(bias + contributions.sum(axis=2), forest.predict_proba(X), atol=1e-10)
+    # O bias é o mesmo para todas as linhas: a distribuição média das raízes
+    np.testing.assert_allclose(bias, np.tile(bias[0], (len(X), 1)))
+
+@pytest.mark.parametrize('binary', [False, True])
+def test_booster_margins_add_up(detector, binary):
+    df, X = scaled(detector, rows=300, seed=2)
+    y = detector.label_encoder.transform(df['koi_disposition'])
+    if binary:
+        y = (y == 0).astype(int)
+
+    boosters = {
+        'XGBoost': (xgb.XGBClassifier(n_estimators=20, max_depth=3, random_state=0).fit(X, y),
+                    lambda model: model.predict(X, output_margin=True)),
+        'LightGBM': (lgb.LGBMClassifier(n_estimators=20, num_leaves=7, random_state=0, verbose=-1).fit(X, y),
+                     lambda model: model.predict(X, raw_score=True)),
+    }
+    for name, (model, margin) in boosters.items():
+        contributions, bias, space = model_contributions(model, X)
+        assert space == 'margin'
+        assert contributions.shape == (len(X), 1 if binary else 3, len(FEATURES)), name
+        expected = np.asarray(margin(model)).reshape(len(X), -1)
+        np.testing.assert_allclose(bias + contributions.sum(axis=2), expected, rtol=1e-5, atol=1e-5, err_msg=name)
+
+def test_explain_rows_reassembles_positions_across_batches(tmp_path, detector):
+    df = labeled_catalog(rows=50, seed=3)
+    X = detector.scaler.transform(df[FEATURES].to_numpy())
+    full, full_bias = _forest_contributions(detector.models['Random Forest'], X)
+    cache = ExplanationCache(directory=str(tmp_path))
+
+    # Fora de ordem, repetidas e nas bordas dos lotes de 7 linhas (inclusive o último, incompleto)
+    positions = [13, 0, 6, 7, 49, 14, 6, 48, 20]
+    result = explain_rows(detector, df, positions, 'Random Forest', 'abc', cache=cache, batch_rows=7)
+    np.testing.assert_array_equal(result['positions'], positions)
+    np.testing.assert_allclose(result['contributions'], full[positions])
+    np.testing.assert_allclose(result['bias'], full_bias[positions])
+    assert result['space'] == 'probability' and result['classes'] == list(detector.label_encoder.classes_)
+    batches = len({position // 7 for position in positions})
+    assert batches == 5 and cache.stats() == {'entries': 5, 'hits': 0, 'misses': 5}
+
+    again = explain_rows(detector, df, 8, 'Random Forest', 'abc', cache=cache, batch_rows=7)
+    np.testing.assert_allclose(again['contributions'], full[[8]])
+    assert cache.stats() == {'entries': 5, 'hits': 1, 'misses': 5}
+
+    with pytest.raises(IndexError):
+        explain_rows(detector, df, [50], 'Random Forest', 'abc', batch_rows=7)
+
+def test_cache_keys_are_versioned_on_disk(tmp_path):
+    directory = str(tmp_path / 'explanations')
+    cache = ExplanationCache(directory=directory)
+    key = ('contributions', 'v1', 'abc', 'Random Forest', 7, 0)
+    cache.put(key, {'value': 1})
+    files = os.listdir(os.path.join(directory, 'v1'))
+    assert len(files) == 1 and files[0].startswith('contributions_')
+
+    # Outra instância (outro processo) lê do disco; outra versão do modelo não
+    fresh = ExplanationCache(directory=directory)
+    assert fresh.get(key) == {'value': 1} and fresh.stats()['hits'] == 1
+    assert fresh.get(('contributions', 'v2') + key[2:]) is None
+    assert fresh.get_or_compute(('contributions', 'v2') + key[2:], lambda: {'value': 2}) == {'value': 2}
+    assert sorted(os.listdir(directory)) == ['v1', 'v2']
+
+    # Modelo sem versão: só memória
+    unversioned = ('contributions', None, 'abc', 'Random Forest', 7, 0)
+    cache.put(unversioned, {'value': 3})
+    assert sorted(os.listdir(directory)) == ['v1', 'v2']
+    assert ExplanationCache(directory=directory).get(unversioned) is None
+
+    # Arquivo corrompido é ignorado
+    with open(os.path.join(directory, 'v1', files[0]), 'wb') as handle:
+        handle.write(b'corrompido')
+    assert ExplanationCache(directory=directory).get(key) is None
+
+def test_permutation_importance_does_not_depend_on_jobs(detector):
+    df = labeled_catalog(rows=200, seed=4)
+    serial = permutation_importance(detector, df, n_repeats=3, jobs=1)
+    parallel = permutation_importance(detector, df, n_repeats=3, jobs=2)
+    assert serial == parallel
+
+    assert set(serial['importance']) == {'Random Forest', 'Logistic', ENSEMBLE_NAME}
+    assert serial['rows'] == 200 and serial['features'] == FEATURES
+    # A disposição depende de período e raio, não da profundidade
+    importance = serial['importance'][ENSEMBLE_NAME]
+    assert importance['koi_period'] > importance['koi_depth'] and importance['koi_prad'] > importance['koi_depth']
@@ -0,0 +1,59 @@
+import numpy as np
+
+from conftest import FEATURES, labeled_catalog
+
+POINT = {'koi_period': 5.0, 'koi_depth': 0.5, 'koi_prad': 3.0}
+
+class NeverThirdClass:
+    """Modelo que nunca dá probabilidade à terceira classe"""
+
+    def predict_proba(self, X):
+        first = 1 / (1 + np.exp(-4 * X[:, 0]))
+        return np.column_stack([first, 1 - first, np.zeros(len(X))])
+
+    def predict(self, X):
+        return self.predict_proba(X).argmax(axis=1)
+
+def splits(detector):
+    train, val = labeled_catalog(rows=300, seed=3), labeled_catalog(rows=200, seed=4)
+    X_train = detector.scaler.transform(train[FEATURES].to_numpy())
+    X_val = detector.scaler.transform(val[FEATURES].to_numpy())
+    return X_train, X_val, detector.label_encoder.transform(val['koi_disposition'])
+
+def test_faithful_fast_path_is_enabled_and_used_under_latency_target(detector):
+    X_train, X_val, y_val = splits(detector)
+    report = detector.build_fast_path(X_train, X_val, y_val)
+
+    ensemble = detector._ensemble_proba(X_val).argmax(axis=1)
+    fast = detector._fast_proba(X_val).argmax(axis=1)
+    assert report['agreement_with_ensemble'] == np.mean(fast == ensemble) >= 0.95
+    assert report['fast_accuracy'] >= report['ensemble_accuracy'] - 0.01
+    assert report['enabled']
+
+    assert detector.predict_exoplanet(POINT, latency_target_ms=0)['path'] == 'fast'
+    assert detector.predict_exoplanet(POINT, latency_target_ms=1e9)['path'] == 'ensemble'
+    assert detector.predict_exoplanet(POINT)['path'] == 'ensemble'
+
+def test_fidelity_gate_disables_the_latency_switch(detector):
+    X_train, X_val, y_val = splits(detector)
+    assert not detector.build_fast_path(X_train, X_val, y_val, min_agreement=1.01)['enabled']
+    assert detector.predict_exoplanet(POINT, latency_target_ms=0)['path'] == 'ensemble'
+
+    # Queda máxima negativa: o booster teria de superar o ensemble na acurácia
+    report = detector.build_fast_path(X_train, X_val, y_val, max_accuracy_drop=-1.0)
+    assert report['agreement_with_ensemble'] >= 0.95 and not report['enabled']
+    assert detector.predict_exoplanet(POINT, latency_target_ms=0)['path'] == 'ensemble'
+
+def test_class_without_soft_label_weight_keeps_its_column(detector):
+    detector.models = {'Never third': NeverThirdClass()}
+    X_train, X_val, _ = splits(detector)
+    detector.build_fast_path(X_train, X_val, n_estimators=20)
+
+    proba = detector._fast_proba(X_val)
+    assert proba.shape == (len(X_val), len(detector.label_encoder.classes_))
+    assert proba[:, 2].max() < 0.01
+    np.testing.assert_allclose(proba.sum(axis=1), 1.0)
+
+    detector.fast_path_report['enabled'] = True
+    result = detector.predict_exoplanet(POINT, latency_target_ms=0)
+    assert set(result['probabilities']['Fast Path']) == set(detector.label_encoder.classes_)
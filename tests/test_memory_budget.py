@@ -0,0 +1,66 @@
+import numpy as np
+
+from memory_budget import (
+    CHUNKED_READ_EXPANSION, MIN_READ_FRACTION, READ_EXPANSION, MemoryBudget, plan_csv_read, plan_training
+)
+
+ORDER = ['subsampled_cv', 'class_weights', 'bounded_forest', 'subsampled_training']
+CLASS_COUNTS = [40_000, 30_000, 10_000]
+
+class FixedBudget(MemoryBudget):
+    """Orçamento com folga fixa (independente do RSS do processo de teste)"""
+
+    def __init__(self, headroom_bytes):
+        super().__init__(limit_bytes=headroom_bytes)
+        self._headroom = headroom_bytes
+
+    def headroom(self):
+        return self._headroom
+
+def plan_for(headroom_mb):
+    budget = FixedBudget(int(headroom_mb * 1024 ** 2))
+    plan = plan_training(budget, CLASS_COUNTS, n_features=7)
+    return plan, [degradation['kind'] for degradation in budget.degradations]
+
+def test_unlimited_budget_keeps_the_full_plan():
+    budget = MemoryBudget(limit_bytes=0)
+    plan = plan_training(budget, CLASS_COUNTS, n_features=7)
+    assert plan['smote'] and plan['forest_max_samples'] is None
+    assert plan['train_rows'] == plan['cv_rows'] == sum(CLASS_COUNTS)
+    assert budget.degradations == []
+
+def test_degradations_follow_the_documented_order():
+    deepest = 0
+    first_seen = None
+    for headroom_mb in np.geomspace(4000, 5, 40):
+        plan, kinds = plan_for(headroom_mb)
+        assert kinds == sorted(kinds, key=ORDER.index)
+        if kinds and first_seen is None:
+            first_seen = kinds
+        # Do SMOTE em diante as degradações só se acumulam à medida que a folga diminui
+        later = [kind for kind in kinds if kind != 'subsampled_cv']
+        assert later == ORDER[1:1 + len(later)]
+        assert len(later) >= deepest
+        deepest = len(later)
+
+        assert ('class_weights' in kinds) == (not plan['smote'])
+        assert ('bounded_forest' in kinds) == (plan['forest_max_samples'] is not None)
+        assert ('subsampled_training' in kinds) == (plan['train_rows'] < sum(CLASS_COUNTS))
+        assert ('subsampled_cv' in kinds) == (plan['cv_rows'] < plan['train_rows'])
+    assert first_seen == ['subsampled_cv']
+    assert deepest == len(ORDER) - 1
+
+def test_csv_read_degrades_from_chunks_to_a_sample():
+    file_bytes = 100 * 1024 ** 2
+    assert plan_csv_read(FixedBudget(file_bytes * READ_EXPANSION), file_bytes) == {'chunked': False, 'sample_fraction': 1.0}
+
+    budget = FixedBudget(file_bytes * CHUNKED_READ_EXPANSION)
+    assert plan_csv_read(budget, file_bytes) == {'chunked': True, 'sample_fraction': 1.0}
+    assert [degradation['kind'] for degradation in budget.degradations] == ['chunked_read']
+
+    budget = FixedBudget(file_bytes * CHUNKED_READ_EXPANSION / 4)
+    plan = plan_csv_read(budget, file_bytes)
+    assert plan == {'chunked': True, 'sample_fraction': 0.25}
+    assert [degradation['kind'] for degradation in budget.degradations] == ['chunked_read', 'sampled_read']
+
+    assert plan_csv_read(FixedBudget(0), file_bytes)['sample_fraction'] == MIN_READ_FRACTION
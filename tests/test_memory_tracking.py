@@ -0,0 +1,24 @@
+import threading
+
+from exoplanet_ml import ExoplanetDetector
+from memory_budget import MemoryBudget
+from tracing import trace_stage
+
+@trace_stage('predict_batch')
+def concurrent_prediction():
+    pass
+
+def test_training_report_ignores_spans_from_other_threads():
+    detector = ExoplanetDetector()
+    other = threading.Thread(target=concurrent_prediction)
+    with detector._track_memory(MemoryBudget(limit_bytes=0)):
+        with trace_stage('fit:Random Forest'):
+            pass
+        other.start()
+        other.join()
+        with trace_stage('save_models'):
+            pass
+
+    stages = [stage['stage'] for stage in detector.training_report['stages']]
+    assert stages == ['fit:Random Forest', 'save_models']
+    assert detector.training_report['budget_mb'] is None
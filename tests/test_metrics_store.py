@@ -0,0 +1,121 @@
+import os
+import time
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import metrics_store
+from metrics_store import ROLLUP_SECONDS, MetricsStore, get_metrics_store, record_events
+
+START = 480_000 * ROLLUP_SECONDS
+HOURS = 12
+
+@pytest.fixture
+def store(tmp_path):
+    return MetricsStore(str(tmp_path / 'metrics.sqlite'))
+
+def raw_events(rows=400, seed=0):
+    rng = np.random.default_rng(seed)
+    accuracy = rng.uniform(0.5, 1.0, rows)
+    # Algumas métricas ausentes: não entram em média nem contagem
+    accuracy[rng.random(rows) < 0.1] = np.nan
+    return pd.DataFrame({
+        'ts': START + rng.uniform(0, HOURS * ROLLUP_SECONDS, rows),
+        'model': rng.choice(['Random Forest', 'XGBoost', None], rows),
+        'accuracy': accuracy,
+    })
+
+def test_rollup_window_matches_aggregating_raw_events(store):
+    events = raw_events()
+    store.record_many([
+        {'kind': 'training', 'timestamp': row.ts, 'model': row.model,
+         'accuracy': None if np.isnan(row.accuracy) else row.accuracy}
+        for row in events.itertuples()
+    ])
+    store.record('scoring', timestamp=START + 10, accuracy=0.1)
+
+    bucket = 2 * ROLLUP_SECONDS
+    start, end = START + ROLLUP_SECONDS * 2, START + ROLLUP_SECONDS * 10 - 1
+    result = store.query('training', start=start, end=end, bucket_seconds=bucket)
+
+    window = events[(events['ts'] >= start) & (events['ts'] <= end)].dropna(subset=['accuracy'])
+    expected = (
+        window.assign(bucket_ts=(window['ts'] // bucket) * bucket, model=window['model'].fillna(''))
+        .groupby(['bucket_ts', 'model'])['accuracy'].agg(['mean', 'min', 'max', 'count'])
+        .reset_index()
+    )
+    expected['timestamp'] = pd.to_datetime(expected.pop('bucket_ts'), unit='s')
+
+    result = result.sort_values(['timestamp', 'model']).reset_index(drop=True)
+    expected = expected.sort_values(['timestamp', 'model']).reset_index(drop=True)
+    assert len(result) == 4 * 3
+    pd.testing.assert_frame_equal(result[['timestamp', 'model']], expected[['timestamp', 'model']])
+    np.testing.assert_allclose(result[['mean', 'min', 'max']], expected[['mean', 'min', 'max']], rtol=1e-12)
+    np.testing.assert_array_equal(result['count'], expected['count'])
+
+def test_connections_are_per_thread(store):
+    main = store._connect()
+    assert store._connect() is main
+
+    seen = []
+    worker = threading.Thread(target=lambda: seen.append(store._connect()))
+    worker.start()
+    worker.join()
+    assert seen[0] is not main
+
+    # A inserção feita em outra thread é vista pela conexão desta
+    worker = threading.Thread(target=lambda: store.record('training', accuracy=0.9))
+    worker.start()
+    worker.join()
+    assert len(store.latest('training')) == 1
+
+def test_version_advances_with_every_insert(store):
+    assert store.version() == 0
+    store.record('training', accuracy=0.8)
+    assert store.version() == 1
+    store.record_many([{'kind': 'scoring', 'rows': 10}, {'kind': 'scoring', 'rows': 20}])
+    assert store.version() == 3
+    assert MetricsStore(store.path).version() == 3
+
+    with pytest.raises(ValueError, match='desconhecidas'):
+        store.record('training', f1=0.5)
+    assert store.version() == 3
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='fork indisponível')
+def test_forked_child_gets_fresh_stores_and_connections(tmp_path):
+    path = str(tmp_path / 'metrics.sqlite')
+    store = get_metrics_store(path)
+    store.record('training', accuracy=0.5)
+    inherited = store._connect()
+
+    def child():
+        code = 1
+        try:
+            child_store = get_metrics_store(path)
+            record_events([{'kind': 'scoring', 'rows': 10}], path=path)
+            fresh = child_store is not store and store._connect() is not inherited
+            code = 0 if fresh and child_store.version() == 2 else 1
+        finally:
+            os._exit(code)
+
+    # Fork com o lock ocupado (outra thread no meio de get_metrics_store): o filho não pode travar
+    with metrics_store._STORES_LOCK:
+        pid = os.fork()
+        if pid == 0:
+            child()
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        finished, status = os.waitpid(pid, os.WNOHANG)
+        if finished:
+            break
+        time.sleep(0.05)
+    else:
+        os.kill(pid, 9)
+        os.waitpid(pid, 0)
+        pytest.fail('processo filho travou em get_metrics_store')
+    assert os.WEXITSTATUS(status) == 0
+    assert store._connect() is inherited
+    assert store.version() == 2 and len(store.latest('scoring')) == 1
@@ -0,0 +1,75 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import partitioned
+from partitioned import PartitionedExecutor, merge_moments
+
+QS = [0.0, 0.01, 0.25, 0.5, 0.75, 0.9, 0.999, 1.0]
+
+def columns(rows=20_000, seed=0):
+    """Colunas com NaN, muitos empates e cauda longa"""
+    rng = np.random.default_rng(seed)
+    ties = rng.integers(0, 20, rows).astype(float)
+    skewed = rng.lognormal(0, 2, rows)
+    for values in (ties, skewed):
+        values[rng.random(rows) < 0.1] = np.nan
+    return {'ties': ties, 'skewed': skewed, 'empty': np.full(rows, np.nan)}
+
+def assert_quantiles_match(result, values):
+    # Exato contra o numpy; o pandas passa por percentis (q * 100) e pode diferir no último bit
+    values = values[~np.isnan(values)]
+    assert result == np.quantile(values, QS).tolist()
+    assert result == pytest.approx(pd.Series(values).quantile(QS).tolist(), rel=1e-12)
+
+def moments_of(values):
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return 0, 0.0, 0.0, math.inf, -math.inf
+    return len(values), values.mean(), float(((values - values.mean()) ** 2).sum()), values.min(), values.max()
+
+@pytest.fixture(params=[1, 3], ids=['serial', 'fork'])
+def partitions(request, monkeypatch):
+    # Bins pequenos forçam várias rodadas de estreitamento antes de juntar os valores
+    monkeypatch.setattr(partitioned, 'QUANTILE_GATHER_ROWS', 8)
+    return request.param
+
+def test_merge_moments_matches_a_single_pass():
+    values = columns()['skewed']
+    cuts = [0, 1, 1, 5000, 12_345, len(values)]
+    merged = moments_of(values[:0])
+    for start, stop in zip(cuts[:-1], cuts[1:]):
+        merged = merge_moments(merged, moments_of(values[start:stop]))
+
+    count, mean, m2, low, high = moments_of(values)
+    assert merged[0] == count
+    assert merged[1] == pytest.approx(mean, rel=1e-12)
+    assert merged[2] == pytest.approx(m2, rel=1e-10)
+    assert (merged[3], merged[4]) == (low, high)
+
+def test_quantiles_and_moments_match_pandas(partitions):
+    data = columns()
+    with PartitionedExecutor(data, partitions) as executor:
+        moments = executor.moments(['ties', 'skewed'])
+        for name in ('ties', 'skewed'):
+            series = pd.Series(data[name])
+            assert_quantiles_match(executor.quantiles(name, QS), data[name])
+            assert moments[name]['count'] == series.count()
+            assert moments[name]['mean'] == pytest.approx(series.mean(), rel=1e-12)
+            assert moments[name]['var'] == pytest.approx(series.var(ddof=0), rel=1e-10)
+            assert (moments[name]['min'], moments[name]['max']) == (series.min(), series.max())
+        assert all(math.isnan(value) for value in executor.quantiles('empty', [0.5]))
+
+def test_masked_quantiles_match_pandas_after_filter(partitions):
+    data = columns(seed=1)
+    frame = pd.DataFrame(data)
+    with PartitionedExecutor(data, partitions) as executor:
+        executor.filter('ties', 3, 15)
+        executor.filter('skewed', 0.1, 50)
+        expected = frame[frame['ties'].between(3, 15) & frame['skewed'].between(0.1, 50)]
+        np.testing.assert_array_equal(executor.mask, frame.index.isin(expected.index))
+
+        assert_quantiles_match(executor.quantiles('skewed', QS, use_mask=True), expected['skewed'].to_numpy())
+        assert executor.moments(['ties'], use_mask=True)['ties']['count'] == len(expected)
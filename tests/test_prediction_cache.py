@@ -0,0 +1,88 @@
+import numpy as np
+
+import exoplanet_ml
+from exoplanet_ml import PredictionCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_sync_version_invalidates_entries():
+    cache = PredictionCache()
+    cache.sync_version('v1')
+    key = cache.make_key('ensemble', [1.0, 2.0])
+    cache.put(key, 'a')
+    assert cache.get(key) == 'a'
+
+    cache.sync_version('v1')
+    assert cache.get(key) == 'a'
+
+    cache.sync_version('v2')
+    assert cache.stats()['entries'] == 0
+    assert cache.get(cache.make_key('ensemble', [1.0, 2.0])) is None
+
+def test_keys_include_model_version():
+    cache = PredictionCache()
+    cache.sync_version('v1')
+    old_key = cache.make_key('ensemble', [1.0])
+    cache.sync_version('v2')
+    assert cache.make_key('ensemble', [1.0]) != old_key
+
+def test_ttl_expires_entries(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(exoplanet_ml.time, 'monotonic', clock)
+    cache = PredictionCache(ttl_seconds=10)
+    key = cache.make_key('ensemble', [1.0])
+    cache.put(key, 'a')
+
+    clock.now += 10
+    assert cache.get(key) == 'a'
+    clock.now += 0.5
+    assert cache.get(key) is None
+    assert cache.stats()['entries'] == 0
+
+def test_lru_eviction_keeps_recent_entries():
+    cache = PredictionCache(max_entries=2)
+    keys = [cache.make_key('ensemble', [float(i)]) for i in range(3)]
+    cache.put(keys[0], 0)
+    cache.put(keys[1], 1)
+    cache.get(keys[0])
+    cache.put(keys[2], 2)
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == 0
+    assert cache.get(keys[2]) == 2
+    assert cache.stats()['evictions'] == 1
+
+def test_make_key_canonicalizes_negative_zero():
+    cache = PredictionCache()
+    assert cache.make_key('batch', [-0.0, 1.0]) == cache.make_key('batch', [0.0, 1.0])
+
+def test_predict_exoplanet_results_do_not_share_cached_state(detector):
+    point = {'koi_period': 5.0, 'koi_depth': 0.5, 'koi_prad': 3.0}
+    first = detector.predict_exoplanet(point)
+    first['probabilities']['Logistic']['CONFIRMED'] = -1.0
+    first['individual_predictions'].clear()
+
+    second = detector.predict_exoplanet(point)
+    assert second['cached']
+    assert second['probabilities']['Logistic']['CONFIRMED'] >= 0
+    assert second['individual_predictions']
+    second['probabilities'].clear()
+
+    third = detector.predict_exoplanet(point)
+    assert set(third['probabilities']) == set(detector.models)
+
+def test_predict_batch_cache_is_opt_in(detector):
+    rows = np.array([[5.0, 0.5, 3.0], [30.0, 0.2, 8.0]])
+    uncached = detector.predict_batch(rows)
+    assert detector.prediction_cache.stats()['entries'] == 0
+
+    cached = detector.predict_batch(rows, use_cache=True)
+    assert detector.prediction_cache.stats()['entries'] == 2
+    again = detector.predict_batch(rows, use_cache=True)
+    assert detector.prediction_cache.stats()['hits'] == 2
+    assert uncached.equals(cached) and cached.equals(again)
@@ -0,0 +1,85 @@
+import copy
+import os
+import tempfile
+
+from conftest import labeled_catalog
+from exoplanet_ml import MISSION_MODELS_SUBDIR, MissionModelGroup, ModelRegistry, SessionModelHandle
+
+def saved_copy(detector, directory):
+    """Cópia do detector salva com uma versão nova em `directory`"""
+    clone = copy.deepcopy(detector)
+    clone.save_models(str(directory))
+    return clone
+
+def test_promote_then_load_active(tmp_path, detector):
+    registry = ModelRegistry(str(tmp_path))
+    version = registry.promote(saved_copy(detector, tmp_path))
+
+    loaded = ModelRegistry(str(tmp_path)).load_active()
+    assert loaded.model_version == version
+    assert registry.active().model_version == version
+
+def test_unpromoted_pipelines_never_become_active(tmp_path, detector):
+    registry = ModelRegistry(str(tmp_path))
+    saved_copy(detector, tmp_path)
+    assert registry.load_active() is None
+
+    promoted = registry.promote(saved_copy(detector, tmp_path))
+    newer = saved_copy(detector, tmp_path)
+    assert newer.model_version > promoted
+
+    os.remove(tmp_path / ModelRegistry.ACTIVE_POINTER)
+    assert ModelRegistry(str(tmp_path)).load_active().model_version == promoted
+
+def test_invalid_active_falls_back_to_previous_promotion(tmp_path, detector):
+    registry = ModelRegistry(str(tmp_path))
+    first = registry.promote(saved_copy(detector, tmp_path))
+    second = registry.promote(saved_copy(detector, tmp_path))
+    assert ModelRegistry(str(tmp_path)).load_active().model_version == second
+
+    (tmp_path / f"pipeline_{second}.joblib").write_bytes(b'corrompido')
+    assert ModelRegistry(str(tmp_path)).load_active().model_version == first
+
+def test_session_models_are_copied_into_the_registry_on_promotion(tmp_path, detector):
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    handle = SessionModelHandle(registry)
+    handle.adopt(saved_copy(detector, tmp_path / 'sessions'))
+    assert registry.load_active() is None
+    assert handle.current is handle.detector
+
+    version = handle.promote()
+    assert not handle.has_private_model
+    assert (tmp_path / 'registry' / f"pipeline_{version}.joblib").exists()
+    assert ModelRegistry(str(tmp_path / 'registry')).load_active().model_version == version
+
+def test_groups_follow_the_same_promotion_rules(tmp_path, detector):
+    registry = ModelRegistry(str(tmp_path))
+    group = MissionModelGroup()
+    group.detectors = {'kepler_koi': copy.deepcopy(detector)}
+    group.save(str(tmp_path))
+    assert registry.load_active_group() is None
+    assert os.path.dirname(group.paths['kepler_koi']) == str(tmp_path / MISSION_MODELS_SUBDIR)
+
+    version = registry.promote_group(group)
+    unpromoted = MissionModelGroup()
+    unpromoted.detectors = {'tess_toi': copy.deepcopy(detector)}
+    unpromoted.save(str(tmp_path))
+
+    loaded = ModelRegistry(str(tmp_path)).load_active_group()
+    assert loaded.group_version == version
+    assert list(loaded.detectors) == ['kepler_koi']
+
+def test_session_training_leaves_no_artifact_behind(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path / 'tmp'))
+    os.makedirs(tmp_path / 'tmp')
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    handle = SessionModelHandle(registry)
+
+    _, _, training_output = handle.train(labeled_catalog(rows=300, seed=7))
+    assert training_output is not None and handle.has_private_model
+    assert os.listdir(tmp_path / 'tmp') == []
+    assert not (tmp_path / 'models').exists()
+
+    version = handle.promote()
+    assert os.listdir(tmp_path / 'registry') and (tmp_path / 'registry' / f"pipeline_{version}.joblib").exists()
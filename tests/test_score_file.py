@@ -0,0 +1,55 @@
+import glob
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import labeled_catalog
+from exoplanet_ml import ExoplanetDetector, score_file
+
+ROWS = 250
+CHUNKSIZE = 40
+
+@pytest.fixture
+def catalog():
+    df = labeled_catalog(rows=ROWS, seed=5).drop(columns='koi_disposition')
+    df.insert(0, 'kepoi_name', [f"K{i:05d}.01" for i in range(ROWS)])
+    return df
+
+def expected_scores(detector, df):
+    return pd.concat([df[['kepoi_name']], detector.predict_batch(df)], axis=1)
+
+@pytest.mark.parametrize('extension', ['csv', 'parquet'])
+@pytest.mark.parametrize('jobs', [1, 3])
+def test_output_keeps_input_order_and_ids(tmp_path, detector, catalog, extension, jobs):
+    input_path = str(tmp_path / f"catalog.{extension}")
+    output_path = str(tmp_path / f"scored.{extension}")
+    if extension == 'parquet':
+        catalog.to_parquet(input_path, index=False)
+    else:
+        catalog.to_csv(input_path, index=False)
+
+    report = score_file(detector, input_path, output_path, chunksize=CHUNKSIZE, jobs=jobs)
+    assert report['rows'] == ROWS and report['chunks'] == -(-ROWS // CHUNKSIZE)
+    assert report['outputs'] == [output_path]
+
+    scored = pd.read_parquet(output_path) if extension == 'parquet' else pd.read_csv(output_path)
+    pd.testing.assert_frame_equal(scored, expected_scores(detector, catalog), check_dtype=False)
+
+def test_partitioned_output_writes_one_part_per_chunk(tmp_path, detector, catalog):
+    input_path = str(tmp_path / 'catalog.csv')
+    catalog.to_csv(input_path, index=False)
+    output_dir = str(tmp_path / 'scored')
+
+    report = score_file(detector, input_path, output_dir, chunksize=CHUNKSIZE, jobs=2, partitioned=True)
+    parts = sorted(glob.glob(os.path.join(output_dir, 'part-*.parquet')))
+    assert [os.path.basename(path) for path in parts] == [f"part-{i:05d}.parquet" for i in range(report['chunks'])]
+    assert sorted(report['outputs']) == parts
+    assert [len(pd.read_parquet(path)) for path in parts] == [CHUNKSIZE] * 6 + [ROWS - 6 * CHUNKSIZE]
+
+    scored = pd.concat([pd.read_parquet(path) for path in parts], ignore_index=True)
+    pd.testing.assert_frame_equal(scored, expected_scores(detector, catalog), check_dtype=False)
+
+def test_untrained_detector_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        score_file(ExoplanetDetector(), str(tmp_path / 'missing.csv'), str(tmp_path / 'out.csv'))
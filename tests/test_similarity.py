@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import similarity
+from similarity import LABEL_COLUMN, SimilarityIndex
+
+FEATURES = ['koi_period', 'koi_depth', 'koi_prad']
+LABELS = ['CONFIRMED', 'CANDIDATE', 'FALSE POSITIVE']
+
+def catalog(rows, seed, start=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'koi_period': rng.lognormal(2, 1, rows),
+        'koi_depth': rng.uniform(0, 1, rows),
+        'koi_prad': rng.uniform(1, 10, rows)
+    })
+    df.loc[rng.random(rows) < 0.05, 'koi_depth'] = np.nan
+    df[LABEL_COLUMN] = rng.choice(LABELS, rows)
+    df['koi_name'] = [f"K{i:05d}" for i in range(start, start + rows)]
+    return df
+
+def brute_force(index, point, labels=None, exclude=None):
+    """(posições, distâncias) de todas as linhas, da mais próxima à mais distante"""
+    distances = np.sqrt(((index.points - point) ** 2).sum(axis=1))
+    positions = np.arange(len(index))
+    keep = positions != exclude
+    if labels is not None:
+        keep &= np.isin(index.labels, labels)
+    order = np.argsort(distances[keep], kind='stable')
+    return positions[keep][order], distances[keep][order]
+
+def assert_matches(result, positions, distances):
+    np.testing.assert_array_equal(result['position'].to_numpy(), positions)
+    np.testing.assert_allclose(result['distance'].to_numpy(), distances, rtol=1e-12)
+
+@pytest.fixture
+def buffered(monkeypatch):
+    """Índice de 500 linhas com 200 inseridas que ainda estão no buffer exaustivo"""
+    monkeypatch.setattr(similarity, 'MIN_REBUILD_ROWS', 1_000)
+    index = SimilarityIndex.build(catalog(500, seed=0), features=FEATURES, leaf_size=8)
+    index.add(catalog(200, seed=1, start=500))
+    assert (len(index), index.tree_rows) == (700, 500)
+    return index
+
+def check_against_brute_force(index):
+    for query, own in [('K00042', 42), ('K00650', 650), ({'koi_period': 8.0, 'koi_prad': 2.5}, None)]:
+        point, position = index._query_point(query)
+        assert position == own
+        for labels in (None, ['CONFIRMED'], ['CANDIDATE', 'FALSE POSITIVE']):
+            positions, distances = brute_force(index, point, labels, exclude=own)
+            assert_matches(index.k_nearest(query, k=15, labels=labels), positions[:15], distances[:15])
+            # Entre duas distâncias, para não depender do arredondamento na borda
+            radius = (distances[30] + distances[31]) / 2
+            within = distances <= radius
+            assert_matches(index.radius(query, radius, labels=labels), positions[within], distances[within])
+
+        if own is not None:
+            nearest = index.k_nearest(query, k=1, exclude_self=False)
+            assert nearest['position'].tolist() == [own] and nearest['distance'].tolist() == [0.0]
+
+def test_buffered_rows_match_brute_force(buffered):
+    check_against_brute_force(buffered)
+
+def test_rebuild_returns_the_same_neighbors(buffered):
+    before = buffered.k_nearest('K00650', k=25, labels=['CONFIRMED'])
+    buffered._rebuild()
+    assert buffered.tree_rows == len(buffered)
+    pd.testing.assert_frame_equal(buffered.k_nearest('K00650', k=25, labels=['CONFIRMED']), before)
+    check_against_brute_force(buffered)
+
+def test_add_rebuilds_past_the_buffer_limit(monkeypatch):
+    monkeypatch.setattr(similarity, 'MIN_REBUILD_ROWS', 50)
+    index = SimilarityIndex.build(catalog(500, seed=0), features=FEATURES)
+    index.add(catalog(50, seed=1, start=500))
+    assert index.tree_rows == 500
+    index.add(catalog(1, seed=2, start=550))
+    assert index.tree_rows == len(index) == 551
+
+def test_for_catalog_reuses_the_saved_index(tmp_path, monkeypatch, buffered):
+    df = catalog(300, seed=3)
+    built = SimilarityIndex.for_catalog(df, 'abc', directory=str(tmp_path))
+    assert (tmp_path / 'similarity_abc.joblib').exists()
+
+    def no_rebuild(*args, **kwargs):
+        raise AssertionError("índice reconstruído apesar de salvo")
+
+    monkeypatch.setattr(SimilarityIndex, 'build', no_rebuild)
+    loaded = SimilarityIndex.for_catalog(df, 'abc', directory=str(tmp_path))
+    pd.testing.assert_frame_equal(loaded.k_nearest('K00007'), built.k_nearest('K00007'))
+
+    path = buffered.save(str(tmp_path / 'buffered.joblib'))
+    restored = SimilarityIndex.load(path)
+    assert restored.tree_rows == buffered.tree_rows
+    pd.testing.assert_frame_equal(restored.radius('K00650', 1.0), buffered.radius('K00650', 1.0))
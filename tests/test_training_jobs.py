@@ -0,0 +1,79 @@
+import os
+import time
+
+import pytest
+
+from conftest import labeled_catalog
+from exoplanet_ml import ExoplanetDetector, TrainingJobManager
+
+def wait_until_finished(manager, job_id, timeout=180):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = manager.status(job_id)
+        if status['state'] in TrainingJobManager.FINISHED_STATES:
+            return status
+        time.sleep(0.2)
+    pytest.fail(f"Job {job_id} não terminou em {timeout}s")
+
+@pytest.fixture
+def job_env(tmp_path, monkeypatch):
+    # O processo do job herda o ambiente: métricas e diretório de trabalho temporários
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('EXOPLANET_METRICS_DB', str(tmp_path / 'metrics.sqlite'))
+    return tmp_path
+
+def test_completed_job_result_is_handed_over_once(job_env):
+    manager = TrainingJobManager(max_workers=1)
+    df = labeled_catalog(rows=300, seed=8)
+    job_id = manager.submit(df, metadata={'filename': 'tiny.csv'})
+
+    status = wait_until_finished(manager, job_id)
+    assert status['state'] == 'completed', status['error']
+    assert status['progress'] == 1.0 and set(status['partial_metrics'])
+    assert not any(key.startswith('_') for key in status)
+    workdir = manager._jobs[job_id]['_workdir']
+    assert os.path.isdir(workdir)
+
+    result = manager.result(job_id)
+    assert isinstance(result['detector'], ExoplanetDetector) and result['detector'].models
+    assert result['adapted_df'] is df and len(result['processed_df'])
+    assert result['metadata'] == {'filename': 'tiny.csv'}
+
+    # Depois de entregue, o job só guarda o estado público
+    assert manager.result(job_id) is None
+    assert manager.status(job_id)['consumed']
+    job = manager._jobs[job_id]
+    assert job['_df'] is None and job['_result'] is None
+    assert not os.path.exists(workdir)
+    assert not (job_env / 'models').exists()
+
+def test_cancel_queued_and_running_jobs(job_env):
+    manager = TrainingJobManager(max_workers=1)
+    df = labeled_catalog(rows=300, seed=9)
+    running = manager.submit(df)
+    queued = manager.submit(df)
+    assert manager.status(running)['state'] == 'running'
+    assert manager.status(queued)['state'] == 'queued'
+
+    assert manager.cancel(queued, reason='teste')
+    assert manager.status(queued)['state'] == 'cancelled'
+    assert manager.status(queued)['error'] == 'teste'
+    assert not manager.cancel(queued)
+
+    process = manager._jobs[running]['_process']
+    assert manager.cancel(running)
+    assert process.wait(timeout=30) is not None
+    assert manager.status(running)['state'] == 'cancelled'
+    assert manager.result(running) is None
+    assert manager._jobs[running]['_df'] is None and manager._jobs[running]['_workdir'] is None
+    assert manager.result('job-desconhecido') is None
+
+def test_finished_jobs_expire_after_the_ttl(job_env):
+    manager = TrainingJobManager(max_workers=0, result_ttl_seconds=60)
+    job_id = manager.submit(labeled_catalog(rows=50, seed=10))
+    manager.cancel(job_id)
+    assert manager.status(job_id)['state'] == 'cancelled'
+
+    manager._jobs[job_id]['finished_at'] -= 61
+    assert manager.status(job_id) is None
+    assert manager._jobs == {}
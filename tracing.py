@@ -0,0 +1,347 @@
+"""
+Instrumentação leve das etapas do pipeline
+Mede duração, linhas, bytes e pico de memória por etapa e exporta em texto Prometheus ou JSON
+"""
+
+import os
+import sys
+import json
+import time
+import bisect
+import threading
+import functools
+import logging
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# EXOPLANET_TRACING=0 desliga a instrumentação (cada etapa custa só um teste de flag)
+TRACING_ENABLED = os.environ.get('EXOPLANET_TRACING', '1') != '0'
+
+# Limites superiores (segundos) dos baldes do histograma de duração
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 1800.0)
+
+# Intervalo de amostragem do RSS enquanto alguma etapa está aberta
+RSS_SAMPLE_SECONDS = 0.01
+
+def current_rss_bytes():
+    """RSS atual do processo em bytes"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Sem /proc só há o pico do processo; ru_maxrss vem em bytes no macOS e em KB no Linux
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+class Span:
+    """Uma execução de etapa; rows e bytes podem ser preenchidos dentro do bloco"""
+
+    __slots__ = ('name', 'rows', 'bytes', 'started', 'seconds', 'rss_start', 'peak_rss', 'error', 'thread')
+
+    def __init__(self, name, rows=None, bytes=None):
+        self.name = name
+        # Thread que abriu a etapa (permite separar execuções concorrentes)
+        self.thread = threading.get_ident()
+        self.rows = rows
+        self.bytes = bytes
+        self.started = time.time()
+        self.seconds = None
+        self.rss_start = self.peak_rss = current_rss_bytes()
+        self.error = None
+
+    @property
+    def peak_delta(self):
+        """Memória adicional (bytes) no pico da etapa em relação ao início"""
+        return max(0, self.peak_rss - self.rss_start)
+
+    def to_dict(self):
+        return {
+            'stage': self.name,
+            'started': self.started,
+            'seconds': self.seconds,
+            'rows': self.rows,
+            'bytes': self.bytes,
+            'rss_start_bytes': self.rss_start,
+            'peak_rss_bytes': self.peak_rss,
+            'peak_delta_bytes': self.peak_delta,
+            'error': self.error
+        }
+
+class _NullSpan:
+    """Span sem efeito usado com a instrumentação desligada"""
+
+    __slots__ = ()
+    rows = bytes = seconds = error = None
+    rss_start = peak_rss = peak_delta = 0
+
+    def __setattr__(self, name, value):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class _StageStats:
+    """Agregado de uma etapa: histograma de duração, totais e maior pico"""
+
+    __slots__ = ('buckets', 'count', 'seconds_sum', 'rows', 'bytes', 'peak_rss', 'peak_delta', 'errors')
+
+    def __init__(self):
+        self.buckets = [0] * (len(DURATION_BUCKETS) + 1)
+        self.count = 0
+        self.seconds_sum = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.peak_rss = 0
+        self.peak_delta = 0
+        self.errors = 0
+
+    def add(self, span):
+        self.buckets[bisect.bisect_left(DURATION_BUCKETS, span.seconds)] += 1
+        self.count += 1
+        self.seconds_sum += span.seconds
+        self.rows += span.rows or 0
+        self.bytes += span.bytes or 0
+        self.peak_rss = max(self.peak_rss, span.peak_rss)
+        self.peak_delta = max(self.peak_delta, span.peak_delta)
+        self.errors += span.error is not None
+
+class Tracer:
+    """Registro das etapas do processo
+
+    Uma única thread amostra o RSS, e só enquanto houver etapas abertas; cada
+    etapa guarda o maior valor visto entre sua abertura e seu fechamento.
+    """
+
+    def __init__(self, enabled=TRACING_ENABLED, history=512):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._recent = deque(maxlen=history)
+        self._active = []
+        self._wake = threading.Condition(self._lock)
+        self._sampler = None
+        self._listeners = []
+
+    def start(self, name, rows=None, bytes=None):
+        """Abre uma etapa (use trace_stage em vez de chamar diretamente)"""
+        if not self.enabled:
+            return _NULL_SPAN
+        span = Span(name, rows, bytes)
+        with self._lock:
+            self._active.append(span)
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_loop, name='tracing-rss', daemon=True)
+                self._sampler.start()
+            if len(self._active) == 1:
+                self._wake.notify()
+        return span
+
+    def finish(self, span, seconds, error=None):
+        """Fecha uma etapa e soma ao agregado"""
+        if span is _NULL_SPAN:
+            return
+        span.seconds = seconds
+        span.error = error
+        span.peak_rss = max(span.peak_rss, current_rss_bytes())
+        with self._lock:
+            self._active.remove(span)
+            self._stats.setdefault(span.name, _StageStats()).add(span)
+            self._recent.append(span)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(span)
+
+    def _sample_loop(self):
+        while True:
+            with self._lock:
+                while not self._active:
+                    self._wake.wait()
+                active = list(self._active)
+            rss = current_rss_bytes()
+            for span in active:
+                if rss > span.peak_rss:
+                    span.peak_rss = rss
+            time.sleep(RSS_SAMPLE_SECONDS)
+
+    def _after_fork(self):
+        # No filho só existe a thread que chamou fork: o lock pode ter ficado preso
+        # pelo amostrador e as etapas abertas pertencem ao pai
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._active = []
+        self._sampler = None
+
+    def add_listener(self, callback):
+        """Registra callback(span) chamado ao fim de cada etapa"""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def reset(self):
+        """Descarta agregados e histórico"""
+        with self._lock:
+            self._stats.clear()
+            self._recent.clear()
+
+    def snapshot(self):
+        """Agregados por etapa e execuções recentes, em estruturas serializáveis"""
+        with self._lock:
+            stats = {name: _copy_stats(stage) for name, stage in self._stats.items()}
+            recent = [span.to_dict() for span in self._recent]
+        return {
+            'enabled': self.enabled,
+            'pid': os.getpid(),
+            'timestamp': time.time(),
+            'rss_bytes': current_rss_bytes(),
+            'buckets': list(DURATION_BUCKETS),
+            'stages': {
+                name: {
+                    'count': stage.count,
+                    'seconds_sum': stage.seconds_sum,
+                    'seconds_mean': stage.seconds_sum / stage.count if stage.count else 0.0,
+                    'rows': stage.rows,
+                    'bytes': stage.bytes,
+                    'peak_rss_bytes': stage.peak_rss,
+                    'peak_delta_bytes': stage.peak_delta,
+                    'errors': stage.errors,
+                    'histogram': stage.buckets
+                }
+                for name, stage in sorted(stats.items())
+            },
+            'recent': recent
+        }
+
+    def prometheus_text(self, prefix='exoplanet'):
+        """Agregados no formato de exposição de texto do Prometheus"""
+        with self._lock:
+            stats = {name: _copy_stats(stage) for name, stage in self._stats.items()}
+
+        lines = [
+            f'# HELP {prefix}_stage_duration_seconds Duração das etapas do pipeline',
+            f'# TYPE {prefix}_stage_duration_seconds histogram'
+        ]
+        for name, stage in sorted(stats.items()):
+            label = _escape_label(name)
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS, stage.buckets):
+                cumulative += count
+                lines.append(f'{prefix}_stage_duration_seconds_bucket{{stage="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_duration_seconds_bucket{{stage="{label}",le="+Inf"}} {stage.count}')
+            lines.append(f'{prefix}_stage_duration_seconds_sum{{stage="{label}"}} {stage.seconds_sum}')
+            lines.append(f'{prefix}_stage_duration_seconds_count{{stage="{label}"}} {stage.count}')
+
+        for metric, kind, help_text, attribute in (
+            ('stage_rows_total', 'counter', 'Linhas processadas por etapa', 'rows'),
+            ('stage_bytes_total', 'counter', 'Bytes processados por etapa', 'bytes'),
+            ('stage_errors_total', 'counter', 'Execuções com erro por etapa', 'errors'),
+            ('stage_peak_rss_bytes', 'gauge', 'Maior RSS do processo observado durante a etapa', 'peak_rss'),
+            ('stage_peak_delta_bytes', 'gauge', 'Maior crescimento do RSS durante a etapa', 'peak_delta'),
+        ):
+            lines.append(f'# HELP {prefix}_{metric} {help_text}')
+            lines.append(f'# TYPE {prefix}_{metric} {kind}')
+            for name, stage in sorted(stats.items()):
+                lines.append(f'{prefix}_{metric}{{stage="{_escape_label(name)}"}} {getattr(stage, attribute)}')
+
+        lines.append(f'# HELP {prefix}_process_rss_bytes RSS atual do processo')
+        lines.append(f'# TYPE {prefix}_process_rss_bytes gauge')
+        lines.append(f'{prefix}_process_rss_bytes {current_rss_bytes()}')
+        return '\n'.join(lines) + '\n'
+
+    def dump_json(self, path):
+        """Grava o snapshot em um arquivo JSON"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as handle:
+            json.dump(self.snapshot(), handle, indent=2)
+        return path
+
+def _copy_stats(stage):
+    copy = _StageStats()
+    for attribute in _StageStats.__slots__:
+        value = getattr(stage, attribute)
+        setattr(copy, attribute, list(value) if isinstance(value, list) else value)
+    return copy
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+TRACER = Tracer()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=TRACER._after_fork)
+
+class trace_stage:
+    """Mede uma etapa; funciona como gerenciador de contexto ou decorador
+
+        with trace_stage('smote', rows=len(X)) as span:
+            ...
+            span.rows = len(X_resampled)
+
+        @trace_stage('preprocess_data')
+        def preprocess_data(...): ...
+    """
+
+    __slots__ = ('name', 'rows', 'bytes', 'tracer', '_span', '_started')
+
+    def __init__(self, name, rows=None, bytes=None, tracer=None):
+        self.name = name
+        self.rows = rows
+        self.bytes = bytes
+        self.tracer = tracer or TRACER
+        self._span = None
+
+    def __enter__(self):
+        self._span = self.tracer.start(self.name, self.rows, self.bytes)
+        self._started = time.perf_counter()
+        return self._span
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.tracer.finish(self._span, time.perf_counter() - self._started, None if exc_type is None else exc_type.__name__)
+        return False
+
+    def __call__(self, function):
+        name, rows, bytes, tracer = self.name, self.rows, self.bytes, self.tracer
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return function(*args, **kwargs)
+            with trace_stage(name, rows, bytes, tracer):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    tracer = TRACER
+
+    def do_GET(self):
+        if self.path.rstrip('/') in ('', '/metrics'):
+            body = self.tracer.prometheus_text().encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        elif self.path.rstrip('/') == '/metrics.json':
+            body = json.dumps(self.tracer.snapshot()).encode('utf-8')
+            content_type = 'application/json'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+def start_metrics_server(port=9108, host='127.0.0.1', tracer=None):
+    """Servidor HTTP local com /metrics (Prometheus) e /metrics.json, em thread daemon"""
+    handler = type('MetricsHandler', (_MetricsHandler,), {'tracer': tracer or TRACER})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name='tracing-http', daemon=True).start()
+    logger.info(f"Métricas das etapas em http://{host}:{server.server_address[1]}/metrics")
+    return server